@@ -154,6 +154,7 @@ class ImportEE(FxnBlock):
     _init_s = ImportEEState
     _init_ee_out = Electricity
     flownames = {"ee_1": "ee_out"}
+    quiescent = True
     """
     Import EE is the line of electricity going into the pump
     We define it here as a subclass of the FxnBlock superclass (imported from define.py)
@@ -215,6 +216,7 @@ class ImportWater(FxnBlock):
     _init_m = ImportWaterMode
     _init_wat_out = Water
     flownames = {"wat_1": "wat_out"}
+    quiescent = True
 
     def behavior(self, time):
         """ The behavior is that if the flow has a no_wat fault, the water
@@ -242,6 +244,7 @@ class ExportWater(FxnBlock):
     _init_m = ExportWaterMode
     _init_wat_in = Water
     flownames = {'wat_2': 'wat_in'}
+    quiescent = True
 
     def behavior(self, time):
         """ Here a blockage changes the area the output water flows through """
@@ -285,6 +288,19 @@ class ImportSig(FxnBlock):
             else:
                 self.sig_out.s.power = 0.0
 
+    def quiescent(self, time):
+        """
+        Since the behavior depends on time, the function declares when it next changes
+        (see :meth:`fmdtools.define.block.Block.quiescent_until`), so that the timesteps
+        in between may be skipped in event-driven simulation or shifted when re-using
+        simulations (see :class:`fmdtools.sim.memo.ScenarioMemo`).
+        """
+        if time < 5:
+            return 5.0
+        elif time < 50:
+            return 50.0
+        return True
+
 
 """
 Move Water Classes
@@ -366,6 +382,11 @@ class MoveWat(FxnBlock):
         """
         return self.wat_out.s.pressure > 15.0
 
+    def quiescent(self, time):
+        """The function is quiescent unless the pressure limit timer is running,
+        since it then changes at each timestep."""
+        return not self.indicate_over_pressure(time)
+
     def behavior(self, time):
         """ here we can define how the function will behave with different faults """
         if self.m.has_fault('short'):
@@ -445,6 +445,15 @@ class PlanPath(FxnBlock):
         if self.m.in_mode("standby", "em_off", "finished"):
             self.control.s.put(rpower=0, lpower=0)
 
+    def quiescent(self, time):
+        """Quiescent until the scheduled mode changes at t=5 and t=149
+        (see :meth:`fmdtools.define.block.Block.quiescent_until`)."""
+        if time < 5:
+            return 5.0
+        elif time < 149:
+            return 149.0
+        return True
+
     def drive_control(self):
         """Control of rpower/lpower signal based on percieved line."""
         u_self = self.pos_signal.s.get('ux', 'uy')
@@ -586,6 +595,7 @@ class Drive(FxnBlock):
     _init_motor_control = Control
     _init_ee_in = EE
     flownames = {"ee_15": "ee_in"}
+    quiescent = True
 
     def dynamic_behavior(self, time):
         self.fault_sig.s.assign(self.m.s, "friction", "transfer", "drift")
@@ -630,6 +640,7 @@ class Perception(FxnBlock):
     _init_ee = EE
     _init_video = Video
     flownames = {"ee_12": "ee"}
+    quiescent = True
 
     def dynamic_behavior(self, time):
         if self.m.in_mode("off"):
@@ -694,6 +705,7 @@ class Power(FxnBlock):
     _init_ee_5 = EE
     _init_ee_12 = EE
     _init_switch = Switch
+    quiescent = True
 
     def static_behavior(self, time):
         """Determining power use based on mode."""
@@ -768,6 +780,7 @@ class Override(FxnBlock):
     _init_motor_control = Control
     _init_auto_control = Control
     flownames = {"ee_5": "ee"}
+    quiescent = True
 
     def dynamic_behavior(self, time):
         if self.m.in_mode("off"):
@@ -787,6 +800,7 @@ class Communications(FxnBlock):
     _init_ee_12 = EE
     _init_comms = Comms
     _init_pos_signal = Pos_Signal
+    quiescent = True
 
     def dynamic_behavior(self, time):
         if self.ee_12.s.v == 12:
@@ -806,6 +820,15 @@ class Operator(FxnBlock):
         elif t == 200:
             self.switch.s.power = 0
 
+    def quiescent(self, t):
+        """Quiescent until the power is switched on at t=1 and off at t=200
+        (see :meth:`fmdtools.define.block.Block.quiescent_until`)."""
+        if t < 1:
+            return 1.0
+        elif t < 200:
+            return 200.0
+        return True
+
 
 def gen_model_params(x, scen):
     params = {"drive_modes": {"custom_fault": {"friction": x[scen][0][0],
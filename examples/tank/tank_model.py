@@ -64,6 +64,7 @@ class ImportLiquid(FxnBlock):
     _init_sig = Signal
     _init_watout = Liquid
     flownames = {'wat_in_1': 'watout', 'valve1_sig': 'sig'}
+    quiescent = True
 
     def static_behavior(self, time):
         if not self.m.has_fault('stuck'):
@@ -84,6 +85,7 @@ class ExportLiquid(FxnBlock):
     _init_sig = Signal
     _init_watin = Liquid
     flownames = {'wat_out_2': 'watin', 'valve2_sig': 'sig'}
+    quiescent = True
 
     def static_behavior(self, time):
         if not self.m.has_fault('stuck'):
@@ -106,6 +108,7 @@ class GuideLiquid(FxnBlock):
     _init_watin = Liquid
     _init_watout = Liquid
     _init_m = GuideLiquidMode
+    quiescent = True
 
     def static_behavior(self, time):
         if self.m.has_fault('clogged'):
@@ -147,6 +150,7 @@ class StoreLiquid(FxnBlock):
     _init_watout = Liquid
     _init_sig = Signal
     flownames = {'wat_in_2': 'watin', 'wat_out_1': 'watout', 'tank_sig': 'sig'}
+    quiescent = True
 
     def static_behavior(self, time):
         if self.s.level >= 20.0:
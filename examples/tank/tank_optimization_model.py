@@ -66,6 +66,7 @@ class ImportLiquid(FxnBlock):
     _init_sig = Signal
     _init_wat_out = Liquid
     flownames = {'coolant_in': 'wat_out', 'input_sig': 'sig'}
+    quiescent = True
 
     def behavior(self, time):
         if self.sig.s.action >= 1:
@@ -94,6 +95,7 @@ class ExportLiquid(FxnBlock):
     _init_sig = Signal
     _init_wat_in = Liquid
     flownames = {'coolant_out': 'wat_in', 'output_sig': 'sig'}
+    quiescent = True
 
     def behavior(self, time):
         if self.sig.s.action >= 1:
@@ -129,6 +131,7 @@ class StoreLiquid(FxnBlock):
     _init_wat_out = Liquid
     _init_sig = Signal
     flownames = {'coolant_in': 'wat_in', 'coolant_out': 'wat_out', 'tank_sig': 'sig'}
+    quiescent = True
 
     def behavior(self, time):
         if self.s.level >= self.p.capacity:
@@ -163,6 +166,7 @@ class ContingencyActions(FxnBlock):
     _init_input_sig = Signal
     _init_output_sig = Signal
     _init_tank_sig = Signal
+    quiescent = True
 
     def dynamic_behavior(self, time):
         self.input_sig.s.action = self.p.policymap[self.input_sig.s.indicator,
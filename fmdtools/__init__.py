@@ -1,5 +1,17 @@
+import importlib
 import fmdtools.define as define
 import fmdtools.sim as sim
-import fmdtools.analyze as analyze
 
-__all__ = ['analyze', 'sim', 'define']
\ No newline at end of file
+__all__ = ['analyze', 'sim', 'define']
+
+
+def __getattr__(name):
+    # analyze is imported when first used, since its plotting/tabulating modules
+    # import matplotlib/pandas (which are not needed to define and simulate models)
+    if name == 'analyze':
+        return importlib.import_module('fmdtools.analyze')
+    raise AttributeError("module 'fmdtools' has no attribute '" + name + "'")
+
+
+def __dir__():
+    return sorted({*globals(), 'analyze'})
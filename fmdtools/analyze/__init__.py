@@ -1,6 +1,15 @@
+import importlib
 
-from fmdtools.analyze import tabulate
-from fmdtools.analyze import graph
-from fmdtools.analyze import plot
-from fmdtools.analyze import result
-from fmdtools.analyze import show
\ No newline at end of file
+__all__ = ['tabulate', 'graph', 'plot', 'result', 'show']
+
+
+def __getattr__(name):
+    # plotting/tabulating modules import matplotlib/pandas, so they are only
+    # imported when first used
+    if name in __all__:
+        return importlib.import_module('fmdtools.analyze.' + name)
+    raise AttributeError("module 'fmdtools.analyze' has no attribute '" + name + "'")
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
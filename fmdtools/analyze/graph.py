@@ -783,13 +783,18 @@ class Graph(object):
         ax : matplotlib axis
             Ax in the figure
         """
+        # only the given time is used, so the (e.g., delta-encoded) histories are cut
+        # to it before comparing states
+        t_ind = time
+        if time >= 0:
+            history, t_ind = history.cut_view(time, time), 0
         faulty = history.get_faulty_hist(*self.g.nodes,
                                          withtotal=False,
-                                         withtime=False).get_slice(time)
+                                         withtime=False).get_slice(t_ind)
         fault_nodes = {n: bool(faulty.get(n, 0)) for n in self.g.nodes}
         nx.set_node_attributes(self.g, fault_nodes, 'faulty')
 
-        faults = Result(history.get_faults_hist(*self.g.nodes).get_slice(time))
+        faults = Result(history.get_faults_hist(*self.g.nodes).get_slice(t_ind))
         faults_nodes = {n: [k for k, v in faults.get(n).items() if v]
                         if fault_nodes.get(n)
                         else [] for n in self.g.nodes}
@@ -797,7 +802,7 @@ class Graph(object):
 
         degraded = history.get_degraded_hist(*self.g.nodes,
                                              withtotal=False,
-                                             withtime=False).get_slice(time)
+                                             withtime=False).get_slice(t_ind)
         deg_nodes = {n: not bool(degraded.get(n, 1)) for n in self.g.nodes}
         nx.set_node_attributes(self.g, deg_nodes, 'degraded')
 
@@ -7,17 +7,43 @@ processed. Has classes:
   (nested dictionaries of metric(s))
 - :class:`History`: Class for defining simulation histories
   (nested dictionaries of arrays or lists)
+- :class:`DeltaArray`: Time-history of an array stored as the initial array plus the
+  sparse changes at each time (e.g., for large grids in a History)
+- :class:`ColumnarHistory`: History where fields are stored as columns of a single
+  (time x field) array per dtype
+- :class:`SharedHistory`: ColumnarHistory with buffers in shared memory, which is
+  pickled by reference (e.g., when sent to process pool workers)
+- :class:`StackedHistory`: History of a set of scenarios where each field is a single
+  (scenario x time) array, masked where scenarios end early
+- :class:`NominalComparison`: Running comparison of a history with a nominal
+  history, updated as the history is logged
+- :class:`EndclassTable`: Columnar (scenario x metric) view of a flat Result, used to
+  calculate statistics of metrics over scenarios
+- :class:`KeyIndex`: Index of the (flattened) keys of a Result/History, used to find
+  keys by prefix/suffix without scanning every key
+- :class:`NpzData`: Dict-like data of a Result/History loaded from npz file(s), which
+  reads each field from the file(s) when it is first accessed
 
 And functions:
 
 - :func:`load`: Loads a given file to a Result/History
 - :func:`load_folder`: Loads a given folder to a Result/History
+- :func:`fromcolumns`: Creates a ColumnarHistory from a given set of buffers
+- :func:`attach_shared`: Creates a SharedHistory from buffers in shared memory
+- :func:`attach_shm`: Attaches to a shared memory block (without tracking it)
+- :func:`close_shm`: Closes a shared memory block (if its buffer is not in use)
+- :func:`detach_shared`: Closes shared memory blocks no longer used by SharedHistories
+- :func:`save_npz`: Saves a Result/History to a columnar (npz) file
+- :func:`load_npz`: Lazily loads a Result/History from columnar (npz) file(s)
+- :func:`group_sum`: Sums an array of values over groups given by integer codes
+- :func:`stack_rows`: Stacks arrays into a single (masked, if needed) array
+- :func:`trim_masked`: Removes trailing masked entries from a stacked array
 
 Private Methods:
 
 - :func:`file_check`: Check if files exists and whether to overwrite the file
 - :func:`auto_filetype`: Helper function that automatically determines the filetype
-  (pickle, csv, or json) of a given filename
+  (pickle, csv, json, or npz) of a given filename
 - :func:`create_indiv_filename`: Helper function that creates an individualized name for
   a file given the general filename and an individual id
 - :func:`clean_resultdict_keys`: Helper function for recreating results dictionary keys
@@ -32,6 +58,8 @@ Private Methods:
 - :func:`bootstrap_confidence_interval`: Convenience wrapper for scipy.bootstrap
 - :func:`diff`: Helper function for finding inconsistent states between val1, val2, with
   the difftype option
+- :func:`reduce_diff`: Helper function for reducing the differences of arrays with
+  multiple values at each time (e.g., grids) to a single value per time
 - :func:`nan_to_x`: Helper function for Result Class, returns nan as zero if present,
   otherwise returns the number
 - :func:`is_numeric`: Helper function for Result Class, checks if a given value is
@@ -48,21 +76,30 @@ Private Methods:
 - :func:`init_hist_iter`: Initializes the history for a given attribute att with value
   val. Enables the recursive definition of a history as a nested structure.
 - :func:`init_dicthist`: Initializes histories for dictionary attributes (if any)
+- :func:`compile_path`: Compiles a nested attribute/key path into a single accessor
+- :func:`compile_log_getter`: Compiles the accessor used by :meth:`History.log` to get
+  the value of a given history key from an object
 """
 
 import numpy as np
-import pandas as pd
 import copy
 import sys
 import os
+import zipfile
+import bisect
+import threading
+import weakref
 from collections import UserDict
+from collections.abc import MutableMapping
+from multiprocessing import shared_memory, resource_tracker
+from operator import attrgetter, itemgetter
 from ordered_set import OrderedSet
-from fmdtools.define.common import get_var, t_key, get_obj_indicators
+from fmdtools.define.common import get_var, t_key, get_obj_indicators, LaneArray
 
 
-def file_check(filename, overwrite):
-    """Check if files exists and whether to overwrite the file"""
-    if os.path.exists(filename):
+def file_check(filename, overwrite, append=False):
+    """Check if files exists and whether to overwrite the file (or append to it)"""
+    if os.path.exists(filename) and not append:
         if not overwrite:
             raise Exception("File already exists: "+filename)
         else:
@@ -76,8 +113,8 @@ def file_check(filename, overwrite):
 
 
 def auto_filetype(filename, filetype=""):
-    """Helper function that automatically determines the filetype (pickle, csv, or json)
-    of a given filename"""
+    """Helper function that automatically determines the filetype (pickle, csv, json,
+    or npz) of a given filename"""
     if not filetype:
         if '.' not in filename:
             raise Exception("No file extension")
@@ -87,9 +124,11 @@ def auto_filetype(filename, filetype=""):
             filetype = "csv"
         elif filename[-5:] == '.json':
             filetype = "json"
+        elif filename[-4:] == '.npz':
+            filetype = "npz"
         else:
             raise Exception("Invalid File Type in: " + filename +
-                            ", ensure extension is pkl, csv, or json ")
+                            ", ensure extension is pkl, csv, json, or npz ")
     return filetype
 
 
@@ -197,6 +236,475 @@ def bootstrap_confidence_interval(data, method=np.mean, return_anyway=False, **k
         raise Exception("All data are the same!")
 
 
+def group_sum(vals, codes, num_groups):
+    """
+    Sums an array of values over groups given by integer codes.
+
+    The values of each group are summed sequentially, in the order given (as with
+    sum() over the values of the group), so the sums depend only on the order of the
+    values. Note that they may differ from np.sum (which uses pairwise summation) in
+    the last bits.
+
+    Parameters
+    ----------
+    vals : array
+        Values to sum.
+    codes : array
+        Integer group codes (0 to num_groups-1) of each value.
+    num_groups : int
+        Number of groups.
+
+    Returns
+    -------
+    sums : np.array
+        Sum of the values in each group (0.0 for empty groups).
+
+    Examples
+    --------
+    >>> group_sum([1.0, 2.0, 3.0, 4.0], [0, 1, 0, 1], 3)
+    array([4., 6., 0.])
+    """
+    vals = np.asarray(vals, dtype=float)
+    codes = np.asarray(codes, dtype=int)
+    return np.bincount(codes, weights=vals, minlength=num_groups)
+
+
+def stack_rows(arrays):
+    """
+    Stacks a list of arrays into a single array (along a new first axis), which is a
+    masked array if any of the arrays are masked.
+
+    Examples
+    --------
+    >>> stack_rows([np.array([1, 2]), np.ma.MaskedArray([3, 4], mask=[False, True])])
+    masked_array(
+      data=[[1, 2],
+            [3, --]],
+      mask=[[False, False],
+            [False,  True]],
+      fill_value=999999)
+    """
+    if not len(arrays):
+        return np.array([])
+    if any(isinstance(a, np.ma.MaskedArray) for a in arrays):
+        return np.ma.stack(arrays)
+    return np.stack(arrays)
+
+
+def trim_masked(vals):
+    """
+    Removes the trailing (time) entries of a stacked (scenario x time) array which are
+    masked in every scenario, returning a plain array if no entries remain masked.
+
+    Examples
+    --------
+    >>> trim_masked(np.ma.MaskedArray([[1, 2, 0], [3, 4, 0]], mask=[[0, 0, 1], [0, 0, 1]]))
+    array([[1, 2],
+           [3, 4]])
+    """
+    if not isinstance(vals, np.ma.MaskedArray):
+        return vals
+    mask = np.ma.getmaskarray(vals)
+    if vals.ndim > 1:
+        unmasked = np.any(~mask.reshape(mask.shape[0], mask.shape[1], -1), axis=(0, 2))
+        length = len(unmasked) - np.argmax(unmasked[::-1]) if np.any(unmasked) else 0
+        vals = vals[:, :length]
+        mask = mask[:, :length]
+    if not np.any(mask):
+        return np.asarray(vals.data)
+    return vals
+
+
+class KeyIndex(object):
+    """
+    Index of the (flattened) keys of a Result/History, used to find keys by prefix
+    (e.g., scenario), suffix (e.g., value), or inner part without scanning every key.
+
+    Keys are indexed by their first component, last component, and the components in
+    between (e.g., 'scen.fxns.fxnname.s.val' is indexed under 'scen', 'val', and
+    'fxns.fxnname.s'), so queries only scan the (much fewer) distinct components. Each
+    part of the index is built lazily on first use. The index is held by the
+    result (see :meth:`Result.get_key_index`), which rebuilds it when keys are added or
+    removed. Lists of keys returned by queries may be part of the index, and should
+    thus not be modified.
+
+    Examples
+    --------
+    >>> idx = KeyIndex({'nominal.fxns.f.s.x': 0, 'scen_1.fxns.f.s.x': 1,
+    ...                 'scen_10.fxns.f.s.y': 2, 'scen_1.time': 3})
+    >>> idx.with_suffix('s.x')
+    ['nominal.fxns.f.s.x', 'scen_1.fxns.f.s.x']
+    >>> idx.with_prefix('scen_1')
+    ['scen_1.fxns.f.s.x', 'scen_10.fxns.f.s.y', 'scen_1.time']
+    >>> idx.with_prefix('scen_1.')
+    ['scen_1.fxns.f.s.x', 'scen_1.time']
+    >>> idx.with_inner('f')
+    ['nominal.fxns.f.s.x', 'scen_1.fxns.f.s.x', 'scen_10.fxns.f.s.y']
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.flat = None
+        self._parts = {}
+
+    def get_part(self, part):
+        """Gets (building, if needed) the part of the index ('pos', 'first', 'firsts',
+        'last', or 'inner')."""
+        if part not in self._parts:
+            if part == 'pos':
+                self._parts[part] = {k: i for i, k in enumerate(self.data)}
+            elif part == 'firsts':
+                self._parts[part] = sorted(self.get_part('first'))
+            else:
+                index = {}
+                for k in self.data:
+                    if not isinstance(k, str):
+                        continue
+                    if part == 'first':
+                        comp = k.partition('.')[0]
+                    elif part == 'last':
+                        comp = k.rpartition('.')[2]
+                    else:
+                        comps = k.split('.')
+                        if len(comps) < 3:
+                            continue
+                        comp = '.'.join(comps[1:-1])
+                    keys = index.get(comp)
+                    if keys is None:
+                        index[comp] = [k]
+                    else:
+                        keys.append(k)
+                self._parts[part] = index
+        return self._parts[part]
+
+    def ordered(self, keys):
+        """Sorts the given keys in the order of the indexed result."""
+        pos = self.get_part('pos')
+        return sorted(set(keys), key=pos.__getitem__)
+
+    def first_keys(self):
+        """Gets the distinct first components of the keys (in order)."""
+        return self.get_part('first').keys()
+
+    def with_first(self, first):
+        """Gets the keys with the given first component (in order)."""
+        return self.get_part('first').get(first, [])
+
+    def firsts_with_prefix(self, prefix):
+        """Gets the first components starting with the string prefix (with no '.')."""
+        firsts = self.get_part('firsts')
+        matches = []
+        for first in firsts[bisect.bisect_left(firsts, prefix):]:
+            if not first.startswith(prefix):
+                break
+            matches.append(first)
+        return matches
+
+    def with_prefix(self, prefix):
+        """Gets the keys starting with the string prefix (i.e., k.startswith(prefix))."""
+        first, sep, _ = prefix.partition('.')
+        if sep:
+            return [k for k in self.with_first(first) if k.startswith(prefix)]
+        by_first = self.get_part('first')
+        matches = self.firsts_with_prefix(prefix)
+        if len(matches) == 1:
+            return by_first[matches[0]]
+        return self.ordered([k for first in matches for k in by_first[first]])
+
+    def with_suffix(self, suffix):
+        """Gets the keys ending with the string suffix (i.e., k.endswith(suffix))."""
+        by_last = self.get_part('last')
+        last = suffix.rpartition('.')[2]
+        if last != suffix:
+            return [k for k in by_last.get(last, []) if k.endswith(suffix)]
+        matches = [last for last in by_last if last.endswith(suffix)]
+        if len(matches) == 1:
+            return by_last[matches[0]]
+        return self.ordered([k for last in matches for k in by_last[last]])
+
+    def with_inner(self, inner):
+        """Gets the keys with the string inner between the first and last components
+        (i.e., '.'+inner+'.' in k)."""
+        inner = '.' + inner + '.'
+        by_inner = self.get_part('inner')
+        matches = [comp for comp in by_inner if inner in '.' + comp + '.']
+        if len(matches) == 1:
+            return by_inner[matches[0]]
+        return self.ordered([k for comp in matches for k in by_inner[comp]])
+
+
+class EndclassTable(object):
+    """
+    Columnar (scenario x metric) view of a flat Result (e.g., endclasses over a set of
+    scenarios), which is used to calculate statistics of metrics (e.g., in
+    :meth:`Result.expected`, :meth:`Result.average`) as vectorized numpy operations.
+
+    Keys are split into a row (e.g., 'scen_1.endclass') and a metric (e.g., 'cost'),
+    and the values of each metric are stored as an array over the rows (a float array
+    if all values are numeric, otherwise an object array).
+
+    As in :meth:`Result.get_values`, metrics are selected by suffix, so e.g. 'cost'
+    selects both 'cost' and 'expected cost' (while '.cost' only selects 'cost').
+
+    Examples
+    --------
+    >>> res = Result({'a.endclass.rate': 0.1, 'a.endclass.cost': 10.0,
+    ...               'b.endclass.rate': 0.2, 'b.endclass.cost': 20.0})
+    >>> table = EndclassTable(res)
+    >>> table.rows
+    ['a.endclass', 'b.endclass']
+    >>> table.columns['cost']
+    array([10., 20.])
+    >>> float(table.expected('cost')), float(table.average('cost', rows=[1]))
+    (5.0, 20.0)
+    """
+
+    def __init__(self, result):
+        """
+        Creates the table.
+
+        Parameters
+        ----------
+        result : Result
+            Flat result to create the table from.
+        """
+        self.index = result.get_key_index()
+        self.row_index = {}
+        cols = {}
+        for k, val in result.items():
+            row, _, metric = k.rpartition('.')
+            i = self.row_index.setdefault(row, len(self.row_index))
+            col = cols.get(metric)
+            if col is None:
+                cols[metric] = ([i], [val])
+            else:
+                col[0].append(i)
+                col[1].append(val)
+        self.rows = [*self.row_index]
+        num_rows = len(self.rows)
+        self.columns = {}
+        self.present = {}
+        for metric, (inds, vals) in cols.items():
+            if all(isinstance(v, (bool, int, float, np.number)) for v in vals):
+                col = np.full(num_rows, np.nan)
+            else:
+                col = np.empty(num_rows, dtype=object)
+            if col.dtype == object:
+                for i, val in zip(inds, vals):
+                    col[i] = val
+            else:
+                col[inds] = vals
+            if len(inds) == num_rows:
+                self.present[metric] = None
+            else:
+                self.present[metric] = np.zeros(num_rows, dtype=bool)
+                self.present[metric][inds] = True
+            self.columns[metric] = col
+        self._selections = {}
+        self._scen_rows = {}
+
+    def get_selection(self, metric):
+        """
+        Gets the metrics (columns) and rows of the table whose keys end with the string
+        metric.
+
+        Returns
+        -------
+        metrics : list
+            Metrics (column names) selected.
+        row_mask : np.array/None
+            Boolean array of rows selected. None if all rows are selected.
+        """
+        if metric not in self._selections:
+            last = metric.rpartition('.')[2]
+            if last == metric:
+                metrics = [m for m in self.columns if m.endswith(metric)]
+                row_mask = None
+            else:
+                metrics = [last] if last in self.columns else []
+                head = metric[:len(metric)-len(last)]
+                row_mask = np.array([bool(row) and (row + '.').endswith(head)
+                                     for row in self.rows], dtype=bool)
+            self._selections[metric] = (metrics, row_mask)
+        return self._selections[metric]
+
+    def get_scen_rows(self, scen):
+        """Gets the indices of the rows of a given scenario (i.e., rows with the first
+        component scen)."""
+        if not self._scen_rows:
+            scen_rows = {}
+            for i, row in enumerate(self.rows):
+                scen_rows.setdefault(row.partition('.')[0], []).append(i)
+            self._scen_rows.update({s: np.array(r) for s, r in scen_rows.items()})
+        return self._scen_rows.get(scen, np.array([], dtype=int))
+
+    def select(self, metric, rows=None, codes=None):
+        """
+        Gets the values of a metric (selected by suffix) as a single 1-d array.
+
+        Parameters
+        ----------
+        metric : str
+            Metric to get (e.g. 'cost' or '.cost').
+        rows : array, optional
+            Indices of the rows to get values from. The default is None (all rows).
+        codes : array, optional
+            Integer group codes of each of the given rows (or of all rows). If given,
+            the codes of the selected values are also returned. The default is None.
+
+        Returns
+        -------
+        values : np.array
+            Values of the metric in the (given) rows (ordered by row, then metric).
+        value_codes : np.array
+            Group codes of each value (only returned if codes are given).
+        """
+        metrics, row_mask = self.get_selection(metric)
+        if rows is None:
+            if row_mask is not None:
+                rows = np.nonzero(row_mask)[0]
+                if codes is not None:
+                    codes = np.asarray(codes)[rows]
+        else:
+            rows = np.asarray(rows, dtype=int)
+            if row_mask is not None:
+                in_sel = row_mask[rows]
+                rows = rows[in_sel]
+                if codes is not None:
+                    codes = np.asarray(codes)[in_sel]
+        if len(metrics) == 1:
+            vals = self.columns[metrics[0]]
+            present = self.present[metrics[0]]
+            if rows is not None:
+                vals = vals[rows]
+                if present is not None:
+                    present = present[rows]
+            if present is not None:
+                vals = vals[present]
+                if codes is not None:
+                    codes = np.asarray(codes)[present]
+        elif not metrics:
+            vals = np.array([])
+            if codes is not None:
+                codes = np.array([], dtype=int)
+        else:
+            vals = np.stack([self.columns[m] for m in metrics], axis=1)
+            present = np.stack([np.ones(len(self.rows), dtype=bool)
+                                if self.present[m] is None else self.present[m]
+                                for m in metrics], axis=1)
+            if rows is not None:
+                vals = vals[rows]
+                present = present[rows]
+            vals = vals[present]
+            if codes is not None:
+                codes = np.repeat(np.asarray(codes), len(metrics))[present.ravel()]
+        if codes is None:
+            return vals
+        return vals, np.asarray(codes, dtype=int)
+
+    def get(self, row, metric, default=np.nan):
+        """Gets the value of a given (exact) metric in a given row."""
+        i = self.row_index.get(row)
+        if i is None or metric not in self.columns:
+            return default
+        if self.present[metric] is not None and not self.present[metric][i]:
+            return default
+        return self.columns[metric][i]
+
+    def get_scen_value(self, scen, metric, default=np.nan):
+        """Gets the value of a given (exact) metric in the (first) row of a given
+        scenario, e.g. 'cost' for 'scen.endclass.cost'."""
+        for i in self.get_scen_rows(scen):
+            if metric in self.columns and (self.present[metric] is None or
+                                           self.present[metric][i]):
+                return self.columns[metric][i]
+        return default
+
+    def total(self, metric, rows=None):
+        """Calculates the total (non-weighted sum) of a metric (see
+        :meth:`Result.total`)."""
+        return np.sum(self.select(metric, rows))
+
+    def expected(self, metric, prob_key='rate', rows=None):
+        """Calculates the expected value of a metric weighted by prob_key (see
+        :meth:`Result.expected`)."""
+        ecs = self.select(metric, rows).astype(float)
+        weights = self.select(prob_key, rows).astype(float)
+        return np.sum(ecs[~np.isnan(ecs)]*weights[~np.isnan(weights)])
+
+    def average(self, metric, empty_as='nan', rows=None):
+        """Calculates the average value of a metric (see :meth:`Result.average`)."""
+        ecs = self.select(metric, rows).astype(float)
+        ecs = ecs[~np.isnan(ecs)]
+        if len(ecs) > 0:
+            return np.mean(ecs)
+        elif empty_as == 'nan':
+            return np.nan
+        else:
+            return empty_as
+
+    def percent(self, metric, rows=None):
+        """Calculates the percentage of an indicator metric being True (see
+        :meth:`Result.percent`)."""
+        ecs = self.select(metric, rows).astype(float)
+        return np.sum(ecs[~np.isnan(ecs)].astype(bool))/(len(ecs)+1e-16)
+
+    def rate(self, metric, prob_key='rate', rows=None):
+        """Calculates the rate of an indicator metric being True weighted by prob_key
+        (see :meth:`Result.rate`)."""
+        ecs = self.select(metric, rows).astype(float)
+        weights = self.select(prob_key, rows).astype(float)
+        return np.sum(ecs[~np.isnan(ecs)].astype(bool)*weights[~np.isnan(weights)])
+
+    def group_average(self, metric, codes, num_groups, empty_as='nan', rows=None):
+        """
+        Calculates the average value of a metric over each group of rows.
+
+        Parameters
+        ----------
+        metric : str
+            Metric to average (selected by suffix).
+        codes : array
+            Integer group codes (0 to num_groups-1) of the given rows (or all rows).
+        num_groups : int
+            Number of groups.
+        empty_as : float/'nan', optional
+            Value for groups without (non-nan) values. The default is 'nan'.
+        rows : array, optional
+            Indices of the rows to average over. The default is None (all rows).
+
+        Returns
+        -------
+        averages : np.array
+            Average of the metric in each group (object array if empty_as is
+            non-numeric and used).
+        """
+        ecs, ec_codes = self.select(metric, rows, codes)
+        ecs = ecs.astype(float)
+        notnan = ~np.isnan(ecs)
+        counts = np.bincount(ec_codes[notnan], minlength=num_groups)
+        sums = group_sum(ecs[notnan], ec_codes[notnan], num_groups)
+        empty = counts == 0
+        avgs = sums/np.where(empty, 1, counts)
+        if empty_as == 'nan':
+            avgs[empty] = np.nan
+        elif np.any(empty):
+            if not isinstance(empty_as, (bool, int, float, np.number)):
+                avgs = avgs.astype(object)
+            avgs[empty] = empty_as
+        return avgs
+
+    def group_percent(self, metric, codes, num_groups, rows=None):
+        """Calculates the percentage of an indicator metric being True over each group
+        of rows (see :meth:`EndclassTable.group_average`)."""
+        ecs, ec_codes = self.select(metric, rows, codes)
+        ecs = ecs.astype(float)
+        notnan = ~np.isnan(ecs)
+        trues = np.bincount(ec_codes[notnan], weights=ecs[notnan].astype(bool),
+                            minlength=num_groups)
+        return trues/(np.bincount(ec_codes, minlength=num_groups)+1e-16)
+
 class Result(UserDict):
     """
     Result is a special type of dictionary that makes it convenient to store, access,
@@ -222,7 +730,7 @@ class Result(UserDict):
     def __repr__(self, ind=0):
         str_rep = ""
         for k, val in self.items():
-            if isinstance(val, np.ndarray) or isinstance(val, list):
+            if isinstance(val, (np.ndarray, DeltaArray)) or isinstance(val, list):
                 if type(k) == tuple:
                     k = str(k)
                 val_rep = ind*"--"+k+": "
@@ -264,8 +772,8 @@ class Result(UserDict):
         equality : Bool
             Whether the results are equal
         """
-        return all([all(v == other[k])
-                    if isinstance(v, np.ndarray)
+        return all([np.all(v == other[k])
+                    if isinstance(v, (np.ndarray, DeltaArray))
                     else v == other[k]
                     for k, v in self.data.items()])
 
@@ -343,9 +851,58 @@ class Result(UserDict):
 
     def __setattr__(self, key, val):
         if key == "data":
+            self.__dict__.pop('_key_index', None)
             UserDict.__setattr__(self, key, val)
         else:
-            self.data[key] = val
+            self[key] = val
+
+    def __setitem__(self, key, val):
+        if key not in self.data or isinstance(val, Result):
+            self.__dict__.pop('_key_index', None)
+        self.__dict__.pop('_endclass_table', None)
+        self.data[key] = val
+
+    def __delitem__(self, key):
+        self.__dict__.pop('_key_index', None)
+        self.__dict__.pop('_endclass_table', None)
+        del self.data[key]
+
+    def get_key_index(self):
+        """
+        Gets the :class:`KeyIndex` of the keys of the result, which is used to find keys
+        by prefix/suffix (e.g., in get_values, get_scens, etc). The index is built on
+        first use and re-built when keys have been added or removed.
+
+        Returns
+        -------
+        index : KeyIndex
+            Index of the keys of the result.
+        """
+        index = self.__dict__.get('_key_index')
+        if index is None or index.data is not self.data or index.size != len(self.data):
+            index = KeyIndex(self.data)
+            self.__dict__['_key_index'] = index
+        return index
+
+    def get_endclass_table(self):
+        """
+        Gets the :class:`EndclassTable` (scenario x metric view) of the result, which
+        is used to calculate statistics over scenarios (e.g., in expected, average,
+        etc). For flat results, the table is built on first use and re-built when
+        the result is modified.
+
+        Returns
+        -------
+        table : EndclassTable
+            Table of the (flattened) result.
+        """
+        if not self.is_flat():
+            return EndclassTable(self.flatten())
+        table = self.__dict__.get('_endclass_table')
+        if table is None or table.index is not self.get_key_index():
+            table = EndclassTable(self)
+            self.__dict__['_endclass_table'] = table
+        return table
 
     def get(self, *argstr,  **to_include):
         """
@@ -377,9 +934,8 @@ class Result(UserDict):
         if attr in self:
             return self[attr]
         new = self.__class__()
-        for k, v in self.items():
-            if k.startswith(attr+'.'):
-                new[k[len(attr)+1:]] = v
+        for k in self.get_key_index().with_prefix(attr+'.'):
+            new[k[len(attr)+1:]] = self[k]
         if len(new) > 1:
             return new
         elif len(new) > 0:
@@ -396,11 +952,16 @@ class Result(UserDict):
         """Loads as Result using :func:`load'"""
         inputdict = load(filename, filetype="", renest_dict=renest_dict,
                          indiv=indiv, Rclass=Result)
+        if isinstance(inputdict.data, NpzData):
+            return inputdict
         return fromdict(Result, inputdict)
 
     def load_folder(folder, filetype, renest_dict=False):
         """Loads as History using :func:`load_folder'"""
         files_toread = load_folder(folder, filetype)
+        if filetype == 'npz':
+            return load_npz(*[folder+'/'+filename for filename in files_toread],
+                            Rclass=Result)
         result = Result()
         for filename in files_toread:
             result.update(Result.load(folder+'/'+filename, filetype,
@@ -411,18 +972,25 @@ class Result(UserDict):
 
     def get_values(self, *values):
         """Gets a dict with all values corresponding to the strings in *values"""
+        if not self.is_flat():
+            return self.flatten().get_values(*values)
+        index = self.get_key_index()
+        if len(values) == 1:
+            k_vs = index.with_suffix(values[0])
+        else:
+            k_vs = index.ordered([k for v in values for k in index.with_suffix(v)])
         h = self.__class__()
-        flatself = self.flatten()
-        k_vs = [k for k in flatself.keys() for v in values if k.endswith(v)]
         for k in k_vs:
-            h[k] = flatself[k]
+            h[k] = self[k]
         return h
 
     def get_scens(self, *scens):
         """Gets a dictlike with all scenarios corresponding to the strings in *scens"""
         h = self.__class__()
-        k_s = [k for k in self.keys()
-               for s in scens if k.startswith(s+".") or '.'+s+'.' in k]
+        index = self.get_key_index()
+        k_s = index.ordered([k for s in scens
+                             for keys in (index.with_prefix(s+"."), index.with_inner(s))
+                             for k in keys])
         for k in k_s:
             h[k] = self[k]
         return h
@@ -449,13 +1017,24 @@ class Result(UserDict):
         if 'time' not in values:
             values = values + ('time', )
         group_hist = self.__class__()
+        index = self.get_key_index()
+        value_keys = index.ordered([k for v in values for k in index.with_suffix(v)
+                                    if '.t.' not in k])
         for group, scens in groups.items():
             if scens == 'default':
-                scens = {k.split('.')[0] for k in self.keys()}
-            elif type(scens) == str:
-                scens = [scens]
-            k_vs = [k for k in self.keys() for scen in scens for v in values
-                    if k.startswith(scen) and k.endswith(v) and '.t.' not in k]
+                k_vs = value_keys
+            else:
+                if type(scens) == str:
+                    scens = [scens]
+                firsts = set()
+                prefixes = []
+                for scen in scens:
+                    if '.' in scen:
+                        prefixes.append(scen)
+                    else:
+                        firsts.update(index.firsts_with_prefix(scen))
+                k_vs = [k for k in value_keys if k.partition('.')[0] in firsts
+                        or any(k.startswith(prefix) for prefix in prefixes)]
             if len(k_vs) > 0 and (group not in group_hist):
                 group_hist[group] = self.__class__()
             for k in k_vs:
@@ -535,24 +1114,24 @@ class Result(UserDict):
 
     def is_flat(self):
         """Checks if the history is flat."""
-        for v in self.values():
-            if isinstance(v, Result):
-                return False
-        return True
+        index = self.get_key_index()
+        if index.flat is None:
+            index.flat = (isinstance(self.data, NpzData) or
+                          not any(isinstance(v, Result) for v in self.values()))
+        return index.flat
 
     def nest(self, levels=np.inf):
         """
         Re-nests a flattened result
         """
         newhist = self.__class__()
-        key_options = set([h.split('.')[0] for h in self.keys()])
-        for key in key_options:
+        index = self.get_key_index()
+        for key in index.first_keys():
             if key in self:
                 newhist[key] = self[key]
             else:
-                subdict = {histkey[len(key)+1:]: val
-                           for histkey, val in self.items()
-                           if histkey.startswith(key+".")}
+                subdict = {histkey[len(key)+1:]: self[histkey]
+                           for histkey in index.with_first(key)}
                 subhist = self.__class__(**subdict)
                 lev = levels-1
                 if lev > 0:
@@ -588,10 +1167,10 @@ class Result(UserDict):
             mem_profile[k] = mem
         return mem_total, mem_profile
 
-    def save(self, filename, filetype="", overwrite=False, result_id=''):
+    def save(self, filename, filetype="", overwrite=False, result_id='', append=False):
         """
         Saves a given result variable (endclasses or mdlhists) to a file filename.
-        Files can be saved as pkl, csv, or json.
+        Files can be saved as pkl, csv, json, or npz (see :func:`save_npz`).
 
         Parameters
         ----------
@@ -606,15 +1185,23 @@ class Result(UserDict):
         result_id : str, optional
             For individual results saving. Places an identifier for the result in the
             file. The default is ''.
+        append : bool, optional
+            Whether to append the result to an existing file (npz only), e.g. when
+            saving scenarios individually. The default is False.
         """
         import dill
         import json
         import csv
-        file_check(filename, overwrite)
+        file_check(filename, overwrite, append=append)
 
         variable = self
         filetype = auto_filetype(filename, filetype)
-        if filetype == 'pickle':
+        if append and filetype != 'npz':
+            raise Exception("Appending only supported for npz files: "+filename)
+        if filetype == 'npz':
+            save_npz(variable, filename, result_id=result_id, append=append)
+            return
+        elif filetype == 'pickle':
             with open(filename, 'wb') as file_handle:
                 if result_id:
                     variable = {result_id: variable}
@@ -651,6 +1238,7 @@ class Result(UserDict):
 
     def as_table(self):
         """Creates a table corresponding to the current dict structure"""
+        import pandas as pd
         flatdict = self.flatten()
         newdict = {join_key(k): v for k, v in flatdict.items()}
         return pd.DataFrame.from_dict(newdict)
@@ -658,6 +1246,7 @@ class Result(UserDict):
     def create_simple_fmea(self, *metrics):
         """Makes a simple fmea-stype table of the metrics in the endclasses
         of a list of fault scenarios run. If metrics not provided, returns all"""
+        import pandas as pd
         nested = {k: {**v.endclass} for k, v in self.nest(levels=1).items()}
         tab = pd.DataFrame.from_dict(nested).transpose()
         if not metrics:
@@ -665,10 +1254,85 @@ class Result(UserDict):
         else:
             return tab.loc[:, metrics]
 
+    def as_stacked(self):
+        """
+        Creates a :class:`StackedHistory` of the scenarios in the result, where each
+        field is stacked into a single (scenario x time) array over the scenarios
+        (padded and masked where scenarios end early or are missing the field).
+
+        Returns
+        -------
+        stacked_hist : StackedHistory
+            Stacked fields of the scenarios (first-level keys) of the result.
+
+        Examples
+        --------
+        >>> r = Result({'nominal.cost': 0.0, 'fault.cost': 2.0, 'fault.rate': 0.1})
+        >>> sr = r.as_stacked()
+        >>> sr['cost']
+        array([0., 2.])
+        >>> sr.present['rate']
+        array([False,  True])
+        """
+        flat = self if self.is_flat() else self.flatten()
+        scen_inds = {}
+        fields = {}
+        for k, v in flat.items():
+            scen, _, key = k.partition('.')
+            if not key:
+                continue
+            i = scen_inds.setdefault(scen, len(scen_inds))
+            field = fields.get(key)
+            if field is None:
+                fields[key] = ([i], [v])
+            else:
+                field[0].append(i)
+                field[1].append(v)
+        num_scens = len(scen_inds)
+        stacked = {}
+        present = {}
+        for key, (inds, vals) in fields.items():
+            vals = [np.asarray(v) for v in vals]
+            shapes = {v.shape for v in vals}
+            if len(inds) == num_scens:
+                present[key] = None
+                if len(shapes) == 1:
+                    stacked[key] = np.stack(vals)
+                    continue
+            else:
+                present[key] = np.zeros(num_scens, dtype=bool)
+                present[key][inds] = True
+            if len({shape[1:] for shape in shapes}) > 1 or () in shapes:
+                if {*shapes} == {()}:
+                    data = np.zeros(num_scens, dtype=np.result_type(*vals))
+                    mask = np.ones(num_scens, dtype=bool)
+                    data[inds] = vals
+                    mask[inds] = False
+                    stacked[key] = np.ma.MaskedArray(data, mask=mask)
+                else:
+                    # ragged fields are not stacked
+                    stacked[key] = np.empty(num_scens, dtype=object)
+                    for i, v in zip(inds, vals):
+                        stacked[key][i] = v
+                continue
+            tail = [*shapes][0][1:]
+            length = max(shape[0] for shape in shapes)
+            data = np.zeros((num_scens, length)+tail, dtype=np.result_type(*vals))
+            mask = np.ones((num_scens, length)+tail, dtype=bool)
+            for i, v in zip(inds, vals):
+                data[i, :len(v)] = v
+                mask[i, :len(v)] = False
+            stacked[key] = np.ma.MaskedArray(data, mask=mask)
+        return StackedHistory(stacked, scens=scen_inds, present=present)
+
     def get_expected(self, app=[], with_nominal=False, difference_from_nominal=False):
         """
         Takes the expectation of numeric metrics in the result over given scenarios.
 
+        The expectation is taken over the stacked scenarios (see :meth:`as_stacked`),
+        so each metric is averaged over all scenarios in a single call (ignoring
+        times after the end of scenarios which end early).
+
         Parameters
         ----------
         app : SampleApproach, optional
@@ -686,27 +1350,33 @@ class Result(UserDict):
             Result/History with values corresponding to the expectation of
             its quantities over the contained scenarios.
         """
-        mh = self.nest(levels=1)
-
-        nomhist = {k: v for k, v in mh.nominal.items() if is_numeric(v)}
-        newhists = {k: hist for k, hist in mh.items()
-                    if not ('nominal' in k and not (with_nominal))}
+        stacked = self.as_stacked()
+        if 'nominal' not in stacked.scens:
+            raise Exception("No nominal scenario in result")
+        nom = stacked.scens.index('nominal')
+        rows = [i for i, k in enumerate(stacked.scens)
+                if not ('nominal' in k and not (with_nominal))]
         if app:
             weights = [w.rate for w in app.scenlist]
             if with_nominal:
                 weights.append(1)
         else:
-            weights = [1 for k in newhists]
+            weights = [1 for k in rows]
 
         expres = self.__class__()
-        for k in nomhist.keys():
+        for k, vals in stacked.items():
+            if stacked.present[k] is not None and not stacked.present[k][nom]:
+                continue
+            if not is_numeric(vals[nom]):
+                continue
             if difference_from_nominal:
-                expres[k] = np.average([nomhist[k]-hist[k]
-                                        for hist in newhists.values()],
-                                       axis=0, weights=weights)
+                vals = trim_masked(vals[nom]-vals[rows])
+            else:
+                vals = trim_masked(vals[rows])
+            if isinstance(vals, np.ma.MaskedArray):
+                expres[k] = np.ma.average(vals, axis=0, weights=weights)
             else:
-                expres[k] = np.average([hist[k] for hist in newhists.values()],
-                                       axis=0, weights=weights)
+                expres[k] = np.average(vals, axis=0, weights=weights)
         return expres
 
     def total(self, metric):
@@ -723,7 +1393,7 @@ class Result(UserDict):
         totalcost : Float
             The total metric of the scenarios.
         """
-        return sum([e for e in self.get_values(metric).values()])
+        return self.get_endclass_table().total(metric)
 
     def state_probabilities(self, prob_key='prob', class_key='classification'):
         """
@@ -757,34 +1427,21 @@ class Result(UserDict):
     def expected(self, metric, prob_key='rate'):
         """Calculates the expected value of a given metric in endclasses using the rate
         variable in endclasses"""
-        ecs = np.array([e for e in self.get_values(metric).values()
-                        if not np.isnan(e)])
-        weights = np.array([e for e in self.get_values(prob_key).values()
-                            if not np.isnan(e)])
-        return sum(ecs*weights)
+        return self.get_endclass_table().expected(metric, prob_key=prob_key)
 
     def average(self, metric, empty_as='nan'):
         """Calculates the average value of a given metric in endclasses"""
-        ecs = [e for e in self.get_values(metric).values() if not np.isnan(e)]
-        if len(ecs) > 0 or empty_as == 'nan':
-            return np.mean(ecs)
-        else:
-            return empty_as
+        return self.get_endclass_table().average(metric, empty_as=empty_as)
 
     def percent(self, metric):
         """Calculates the percentage of a given indicator variable being True in
         endclasses"""
-        return sum([int(bool(e)) for e in self.get_values(metric).values()
-                    if not np.isnan(e)])/(len(self.get_values(metric))+1e-16)
+        return self.get_endclass_table().percent(metric)
 
     def rate(self, metric, prob_key='rate'):
         """Calculates the rate of a given indicator variable being True in endclasses
         using the rate variable in endclasses"""
-        ecs = np.array([bool(e) for e in self.get_values(metric).values()
-                        if not np.isnan(e)])
-        weights = np.array([e for e in self.get_values(prob_key).values()
-                            if not np.isnan(e)])
-        return sum(ecs*weights)
+        return self.get_endclass_table().rate(metric, prob_key=prob_key)
 
     def end_diff(self, metric, nan_as=np.nan, as_ind=False, no_diff=False):
         """
@@ -871,6 +1528,30 @@ def diff(val1, val2, difftype='bool'):
         return abs(val1-val2) > difftype
 
 
+def reduce_diff(timediff, difftype='bool'):
+    """
+    Helper function for reducing the differences (from diff) of arrays with multiple
+    values at each time (e.g., Coords grids) to a single value per time, i.e., whether
+    all values are the same ('bool'), whether any are over the tolerance (float), or
+    the total difference ('diff').
+
+    Examples
+    --------
+    >>> reduce_diff(np.array([[[True, True]], [[True, False]]]))
+    array([ True, False])
+    """
+    timediff = np.asarray(timediff)
+    if timediff.ndim <= 1:
+        return timediff
+    timediff = timediff.reshape(len(timediff), -1)
+    if difftype == 'bool':
+        return timediff.all(axis=1)
+    elif type(difftype) == float:
+        return timediff.any(axis=1)
+    else:
+        return timediff.sum(axis=1)
+
+
 def nan_to_x(metric, x=0.0):
     """returns nan as zero if present, otherwise returns the number"""
     if np.isnan(metric):
@@ -1035,6 +1716,291 @@ def init_dicthist(start_dict, timerange, track="all"):
     return hist
 
 
+def compile_path(obj, path):
+    """
+    Compiles a nested attribute/key path into a single accessor. Consecutive
+    attributes are joined into one attrgetter, while dict entries (e.g., mdl.fxns)
+    use itemgetter, so the string does not need to be parsed again when called.
+
+    Parameters
+    ----------
+    obj : object
+        Example object (with the structure of the objects to get values from)
+    path : list
+        list of names specifying the attribute (e.g., ['fxns', 'fxnname', 's', 'x'])
+
+    Returns
+    -------
+    accessor : callable
+        Function accessor(obj) which returns the value at the given path
+    """
+    getters = []
+    atts = []
+    for name in path:
+        if type(obj) == dict:
+            if atts:
+                getters.append(attrgetter('.'.join(atts)))
+                atts = []
+            getters.append(itemgetter(name))
+            obj = obj[name]
+        else:
+            atts.append(name)
+            obj = getattr(obj, name)
+    if atts:
+        getters.append(attrgetter('.'.join(atts)))
+    if not getters:
+        return lambda o: o
+    elif len(getters) == 1:
+        return getters[0]
+
+    def get_path(o):
+        for getter in getters:
+            o = getter(o)
+        return o
+    return get_path
+
+
+def compile_log_getter(obj, att):
+    """
+    Compiles the accessor used by :meth:`History.log` to get the value of the
+    history key att from objects with the structure of obj.
+
+    Parameters
+    ----------
+    obj : Model/Function/State...
+        Object the history is logged from
+    att : str
+        Key of the history (e.g., 'fxns.fxnname.s.x', 'i.indicator',
+        'fxns.fxnname.m.faults.mode')
+
+    Returns
+    -------
+    getter : callable
+        Function getter(obj, time) which returns the value to log
+    """
+    split_att = att.split('.')
+    if att == 'time':
+        def getter(o, t):
+            return t if t is not None else get_var(o, 'time')
+    elif 'i' in split_att[:-1]:
+        i_ind = split_att.index('i')
+        get_ind = compile_path(obj, split_att[:i_ind] + ['indicate_'+split_att[-1]])
+
+        def getter(o, t):
+            return get_ind(o)(t)
+    elif 'faults' in split_att[:-1]:
+        faultind = split_att.index('faults')
+        modename = split_att[faultind+1]
+        get_mode = compile_path(obj, split_att[:faultind])
+
+        def getter(o, t):
+            return modename in get_mode(o).faults
+    else:
+        get_val = compile_path(obj, split_att)
+
+        def getter(o, t):
+            return get_val(o)
+    return getter
+
+
+class DeltaArray(object):
+    """
+    Time-history of an array (e.g., a grid state of a Coords) stored as the initial
+    array plus the sparse changes (flat indices and values) at each time-index.
+
+    Used in place of a (time x ...) numpy array in a History to save memory when few
+    entries of the array change at each time. Frames (the array at a given time-index)
+    are reconstructed when accessed, which is cheapest when accessing them in order,
+    since the last frame accessed is cached. The full (time x ...) array is only
+    created when needed, e.g., by np.array(arr) or numpy operations on the array.
+
+    Attributes
+    ----------
+    start : np.ndarray
+        Array before the first time-index (i.e., the initial value).
+    deltas : list
+        (flat indices, values) of the entries changed from the previous frame at each
+        time-index (None if nothing changed).
+    end : int
+        Number of time-indices set so far (frames after these repeat the last frame).
+
+    Examples
+    --------
+    >>> arr = DeltaArray(np.zeros((2, 2)), 3)
+    >>> arr[0] = [[0.0, 0.0], [0.0, 1.0]]
+    >>> arr[1] = [[2.0, 0.0], [0.0, 1.0]]
+    >>> arr[2] = arr[1]
+    >>> arr.deltas
+    [(array([3], dtype=int32), array([1.])), (array([0], dtype=int32), array([2.])), None]
+    >>> arr[1]
+    array([[2., 0.],
+           [0., 1.]])
+    >>> arr.shape
+    (3, 2, 2)
+    >>> arr[1:].start
+    array([[0., 0.],
+           [0., 1.]])
+    >>> np.array(arr)[:, 0, 0]
+    array([0., 2., 2.])
+    >>> arr.nbytes < np.array(arr).nbytes
+    True
+    """
+
+    __slots__ = ('start', 'deltas', 'end', '_frame_ind', '_frame')
+
+    def __init__(self, start, length=0, deltas=None, end=0):
+        self.start = np.array(start)
+        if deltas is None:
+            deltas = [None] * length
+        self.deltas = deltas
+        self.end = end
+        self._frame_ind = -1
+        self._frame = None
+
+    def __reduce__(self):
+        return self.__class__, (self.start, 0, self.deltas, self.end)
+
+    def __len__(self):
+        return len(self.deltas)
+
+    @property
+    def shape(self):
+        return (len(self.deltas), *self.start.shape)
+
+    @property
+    def ndim(self):
+        return self.start.ndim + 1
+
+    @property
+    def dtype(self):
+        return self.start.dtype
+
+    @property
+    def size(self):
+        return len(self.deltas) * self.start.size
+
+    @property
+    def nbytes(self):
+        """Number of bytes held by the initial array and changes."""
+        return self.start.nbytes + sum(d[0].nbytes + d[1].nbytes
+                                       for d in self.deltas if d is not None)
+
+    def __repr__(self):
+        return ("DeltaArray(shape=" + str(self.shape) + ", dtype=" + str(self.dtype) +
+                ", changes=" + str(sum(len(d[0]) for d in self.deltas if d is not None))
+                + ")")
+
+    def __array__(self, dtype=None, copy=None):
+        arr = np.empty(self.shape, dtype=self.dtype)
+        for t_ind in range(len(self)):
+            arr[t_ind] = self.get_frame(t_ind)
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return arr
+
+    def __iter__(self):
+        for t_ind in range(len(self)):
+            yield self.get_frame(t_ind).copy()
+
+    def __eq__(self, other):
+        return np.asarray(self) == np.asarray(other)
+
+    def __ne__(self, other):
+        return np.asarray(self) != np.asarray(other)
+
+    __hash__ = None
+
+    def check_ind(self, t_ind):
+        """Gets the (non-negative) time-index t_ind, raising an IndexError if out of
+        bounds."""
+        length = len(self)
+        if t_ind < 0:
+            t_ind += length
+        if not 0 <= t_ind < length:
+            raise IndexError("index " + str(t_ind) + " is out of bounds for " +
+                             "DeltaArray with length " + str(length))
+        return t_ind
+
+    def get_frame(self, t_ind):
+        """
+        Gets the array at time-index t_ind (-1 for start). Note that the returned array
+        is the cached frame, and should be copied before it is modified.
+        """
+        if t_ind == -1:
+            return self.start
+        t_ind = self.check_ind(t_ind)
+        if self._frame is None or t_ind < self._frame_ind:
+            self._frame_ind, self._frame = -1, self.start.copy()
+        flat = self._frame.reshape(-1)
+        for delta in self.deltas[self._frame_ind+1:t_ind+1]:
+            if delta is not None:
+                flat[delta[0]] = delta[1]
+        self._frame_ind = t_ind
+        return self._frame
+
+    def get_delta(self, prev, val):
+        """Gets the (flat indices, values) of the entries of val which differ from
+        prev (or None if they are the same)."""
+        prev, val = prev.reshape(-1), val.reshape(-1)
+        changed = prev != val
+        if val.dtype.kind in 'fc':
+            changed &= ~(np.isnan(prev) & np.isnan(val))
+        inds = np.flatnonzero(changed)
+        if not len(inds):
+            return None
+        if val.size < 2**31:
+            inds = inds.astype(np.int32)
+        return inds, val[inds]
+
+    def set_frame(self, t_ind, val):
+        """Sets the array at time-index t_ind to val (keeping the other frames)."""
+        t_ind = self.check_ind(t_ind)
+        val = np.broadcast_to(np.asarray(val, dtype=self.dtype), self.start.shape)
+        if t_ind + 1 < self.end:
+            nxt = self.get_frame(t_ind + 1).copy()
+        else:
+            nxt = None
+        prev = self.get_frame(t_ind - 1)
+        self.deltas[t_ind] = self.get_delta(prev, val)
+        if nxt is not None:
+            self.deltas[t_ind + 1] = self.get_delta(val, nxt)
+        self.end = max(self.end, t_ind + 1)
+        self._frame_ind, self._frame = t_ind, np.array(val)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.get_frame(key).copy()
+        elif isinstance(key, slice) and key.step in (None, 1):
+            start, stop, _ = key.indices(len(self))
+            stop = max(start, stop)
+            return self.__class__(self.get_frame(start - 1), deltas=self.deltas[start:stop],
+                                  end=max(0, min(self.end, stop) - start))
+        elif (isinstance(key, tuple) and key and isinstance(key[0], (int, np.integer))):
+            return self.get_frame(key[0])[key[1:]].copy()
+        else:
+            return np.asarray(self)[key]
+
+    def __setitem__(self, key, val):
+        if isinstance(key, (int, np.integer)):
+            self.set_frame(key, val)
+        elif isinstance(key, slice):
+            val = np.asarray(val)
+            t_inds = range(*key.indices(len(self)))
+            if val.ndim <= self.start.ndim:
+                val = [val] * len(t_inds)
+            for t_ind, frame in zip(t_inds, val):
+                self.set_frame(t_ind, frame)
+        else:
+            arr = np.asarray(self)
+            arr[key] = val
+            for t_ind, frame in enumerate(arr):
+                self.set_frame(t_ind, frame)
+
+    def copy(self):
+        """Creates an independent copy of the DeltaArray."""
+        return self.__class__(self.start, deltas=list(self.deltas), end=self.end)
+
+
 class History(Result):
     """
     History is a special time of :class:'Result' specifically for keeping simulation
@@ -1054,6 +2020,14 @@ class History(Result):
                 self[att] = np.empty([len(timerange)], dtype=str_size)
             elif type(val) == dict:
                 self[att] = init_dicthist(val, timerange, sub_track)
+            elif dtype == DeltaArray:
+                # initial array plus changes at each time (e.g., for large grids)
+                self[att] = DeltaArray(val, len(timerange))
+            elif isinstance(val, LaneArray):
+                # (time x lane) array for lanes simulated together (see ModelBatch)
+                lane_dtype = dtype if dtype in (bool, int, float) else val.dtype
+                self[att] = np.empty([len(timerange), len(val)],
+                                     dtype=lane_dtype).view(LaneArray)
             elif type(val) == np.ndarray or dtype == np.ndarray:
                 self[att] = np.array([val for i in timerange])
             elif dtype:
@@ -1071,11 +2045,16 @@ class History(Result):
         """Loads file as History using :func:`load'"""
         inputdict = load(filename, filetype=filetype,
                          renest_dict=renest_dict, indiv=indiv, Rclass=History)
+        if isinstance(inputdict.data, NpzData):
+            return inputdict
         return fromdict(History, inputdict)
 
     def load_folder(folder, filetype, renest_dict=False):
         """Loads folder as History using :func:`load_folder'"""
         files_toread = load_folder(folder, filetype)
+        if filetype == 'npz':
+            return load_npz(*[folder+'/'+filename for filename in files_toread],
+                            Rclass=History)
         hist = History()
         for filename in files_toread:
             hist.update(History.load(folder+'/'+filename, filetype,
@@ -1111,14 +2090,100 @@ class History(Result):
         for k, v in self.items():
             if isinstance(v, History):
                 newhist[k] = v.copy()
+            elif isinstance(v, DeltaArray):
+                newhist[k] = v.copy()
             else:
                 newhist[k] = np.copy(v)
         return newhist
 
+    def as_columnar(self):
+        """
+        Creates a (flattened) copy of the history as a :class:`ColumnarHistory`, where
+        the fixed-size 1-d fields are stored in a single (time x field) array per dtype.
+
+        Returns
+        -------
+        columnar_hist : ColumnarHistory
+            Independent columnar copy of the history.
+
+        Examples
+        --------
+        >>> h = History({'a': np.array([1.0, 2.0]), 'b': np.array([3.0, 4.0])})
+        >>> ch = h.as_columnar()
+        >>> ch['b']
+        array([3., 4.])
+        >>> [*ch._buffers.values()][0]
+        array([[1., 3.],
+               [2., 4.]])
+        """
+        flathist = self.flatten()
+        groups = {}
+        for k, v in flathist.items():
+            if isinstance(v, np.ndarray) and v.ndim == 1 and v.dtype != object:
+                groups.setdefault((v.dtype.str, len(v)), []).append(k)
+        buffers = {}
+        columns = {}
+        for bufkey, keys in groups.items():
+            buf = np.empty((bufkey[1], len(keys)), dtype=bufkey[0])
+            for col, k in enumerate(keys):
+                buf[:, col] = flathist[k]
+                columns[k] = (bufkey, col)
+            buffers[bufkey] = buf
+        others = {k: v.copy() if isinstance(v, DeltaArray) else np.copy(v)
+                  for k, v in flathist.items() if k not in columns}
+        return fromcolumns(tuple(flathist.keys()), buffers, columns, others)
+
+    def as_shared(self):
+        """
+        Creates a (flattened) copy of the history as a :class:`SharedHistory`, where
+        the columnar buffers (see :meth:`as_columnar`) are placed in shared memory.
+
+        The SharedHistory is pickled by reference to the shared memory, which makes it
+        cheap to send to a process pool (e.g., as the nominal history for each
+        scenario). The shared memory must be released using
+        :meth:`SharedHistory.release` when it is no longer needed.
+
+        Returns
+        -------
+        shared_hist : SharedHistory
+            Copy of the history with buffers in shared memory.
+
+        Examples
+        --------
+        >>> h = History({'a': np.array([1.0, 2.0]), 'b': np.array([True, False])})
+        >>> import pickle
+        >>> sh = h.as_shared()
+        >>> sh2 = pickle.loads(pickle.dumps(sh))
+        >>> sh2['a']
+        array([1., 2.])
+        >>> sh2['a'].flags.writeable
+        False
+        >>> sh.release()
+        """
+        columnar_hist = self.as_columnar()
+        buffers = {}
+        shms = {}
+        for bufkey, buf in columnar_hist._buffers.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(buf.nbytes, 1))
+            buffers[bufkey] = np.ndarray(buf.shape, dtype=buf.dtype, buffer=shm.buf)
+            buffers[bufkey][:] = buf
+            shms[bufkey] = (shm, buf.shape)
+        others = {k: v for k, v in columnar_hist.items()
+                  if k not in columnar_hist._columns}
+        hist = fromcolumns(tuple(columnar_hist.keys()), buffers,
+                           columnar_hist._columns, others, hclass=SharedHistory)
+        hist.__dict__['_shms'] = shms
+        hist.__dict__['_owner'] = True
+        return hist
+
     def log(self, obj, t_ind, time=None):
         """
         Updates the history from obj at the time t_ind
 
+        Accessors for each key are compiled (see :func:`compile_log_getter`) the first
+        time the key is logged and cached in the history, so logging a timestep does
+        not require re-parsing each key.
+
         Parameters
         ----------
         obj : Model/Function/State...
@@ -1129,28 +2194,18 @@ class History(Result):
             Real time for the history (if initialized). Used at the top level of the
             history.
         """
+        getters = self.__dict__.setdefault('_log_getters', {})
         for att, hist in self.items():
+            val = None
             try:
-                val = None
-                if att == 'time' and time is not None:
-                    val = time
-                elif att.startswith('i.') or '.i.' in att:
-                    split_att = att.split('.')
-                    i_ind = split_att.index('i')
-                    new_split_att = split_att[:i_ind] + ['indicate_'+split_att[-1]]
-                    methname = '.'.join(new_split_att)
-                    val = get_var(obj, methname)(time)
-                elif 'faults' in att:
-                    split_att = att.split('.')
-                    faultind = split_att.index('faults')
-                    modename = split_att[faultind+1]
-                    fault_att = '.'.join(split_att[:faultind])
-                    val = modename in get_var(obj, fault_att).faults
-                else:
-                    val = get_var(obj, att)
-            except: 
-                raise Exception("Unable to log att " + str(att) + " in " +
-                                str(obj.__class__.__name__) + ', val=' + str(val))
+                val = getters[att](obj, time)
+            except:
+                try:
+                    getters[att] = compile_log_getter(obj, att)
+                    val = getters[att](obj, time)
+                except:
+                    raise Exception("Unable to log att " + str(att) + " in " +
+                                    str(obj.__class__.__name__) + ', val=' + str(val))
 
             if type(hist) == History:
                 hist.log(val, t_ind)
@@ -1159,7 +2214,7 @@ class History(Result):
                     val = copy.deepcopy(val)
                 if type(hist) == list:
                     hist.append(val)
-                elif isinstance(hist, np.ndarray):
+                elif isinstance(hist, (np.ndarray, DeltaArray)):
                     try:
                         hist[t_ind] = val
                     except Exception as e:
@@ -1177,6 +2232,82 @@ class History(Result):
                         else:
                             raise Exception(obj_str + "Value too large to represent: "
                                             + att + "=" + str(val)) from e
+        comparison = self.__dict__.get('_comparison')
+        if comparison is not None:
+            comparison.update(t_ind, time=time)
+
+    def log_repeated(self, obj, start_ind, end_ind, times):
+        """
+        Fills the history at the time-indices start_ind to end_ind (exclusive) with
+        repeats of the row at start_ind-1, e.g., when the model was quiescent over these
+        times in event-driven simulation (see
+        :meth:`fmdtools.define.model.Model.quiescent_until`). Since they may depend on
+        time, the time and indicators are instead logged at each time.
+
+        Parameters
+        ----------
+        obj : Model/Function...
+            Object the history is logged from (used to evaluate indicators).
+        start_ind : int
+            First time-index to fill.
+        end_ind : int
+            Time-index to fill until (exclusive).
+        times : iterable
+            Real times of the time-indices.
+
+        Examples
+        --------
+        >>> hist = History({'a': np.array([1.0, 2.0, 0.0, 0.0]), 'time': np.zeros(4)})
+        >>> hist.time[:2] = [0.0, 1.0]
+        >>> hist.log_repeated(None, 2, 4, [2.0, 3.0])
+        >>> hist.a
+        array([1., 2., 2., 2.])
+        >>> hist.time
+        array([0., 1., 2., 3.])
+        """
+        getters = self.__dict__.get('_log_getters', {})
+        for att, hist in self.flatten().items():
+            if att == 'time' or 'i' in att.split('.')[:-1]:
+                getter = getters.get(att) or compile_log_getter(obj, att)
+                vals = [getter(obj, time) for time in times]
+            elif isinstance(hist, (np.ndarray, DeltaArray)):
+                vals = hist[start_ind-1]
+            else:
+                vals = [copy.deepcopy(hist[start_ind-1])
+                        for _ in range(end_ind - start_ind)]
+            if isinstance(hist, (np.ndarray, DeltaArray)):
+                hist[start_ind:end_ind] = vals
+            else:
+                hist.extend(vals)
+        comparison = self.__dict__.get('_comparison')
+        if comparison is not None:
+            comparison.update(end_ind - 1)
+
+    def set_comparison(self, nomhist, batch=16):
+        """
+        Sets up a running comparison of the history with a nominal history, which is
+        updated each time the history is logged (see :class:`NominalComparison`).
+
+        Parameters
+        ----------
+        nomhist : History
+            Nominal history to compare with (with the same time-indices).
+        batch : int
+            Number of logged timesteps to compare at once. The default is 16.
+
+        Returns
+        -------
+        comparison : NominalComparison
+            Comparison of the history with the nominal history.
+        """
+        comparison = NominalComparison(self, nomhist, batch=batch)
+        self.__dict__['_comparison'] = comparison
+        return comparison
+
+    def get_comparison(self):
+        """Gets the :class:`NominalComparison` of the history (if set, otherwise
+        None)."""
+        return self.__dict__.get('_comparison')
 
     def cut(self, end_ind=None, start_ind=None, newcopy=False):
         """Cuts the history to a given index"""
@@ -1200,6 +2331,19 @@ class History(Result):
                                     " in history "+str(hist.data)) from e
         return hist
 
+    def cut_view(self, end_ind=None, start_ind=None):
+        """Creates a cut history whose fields are views of the fields of the history
+        (so the data is not copied, and should not be modified)."""
+        hist = History()
+        for name, att in self.items():
+            if isinstance(att, History):
+                hist[name] = att.cut_view(end_ind, start_ind)
+            elif end_ind is None:
+                hist[name] = att[start_ind:]
+            else:
+                hist[name] = att[start_ind:end_ind+1]
+        return hist
+
     def get_slice(self, t_ind=0):
         """
         Returns a dictionary of values from (flattenned) version of the history at t_ind
@@ -1292,7 +2436,7 @@ class History(Result):
         nomhist, faulthist = self._prep_nom_faulty(nomhist)
         deghist = History()
         for att in attrs:
-            att_diff = [diff(nomhist[k], v, difftype)
+            att_diff = [reduce_diff(diff(nomhist[k], v, difftype), difftype)
                         for k, v in faulthist.items()
                         if att in k]
             if att_diff:
@@ -1493,18 +2637,966 @@ class History(Result):
         """
         if not values:
             values = self.keys()
+        hist = self if self.is_flat() else self.flatten()
         metrics = Result()
         for value in values:
-            metrics[value] = self.get_metric(value, metric=metric, args=args, axis=axis)
+            metrics[value] = hist.get_metric(value, metric=metric, args=args, axis=axis)
         return metrics
 
 
+class ColumnarHistory(History):
+    """
+    History where the fixed-size (bool/int/float/str) fields are stored as columns of
+    a single contiguous (time x field) array per dtype, with a key -> column index.
+
+    Fields of the history (e.g., h['fxns.x.s.y']) are views into these buffers, so
+    the :class:`History` interface (log, flatten, get_slice, etc.) works as usual,
+    while copying, cutting, and pickling only have to handle a few large arrays.
+    Fields which cannot be stored as columns (e.g., object or n-d arrays) are kept
+    as separate arrays.
+
+    Created using :meth:`History.as_columnar`.
+
+    Examples
+    --------
+    >>> h = History({'a': np.array([1.0, 2.0, 3.0]), 'b': np.array([True, False, True])})
+    >>> ch = h.as_columnar()
+    >>> ch2 = ch.cut(1, newcopy=True)
+    >>> ch2['a']
+    array([1., 2.])
+    >>> ch2['a'][0] = 10.0
+    >>> ch['a']
+    array([1., 2., 3.])
+    >>> ch.get_slice(2)
+    {'a': 3.0, 'b': True}
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.__dict__['_buffers'] = {}
+        self.__dict__['_columns'] = {}
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key, val):
+        # replaced fields are no longer views of the buffer
+        self._columns.pop(key, None)
+        super().__setitem__(key, val)
+
+    def __reduce__(self):
+        others = {k: v for k, v in self.items() if k not in self._columns}
+        return fromcolumns, (tuple(self.keys()), self._buffers, self._columns, others)
+
+    def flatten(self, newhist=False, prevname="", to_include='all'):
+        """Flattens the history. Returns a shallow copy (sharing buffers) when the full
+        history is to be included, see :meth:`Result.flatten`."""
+        if newhist is False and not prevname and to_include == 'all':
+            others = {k: v for k, v in self.items() if k not in self._columns}
+            return fromcolumns(tuple(self.keys()), self._buffers, self._columns, others)
+        else:
+            return super().flatten(newhist, prevname, to_include)
+
+    def copy(self):
+        """Creates a new independent copy of the current history (copying each
+        buffer as a whole)"""
+        buffers = {k: np.copy(buf) for k, buf in self._buffers.items()}
+        others = {k: v.copy() if isinstance(v, History) else np.copy(v)
+                  for k, v in self.items() if k not in self._columns}
+        return fromcolumns(tuple(self.keys()), buffers, self._columns, others)
+
+    def cut(self, end_ind=None, start_ind=None, newcopy=False):
+        """Cuts the history to a given index. Buffers are sliced in time, so when
+        newcopy=True only the retained times are copied."""
+        if end_ind is None:
+            t_slice = slice(start_ind, None)
+        else:
+            t_slice = slice(start_ind, end_ind+1)
+        buffers = {k: buf[t_slice] for k, buf in self._buffers.items()}
+        others = History({k: v for k, v in self.items() if k not in self._columns})
+        others = others.cut(end_ind, start_ind, newcopy=newcopy)
+        if newcopy:
+            buffers = {k: np.copy(buf) for k, buf in buffers.items()}
+            return fromcolumns(tuple(self.keys()), buffers, self._columns, others)
+        else:
+            self.__dict__['_buffers'] = buffers
+            for k, (bufkey, col) in self._columns.items():
+                self.data[k] = buffers[bufkey][:, col]
+            self.data.update(others)
+            return self
+
+    def get_slice(self, t_ind=0):
+        """Returns a dictionary of values from the history at t_ind"""
+        rows = {k: buf[t_ind] for k, buf in self._buffers.items()}
+        slice_dict = dict.fromkeys(self.keys())
+        for k, v in self.items():
+            if k in self._columns:
+                bufkey, col = self._columns[k]
+                slice_dict[k] = rows[bufkey][col]
+            elif isinstance(v, History):
+                slice_dict.update({k+'.'+subk: subv
+                                   for subk, subv in v.get_slice(t_ind).items()})
+                slice_dict.pop(k)
+            else:
+                slice_dict[k] = v[t_ind]
+        return slice_dict
+
+    def get_memory(self):
+        """Determines the memory usage of the history. See :meth:`Result.get_memory`"""
+        others = History({k: v for k, v in self.items() if k not in self._columns})
+        mem_total, mem_profile = others.get_memory()
+        mem_total += sum([buf.nbytes for buf in self._buffers.values()])
+        for k, (bufkey, col) in self._columns.items():
+            buf = self._buffers[bufkey]
+            mem_profile[k] = buf.shape[0]*buf.itemsize
+        return mem_total, {k: mem_profile[k] for k in self.keys() if k in mem_profile}
+
+
+class SharedHistory(ColumnarHistory):
+    """
+    ColumnarHistory where the buffers are stored in shared memory.
+
+    When pickled (e.g., when sent to a process pool worker), only the names and layout
+    of the shared buffers are sent, and the unpickled history attaches to the shared
+    buffers read-only (see :func:`attach_shared`). Fields which are not in the buffers
+    are pickled normally.
+
+    Created using :meth:`History.as_shared`. The process which creates the
+    SharedHistory owns the shared memory, and should release it using
+    :meth:`release` after use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.__dict__['_shms'] = {}
+        self.__dict__['_owner'] = False
+        super().__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        specs = {}
+        for bufkey, (shm, shape) in self._shms.items():
+            buf = self._buffers.get(bufkey)
+            if buf is None or buf.shape != shape:
+                # buffers have been cut, so are no longer the full shared buffers
+                return super().__reduce__()
+            specs[bufkey] = (shm.name, shape, buf.dtype.str)
+        others = {k: v for k, v in self.items() if k not in self._columns}
+        return attach_shared, (tuple(self.keys()), specs, self._columns, others)
+
+    def release(self):
+        """Releases the shared memory of the history (unlinking it, if owned)."""
+        shms = self._shms
+        self.data.clear()
+        self.__dict__['_buffers'] = {}
+        self.__dict__['_columns'] = {}
+        self.__dict__['_shms'] = {}
+        if not self._owner:
+            # attachments are shared by the histories attached in the process
+            detach = self.__dict__.pop('_detach', None)
+            if detach is not None:
+                detach()
+            return
+        for shm, _ in shms.values():
+            close_shm(shm)
+            attached = _attached_shms.pop(shm.name, None)
+            if attached is not None:
+                close_shm(attached[0])
+            shm.unlink()
+
+
+class StackedHistory(History):
+    """
+    History of a set of scenarios where each field is stacked into a single
+    (scenario x time) array, so statistics over scenarios can be computed in one
+    vectorized call.
+
+    Fields of scenarios which end early (or which are missing the field) are padded,
+    in which case the field is a numpy masked array with the padded entries masked.
+    Fields present in every scenario with the same shape are plain arrays. Scalar
+    fields (e.g., endclasses) are stacked into 1-d arrays with one value per scenario.
+
+    Created using :meth:`Result.as_stacked`.
+
+    Attributes
+    ----------
+    scens : list
+        Names of the scenarios (rows) of the stacked fields.
+    present : dict
+        Boolean array of the scenarios each field is present in, for each field
+        (None if the field is present in every scenario).
+
+    Examples
+    --------
+    >>> h = History({'nominal.a': np.array([1.0, 2.0, 3.0]),
+    ...              'fault.a': np.array([1.0, 4.0])})
+    >>> sh = h.as_stacked()
+    >>> sh.scens
+    ['nominal', 'fault']
+    >>> sh['a']
+    masked_array(
+      data=[[1.0, 2.0, 3.0],
+            [1.0, 4.0, --]],
+      mask=[[False, False, False],
+            [False, False,  True]],
+      fill_value=1e+20)
+    >>> sh.get_scen('fault')['a']
+    array([1., 4.])
+    """
+
+    def __init__(self, *args, scens=(), present={}, **kwargs):
+        self.__dict__['scens'] = list(scens)
+        self.__dict__['present'] = {**present}
+        super().__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        return type(self), (), {'scens': self.scens, 'present': self.present}, None, \
+            iter(self.items())
+
+    def new_stacked(self):
+        """Creates an empty StackedHistory with the same scenarios."""
+        return self.__class__(scens=self.scens)
+
+    def get_scen(self, scen):
+        """
+        Gets the (unpadded) history of a given scenario.
+
+        Parameters
+        ----------
+        scen : str
+            Name of the scenario.
+
+        Returns
+        -------
+        hist : History
+            History of the scenario (with fields at their original lengths).
+        """
+        i = self.scens.index(scen)
+        hist = History()
+        for k, v in self.items():
+            if self.present.get(k) is not None and not self.present[k][i]:
+                continue
+            row = v[i]
+            if isinstance(row, np.ma.MaskedArray):
+                row = row.data[~np.ma.getmaskarray(row)]
+            hist[k] = row
+        return hist
+
+    def unstack(self):
+        """Creates a (flat) History of all the scenarios in the stack."""
+        hist = History()
+        for scen in self.scens:
+            for k, v in self.get_scen(scen).items():
+                hist[scen+'.'+k] = v
+        return hist
+
+    def get_nominal_row(self, key, nomhist={}):
+        """Gets the nominal values of a field (from nomhist, if provided, or the
+        'nominal' scenario) padded/cut to the length of the stacked field."""
+        if not nomhist:
+            return self[key][self.scens.index('nominal')]
+        nom = np.asarray(nomhist[key])
+        if np.ndim(self[key]) < 2 or np.ndim(nom) == 0:
+            return nom
+        length = np.shape(self[key])[1]
+        if len(nom) >= length:
+            return nom[:length]
+        padded = np.zeros((length,)+nom.shape[1:], dtype=nom.dtype)
+        padded[:len(nom)] = nom
+        mask = np.ones(padded.shape, dtype=bool)
+        mask[:len(nom)] = False
+        return np.ma.MaskedArray(padded, mask=mask)
+
+    def get_degraded_hist(self, *attrs, nomhist={}, operator=np.prod, difftype='bool',
+                          withtime=True, withtotal=True):
+        """
+        Gets history of times when the attributes *attrs deviate from their nominal
+        values in each scenario of the stack (see :meth:`History.get_degraded_hist`).
+
+        Parameters
+        ----------
+        *attrs : names of attributes
+            Names to check (e.g., `flow_1`, `fxn_2`)
+        nomhist : History, optional
+            Nominal history to compare against (otherwise uses the 'nominal' scenario)
+        operator : function
+            Method of combining multiple degraded values. The default is np.prod
+        difftype : 'bool'/'diff'/float
+            Way to calculate the difference (see :func:`diff`). Default is 'bool'.
+        withtime : bool
+            Whether to include time in the dict. Default is True.
+        withtotal : bool
+            Whether to include a total in the dict. Default is True.
+
+        Returns
+        -------
+        deghist : StackedHistory
+            (scenario x time) history of degraded attributes
+        """
+        if not attrs:
+            attrs = self.keys()
+        if nomhist:
+            nomhist = nomhist.flatten()
+        deghist = self.new_stacked()
+        for att in attrs:
+            att_diff = [diff(self.get_nominal_row(k, nomhist), v, difftype)
+                        for k, v in self.items() if att in k]
+            if att_diff:
+                deghist[att] = operator(stack_rows(att_diff), 0)
+        if withtotal:
+            deghist['total'] = len(deghist.values()) - \
+                np.sum(stack_rows([*deghist.values()]), axis=0)
+        if withtime:
+            deghist['time'] = self['time']
+        return deghist
+
+    def get_faulty_hist(self, *attrs, withtime=True, withtotal=True, operator=np.any):
+        """
+        Gets the times when the attributes *attrs have faults present in each scenario
+        of the stack (see :meth:`History.get_faulty_hist`).
+
+        Parameters
+        ----------
+        *attrs : names of attributes
+            Names to check (e.g., `fxn_1`, `fxn_2`)
+        withtime : bool
+            Whether to include time in the dict. Default is True.
+        withtotal : bool
+            Whether to include a total in the dict. Default is True.
+        operator : function
+            Method of combining multiple degraded values. The default is np.any
+
+        Returns
+        -------
+        has_faults_hist : StackedHistory
+            (scenario x time) history of attrs being faulty/not faulty
+        """
+        has_faults_hist = self.new_stacked()
+        for att in attrs:
+            faults = [v for k, v in self.items()
+                      if ('.'+att+'.m.faults' in k) or
+                      (att+'.m.faults' in k and k.startswith(att))]
+            if faults:
+                has_faults_hist[att] = operator(stack_rows(faults), 0)
+        if withtotal:
+            has_faults_hist['total'] = np.sum(stack_rows([*has_faults_hist.values()]),
+                                              axis=0)
+        if withtime:
+            has_faults_hist['time'] = self['time']
+        return has_faults_hist
+
+    def get_fault_degradation_summary(self, *attrs):
+        """
+        Creates a Result with the *attrs that are faulty/degraded in each scenario.
+
+        Parameters
+        ----------
+        *attrs : str
+            Attribute(s) to check.
+
+        Returns
+        -------
+        Result
+            Result dict with structure {'scen': {'degraded':['degattrname'],
+                                                 'faulty':['faultyattrname']}}
+        """
+        faulty_hist = self.get_faulty_hist(*attrs, withtotal=False, withtime=False)
+        faulty = {k: np.ma.filled(np.any(v, axis=1), False)
+                  for k, v in faulty_hist.items()}
+        deg_hist = self.get_degraded_hist(*attrs, withtotal=False, withtime=False)
+        degraded = {k: ~np.ma.filled(np.all(v, axis=1), True)
+                    for k, v in deg_hist.items()}
+        summary = Result()
+        for i, scen in enumerate(self.scens):
+            summary[scen] = Result(faulty=[k for k, v in faulty.items() if v[i]],
+                                   degraded=[k for k, v in degraded.items() if v[i]])
+        return summary
+
+    def get_metric(self, value, metric=np.mean, args=(), axis=None):
+        """
+        Calculates a statistic of the value in each scenario using a provided metric
+        function.
+
+        Parameters
+        ----------
+        value : str
+            Value of the history to calculate the statistic over
+        metric : func, optional
+            Function to process the history (e.g. np.mean, np.min...), which must
+            take (tuple) axis arguments and respect masks (if any fields are masked).
+            The default is np.mean.
+        args : args
+            Arguments for the metric function. Default is ().
+        axis : None or 0 or 1
+            Whether to take the metric over variables (0) or over time (1) or
+            both (None). The default is None.
+
+        Returns
+        -------
+        stat : np.array
+            Statistic for each scenario (None), each scenario at each time (0), or each
+            variable in each scenario (1).
+        """
+        vals = stack_rows([*self.get_values(value).values()])
+        if axis is None:
+            axis = tuple(i for i in range(vals.ndim) if i != 1)
+        elif axis == 1:
+            axis = 2
+        return metric(vals, *args, axis=axis)
+
+
+class NominalComparison(object):
+    """
+    Running comparison of a (faulty) history with a nominal history, which is updated
+    as timesteps of the history are logged (see :meth:`History.set_comparison`).
+
+    Rather than comparing full histories after a simulation (which requires the
+    nominal history to be cut/copied to match the faulty history), this keeps
+    counters of when/how often each field deviates from its nominal value (and each
+    fault is present) as the simulation runs. Logged timesteps are compared in
+    vectorized batches (every `batch` timesteps, and whenever the counters are
+    accessed).
+
+    Attributes
+    ----------
+    fields : list
+        (key, array, nominal array) for each (flattened) field compared.
+    faults : list
+        (key, array) for each fault indicator field (e.g., 'fxns.f.m.faults.x').
+    batch : int
+        Number of logged timesteps to compare at once.
+    start_ind : int
+        Index of the first logged timestep (None if none have been logged).
+    compared_ind : int
+        Index up to which (exclusive) timesteps have been compared.
+    logged_ind : int
+        Index up to which (exclusive) timesteps have been logged.
+    first_deg : dict
+        Time each field first deviated from nominal (None if it has not).
+    num_deg : dict
+        Number of logged timesteps each field deviated from nominal.
+    first_fault : dict
+        Time each fault was first present (None if it has not been).
+    num_faulty : dict
+        Number of logged timesteps each fault was present.
+    last_diff_ind : int
+        Index of the last compared timestep where any field deviated from nominal (-1
+        if none have).
+    missing : list
+        Keys of (array) fields of the history which are not in the nominal history.
+    complete : bool
+        Whether every (array) field of the history has a nominal counterpart, so that
+        the rest of the history can be filled from nominal (see fill_nominal).
+
+    Examples
+    --------
+    >>> nomhist = History({'a': np.array([1.0, 1.0, 1.0]), 'time': np.array([0.0, 1.0, 2.0])})
+    >>> hist = History({'a': np.array([1.0, 1.0, 1.0]), 'time': np.array([0.0, 1.0, 2.0])})
+    >>> comp = hist.set_comparison(nomhist)
+    >>> hist['a'][1:] = 2.0
+    >>> for t_ind in range(3):
+    ...     comp.update(t_ind)
+    >>> comp.first_deg['a'], comp.num_deg['a']
+    (1.0, 2)
+    >>> comp.get_degraded('a', 'time')
+    ['a']
+
+    If the history returns to nominal, the number of matching timesteps since the last
+    deviation can be used to end the simulation early and fill it from nominal:
+
+    >>> hist = History({'a': np.array([1.0, 2.0, 1.0]), 'time': np.array([0.0, 1.0, 2.0])})
+    >>> comp = hist.set_comparison(nomhist)
+    >>> for t_ind in range(3):
+    ...     comp.update(t_ind)
+    >>> comp.compare()
+    >>> comp.last_diff_ind, comp.num_matching()
+    (1, 1)
+    """
+
+    def __init__(self, hist, nomhist, batch=16):
+        flathist = hist.flatten()
+        flatnom = nomhist.flatten()
+        arrtypes = (np.ndarray, DeltaArray)
+        self.fields = [(k, v, flatnom[k]) for k, v in flathist.items()
+                       if isinstance(v, arrtypes)
+                       and isinstance(flatnom.get(k), arrtypes)]
+        self.faults = [(k, v) for k, v in flathist.items()
+                       if 'm.faults' in k and isinstance(v, np.ndarray)]
+        self.times = flathist.get('time')
+        self.missing = [k for k, v in flathist.items()
+                        if isinstance(v, arrtypes)
+                        and not isinstance(flatnom.get(k), arrtypes)]
+        self.complete = not self.missing
+        self.batch = batch
+        self.start_ind = None
+        self.compared_ind = 0
+        self.logged_ind = 0
+        self.last_diff_ind = -1
+        self._first_deg = {k: None for k, _, _ in self.fields}
+        self._num_deg = {k: 0 for k, _, _ in self.fields}
+        self._first_fault = {k: None for k, _ in self.faults}
+        self._num_faulty = {k: 0 for k, _ in self.faults}
+
+    def update(self, t_ind, time=None):
+        """
+        Records that a timestep of the history has been logged, comparing the logged
+        timesteps with the nominal history if a full batch has been logged.
+
+        Parameters
+        ----------
+        t_ind : int
+            Time-index of the history which was logged.
+        time : float, optional
+            Real time of the index (unused, since times are taken from the history).
+        """
+        if self.start_ind is None:
+            self.start_ind = t_ind
+            self.compared_ind = t_ind
+        self.logged_ind = max(self.logged_ind, t_ind + 1)
+        if self.logged_ind - self.compared_ind >= self.batch:
+            self.compare()
+
+    def compare(self):
+        """Compares the logged (not yet compared) timesteps with the nominal history,
+        updating the counters."""
+        start = self.compared_ind
+        for k, val, nom in self.fields:
+            end = min(self.logged_ind, len(nom), len(val))
+            if end <= start:
+                continue
+            deg = val[start:end] != nom[start:end]
+            if deg.ndim > 1:
+                deg = deg.reshape(len(deg), -1).any(axis=1)
+            num = np.count_nonzero(deg)
+            if num:
+                if not self._num_deg[k]:
+                    self._first_deg[k] = self.get_time(start + np.argmax(deg))
+                self._num_deg[k] += num
+                last = start + len(deg) - 1 - np.argmax(deg[::-1])
+                self.last_diff_ind = max(self.last_diff_ind, last)
+        for k, val in self.faults:
+            faulty = val[start:min(self.logged_ind, len(val))].astype(bool)
+            num = np.count_nonzero(faulty)
+            if num:
+                if not self._num_faulty[k]:
+                    self._first_fault[k] = self.get_time(start + np.argmax(faulty))
+                self._num_faulty[k] += num
+        self.compared_ind = max(self.compared_ind, self.logged_ind)
+
+    def get_nominal_len(self):
+        """Gets the number of timesteps which can be compared with nominal."""
+        return min([min(len(val), len(nom)) for _, val, nom in self.fields], default=0)
+
+    def num_matching(self, after_ind=-1):
+        """
+        Gets the number of consecutive (compared) timesteps up to compared_ind in which
+        every field has matched nominal.
+
+        Parameters
+        ----------
+        after_ind : int, optional
+            Index after which to count matching timesteps (e.g., the time-index of the
+            last fault injected). The default is -1.
+
+        Returns
+        -------
+        num_matching : int
+            Number of matching timesteps since the last deviation from nominal.
+        """
+        end = min(self.compared_ind, self.get_nominal_len())
+        return max(end - max(self.last_diff_ind, after_ind) - 1, 0)
+
+    def fill_nominal(self):
+        """
+        Fills the (not yet logged) rest of the history from the nominal history, e.g.,
+        when the history has returned to nominal and does not need to be simulated.
+
+        Returns
+        -------
+        end_ind : int
+            Index up to which (exclusive) the history has been filled.
+        """
+        if not self.complete:
+            raise Exception("Cannot fill history from nominal: fields " +
+                            str(self.missing)+" not in nominal history")
+        start = self.logged_ind
+        end = self.get_nominal_len()
+        for k, val, nom in self.fields:
+            val[start:end] = nom[start:end]
+        self.logged_ind = max(self.logged_ind, end)
+        return self.logged_ind
+
+    def get_time(self, t_ind):
+        """Gets the time of a given time-index of the history."""
+        if self.times is None or t_ind >= len(self.times):
+            return t_ind
+        return self.times[t_ind]
+
+    @property
+    def first_deg(self):
+        self.compare()
+        return self._first_deg
+
+    @property
+    def num_deg(self):
+        self.compare()
+        return self._num_deg
+
+    @property
+    def first_fault(self):
+        self.compare()
+        return self._first_fault
+
+    @property
+    def num_faulty(self):
+        self.compare()
+        return self._num_faulty
+
+    def get_degraded(self, *attrs):
+        """Gets the attributes *attrs (e.g., `flow_1`, `fxn_2`) with fields which have
+        deviated from nominal (see :meth:`History.get_degraded_hist`)."""
+        num_deg = self.num_deg
+        if not attrs:
+            attrs = num_deg.keys()
+        return [att for att in attrs
+                if any(num and att in k for k, num in num_deg.items())]
+
+    def get_faulty(self, *attrs):
+        """Gets the attributes *attrs (e.g., `fxn_1`, `fxn_2`) which have had faults
+        present (see :meth:`History.get_faulty_hist`)."""
+        num_faulty = self.num_faulty
+        return [att for att in attrs
+                if any(num and (('.'+att+'.m.faults' in k) or
+                                (att+'.m.faults' in k and k.startswith(att)))
+                       for k, num in num_faulty.items())]
+
+    def get_fault_degradation_summary(self, *attrs):
+        """
+        Creates a Result with values for the *attrs that are faulty/degraded (see
+        :meth:`History.get_fault_degradation_summary`).
+
+        Returns
+        -------
+        Result
+            Result dict with structure {'degraded':['degattrname'],
+                                        'faulty':['faultyattrname']]}
+        """
+        return Result(faulty=self.get_faulty(*attrs), degraded=self.get_degraded(*attrs))
+
+_attached_shms = {}
+_register_lock = threading.Lock()
+
+
+def attach_shm(name):
+    """
+    Attaches to an existing shared memory block without registering it with the
+    resource tracker (which would otherwise try to clean it up when the attaching
+    process, e.g. a pool worker, exits).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # python < 3.13 always registers the block, so only the registration of this
+    # block is skipped (registrations from other threads are passed through)
+    with _register_lock:
+        register = resource_tracker.register
+
+        def register_other(rname, rtype):
+            if rtype != "shared_memory" or rname.lstrip("/") != name.lstrip("/"):
+                register(rname, rtype)
+        resource_tracker.register = register_other
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def close_shm(shm):
+    """Closes a shared memory block (if its buffer is not still in use)."""
+    try:
+        shm.close()
+    except BufferError:
+        pass
+
+
+def detach_shared(names):
+    """
+    Detaches a SharedHistory from the shared memory blocks of the given names,
+    closing the blocks which are no longer used by any SharedHistory in the process.
+
+    Called when a SharedHistory created by :func:`attach_shared` is released or
+    garbage-collected (e.g., after the task it was sent with finishes in a worker).
+    """
+    for name in names:
+        attached = _attached_shms.get(name)
+        if attached is not None:
+            attached[1] -= 1
+            if attached[1] <= 0:
+                del _attached_shms[name]
+                close_shm(attached[0])
+
+
+def attach_shared(keys, specs, columns, others):
+    """
+    Creates a :class:`SharedHistory` by attaching to buffers in shared memory.
+
+    Shared memory blocks are only attached once per process (while any history
+    attached to them is in use), so that repeated unpickling (e.g., for each scenario
+    in a chunk sent to a worker) does not re-attach them. Blocks are closed when the
+    histories attached to them are released or garbage-collected.
+
+    Parameters
+    ----------
+    keys : tuple
+        Keys of the history (in order)
+    specs : dict
+        Shared memory buffers with structure {(dtype, length): (name, shape, dtype)}
+    columns : dict
+        Column of each key in the buffers, with structure {key: ((dtype, length), col)}
+    others : dict
+        Other (non-columnar) fields of the history
+
+    Returns
+    -------
+    hist : SharedHistory
+        History with fields as read-only views into the shared buffers
+    """
+    buffers = {}
+    shms = {}
+    for bufkey, (name, shape, dtype) in specs.items():
+        if name not in _attached_shms:
+            _attached_shms[name] = [attach_shm(name), 0]
+        _attached_shms[name][1] += 1
+        shm = _attached_shms[name][0]
+        shms[bufkey] = (shm, tuple(shape))
+        buf = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        buf.flags.writeable = False
+        buffers[bufkey] = buf
+    hist = fromcolumns(keys, buffers, columns, others, hclass=SharedHistory)
+    hist.__dict__['_shms'] = shms
+    hist.__dict__['_detach'] = weakref.finalize(hist, detach_shared,
+                                                [n for n, _, _ in specs.values()])
+    return hist
+
+
+def fromcolumns(keys, buffers, columns, others, hclass=ColumnarHistory):
+    """
+    Creates a :class:`ColumnarHistory` from a given set of buffers.
+
+    Parameters
+    ----------
+    keys : tuple
+        Keys of the history (in order)
+    buffers : dict
+        Buffers of the history with structure {(dtype, length): array}
+    columns : dict
+        Column of each key in the buffers, with structure {key: ((dtype, length), col)}
+    others : dict
+        Other (non-columnar) fields of the history
+    hclass : class
+        Class of the history to create. The default is ColumnarHistory.
+
+    Returns
+    -------
+    hist : ColumnarHistory
+        History with fields as views into the given buffers
+    """
+    hist = hclass()
+    hist.__dict__['_buffers'] = dict(buffers)
+    hist.__dict__['_columns'] = {k: columns[k] for k in keys if k in columns}
+    for k in keys:
+        if k in columns:
+            bufkey, col = columns[k]
+            hist.data[k] = buffers[bufkey][:, col]
+        else:
+            hist.data[k] = others[k]
+    return hist
+
+
+class NpzData(MutableMapping):
+    """
+    Dict-like data of a Result/History loaded from npz file(s) (see :func:`save_npz`).
+
+    Each field is stored as a separate (uncompressed) member of the file, which is only
+    read when the field is first accessed, so that e.g. getting a single field of a
+    large history does not require reading the rest of the file. Fields which are set
+    (or accessed) are kept in memory.
+
+    Only the names of the files and their members are kept, and a file is opened
+    when one of its fields is read. The last-read file is kept open (so that reading
+    several fields of a file only opens it once) until a field of another file is
+    read, so at most one file is open at a time, however many files are loaded (e.g.,
+    from a folder of individual scenarios). This file is closed with close(), when
+    used as a context manager, or when the data is deleted.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     for i in range(3):
+    ...         save_npz(History({'a': np.array([i, i])}), folder+'/h'+str(i)+'.npz',
+    ...                  result_id='scen_'+str(i))
+    ...     with NpzData(*[folder+'/h'+str(i)+'.npz' for i in range(3)]) as data:
+    ...         vals = [data['scen_0.a'], data['scen_2.a']]
+    ...         num_open = len(data.npzs)
+    >>> vals, num_open, len(data.npzs)
+    ([array([0, 0]), array([2, 2])], 1, 0)
+    """
+
+    def __init__(self, *filenames):
+        self.filenames = filenames
+        self.npzs = {}
+        self.locs = {}
+        self.loaded = {}
+        for filename in filenames:
+            with np.load(filename, allow_pickle=True) as npz:
+                for k in npz.files:
+                    self.locs[k] = filename
+
+    def get_npz(self, filename):
+        """Gets the (open) npz file filename, closing any other open file."""
+        if filename not in self.npzs:
+            self.close()
+            self.npzs[filename] = np.load(filename, allow_pickle=True)
+        return self.npzs[filename]
+
+    def __getitem__(self, key):
+        if key not in self.loaded:
+            val = self.get_npz(self.locs[key])[key]
+            if val.ndim == 0:
+                val = val.item()
+            self.loaded[key] = val
+        return self.loaded[key]
+
+    def __setitem__(self, key, val):
+        if key not in self.locs:
+            self.locs[key] = None
+        self.loaded[key] = val
+
+    def __delitem__(self, key):
+        del self.locs[key]
+        self.loaded.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.locs
+
+    def __iter__(self):
+        return iter(self.locs)
+
+    def __len__(self):
+        return len(self.locs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __getstate__(self):
+        # open files are not copied/pickled (and are re-opened when accessed)
+        return {**self.__dict__, 'npzs': {}}
+
+    def close(self):
+        """Closes the open file (if any). Fields not yet read may still be read, since
+        files are re-opened when their fields are accessed."""
+        for npz in self.npzs.values():
+            npz.close()
+        self.npzs.clear()
+
+
+def save_npz(result, filename, result_id='', append=False):
+    """
+    Saves a Result/History to a columnar npz file, where each (flattened) field is
+    stored as a separate uncompressed .npy member of the (zip) file.
+
+    Since members may be added to an existing file, results may be saved incrementally
+    (e.g., one scenario at a time) by using result_id and append=True. Saved files are
+    loaded using :func:`load_npz`, which only reads the fields that are accessed.
+
+    Parameters
+    ----------
+    result : Result/History
+        Result to save.
+    filename : str
+        Name of the file.
+    result_id : str, optional
+        Identifier to prepend to the keys of the result in the file, e.g., the scenario
+        name. The default is ''.
+    append : bool, optional
+        Whether to add the result to the file (if it exists) rather than creating a new
+        file. The default is False.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> hist = History({'a': np.array([1.0, 2.0]), 'b': np.array([True, False])})
+    >>> res = Result({'rate': 0.1, 'expected_cost': 100.0})
+    >>> with tempfile.TemporaryDirectory() as folder:
+    ...     save_npz(hist, folder+'/hist.npz', result_id='scen_1')
+    ...     save_npz(hist, folder+'/hist.npz', result_id='scen_2', append=True)
+    ...     save_npz(res, folder+'/res.npz')
+    ...     h = load_npz(folder+'/hist.npz')
+    ...     r = load_npz(folder+'/res.npz', Rclass=Result)
+    ...     [*h.keys()], h['scen_2.a'], r['rate']
+    (['scen_1.a', 'scen_1.b', 'scen_2.a', 'scen_2.b'], array([1., 2.]), 0.1)
+    """
+    flatresult = result.flatten()
+    if result_id:
+        prefix = result_id + '.'
+    else:
+        prefix = ''
+    mode = 'a' if append and os.path.exists(filename) else 'w'
+    with zipfile.ZipFile(filename, mode=mode, compression=zipfile.ZIP_STORED,
+                         allowZip64=True) as zipf:
+        existing = set(zipf.namelist())
+        for k, val in flatresult.items():
+            name = prefix + str(k) + '.npy'
+            if name in existing:
+                raise Exception("Key already in file " + filename + ": " + name[:-4])
+            if isinstance(val, DeltaArray):
+                val = np.asarray(val)
+            elif not isinstance(val, np.ndarray):
+                try:
+                    val = np.array(val)
+                    if val.dtype == object or val.ndim > 0:
+                        raise TypeError()
+                except (TypeError, ValueError):
+                    val = np.array(None, dtype=object)
+                    val[()] = flatresult[k]
+            with zipf.open(name, 'w', force_zip64=True) as file_handle:
+                np.lib.format.write_array(file_handle, val, allow_pickle=True)
+
+
+def load_npz(*filenames, Rclass=History):
+    """
+    Lazily loads a Result/History from npz file(s) saved using :func:`save_npz`.
+
+    The data of the returned result is a :class:`NpzData`, so fields are only read
+    from the file(s) when they are accessed.
+
+    Parameters
+    ----------
+    *filenames : str
+        Name(s) of the file(s) to load. Fields from multiple files (e.g. individual
+        scenarios in a folder) are combined into a single (flat) result.
+    Rclass : class
+        Class to return (Result or History). The default is History.
+
+    Returns
+    -------
+    result : Result/History
+        Flat result/hist with data loaded lazily from the file(s).
+    """
+    result = Rclass()
+    result.data = NpzData(*filenames)
+    return result
+
+
 def load(filename, filetype="", renest_dict=True, indiv=False, Rclass=History):
     """
-    Loads a given (endclasses or mdlhists) results dictionary from a (pickle/csv/json)
-    file.
+    Loads a given (endclasses or mdlhists) results dictionary from a
+    (pickle/csv/json/npz) file.
     e.g. a file saved using process.save_result or save_args in propagate functions.
 
+    Results in npz files are loaded lazily (see :func:`load_npz`) and are always flat.
+
     Parameters
     ----------
     filename : str
@@ -1553,6 +3645,11 @@ def load(filename, filetype="", renest_dict=True, indiv=False, Rclass=History):
         if indiv:
             scenname = [*pandas.read_csv(filename, nrows=0).columns][0]
             resultdict = {scenname: resultdict}
+    elif filetype == 'npz':
+        if Rclass in [dict, 'dict']:
+            result = load_npz(filename)
+            return {k: result[k] for k in result}
+        return load_npz(filename, Rclass=Rclass)
     elif filetype == 'json':
         with open(filename, 'r', encoding='utf8') as file_handle:
             loadeddict = json.load(file_handle)
@@ -1587,7 +3684,7 @@ def load_folder(folder, filetype):
     folder : str
         Name of the folder. Must be in the current directory
     filetype : str
-        Type of files in the folder ('pickle', 'csv', or 'json')
+        Type of files in the folder ('pickle', 'csv', 'json', or 'npz')
 
     Returns
     -------
@@ -30,7 +30,8 @@ from fmdtools.analyze.plot import prep_hists
 from shapely import LineString, Point, Polygon
 
 
-def coord_property(crd, prop, xlab="x", ylab="y", proplab="prop", **kwargs):
+def coord_property(crd, prop, xlab="x", ylab="y", proplab="prop", hist=None, t_ind=-1,
+                   **kwargs):
     """
     Plot a given property 'prop' as a colormesh on an x-y grid.
 
@@ -49,6 +50,12 @@ def coord_property(crd, prop, xlab="x", ylab="y", proplab="prop", **kwargs):
     proplab : str, optional
         Label for the property. The default is "prop", which uses the name of the
         property provided.
+    hist : History, optional
+        History of the Coords (e.g., mdlhist.flows.env.c) to plot the property from
+        (if the property is a tracked state). The default is None, which plots the
+        current value of the property.
+    t_ind : int, optional
+        Time-index of the history to plot. The default is -1.
     **kwargs : kwargs
         Keyword arguments to matplotlib.pyplot.pcolormesh (e.g., cmap, edgecolors)
 
@@ -64,7 +71,11 @@ def coord_property(crd, prop, xlab="x", ylab="y", proplab="prop", **kwargs):
 
     fig, ax = plt.subplots(1)
 
-    p = getattr(crd, prop)
+    if hist is not None and prop in hist:
+        # only the frame at t_ind is reconstructed from delta-encoded histories
+        p = hist[prop][t_ind]
+    else:
+        p = getattr(crd, prop)
     # im = ax.matshow(p, **kwargs)
     offset = crd.p.blocksize/2
     x = np.linspace(0., crd.p.blocksize*(crd.p.x_size-1), crd.p.x_size)
@@ -300,7 +311,8 @@ def coord(crd, prop, collections={}, legend_args=False, **kwargs):
         Collections to plot and their respective kwargs for show_collection.
         The default is {}.
     **kwargs : kwargs
-        kwargs to show_property.
+        kwargs to show_property (e.g., hist and t_ind to plot the property at a given
+        time in the history of the Coords).
 
     Returns
     -------
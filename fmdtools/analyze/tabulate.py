@@ -27,7 +27,7 @@ Legacy Functions:
 
 import pandas as pd
 import numpy as np
-from fmdtools.analyze.result import nan_to_x, Result, bootstrap_confidence_interval
+from fmdtools.analyze.result import nan_to_x, Result, bootstrap_confidence_interval, group_sum
 
 
 def label_faults(faulthist, df, fxnlab, labels):
@@ -135,10 +135,13 @@ def nominal_stats(nomapp, nomapp_endclasses, metrics='all', inputparams='from_ra
     table : pandas DataFrame
         Table with the metrics of interest layed out over the input parameters for the set of scenarios in endclasses
     """
+    if not isinstance(nomapp_endclasses, Result):
+        nomapp_endclasses = Result.fromdict(nomapp_endclasses)
+    ectable = nomapp_endclasses.get_endclass_table()
     if metrics == 'all':
-        metrics = [*nomapp_endclasses[[*nomapp_endclasses][0]]]
+        metrics = [*ectable.columns]
     if scenarios == 'all':
-        scens = [*nomapp_endclasses]
+        scens = [*nomapp_endclasses.get_key_index().first_keys()]
     elif type(scenarios) == str:
         scens = nomapp.ranges[scenarios]['scenarios']
     elif not type(scenarios) == list:
@@ -162,8 +165,8 @@ def nominal_stats(nomapp, nomapp_endclasses, metrics='all', inputparams='from_ra
     for inputparam in inputparams:
         table_values.append([nomapp.scenarios[e].inputparams[inputparam] for e in scens])
     for metric in metrics:
-        table_values.append([nomapp_endclasses[e][metric] for e in scens])
-    table = pd.DataFrame(table_values, columns=[*nomapp_endclasses], index=inputparams+metrics)
+        table_values.append([ectable.get_scen_value(e, metric) for e in scens])
+    table = pd.DataFrame(table_values, columns=scens, index=inputparams+metrics)
     return table
 
 
@@ -421,17 +424,22 @@ def nested_stats(nomapp, nested_endclasses, percent_metrics=[], rate_metrics=[],
     table_values=[]; table_rows = inputparams
     for inputparam in inputparams:
         table_values.append([nomapp.scenarios[e].p[inputparam] for e in scens])
+    # stats are calculated once for each scenario (scens may repeat)
+    ectable = nested_endclasses.get_endclass_table()
+    def scen_stats(stat, metric):
+        stats = {e: stat(metric, rows=ectable.get_scen_rows(e)) for e in set(scens)}
+        return [stats[e] for e in scens]
     for metric in percent_metrics:  
-        table_values.append([nested_endclasses.get(e).percent(metric) for e in scens])
+        table_values.append(scen_stats(ectable.percent, metric))
         table_rows.append('perc_'+metric)
     for metric in rate_metrics:     
-        table_values.append([nested_endclasses.get(e).rate(metric) for e in scens])
+        table_values.append(scen_stats(ectable.rate, metric))
         table_rows.append('rate_'+metric)
     for metric in average_metrics:  
-        table_values.append([nested_endclasses.get(e).average(metric) for e in scens])
+        table_values.append(scen_stats(ectable.average, metric))
         table_rows.append('ave_'+metric)
     for metric in expected_metrics: 
-        table_values.append([nested_endclasses.get(e).expected(metric) for e in scens])
+        table_values.append(scen_stats(ectable.expected, metric))
         table_rows.append('exp_'+metric)
     table = pd.DataFrame(table_values, columns=[*nested_endclasses], index=table_rows)
     return table
@@ -458,12 +466,9 @@ def result_summary_fmea(endresult, mdlhist, *attrs, metrics=()):
     pandas.DataFrame
         Table of metrics and degraded functions/flows over scenarios
     """
-    from fmdtools.analyze.result import History
     deg_summaries={}; fault_summaries={}
-    mdlhist = mdlhist.nest(levels=1)
-    for scen, hist in mdlhist.items():
-        hist_comp = History(faulty=hist, nominal=mdlhist.nominal)
-        hist_summary = hist_comp.get_fault_degradation_summary(*attrs)
+    summaries = mdlhist.as_stacked().get_fault_degradation_summary(*attrs)
+    for scen, hist_summary in summaries.items():
         deg_summaries[scen] = str(hist_summary.degraded)
         fault_summaries[scen] = str(hist_summary.faulty)
     degradedtable = pd.DataFrame(deg_summaries, index=['degraded'])
@@ -566,26 +571,44 @@ def fmea(endclasses, app, metrics=[], weight_metrics=[], avg_metrics = [], perc_
         else:
             sort_by = allmetrics[-1]
 
-    fmeadict = {g: dict.fromkeys(allmetrics) for g in grouped_scens}
-    for group, ids in grouped_scens.items():
-        for metric in metrics:
-            fmeadict[group][metric] = sum([endclasses.get(scenid).get('endclass.'+metric) for scenid in ids])
-        for metric in weight_metrics:
-            fmeadict[group][metric] = sum([endclasses.get(scenid).get('endclass.'+metric)*id_weights[scenid] for scenid in ids])
-        for metric in perc_metrics:
-            fmeadict[group][metric] = Result({scenid: endclasses.get(scenid) for scenid in ids}).percent(metric)
-        for metric in avg_metrics:    
-            fmeadict[group][metric] = Result({scenid: endclasses.get(scenid) for scenid in ids}).average(metric, empty_as=empty_as)
-        for metric, to_mult in mult_metrics.items():
-            if set(to_mult).intersection(weight_metrics):
-                fmeadict[group][metric] = sum([np.prod([endclasses.get(scenid).get('endclass.'+m) 
-                                                        for m in to_mult])*id_weights[scenid] for scenid in ids])
-            else:
-                fmeadict[group][metric] = sum([np.prod([endclasses.get(scenid).get('endclass.'+m) 
-                                                        for m in to_mult]) for scenid in ids])
+    # map scenarios to integer group codes to calculate metrics over all groups at once
+    table = endclasses.get_endclass_table()
+    groups = [*grouped_scens]
+    num_groups = len(groups)
+    # scenarios are summed in the order of the results (rather than the arbitrary
+    # order of the sets of scenario ids) so the metrics are reproducible
+    grouped_ids = [sorted(group_ids,
+                          key=lambda scenid: table.row_index[scenid+'.endclass'])
+                   for group_ids in grouped_scens.values()]
+    ids = [scenid for group_ids in grouped_ids for scenid in group_ids]
+    codes = np.repeat(np.arange(num_groups),
+                      [len(group_ids) for group_ids in grouped_ids])
+    ec_rows = np.array([table.row_index[scenid+'.endclass'] for scenid in ids], dtype=int)
+    weights = np.array([id_weights[scenid] for scenid in ids], dtype=float)
+    scen_rows = [table.get_scen_rows(scenid) for scenid in ids]
+    scen_codes = np.repeat(codes, [len(rows) for rows in scen_rows])
+    scen_rows = np.concatenate(scen_rows+[[]]).astype(int)
+
+    fmeacols = dict.fromkeys(allmetrics)
+    for metric in metrics:
+        fmeacols[metric] = group_sum(table.columns[metric][ec_rows], codes, num_groups)
+    for metric in weight_metrics:
+        fmeacols[metric] = group_sum(table.columns[metric][ec_rows]*weights, codes,
+                                     num_groups)
+    for metric in perc_metrics:
+        fmeacols[metric] = table.group_percent(metric, scen_codes, num_groups,
+                                               rows=scen_rows)
+    for metric in avg_metrics:
+        fmeacols[metric] = table.group_average(metric, scen_codes, num_groups,
+                                               empty_as=empty_as, rows=scen_rows)
+    for metric, to_mult in mult_metrics.items():
+        prods = np.prod([table.columns[m][ec_rows] for m in to_mult], axis=0)
+        if set(to_mult).intersection(weight_metrics):
+            fmeacols[metric] = group_sum(prods*weights, codes, num_groups)
+        else:
+            fmeacols[metric] = group_sum(prods, codes, num_groups)
 
-    table = pd.DataFrame(fmeadict)
-    table = table.transpose()
+    table = pd.DataFrame(fmeacols, index=pd.Index(groups))
     if sort_by not in allmetrics:
         sort_by = allmetrics[0]
     table = table.sort_values(sort_by, ascending=ascending)
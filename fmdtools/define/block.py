@@ -29,6 +29,7 @@ from .state import State
 from .parameter import Parameter, SimParam
 from .rand import Rand
 from .common import get_true_fields, get_true_field, init_obj_attr, get_obj_track, eq_units, set_var
+from .common import changes, untrack_changes
 from .time import Time
 from .mode import Mode
 from .flow import init_flow, Flow
@@ -294,6 +295,7 @@ class Simulable(object):
 class Block(Simulable):
     __slots__ = ['s', '_args_s', 'm', '_args_m', 't', '_args_t']
     default_track = ['s', 'm', 'r', 't', 'i']
+    quiescent = False
     _init_s = State
     _init_m = Mode
     _init_t = Time
@@ -318,6 +320,9 @@ class Block(Simulable):
         Dictionary of flows included in the Block (if any are added via _init_flowname)
     is_copy : bool
         Marker for whether the object is a copy.
+    quiescent : bool
+        Class attribute declaring whether the behaviors of the block only depend on its
+        states, modes, and flows (see quiescent_until). The default is False.
     """
     def __init__(self, name='', flows={}, s={}, p={}, m={}, r={}, t={}, sp={}, track=''):
         """
@@ -386,7 +391,46 @@ class Block(Simulable):
         """Checks if Block has dynamic execution step"""
         return (getattr(self, 'dynamic_behavior', False) or
                 (hasattr(self, 'aa') and getattr(self.aa, 'proptype','') == 'dynamic'))
-        
+
+    def quiescent_until(self, time):
+        """
+        Gets the time until which the Block is quiescent, meaning that its behaviors
+        only depend on its states, modes, timers, and flows (and not on time), so that
+        re-running them without these changing does not change the model. Used in
+        event-driven simulation (see event_driven in
+        :class:`fmdtools.define.parameter.SimParam`).
+
+        Blocks whose behaviors never depend on time declare quiescence with the class
+        attribute quiescent = True. Blocks with time-dependent behaviors (e.g., a
+        scheduled action) may instead define a method quiescent(time), which returns
+        True if the Block is quiescent at the given time, False if it is not, or the
+        time when the time-dependent behavior next occurs. Blocks without either (i.e.,
+        with the default quiescent = False), with an action architecture, or with a
+        local timestep larger than the global timestep are not quiescent.
+
+        Parameters
+        ----------
+        time : float
+            Current time.
+
+        Returns
+        -------
+        until : float
+            Time until which the Block is quiescent (inf if indefinitely). Returns
+            time if the Block is not quiescent.
+        """
+        quiescent = self.quiescent
+        if quiescent is False or hasattr(self, 'aa') or self.t.run_times < 1:
+            return time
+        elif callable(quiescent):
+            quiescent = quiescent(time)
+        if quiescent is True:
+            return float('inf')
+        elif quiescent is False or quiescent is None:
+            return time
+        else:
+            return max(time, quiescent)
+
 
     def __repr__(self):
         """
@@ -512,6 +556,36 @@ class Block(Simulable):
             cop.h =self.h.copy()
         return cop
 
+    def get_snapshot(self):
+        """
+        Gets a snapshot of the states, modes, rand, and time of the block.
+
+        Unlike copy(), this does not create a new block, and may thus be used to
+        (quickly) return an existing block to a previous state using load_snapshot.
+
+        Returns
+        -------
+        snapshot : tuple
+            Snapshots of the s, m, r, and t attributes of the block.
+        """
+        return (self.s.get_snapshot(), self.m.get_snapshot(), self.r.get_snapshot(),
+                self.t.get_snapshot())
+
+    def load_snapshot(self, snapshot):
+        """
+        Sets the block to the states, modes, rand, and time in a snapshot.
+
+        Parameters
+        ----------
+        snapshot : tuple
+            Snapshot from get_snapshot.
+        """
+        s_snap, m_snap, r_snap, t_snap = snapshot
+        self.s.load_snapshot(s_snap)
+        self.m.load_snapshot(m_snap)
+        self.r.load_snapshot(r_snap)
+        self.t.load_snapshot(t_snap)
+
     def get_memory(self):
         """
         Gets the approximate memory usage of the block in bytes (not complete)
@@ -561,6 +635,27 @@ class Block(Simulable):
                 *self.r.return_mutables(),
                 *self.t.return_mutables())
 
+    def has_changed(self, count):
+        """
+        Check whether the mutables in the block have changed since the given count.
+
+        Used in static propagation steps to avoid constructing return_mutables when
+        the block hasn't changed (see :class:`fmdtools.define.common.ChangeTracker`).
+
+        Parameters
+        ----------
+        count : int
+            Value of changes.count to check against.
+
+        Returns
+        -------
+        changed : bool
+            Whether the block may have changed since count.
+        """
+        return (changes.changed_since(count, self.s, self.m)
+                or self.r.has_changed(count)
+                or self.t.has_changed(count))
+
     def return_probdens(self):
         """Gets the probability density associated with a Block and its components/actions (if any)"""
         state_pd = self.r.return_probdens()
@@ -650,22 +745,28 @@ class Block(Simulable):
         oldmutables = self.return_mutables()
         flows_mutables = {f: fl.return_mutables() for f, fl in self.flows.items()}
         while active:
+            count = changes.count
             if self.is_static():
                 self("static", time=time, faults=faults, run_stochastic=run_stochastic)
             
             if hasattr(self, 'static_loading'):
                 self.static_loading(time)
             # Check to see what flows now have new values and add connected functions (done for each because of communications potential)
+            # (mutables are only constructed for the block/flows changed since count)
             active = False
-            newmutables = self.return_mutables()
-            if oldmutables != newmutables:
-                active = True
-                oldmutables = newmutables
-            for flowname, fl in self.flows.items():
-                newflowmutables = fl.return_mutables()
-                if flows_mutables[flowname] != newflowmutables:
+            if count == changes.count:
+                break
+            if self.has_changed(count):
+                newmutables = self.return_mutables()
+                if oldmutables != newmutables:
                     active = True
-                    flows_mutables[flowname] = newflowmutables
+                    oldmutables = newmutables
+            for flowname, fl in self.flows.items():
+                if fl.has_changed(count):
+                    newflowmutables = fl.return_mutables()
+                    if flows_mutables[flowname] != newflowmutables:
+                        active = True
+                        flows_mutables[flowname] = newflowmutables
 
 # COMPONENT/COMPONENT ARCHITECTURES
 
@@ -729,6 +830,13 @@ class CompArch(dataobject, mapping=True):
                 cop_comp.h = component.h.copy()
         return cop
 
+    def get_snapshot(self):
+        return {compname: comp.get_snapshot() for compname, comp in self.components.items()}
+
+    def load_snapshot(self, snapshot):
+        for compname, comp_snapshot in snapshot.items():
+            self.components[compname].load_snapshot(comp_snapshot)
+
     def update_seed(self, seed):
         for comp in self.components.values():
             comp.update_seed(seed)
@@ -789,6 +897,9 @@ class CompArch(dataobject, mapping=True):
         for c in self.components.values():
             cm.extend(c.return_mutables())
         return cm
+
+    def has_changed(self, count):
+        return any(c.has_changed(count) for c in self.components.values())
     
 # Actions/ASGs
 
@@ -876,6 +987,12 @@ class ActArch(object):
         self.is_copy = is_copy
         self.active_actions = set()
 
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        changes.mark_change(self, getattr(self, name, None), value)
+        object.__setattr__(self, name, value)
+
     def build(self):
         if self.initial_action == 'auto':
             initial_action = [act for act, in_degree in self.action_graph.in_degree if in_degree == 0]
@@ -1065,6 +1182,21 @@ class ActArch(object):
         cop.active_actions = copy.deepcopy(self.active_actions)
         return cop
 
+    def get_snapshot(self):
+        act_snaps = {actname: (action.duration, action.get_snapshot())
+                     for actname, action in self.actions.items()}
+        flow_snaps = {flowname: flow.get_snapshot() for flowname, flow in self.flows.items()}
+        return act_snaps, flow_snaps, copy.deepcopy(self.active_actions)
+
+    def load_snapshot(self, snapshot):
+        act_snaps, flow_snaps, active_actions = snapshot
+        for actname, (duration, act_snapshot) in act_snaps.items():
+            self.actions[actname].duration = duration
+            self.actions[actname].load_snapshot(act_snapshot)
+        for flowname, flow_snapshot in flow_snaps.items():
+            self.flows[flowname].load_snapshot(flow_snapshot)
+        self.active_actions = copy.deepcopy(active_actions)
+
     def reset(self):
         for name, action in self.actions.items():
             action.reset()
@@ -1110,6 +1242,11 @@ class ActArch(object):
             am.extend(f.return_mutables())
         am.append(copy.copy(self.active_actions))
         return am
+
+    def has_changed(self, count):
+        return (changes.changed_since(count, self)
+                or any(a.has_changed(count) for a in self.actions.values())
+                or any(f.has_changed(count) for f in self.flows.values()))
         
 
 # Function superclass
@@ -1275,6 +1412,38 @@ class FxnBlock(Block):
                             cop.h["aa.actions." + actname + "." + k] = v
         return cop
 
+    def get_snapshot(self):
+        """Gets a snapshot of the function, including contained components/actions."""
+        ca_snap, aa_snap = None, None
+        if hasattr(self, 'ca'):
+            ca_snap = self.ca.get_snapshot()
+        if hasattr(self, 'aa'):
+            aa_snap = self.aa.get_snapshot()
+        return super().get_snapshot(), ca_snap, aa_snap
+
+    def load_snapshot(self, snapshot):
+        """Sets the function (and contained components/actions) to a snapshot."""
+        block_snap, ca_snap, aa_snap = snapshot
+        super().load_snapshot(block_snap)
+        if hasattr(self, 'ca'):
+            self.ca.load_snapshot(ca_snap)
+        if hasattr(self, 'aa'):
+            self.aa.load_snapshot(aa_snap)
+
+    def relink_hist(self):
+        """Re-points the histories of components/actions to those in the function
+        history (e.g., after a new history has been set at self.h)."""
+        if hasattr(self, 'ca'):
+            for compname, comp in self.ca.components.items():
+                comp_hist = self.h.get("ca.components." + compname)
+                if comp_hist:
+                    comp.h = comp_hist
+        if hasattr(self, 'aa'):
+            for actname, act in self.aa.actions.items():
+                act_hist = self.h.get("aa.actions." + actname)
+                if act_hist:
+                    act.h = act_hist
+
     def return_mutables(self):
         bm = super().return_mutables()
         cm, am = (), ()
@@ -1284,6 +1453,11 @@ class FxnBlock(Block):
             am = self.aa.return_mutables()
         return *bm, *cm, *am
 
+    def has_changed(self, count):
+        return (super().has_changed(count)
+                or (hasattr(self, 'ca') and self.ca.has_changed(count))
+                or (hasattr(self, 'aa') and self.aa.has_changed(count)))
+
     def __call__(self, proptype, faults=[], time=0, run_stochastic=False):
         """
         Updates the state of the function at a given time and injects faults.
@@ -1337,6 +1511,7 @@ class FxnBlock(Block):
                 self.dynamic_behavior(time)
 
         # propagate faults from action/component level to function level
+        oldfaults = set(self.m.faults)
         if hasattr(self, 'aa') and self.aa.actions:
             self.m.faults.difference_update(self.aa.faultmodes)
             self.m.faults.update(self.aa.get_faults())
@@ -1344,6 +1519,8 @@ class FxnBlock(Block):
         if comps:
             self.m.faults.difference_update(self.ca.faultmodes)
             self.m.faults.update(self.ca.get_faults())
+        if self.m.faults != oldfaults:
+            changes.mark(self.m)
         self.t.time = time
         if run_stochastic == 'track_pdf':
             self.r.probdens = self.r.return_probdens()
@@ -22,12 +22,23 @@ not.
 - :func:`t_key`:Used to generate keys for a given (float) time that is queryable as
   an attribute of an object/dict
 - :func:`eq_units`:Provides conversion factor for from rateunit (str) to timeunit (str)
+- :class:`ChangeTracker`:Records when mutable model constructs (State, Mode, etc) have
+  changed so that propagation can skip comparing unchanged mutables.
+- :data:`changes`:ChangeTracker instance used by model constructs.
+- :func:`untrack_changes`:Removes the stamp of a deleted object from changes.
+- :class:`LaneArray`:Array of the values of a variable in a set of lanes (scenarios
+  simulated together in a single model)
+- :class:`LaneDivergence`:Raised when the lanes of a LaneArray are used as a single
+  value but have different values
+- :func:`mutables_differ`:Checks whether mutables (which may include LaneArrays) are
+  different
 
 """
 from collections.abc import Iterable
 import dill
 import pickle
 import time
+import numpy as np
 from recordclass import asdict
 
 
@@ -336,3 +347,206 @@ def return_true_indicators(obj, time):
 
     """
     return [f for f, ind in get_obj_indicators(obj).items() if ind(time)]
+
+
+class ChangeTracker(object):
+    """
+    Records when mutable model constructs (State, Mode, Time, etc) change.
+
+    Static propagation needs to know whether a block or flow changed during a
+    function call. Rather than constructing and comparing tuples of mutables
+    (via return_mutables) at each call, objects mark themselves here when set to a
+    new value, so that unchanged blocks/flows can be skipped entirely.
+
+    Since dataobjects (e.g., States) can't hold extra per-instance flags (or weak
+    references), changes are stored as stamps {id(obj): count}, where count
+    increments with each change. Tracked classes remove their stamp when they are
+    deleted (by setting __del__ to :func:`untrack_changes`), so that the stamps only
+    hold objects which currently exist.
+
+    Note that only changes made via attribute-setting (setattr, put, assign, etc) or
+    the Mode fault methods are recorded, so values should not be modified in-place.
+
+    Attributes
+    ----------
+    count : int
+        Number of changes that have been recorded.
+    stamps : dict
+        Count at which each object (by id) was last changed.
+
+    Examples
+    --------
+    >>> tracker = ChangeTracker()
+    >>> a, b = [], []
+    >>> count = tracker.count
+    >>> tracker.mark_change(a, 1.0, 1.0)
+    >>> tracker.changed_since(count, a, b)
+    False
+    >>> tracker.mark_change(a, 1.0, 2.0)
+    >>> tracker.changed_since(count, a, b)
+    True
+    >>> tracker.changed_since(tracker.count, a, b)
+    False
+    >>> tracker.forget(a)
+    >>> tracker.changed_since(count, a, b)
+    False
+    """
+
+    __slots__ = ('count', 'stamps')
+
+    def __init__(self):
+        self.count = 0
+        self.stamps = {}
+
+    def mark(self, obj):
+        """Mark the object obj as changed."""
+        self.count += 1
+        self.stamps[id(obj)] = self.count
+
+    def mark_change(self, obj, old, new):
+        """Mark the object obj as changed if value new is different from value old."""
+        if old is new:
+            return
+        try:
+            changed = bool(old != new)
+        except (ValueError, TypeError):
+            changed = True
+        if changed:
+            self.mark(obj)
+
+    def changed_since(self, count, *objs):
+        """Check whether any of the objects objs have changed since the given count."""
+        stamps = self.stamps
+        for obj in objs:
+            if stamps.get(id(obj), 0) > count:
+                return True
+        return False
+
+    def forget(self, obj):
+        """Remove the stamp of the object obj (e.g., when it is deleted)."""
+        self.stamps.pop(id(obj), None)
+
+
+changes = ChangeTracker()
+
+
+def untrack_changes(obj, _stamps=changes.stamps):
+    """
+    Remove the stamp of obj from the ChangeTracker changes. Used as the __del__
+    method of tracked classes (State, Mode, Timer, etc) so that stamps are freed (and
+    ids are not reused with stale stamps) when objects are deleted.
+    """
+    _stamps.pop(id(obj), None)
+
+
+class LaneDivergence(ValueError):
+    """Raised when the lanes of a LaneArray are used in a way that requires them to
+    have the same value (e.g., as a condition), but they have different values."""
+
+
+class LaneArray(np.ndarray):
+    """
+    Array of the values of a (numeric) variable in a set of lanes, i.e., scenarios
+    which are simulated together in a single model (see
+    :class:`fmdtools.sim.batch.ModelBatch`).
+
+    Arithmetic (and other numpy operations) are applied to all lanes at once and
+    return LaneArrays. Since models are otherwise written in terms of scalars, the
+    lanes may also be used where a single value is needed (e.g., in conditions or as
+    dict keys) as long as they have the same value, in which case they act as that
+    value. Otherwise, a :class:`LaneDivergence` is raised, since the lanes would then
+    need to take different paths through the model. In-place operations (e.g., +=)
+    return new arrays, so that LaneArrays may be treated as (immutable) values, like
+    the scalars they replace.
+
+    Examples
+    --------
+    >>> a = LaneArray.of([1.0, 2.0])
+    >>> a * 2 + 1
+    LaneArray([3., 5.])
+    >>> bool(a > 0)
+    True
+    >>> bool(a > 1)  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+      ...
+    LaneDivergence: Lanes have different values: [False  True]
+    >>> {1.0: 'x'}[LaneArray.of([1.0, 1.0])]
+    'x'
+    """
+
+    @classmethod
+    def of(cls, values):
+        """Creates a LaneArray with the given values (one per lane)."""
+        return np.asarray(values).view(cls)
+
+    def shared(self):
+        """Returns the value shared by the lanes (or raises LaneDivergence)."""
+        vals = np.asarray(self)
+        if vals.size and not (vals == vals.flat[0]).all():
+            raise LaneDivergence("Lanes have different values: " + str(vals))
+        return vals.flat[0]
+
+    def __bool__(self):
+        vals = np.asarray(self, dtype=bool)
+        if vals.all():
+            return True
+        elif not vals.any():
+            return False
+        raise LaneDivergence("Lanes have different values: " + str(vals))
+
+    def __float__(self):
+        return float(self.shared())
+
+    def __int__(self):
+        return int(self.shared())
+
+    def __index__(self):
+        return int(self.shared())
+
+    def __hash__(self):
+        return hash(self.shared())
+
+    def __iadd__(self, other):
+        return self + other
+
+    def __isub__(self, other):
+        return self - other
+
+    def __imul__(self, other):
+        return self * other
+
+    def __itruediv__(self, other):
+        return self / other
+
+    def __ifloordiv__(self, other):
+        return self // other
+
+    def __imod__(self, other):
+        return self % other
+
+    def __ipow__(self, other):
+        return self ** other
+
+
+def mutables_differ(old, new):
+    """
+    Checks whether the mutables (e.g., from return_mutables) old and new are different.
+
+    Unlike old != new, this is also valid when the mutables include LaneArrays with
+    different values in each lane.
+
+    Examples
+    --------
+    >>> a = LaneArray.of([1.0, 2.0])
+    >>> mutables_differ((1.0, a), (1.0, LaneArray.of([1.0, 2.0])))
+    False
+    >>> mutables_differ((1.0, a), (1.0, LaneArray.of([1.0, 3.0])))
+    True
+    """
+    try:
+        return bool(old != new)
+    except LaneDivergence:
+        if isinstance(old, (tuple, list)) and isinstance(new, (tuple, list)):
+            return (len(old) != len(new)
+                    or any(mutables_differ(o, n) for o, n in zip(old, new)))
+        return not np.array_equal(old, new)
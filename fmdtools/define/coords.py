@@ -2,15 +2,20 @@
 """
 Module for creating x-y arrays to represent gridworlds.
 
-
+- :class:`CoordsParam`: Defines the underlying arrays that make up the Coords object.
+- :class:`CoordsIndex`: Spatial index of the points of a Coords meeting a condition.
+- :class:`StateArray`: Array of a Coords state which records writes to the Coords.
+- :class:`Coords`: Class for generating, accessing, and setting gridworld properties.
 """
 import numpy as np
 import copy
 from typing import ClassVar
+from scipy.spatial import cKDTree as KDTree
 from fmdtools.define.parameter import Parameter
 from fmdtools.define.rand import Rand
-from fmdtools.define.common import is_iter, get_obj_track, init_obj_dict
-from fmdtools.analyze.result import History
+from fmdtools.define.common import is_iter, get_obj_track, init_obj_dict, changes
+from fmdtools.define.common import untrack_changes
+from fmdtools.analyze.result import History, DeltaArray
 
 
 class CoordsParam(Parameter):
@@ -31,6 +36,11 @@ class CoordsParam(Parameter):
         Coordinate resolution
     gapwidth : float
         Width between coordinate cells (if any). Blocksize is inclusive of this width.
+    delta_hist : bool
+        Whether to record the history of states as the initial grid plus the changes
+        at each time (see :class:`fmdtools.analyze.result.DeltaArray`) rather than as a
+        full grid at each time, which saves memory for large grids where few points
+        change at each time.
 
     Other Modifiers
     ---------------
@@ -64,6 +74,236 @@ class CoordsParam(Parameter):
     y_size: ClassVar[int] = 10
     blocksize: ClassVar[float] = 10.0
     gapwidth: ClassVar[float] = 0.0
+    delta_hist: ClassVar[bool] = False
+
+
+class CoordsIndex(object):
+    """
+    Spatial index of the points of a Coords grid meeting a condition (e.g., in a
+    collection or with a given property value), used to find the closest points.
+
+    The points are held as a mask over the grid, which may be updated incrementally
+    as the underlying property changes (see Coords.set), while the array of points and
+    the KD-tree over them are (re)built when needed after a change.
+
+    Attributes
+    ----------
+    grid : np.ndarray
+        Grid of x-y points of the Coords.
+    mask : np.ndarray
+        Boolean array of the grid points in the index.
+    brute_force_size : int
+        Number of points below which the closest point is found by computing the
+        distance to every point rather than using the KD-tree (which has a higher
+        overhead per query). The default is 1000.
+
+    Examples
+    --------
+    >>> grid = np.array([[(i, j) for j in range(3)] for i in range(3)]) * 10.0
+    >>> index = CoordsIndex(grid, np.array([[True, False, False],
+    ...                                     [False, False, False],
+    ...                                     [False, False, True]]))
+    >>> index.pts
+    array([[ 0.,  0.],
+           [20., 20.]])
+    >>> index.pts[index.closest(14.0, 15.0)]
+    array([20., 20.])
+    >>> index.update((0, 0), False)
+    >>> index.pts
+    array([[20., 20.]])
+    """
+
+    __slots__ = ('grid', 'mask', '_pts', '_tree')
+    brute_force_size = 1000
+
+    def __init__(self, grid, mask):
+        self.grid = grid
+        self.mask = np.array(mask, dtype=bool)
+        self._pts = None
+        self._tree = None
+
+    @property
+    def pts(self):
+        """Array of the points in the index (in grid order)."""
+        if self._pts is None:
+            self._pts = self.grid[self.mask]
+            self._pts.flags.writeable = False
+        return self._pts
+
+    def update(self, inds, matches):
+        """
+        Update the mask of the index at the given grid indices.
+
+        Parameters
+        ----------
+        inds : tuple
+            Index (or slices) of the grid to update.
+        matches : bool/np.ndarray
+            Whether the points at the given indices are in the index.
+        """
+        if np.any(self.mask[inds] != matches):
+            self.mask[inds] = matches
+            self._pts = None
+            self._tree = None
+
+    def closest(self, x, y, exclude=None):
+        """
+        Find the index (in pts) of the closest point to a given x-y location.
+
+        As in a brute-force search, the first of the points at the same (closest)
+        distance is returned.
+
+        Parameters
+        ----------
+        x : number
+            x-position to check from.
+        y : number
+            y-position to check from.
+        exclude : np.ndarray, optional
+            Point to exclude, along with all points sharing its x or y value (as in
+            Coords.find_closest with include_pt=False). The default is None.
+
+        Returns
+        -------
+        ind : int
+            Index of the closest point in pts.
+        """
+        pts = self.pts
+        pt = np.array([x, y])
+        if len(pts) < self.brute_force_size:
+            dists = np.sqrt(np.sum((pt - pts)**2, 1))
+            if exclude is not None:
+                dists[np.any(pts == exclude, 1)] = np.inf
+            if not len(pts) or dists.min() == np.inf:
+                raise Exception("No points in index to find the closest point in")
+            return np.argmin(dists)
+        if self._tree is None:
+            self._tree = KDTree(pts)
+        k = 1 if exclude is None else 2
+        while True:
+            dists, inds = self._tree.query(pt, k=min(k, len(pts)))
+            dists, inds = np.atleast_1d(dists), np.atleast_1d(inds)
+            if exclude is not None:
+                valid = np.all(pts[inds] != exclude, 1)
+                dists, inds = dists[valid], inds[valid]
+            if len(inds) or k >= len(pts):
+                break
+            k *= 2
+        if not len(inds):
+            raise Exception("No points in index to find the closest point in")
+        # ties are broken by order in pts using the brute-force distance calculation
+        cands = np.sort(self._tree.query_ball_point(pt, dists[0]*(1+1e-9) + 1e-12))
+        if exclude is not None:
+            cands = cands[np.all(pts[cands] != exclude, 1)]
+        dists = np.sqrt(np.sum((pt - pts[cands])**2, 1))
+        return cands[np.argmin(dists)]
+
+
+class StateArray(np.ndarray):
+    """
+    Array of a Coords state which records writes to the Coords.
+
+    Writes to the array (or to views of it, e.g., slices) via item-assignment or
+    in-place operations which change its values are recorded by the Coords (see
+    Coords.mark_write), which increments the version of the state and updates its
+    spatial indexes. This lets static propagation detect changes to the grid by
+    comparing versions rather than whole grids. Other arrays made from the state
+    (e.g., copies or the results of operations) are regular numpy arrays, and copies
+    made by fancy or boolean indexing do not record writes.
+
+    Note that writes which bypass item-assignment and ufuncs (e.g., np.copyto or
+    ndarray.fill) are not recorded, and should be made by assigning to [...] instead.
+
+    Examples
+    --------
+    >>> ex = ExampleCoords()
+    >>> ex.return_mutables()
+    (0,)
+    >>> ex.h[0, 0] = 1.0
+    >>> ex.h[0:2][1] += 2.0
+    >>> ex.return_mutables()
+    (2,)
+    >>> ex.h[0, 0] = 1.0
+    >>> ex.return_mutables()
+    (2,)
+    >>> ex.find_closest(50.0, 50.0, "h", value=2.0)
+    array([10., 50.])
+    >>> type(ex.h + 1.0)
+    <class 'numpy.ndarray'>
+    >>> c = ex.h[[0, 1]]
+    >>> c[0, 0] = 5.0
+    >>> ex.return_mutables(), ex.h[0, 0]
+    ((2,), 1.0)
+    """
+
+    def __array_finalize__(self, obj):
+        # views write through to the state of the Coords, while copies (including
+        # the results of fancy/boolean indexing, which have a base) are independent
+        owner = getattr(obj, '_owner', None)
+        if owner is not None and np.may_share_memory(self, obj):
+            self._owner = owner
+            self._name = obj._name
+        else:
+            self._owner = None
+            self._name = None
+        self._root = False
+
+    def __repr__(self):
+        return repr(self.view(np.ndarray))
+
+    def __setitem__(self, key, value):
+        if self._owner is None:
+            return super().__setitem__(key, value)
+        old = np.array(super().__getitem__(key))
+        super().__setitem__(key, value)
+        if np.any(old != super().__getitem__(key)):
+            self.mark_write(key)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, out=None, **kwargs):
+        args = [i.view(np.ndarray) if isinstance(i, StateArray) else i for i in inputs]
+        if method == 'at':
+            written = inputs[:1]
+        else:
+            written = out or ()
+        written = [(w, np.array(w)) for w in written
+                   if isinstance(w, StateArray) and w._owner is not None]
+        if out:
+            kwargs['out'] = tuple(o.view(np.ndarray) if isinstance(o, StateArray)
+                                  else o for o in out)
+        result = getattr(ufunc, method)(*args, **kwargs)
+        for w, old in written:
+            if np.any(old != w.view(np.ndarray)):
+                w.mark_write()
+        if out:
+            return out[0] if len(out) == 1 else out
+        return result
+
+    def __reduce__(self):
+        reconstruct, args, state = super().__reduce__()
+        return reconstruct, args, (state, self._owner, self._name, self._root)
+
+    def __setstate__(self, state):
+        arr_state, self._owner, self._name, self._root = state
+        super().__setstate__(arr_state)
+
+    def __deepcopy__(self, memo):
+        cop = super().__deepcopy__(memo)
+        if self._root:
+            cop.track(copy.deepcopy(self._owner, memo), self._name)
+        return cop
+
+    def track(self, owner, name):
+        """Set the array as the state name of the Coords owner."""
+        self._owner = owner
+        self._name = name
+        self._root = True
+
+    def mark_write(self, key=(slice(None), slice(None))):
+        """Record a write to the array at index key (the full array by default)."""
+        if self._root:
+            self._owner.mark_write(self._name, key)
+        else:
+            self._owner.mark_write(self._name)
 
 
 class Coords(object):
@@ -114,6 +354,13 @@ class Coords(object):
     >>> ex.h[0, 0]
     100.0
 
+    States are StateArrays, which record these writes in the version of the state:
+
+    >>> type(ex.h)
+    <class 'fmdtools.define.coords.StateArray'>
+    >>> ex.return_mutables()
+    (1,)
+
     Collections are lists of points that map to immutable properties. In ExampleCoords,
     all points where v > 5.0 should be a part of high_v, as shown:
 
@@ -128,7 +375,8 @@ class Coords(object):
     """
 
     __slots__ = ("p", "r", "grid", "pts", "points", "collections", "features", "states",
-                 "properties", "_args", "_kwargs", "default_track", )
+                 "properties", "_args", "_kwargs", "default_track", "_indexes",
+                 "_versions")
     _init_p = CoordsParam
     _init_r = Rand
 
@@ -147,6 +395,8 @@ class Coords(object):
         """Prepare class with defined features."""
         self.p = self._init_p(**kwargs.get('p', {}))
         self.r = self._init_r(**kwargs.get('r', {}))
+        self._indexes = {}
+        self._versions = {}
         self.grid = np.array([[(i, j) for j in range(0, self.p.y_size)]
                              for i in range(0, self.p.x_size)]) * self.p.blocksize
         self.pts = self.grid.reshape(int(self.grid.size/2), 2)
@@ -155,6 +405,7 @@ class Coords(object):
         init_obj_dict(self, "collect", "ions")
         init_obj_dict(self, "feature")
         init_obj_dict(self, "state")
+        self._versions = dict.fromkeys(self.states, 0)
         self.properties = {**self.features, **self.states}
         for propname, prop in self.properties.items():
             prop_type, prop_default = prop
@@ -167,18 +418,85 @@ class Coords(object):
         return 0
 
     def build(self):
-        """Set features as immutable."""
+        """Set features as immutable and build the spatial indexes of collections."""
         for propname, prop in self.properties.items():
             if propname in self.features:
                 proparray = getattr(self, propname)
                 proparray.flags.writeable = False
         for cname, collection in self.collections.items():
             if collection[0] in self.features:
-                setattr(self, cname, self.find_all(*collection))
+                index = self.get_index(*collection)
+                self._indexes[cname] = index
+                setattr(self, cname, np.array(index.pts))
             else:
                 raise Exception("Invalid collection: " + cname +
                                 " collections may only map to (immutable) features")
 
+    def get_index(self, name, value=True, comparator=np.equal):
+        """
+        Get the (cached) spatial index of the points in a collection or where a
+        property satisfies the statement defined by value and comparator.
+
+        Indexes of features are built once, while indexes of states are updated when
+        the state is written (see StateArray).
+
+        Parameters
+        ----------
+        name : str
+            Name of the collection (or 'pts') or underlying property.
+        value : bool/float/str/etc, optional
+            Value to pass to comparator. The default is True.
+        comparator : function, optional
+            Function to use to compare the value with the array.
+            (e.g. np.equal, np.greater, np.less...). The default is np.equal.
+
+        Returns
+        -------
+        index : CoordsIndex
+            Spatial index of the points.
+
+        Examples
+        --------
+        >>> ex = ExampleCoords()
+        >>> ex.get_index("v", 5.0, np.greater).pts
+        array([[ 0.,  0.],
+               [10.,  0.]])
+        >>> ex.get_index("v", 5.0, np.greater) is ex.get_index("high_v")
+        True
+        """
+        if name == 'pts' and 'pts' not in self._indexes:
+            self._indexes['pts'] = CoordsIndex(self.grid,
+                                               np.full(self.grid.shape[:2], True))
+        if name in self.collections or name == 'pts':
+            return self._indexes[name]
+        key = (name, value, comparator)
+        try:
+            return self._indexes[key]
+        except KeyError:
+            index = CoordsIndex(self.grid, comparator(getattr(self, name), value))
+            self._indexes[key] = index
+        except TypeError:
+            # unhashable values are not cached
+            index = CoordsIndex(self.grid, comparator(getattr(self, name), value))
+        return index
+
+    def update_index(self, prop, inds=(slice(None), slice(None))):
+        """
+        Update the spatial indexes (see get_index) of a property at given indices.
+
+        Parameters
+        ----------
+        prop : str
+            Name of the property.
+        inds : tuple, optional
+            Index (or slices) of the grid which changed. The default is the full grid.
+        """
+        if self._indexes:
+            proparray = getattr(self, prop)
+            for key, index in self._indexes.items():
+                if type(key) == tuple and key[0] == prop:
+                    index.update(inds, key[2](proparray[inds], key[1]))
+
     def find_all(self, name, value=True, comparator=np.equal):
         """
         Find all points in array satisfying statement defined by value and comparator.
@@ -206,9 +524,7 @@ class Coords(object):
                [10.,  0.]])
         """
         prop = getattr(self, name)
-        where = np.where(comparator(prop, value))
-        pts_with_condition = [(p, where[1][i]) for i, p in enumerate(where[0])]
-        return np.array([self.grid[tuple(p)] for p in pts_with_condition])
+        return self.grid[tuple(np.argwhere(comparator(prop, value)).T)]
 
     def to_index(self, *args):
         """
@@ -426,7 +742,8 @@ class Coords(object):
             if inclusive and y_max_ind < self.p.y_size:
                 y_max_ind += 1
         proparray = getattr(self, prop)
-        proparray[x_min_ind:x_max_ind, y_min_ind:y_max_ind] = value
+        inds = (slice(x_min_ind, x_max_ind), slice(y_min_ind, y_max_ind))
+        proparray[inds] = value
 
     def set_pts(self, pts, prop, value):
         """
@@ -511,23 +828,23 @@ class Coords(object):
         array([0., 0.])
         """
         if prop in self.properties:
-            pts = self.find_all(prop, value, comparator)
+            index = self.get_index(prop, value, comparator)
         elif prop in self.collections or prop == 'pts':
-            pts = getattr(self, prop)
+            index = self.get_index(prop)
         else:
             raise Exception(prop+" not in .properties or .collections")
- 
-        p_rounded = self.to_gridpoint(x, y)
 
-        if p_rounded.tolist() in pts.tolist():
+        inds = self.to_index(x, y)
+        p_rounded = self.grid[inds]
+
+        if index.mask[inds]:
             return p_rounded
         else:
             if not include_pt:
-                pts = np.array([p for p in pts if all(p != p_rounded)])
-            dists = np.sqrt(np.sum((np.array([x, y])-pts)**2, 1))
-            closest_ind = np.argmin(dists)
-            xy = pts[closest_ind]
-            return xy
+                closest_ind = index.closest(x, y, exclude=p_rounded)
+            else:
+                closest_ind = index.closest(x, y)
+            return np.array(index.pts[closest_ind])
 
     def in_range(self, x, y):
         """
@@ -637,9 +954,58 @@ class Coords(object):
         new_p = meth(*args, size=p.shape, **kwargs)
         setattr(self, prop, new_p)
 
+    def mark_write(self, state, inds=(slice(None), slice(None))):
+        """
+        Record a change to a state at given indices (called by StateArray).
+
+        Increments the version of the state, marks the Coords as changed (see
+        :class:`fmdtools.define.common.ChangeTracker`), and updates the spatial indexes
+        of the state.
+
+        Parameters
+        ----------
+        state : str
+            Name of the state.
+        inds : tuple, optional
+            Index (or slices) of the grid which changed. The default is the full grid.
+        """
+        self._versions[state] += 1
+        changes.mark(self)
+        self.update_index(state, inds)
+
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        versions = getattr(self, '_versions', {})
+        if name in versions:
+            old = getattr(self, name, None)
+            value = np.asarray(value).view(StateArray)
+            value.track(self, name)
+            super().__setattr__(name, value)
+            if old is not None and not np.array_equal(old, value):
+                self.mark_write(name)
+        else:
+            super().__setattr__(name, value)
+
     def return_mutables(self):
-        """Check if grid properties have changed (used in propagation)."""
-        return tuple([*(tuple(map(tuple, getattr(self, state))) for state in self.states)])
+        """
+        Return the versions of the grid states, which are incremented whenever the
+        states change (used in propagation).
+
+        Examples
+        --------
+        >>> ex = ExampleCoords()
+        >>> ex.set(0.0, 0.0, "h", 1.0)
+        >>> ex.set_range("h", 2.0, 20.0, 30.0, 20.0, 30.0)
+        >>> ex.return_mutables()
+        (2,)
+        """
+        return tuple(self._versions[state] for state in self.states)
+
+    def has_changed(self, count):
+        """Check whether the states have changed since the given count (see
+        :class:`fmdtools.define.common.ChangeTracker`)."""
+        return changes.changed_since(count, self)
 
     def copy(self):
         """
@@ -662,6 +1028,29 @@ class Coords(object):
             setattr(cop, state, np.copy(getattr(self, state)))
         return cop
 
+    def get_snapshot(self):
+        """
+        Get a snapshot of the Coords states (and rand), for use in load_snapshot.
+
+        Examples
+        --------
+        >>> ex = ExampleCoords()
+        >>> snap = ex.get_snapshot()
+        >>> ex.set(0, 0, "h", 25.0)
+        >>> ex.load_snapshot(snap)
+        >>> ex.get(0, 0, "h")
+        0.0
+        """
+        states = {state: np.copy(getattr(self, state)) for state in self.states}
+        return states, self.r.get_snapshot()
+
+    def load_snapshot(self, snapshot):
+        """Set the Coords states (and rand) to those in a snapshot from get_snapshot."""
+        states, r_snapshot = snapshot
+        for state, arr in states.items():
+            getattr(self, state)[...] = arr
+        self.r.load_snapshot(r_snapshot)
+
     def create_hist(self, timerange, track):
         """
         Create a history of states for the Coords object.
@@ -696,12 +1085,33 @@ class Coords(object):
                [0., 0., 0., 0., 0., 0., 0., 0., 0., 0.],
                [0., 0., 0., 0., 0., 0., 0., 0., 0., 0.],
                [0., 0., 0., 0., 0., 0., 0., 0., 0., 0.]])
+
+        With delta_hist, the history of each state is instead a DeltaArray, which only
+        holds the initial grid and the changes at each time:
+
+        >>> class ExampleDeltaParam(ExampleCoordsParam):
+        ...     delta_hist = True
+        >>> class ExampleDeltaCoords(ExampleCoords):
+        ...     _init_p = ExampleDeltaParam
+        >>> ex = ExampleDeltaCoords()
+        >>> h = ex.create_hist([0, 1, 2], "all")
+        >>> for t_ind in range(3):
+        ...     ex.set(10.0 * t_ind, 0.0, "h", 1.0)
+        ...     h.log(ex, t_ind)
+        >>> h.h
+        DeltaArray(shape=(3, 10, 10), dtype=float64, changes=3)
+        >>> h.h[2][:3, 0]
+        array([1., 1., 1.])
         """
         track = get_obj_track(self, track, all_possible=self.states)
         h = History()
+        if self.p.delta_hist and timerange is not None:
+            dtype = DeltaArray
+        else:
+            dtype = np.ndarray
         for att in track:
             val = getattr(self, att)
-            h.init_att(att, val, timerange, track, dtype=np.ndarray)
+            h.init_att(att, val, timerange, track, dtype=dtype)
         return h
 
     def get_collection(self, prop):
@@ -729,7 +1139,7 @@ class Coords(object):
         """Return the mutable states of a Coords object."""
         states = dict.fromkeys(self.states)
         for state in states:
-            states[state] = copy.copy(getattr(self, state))
+            states[state] = np.copy(getattr(self, state))
         return states
 
 class ExampleCoordsParam(CoordsParam):
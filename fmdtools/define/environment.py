@@ -63,6 +63,15 @@ class Environment(CommsFlow):
                 self.c.return_mutables(),
                 self.ga.return_mutables())
 
+    def has_changed(self, count):
+        """Check whether the Environment has changed since the given count (see
+        :class:`fmdtools.define.common.ChangeTracker`). Writes to Coords states are
+        recorded by the Coords (see :class:`fmdtools.define.coords.StateArray`)."""
+        return (super().has_changed(count)
+                or self.r.has_changed(count)
+                or self.c.has_changed(count)
+                or self.ga.has_changed(count))
+
     def copy(self, glob=[], p={}, s={}):
         """
         Copy the Environment.
@@ -100,6 +109,33 @@ class Environment(CommsFlow):
             cop.h = self.h.copy()
         return cop
 
+    def get_snapshot(self):
+        """
+        Get a snapshot of the Environment, for use in load_snapshot.
+
+        Examples
+        --------
+        >>> e = ExampleEnvironment("env")
+        >>> snap = e.get_snapshot()
+        >>> e.ga.geoms['ex_point'].s.occupied = True
+        >>> e.c.h[0, 0] = 1
+        >>> e.load_snapshot(snap)
+        >>> e.ga.geoms['ex_point'].s.occupied
+        False
+        >>> e.c.h[0, 0]
+        0.0
+        """
+        return (super().get_snapshot(), self.r.get_snapshot(), self.c.get_snapshot(),
+                self.ga.get_snapshot())
+
+    def load_snapshot(self, snapshot):
+        """Set the Environment to the states in a snapshot from get_snapshot."""
+        comms_snapshot, r_snapshot, c_snapshot, ga_snapshot = snapshot
+        super().load_snapshot(comms_snapshot)
+        self.r.load_snapshot(r_snapshot)
+        self.c.load_snapshot(c_snapshot)
+        self.ga.load_snapshot(ga_snapshot)
+
     def status(self):
         stat = super().status()
         stat["c"] = self.c.return_states()
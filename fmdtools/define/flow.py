@@ -13,7 +13,7 @@ from recordclass import asdict, astuple
 
 from .parameter import Parameter
 from .state import State
-from .common import init_obj_attr, get_obj_track
+from .common import init_obj_attr, get_obj_track, changes, untrack_changes
 from fmdtools.analyze.result import History, get_sub_include, init_indicator_hist
 
 class Flow(object):
@@ -55,6 +55,11 @@ class Flow(object):
         self.s=self._init_s(**self._args_s)
     def return_mutables(self):
         return astuple(self.s)
+    __del__ = untrack_changes
+    def has_changed(self, count):
+        """Checks whether the flow has changed since the given count (see ChangeTracker in
+        fmdtools.define.common). Used in static propagation to skip return_mutables."""
+        return changes.stamps.get(id(self.s), 0) > count
     def status(self):
         """
         Returns a dict with the current states of the flow.
@@ -78,6 +83,19 @@ class Flow(object):
             cop.h = self.h.copy()
         return cop
 
+    def get_snapshot(self):
+        """
+        Returns a snapshot of the flow states, which can be restored with load_snapshot.
+
+        Unlike copy(), this does not create a new flow, which makes it possible to
+        return an existing flow (e.g., in a model skeleton) to a previous state.
+        """
+        return self.s.get_snapshot()
+
+    def load_snapshot(self, snapshot):
+        """Sets the flow states to those in a snapshot from get_snapshot."""
+        self.s.load_snapshot(snapshot)
+
     def get_typename(self):
         return "Flow"
 
@@ -258,6 +276,14 @@ class MultiFlow(Flow):
             local = getattr(self, loc)
             cop.create_local(local.name, s=asdict(local.s), p=local.p)
         return cop
+    def get_snapshot(self):
+        local_snaps = {l: getattr(self, l).get_snapshot() for l in self.locals}
+        return super().get_snapshot(), local_snaps
+    def load_snapshot(self, snapshot):
+        glob_snap, local_snaps = snapshot
+        super().load_snapshot(glob_snap)
+        for l, local_snap in local_snaps.items():
+            getattr(self, l).load_snapshot(local_snap)
     def create_hist(self, timerange, track):
         super().create_hist(timerange, track)
         for localname in self.locals:
@@ -270,6 +296,13 @@ class MultiFlow(Flow):
     def return_mutables(self):
         local_mutes = [getattr(self, l).return_mutables() for l in self.locals]
         return (super().return_mutables(), *local_mutes)
+    def has_changed(self, count):
+        if super().has_changed(count):
+            return True
+        for l in self.locals:
+            if getattr(self, l).has_changed(count):
+                return True
+        return False
 
 class CommsFlow(MultiFlow):
     """
@@ -362,6 +395,7 @@ class CommsFlow(MultiFlow):
             if fxn_from not in self.glob.fxns[f_to]["received"]:
                 newstates = [*self.glob.fxns[f_to]["in"].get(fxn_from, ()), *states]
                 self.glob.fxns[f_to]["in"][fxn_from] = tuple(set(newstates))
+                changes.mark(self.glob)
     def inbox(self, fxnname="local"):
         """ Provides a list of messages which have not been received by the function yet"""
         fxnname = self.get_local_name(fxnname)
@@ -374,6 +408,7 @@ class CommsFlow(MultiFlow):
         fxnname = self.get_local_name(fxnname)
         self.glob.fxns[fxnname]["in"].clear()
         self.glob.fxns[fxnname]["received"].clear()
+        changes.mark(self.glob)
     def out(self, fxnname="local"):
         """ Provies the view of the message that is being sent by the function"""
         fxnname = self.get_local_name(fxnname)
@@ -410,6 +445,7 @@ class CommsFlow(MultiFlow):
             port_to = self.get_port(fxn_to, f_from, "internal")
             port_to.s.assign(port_from.s,  *args, as_copy=True)
             self.glob.fxns[fxn_to]["received"][f_from]=args
+            changes.mark(self.glob)
     def status(self):
         stat = super().status()
         for f in self.fxns:
@@ -426,6 +462,7 @@ class CommsFlow(MultiFlow):
         for fxn in self.fxns:
             self.fxns[fxn]["in"] = {}
             self.fxns[fxn]["received"] = {}
+        changes.mark(self)
     def copy(self, glob=[], p={}, s={}):
         cop = super().copy(glob=glob, p=p, s=s)
         for fxn in self.fxns:
@@ -433,6 +470,16 @@ class CommsFlow(MultiFlow):
                              prev_in=copy.deepcopy(self.fxns[fxn]["in"]), received=copy.deepcopy(self.fxns[fxn]["received"]),
                              ports = getattr(self.fxns[fxn], "locals", []))
         return cop
+    def get_snapshot(self):
+        comms_snaps = {f: copy.deepcopy((self.fxns[f]["in"], self.fxns[f]["received"]))
+                       for f in self.fxns}
+        return super().get_snapshot(), comms_snaps
+    def load_snapshot(self, snapshot):
+        multiflow_snap, comms_snaps = snapshot
+        super().load_snapshot(multiflow_snap)
+        for f, (f_in, f_received) in comms_snaps.items():
+            self.fxns[f]["in"], self.fxns[f]["received"] = copy.deepcopy((f_in, f_received))
+        changes.mark(self.glob)
     def get_typename(self):
         return "CommsFlow"
     def return_mutables(self):
@@ -441,6 +488,8 @@ class CommsFlow(MultiFlow):
         for f in self.fxns.values():
             comms_mutes.append([f['in'], f['received']])
         return (*mutes, *comms_mutes)
+    def has_changed(self, count):
+        return changes.changed_since(count, self.glob) or super().has_changed(count)
 
 
 def init_flow(flowname, fclass=Flow, p={}, s={}, **kwargs):
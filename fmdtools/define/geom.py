@@ -6,14 +6,15 @@ Now:
 Future:
     Dynamic Geoms, with properties tied to states
 """
-from fmdtools.define.common import init_obj_attr, init_obj_dict
+from fmdtools.define.common import init_obj_attr, init_obj_dict, changes
 from fmdtools.define.parameter import Parameter
 from fmdtools.define.state import State
 from fmdtools.define.common import get_obj_track
 from fmdtools.analyze.result import History, get_sub_include, init_indicator_hist
 
-from shapely import LineString, Point, Polygon
+from shapely import LineString, Point, Polygon, STRtree
 from shapely.ops import nearest_points
+import shapely
 from typing import ClassVar
 from recordclass import astuple, asdict
 import numpy as np
@@ -45,11 +46,26 @@ class Geom(object):
         init_obj_dict(self, "buffer")
         for b, dist in self.buffers.items():
             setattr(self, b, self.shape.buffer(dist))
+        self.prepare()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # prepared geometries are not kept when pickled
+        self.prepare()
+
+    def prepare(self):
+        """Prepare the shape and buffers (creating their spatial indexes) so that
+        points can be checked against them quickly (see :meth:`Geom.at`)."""
+        for bname in ['shape', *self.buffers]:
+            shapely.prepare(getattr(self, bname))
 
     def at(self, pt, buffername='shape'):
         """
         Determine whether the point x, y is within the buffer 'buffername'.
 
+        Note that since a point has no extent, the buffer covers it exactly when it
+        intersects it, which is checked using the prepared buffer.
+
         Parameters
         ----------
         *pt : tuple
@@ -63,7 +79,7 @@ class Geom(object):
             Whether x,y is within the buffer.
         """
         buffer = getattr(self, buffername)
-        return buffer.covers(Point(*pt))
+        return bool(shapely.intersects_xy(buffer, pt[0], pt[1]))
 
     def all_at(self, *pt):
         """
@@ -109,6 +125,10 @@ class Geom(object):
     def return_mutables(self):
         return astuple(self.s)
 
+    def has_changed(self, count):
+        """Check whether the states have changed since the given count."""
+        return changes.changed_since(count, self.s)
+
     def create_hist(self, timerange, track):
         track = get_obj_track(self, track, all_possible=self.all_possible)
         h = History()
@@ -463,6 +483,7 @@ class GeomArch(object):
         self.lines = []
         self.polys = []
         self.geoms = {}
+        self._tree = None
         init_obj_attr(self, p=p)
         self.init_geoms(**kwargs)
 
@@ -495,6 +516,7 @@ class GeomArch(object):
         elif not issubclass(gclass, Geom):
             raise Exception(name + " gclass " + str(gclass) + " not a Geom")
         self.geoms[name] = getattr(self, name)
+        self._tree = None
 
     def copy(self):
         """Copy geoms in the architecture (mirrors current states)."""
@@ -503,6 +525,15 @@ class GeomArch(object):
             cop.geoms[geom].s.assign(self.geoms[geom].s)
         return cop
 
+    def get_snapshot(self):
+        """Get a snapshot of geom states, for use in load_snapshot."""
+        return {geom: self.geoms[geom].s.get_snapshot() for geom in self.geoms}
+
+    def load_snapshot(self, snapshot):
+        """Set geom states to those in a snapshot from get_snapshot."""
+        for geom, s_snapshot in snapshot.items():
+            self.geoms[geom].s.load_snapshot(s_snapshot)
+
     def reset(self):
         for geom in self.geoms:
             self.geoms[geom].reset()
@@ -538,6 +569,68 @@ class GeomArch(object):
                 all_at[geomname] = at_geom
         return all_at
 
+    def get_tree(self):
+        """
+        Get the spatial index (STRtree) of the shapes/buffers of the geoms, which is
+        built the first time it is used.
+
+        Returns
+        -------
+        tree : shapely.STRtree
+            Tree of the shapes/buffers of the geoms.
+        keys : list
+            (geomname, buffername) of each shape/buffer in the tree (in the order of
+            the geoms and their buffers).
+        """
+        if self._tree is None:
+            keys = [(geomname, bname) for geomname, geom in self.geoms.items()
+                    for bname in ['shape', *geom.buffers]]
+            tree = STRtree([getattr(self.geoms[g], b) for g, b in keys])
+            self._tree = tree, keys
+        return self._tree
+
+    def all_at_many(self, points):
+        """
+        Find all geoms (and buffers) each of the given points is at.
+
+        Gives the same result as calling :meth:`GeomArch.all_at` for each point, but
+        checks all of the points against the geoms at once using the spatial index of
+        the architecture (see :meth:`GeomArch.get_tree`).
+
+        Parameters
+        ----------
+        points : array-like
+            x, y(, z) locations to check, e.g., [(x1, y1), (x2, y2), ...].
+
+        Returns
+        -------
+        all_at_many : list
+            Dicts of the geoms where each point is at (and their properties).
+
+        Examples
+        --------
+        >>> exga = ExGeomArch()
+        >>> all_at = exga.all_at_many([(1.0, 1.0), (0.0, 0.0), (0.4, 0.3), (5.0, 5.0)])
+        >>> all_at[0]
+        {'ex_point': ['shape', 'on'], 'ex_line': ['shape', 'on'], 'ex_poly': ['shape']}
+        >>> all_at[1]
+        {'ex_line': ['shape', 'on'], 'ex_poly': ['shape']}
+        >>> all_at[2:]
+        [{'ex_point': ['on'], 'ex_line': ['on']}, {}]
+        """
+        points = np.asarray(points, dtype=float)
+        if not len(points):
+            return []
+        tree, keys = self.get_tree()
+        pts = shapely.points(points[:, 0], points[:, 1])
+        pt_inds, shape_inds = tree.query(pts, predicate='intersects')
+        order = np.lexsort((shape_inds, pt_inds))
+        all_at = [{} for i in range(len(points))]
+        for pt_ind, shape_ind in zip(pt_inds[order], shape_inds[order]):
+            geomname, bname = keys[shape_ind]
+            all_at[pt_ind].setdefault(geomname, []).append(bname)
+        return all_at
+
     def create_hist(self, timerange, track):
         """
         Create history for the architecture.
@@ -586,6 +679,10 @@ class GeomArch(object):
             mutes.extend(geom.return_mutables())
         return tuple(mutes)
 
+    def has_changed(self, count):
+        """Check whether the geom states have changed since the given count."""
+        return any(geom.has_changed(count) for geom in self.geoms.values())
+
 
 class ExGeomArch(GeomArch):
     """Example Geometric Architecture for testing etc."""
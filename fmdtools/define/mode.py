@@ -13,7 +13,8 @@ from typing import ClassVar
 import numpy as np
 import itertools
 import copy
-from .common import get_true_fields, get_true_field, get_dataobj_track
+from .common import get_true_fields, get_true_field, get_dataobj_track, changes
+from .common import untrack_changes
 from fmdtools.analyze.result import History, init_hist_iter
 
 
@@ -173,6 +174,12 @@ class Mode(dataobject, readonly=False):
             raise Exception("Invalid type for EPCs: " + str(type(EPCs)))
         return gtp*EPC_f
 
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        changes.mark_change(self, getattr(self, name), value)
+        dataobject.__setattr__(self, name, value)
+
     def return_mutables(self):
         return (self.mode, copy.copy(self.faults))
 
@@ -381,6 +388,7 @@ class Mode(dataobject, readonly=False):
         """
         self.faults.clear()
         self.faults.add(fault)
+        changes.mark(self)
         if self.exclusive:
             self._assign_mode(fault)
 
@@ -393,7 +401,9 @@ class Mode(dataobject, readonly=False):
         *fault : str(s)
             name(s) of the fault to add to the black
         """
-        self.faults.update(faults)
+        if not self.faults.issuperset(faults):
+            self.faults.update(faults)
+            changes.mark(self)
         if self.exclusive:
             if len(faults) > 1:
                 raise Exception("Multiple fault modes added to function with" +
@@ -418,6 +428,7 @@ class Mode(dataobject, readonly=False):
         """
         self.faults.add(fault_to_add)
         self.faults.remove(fault_to_replace)
+        changes.mark(self)
         if self.exclusive:
             self._assign_mode(fault_to_add)
 
@@ -434,7 +445,9 @@ class Mode(dataobject, readonly=False):
         warnmessage : str/False
             Warning to give when performing operation. Default is False (no warning)
         """
-        self.faults.discard(fault_to_remove)
+        if fault_to_remove in self.faults:
+            self.faults.discard(fault_to_remove)
+            changes.mark(self)
         if opermode:
             self._assign_mode(opermode)
         if self.exclusive and not (opermode):
@@ -454,7 +467,9 @@ class Mode(dataobject, readonly=False):
         warnmessage : str/False
             Warning to give when performing operation. Default is False (no warning)
         """
-        self.faults.clear()
+        if self.faults:
+            self.faults.clear()
+            changes.mark(self)
         self._assign_mode(opermode)
 
         if self.exclusive and not (self.mode):
@@ -469,6 +484,21 @@ class Mode(dataobject, readonly=False):
             self.mode = mode_to_mirror.mode
         self.faults.clear()
         self.faults.update(mode_to_mirror.faults)
+        changes.mark(self)
+
+    def get_snapshot(self):
+        """Return the mode and faults, which can be restored using load_snapshot."""
+        return getattr(self, 'mode', None), frozenset(self.faults)
+
+    def load_snapshot(self, snapshot):
+        """Set the mode and faults to those in a snapshot from get_snapshot."""
+        mode, faults = snapshot
+        if 'mode' in self.__fields__:
+            self.mode = mode
+        if self.faults != faults:
+            self.faults.clear()
+            self.faults.update(faults)
+            changes.mark(self)
 
     def get_true_field(self, fieldname, *args, **kwargs):
         return get_true_field(self, fieldname, *args, **kwargs)
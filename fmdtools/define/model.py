@@ -18,6 +18,7 @@ import copy
 
 from .flow import Flow, init_flow
 from .common import check_pickleability, get_var, set_var, init_obj_attr, get_obj_track, eq_units
+from .common import changes, mutables_differ
 from .parameter import Parameter, SimParam
 from .rand import Rand
 from .block import Simulable
@@ -26,7 +27,8 @@ from fmdtools.analyze.result import History, get_sub_include, init_hist_iter, in
 #Model superclass    
 class Model(Simulable):
     __slots__ =['fxns', 'functionorder', '_fxnflows', '_fxninput', '_flowstates',
-                'graph', 'staticfxns', 'dynamicfxns', 'staticflows'] #added in self.build())
+                'graph', 'staticfxns', 'dynamicfxns', 'staticflows', 'staticorder',
+                '_flowfxns', '_fxnstaticflows', '_asleep'] #added in self.build())
     default_track=('fxns', 'flows', 'i')
     default_name='model'
     """
@@ -57,6 +59,7 @@ class Model(Simulable):
         self._fxnflows=[]
         self._fxninput={}
         self._flowstates={}
+        self._asleep={}
     def __repr__(self):
         fxnlist = [fxn.__repr__() for fxn in self.fxns.values()]
         fxnlist = [fstr[:115]+'...'if len(fstr)>120 else fstr for fstr in fxnlist]
@@ -200,6 +203,21 @@ class Model(Simulable):
                                            if fxn.is_dynamic()])
             self.construct_graph(require_connections=require_connections)
             self.staticflows = [flow for flow in self.flows if any([ n in self.staticfxns for n in self.graph.neighbors(flow)])]
+            self.construct_static_index()
+    def construct_static_index(self):
+        """
+        Constructs the indexes used to schedule functions in prop_static (so that the
+        graph does not need to be queried during simulation), including:
+            - _flowfxns, which maps each static flow to the static functions connected to it
+            - _fxnstaticflows, which maps each static function to its static flows
+            - staticorder, the order to run static functions in (if sp.static_order), 
+            which follows self.functionorder
+        """
+        self._flowfxns = {flow: frozenset([n for n in self.graph.neighbors(flow) if n in self.staticfxns])
+                          for flow in self.staticflows}
+        self._fxnstaticflows = {fxnname: tuple([f for f in self.fxns[fxnname].flows if f in self._flowfxns])
+                                for fxnname in self.staticfxns}
+        self.staticorder = tuple([f for f in self.functionorder if f in self.staticfxns])
     def construct_graph(self, require_connections=True):
         """
         Creates .graph nx.graph representation of the model
@@ -324,6 +342,83 @@ class Model(Simulable):
                     hist[k] = self.h[k].copy()
             cop.h = hist.flatten()
         return cop
+    def get_snapshot(self, with_hist=True):
+        """
+        Gets a snapshot of the model's mutable states (states, modes, rand, and time of
+        functions/flows, along with the model history, if any).
+
+        Unlike copy(), the snapshot is not a model. Instead, it can be used to (quickly)
+        return this model or a copy of it (with the same structure) to the current
+        state using load_snapshot. Note that only the s, m, r, t attributes of blocks,
+        flow states (and comms/coords/geoms of environments) are restored.
+
+        Parameters
+        ----------
+        with_hist : bool
+            Whether to include (a copy of) the model history. The default is True.
+
+        Returns
+        -------
+        snapshot : dict
+            Dict with snapshots of the fxns, flows, rand, _flowstates, and history (h)
+        """
+        snapshot = {'r': self.r.get_snapshot(),
+                    'flows': {flowname: flow.get_snapshot()
+                              for flowname, flow in self.flows.items()},
+                    'fxns': {fxnname: fxn.get_snapshot()
+                             for fxnname, fxn in self.fxns.items()},
+                    '_flowstates': copy.deepcopy(self._flowstates)}
+        if with_hist and hasattr(self, 'h'):
+            snapshot['h'] = self.h.copy()
+        return snapshot
+    def load_snapshot(self, snapshot):
+        """
+        Sets the model to the states in a snapshot from get_snapshot.
+
+        The history in the snapshot (if any) is copied, so that histories from
+        different runs loaded from the same snapshot are independent. If the snapshot
+        has no history, existing histories are removed (see clear_hist).
+
+        Parameters
+        ----------
+        snapshot : dict
+            Snapshot from get_snapshot.
+        """
+        self.r.load_snapshot(snapshot['r'])
+        for flowname, flow_snapshot in snapshot['flows'].items():
+            self.flows[flowname].load_snapshot(flow_snapshot)
+        for fxnname, fxn_snapshot in snapshot['fxns'].items():
+            self.fxns[fxnname].load_snapshot(fxn_snapshot)
+        self._flowstates = copy.deepcopy(snapshot['_flowstates'])
+        self._asleep.clear()
+        self.clear_hist()
+        if 'h' in snapshot:
+            self.h = snapshot['h'].copy()
+            subhists = {}
+            for k, v in self.h.items():
+                split_k = k.split('.', 2)
+                if split_k[0] in ('fxns', 'flows') and len(split_k) == 3:
+                    att, name, key = split_k
+                    subhists.setdefault((att, name), History())[key] = v
+            for (att, name), subhist in subhists.items():
+                obj = getattr(self, att)[name]
+                obj.h = subhist
+                if att == 'fxns':
+                    obj.relink_hist()
+    def clear_hist(self):
+        """Removes the histories of the model and its functions/flows (including
+        components, actions, and local flows), so that new histories are created in
+        the next simulation."""
+        objs = [self, *self.fxns.values(), *self.flows.values()]
+        while objs:
+            obj = objs.pop()
+            if hasattr(obj, 'h'):
+                del obj.h
+            if hasattr(obj, 'ca'):
+                objs.extend(obj.ca.components.values())
+            if hasattr(obj, 'aa'):
+                objs.extend([*obj.aa.actions.values(), *obj.aa.flows.values()])
+            objs.extend([getattr(obj, l) for l in getattr(obj, 'locals', [])])
     def reset(self):
         """Resets the model to the initial state (with no faults, etc)"""
         for flowname, flow in self.flows.items():
@@ -331,6 +426,7 @@ class Model(Simulable):
         for fxnname, fxn in self.fxns.items():
             fxn.reset()
         self.r.reset()
+        self._asleep.clear()
     def return_probdens(self):
         """Returns the probability desnity of the model distributions given a """
         probdens=1.0
@@ -466,18 +562,94 @@ class Model(Simulable):
         self.set_vars(**disturbances)
         
         #Step 1: Run Dynamic Propagation Methods in Order Specified and Inject Faults if Applicable
+        #(in event-driven simulation, functions which are asleep are not re-run)
+        event_driven = self.sp.event_driven and not run_stochastic
         for fxnname in self.dynamicfxns.union(fxnfaults.keys()):
             fxn = self.fxns[fxnname]
             faults = fxnfaults.get(fxnname, [])
             if type(faults) != list: 
                 faults = [faults]
+            if event_driven and not faults and time < self.asleep_until(fxnname):
+                fxn.t.time = time
+                continue
+            count = changes.count
+            ran = time > fxn.t.time
             fxn('dynamic', faults=faults, time=time, run_stochastic=run_stochastic)
+            if event_driven and ran:
+                until = fxn.quiescent_until(time)
+                if until > time:
+                    self._asleep[fxnname] = (count, until)
             
         #Step 2: Run Static Propagation Methods
         try:
             self.prop_static(time, run_stochastic=run_stochastic)
         except Exception as e:
             raise Exception("Error in static propagation at time t="+str(time)) 
+    def asleep_until(self, fxnname):
+        """
+        Gets the time until which a dynamic function is asleep in event-driven
+        simulation (see event_driven in :class:`fmdtools.define.parameter.SimParam`).
+
+        A function is put to sleep when it is quiescent (see
+        :meth:`fmdtools.define.block.Block.quiescent_until`) after running its dynamic
+        behavior, and is woken when its states, modes, timers, rand, components, or
+        flows change after it was run (see :class:`fmdtools.define.common.ChangeTracker`),
+        since its behavior would then no longer be the same.
+
+        Parameters
+        ----------
+        fxnname : str
+            Name of the function.
+
+        Returns
+        -------
+        until : float
+            Time until which the function is asleep (-inf if it is awake).
+        """
+        entry = self._asleep.get(fxnname)
+        if entry is None:
+            return -np.inf
+        count, until = entry
+        fxn = self.fxns[fxnname]
+        if count < changes.count and (
+                changes.changed_since(count, fxn.s, fxn.m, *fxn.t.timers.values())
+                or fxn.r.has_changed(count)
+                or (hasattr(fxn, 'ca') and fxn.ca.has_changed(count))
+                or any(self.flows[flowname].has_changed(count)
+                       for flowname in self._fxninput[fxnname]['flows'])):
+            del self._asleep[fxnname]
+            return -np.inf
+        return until
+    def quiescent_until(self, time):
+        """
+        Gets the time until which the model is quiescent, meaning that simulating the
+        timesteps before this time would not change the model (besides its time). Used
+        to skip timesteps in event-driven simulation (see event_driven in
+        :class:`fmdtools.define.parameter.SimParam`).
+
+        The model is quiescent when each function is quiescent (see
+        :meth:`fmdtools.define.block.Block.quiescent_until`) and each dynamic function
+        is asleep (see asleep_until), since the flows are then already the result of
+        the static propagation of these functions.
+
+        Parameters
+        ----------
+        time : float
+            Current (last simulated) time.
+
+        Returns
+        -------
+        until : float
+            Time until which the model is quiescent. Returns time if it is not quiescent.
+        """
+        until = np.inf
+        for fxnname, fxn in self.fxns.items():
+            if fxnname in self.dynamicfxns:
+                until = min(until, self.asleep_until(fxnname))
+            until = min(until, fxn.quiescent_until(time))
+            if until <= time:
+                return time
+        return until
     def prop_static(self, time, run_stochastic=False):
         """
         Propagates behaviors through model graph (static propagation step)
@@ -497,38 +669,93 @@ class Model(Simulable):
             self._flowstates=dict.fromkeys(self.staticflows)
             for flowname in self.staticflows:
                 self._flowstates[flowname]=self.flows[flowname].return_mutables()
+        # changes.count at which each flow/fxn was last checked against its mutables
+        # (-1 for flows, since they may have changed since the last time-step)
+        flowcounts = dict.fromkeys(self.staticflows, -1)
+        fxnstates = {}
+        ordered = self.sp.static_order
         n=0
         while activefxns:
             flows_to_check = {*self.staticflows}
-            for fxnname in list(activefxns).copy():
+            if ordered:
+                fxnorder = [fxnname for fxnname in self.staticorder if fxnname in activefxns]
+                pending = {*fxnorder}
+            else:
+                fxnorder = list(activefxns)
+                pending = ()
+            for fxnname in fxnorder:
                 #Update functions with new values, check to see if new faults or states
-                oldmutables = self.fxns[fxnname].return_mutables()
-                self.fxns[fxnname]('static', time=time, run_stochastic=run_stochastic)
-                if oldmutables!=self.fxns[fxnname].return_mutables(): 
-                    nextfxns.update([fxnname])
-                
+                fxn = self.fxns[fxnname]
+                count, oldmutables = fxnstates.get(fxnname, (-1, None))
+                if count < 0 or (count < changes.count and fxn.has_changed(count)):
+                    oldmutables = fxn.return_mutables()
+                count = changes.count
+                fxn('static', time=time, run_stochastic=run_stochastic)
+                if count < changes.count and fxn.has_changed(count):
+                    newmutables = fxn.return_mutables()
+                    if mutables_differ(oldmutables, newmutables):
+                        nextfxns.update([fxnname])
+                    oldmutables = newmutables
+                fxnstates[fxnname] = (changes.count, oldmutables)
+                if ordered:
+                    pending.remove(fxnname)
+
                 #Check to see what flows now have new values and add connected functions (done for each because of communications potential)
-                for flowname in self.fxns[fxnname].flows:
+                #(when ordered, functions still to be run in this pass are not added)
+                for flowname in self._fxnstaticflows[fxnname]:
                     if flowname in flows_to_check:
                         try:
-                            if self._flowstates[flowname]!=self.flows[flowname].return_mutables():
-                                nextfxns.update(set([n for n in self.graph.neighbors(flowname) if n in self.staticfxns]))
+                            if self.flow_has_changed(flowname, flowcounts):
+                                if ordered:
+                                    nextfxns.update(self._flowfxns[flowname].difference(pending))
+                                else:
+                                    nextfxns.update(self._flowfxns[flowname])
                                 flows_to_check.remove(flowname)
                         except ValueError as e:
                             raise Exception("Invalid mutables in flow: "+flowname) from e
             # check remaining flows that have not been checked already
             for flowname in flows_to_check:
-                if self._flowstates[flowname]!=self.flows[flowname].return_mutables():
-                    nextfxns.update(set([n for n in self.graph.neighbors(flowname) if n in self.staticfxns]))
+                if self.flow_has_changed(flowname, flowcounts):
+                    nextfxns.update(self._flowfxns[flowname])
             # update flowstates
             for flowname in self.staticflows:
-                self._flowstates[flowname]=self.flows[flowname].return_mutables()
+                count = flowcounts[flowname]
+                if count < 0 or (count < changes.count and self.flows[flowname].has_changed(count)):
+                    flowcounts[flowname] = changes.count
+                    self._flowstates[flowname]=self.flows[flowname].return_mutables()
             activefxns=nextfxns.copy()
             nextfxns.clear()
             n += 1
             if n > 1000: #break if this is going for too long
                 raise Exception("Undesired looping between functions in static propagation step",
                                 "at t=" + str(time) + ", these functions remain active:" + str(activefxns))
+    def flow_has_changed(self, flowname, flowcounts):
+        """
+        Checks whether a flow has changed from its state in self._flowstates. Used in
+        prop_static, where return_mutables is only called for flows which have been
+        changed since the count in flowcounts (see fmdtools.define.common.ChangeTracker).
+
+        Parameters
+        ----------
+        flowname : str
+            Name of the flow to check.
+        flowcounts : dict
+            Counts at which each flow was last found to be the same as in _flowstates.
+            Updated if the flow is found to be the same.
+
+        Returns
+        -------
+        changed : bool
+            Whether the flow is different from self._flowstates[flowname]
+        """
+        count = flowcounts[flowname]
+        flow = self.flows[flowname]
+        if count < 0 or (count < changes.count and flow.has_changed(count)):
+            count = changes.count
+            if mutables_differ(self._flowstates[flowname], flow.return_mutables()):
+                return True
+            flowcounts[flowname] = count
+        return False
         
 def check_model_pickleability(model, try_pick=False):
     """ Checks to see which attributes of a model object will pickle, providing more detail about functions/flows"""
@@ -12,7 +12,7 @@ from recordclass import dataobject, asdict
 import warnings
 import numpy as np
 
-from .common import get_true_fields, get_true_field
+from .common import get_true_fields, get_true_field, LaneArray
 
 
 class Parameter(dataobject, readonly=True, mapping=True, iterable=True):
@@ -133,7 +133,11 @@ class Parameter(dataobject, readonly=True, mapping=True, iterable=True):
             Raises exception if a field is not the same as its defined type.
         """
         for typed_field in self.__annotations__:
-            attr_type = type(getattr(self, typed_field))
+            attr = getattr(self, typed_field)
+            if isinstance(attr, LaneArray) and attr.size:
+                # lanes (see fmdtools.sim.batch) are checked by their values
+                attr = attr.flat[0]
+            attr_type = type(attr)
             true_type = self.__annotations__.get(typed_field, False)
             if ((true_type and not attr_type == true_type) and
                     str(true_type).split("'")[1] not in str(attr_type)):
@@ -179,6 +183,18 @@ class SimParam(Parameter, readonly=True):
         use_local : bool
             Whether to use locally-defined timesteps in functions (if any).
             Default is True.
+        static_order : bool
+            Whether to run static propagation in Model.functionorder, where functions
+            which have yet to be run in a pass are not re-run when their flows change.
+            Makes static propagation deterministic and, when functions are ordered
+            from upstream to downstream, lets acyclic models converge in a single pass.
+            Default is False (runs functions as a set until no flows change).
+        event_driven : bool
+            Whether to skip the dynamic behaviors of functions which are quiescent
+            (see :meth:`fmdtools.define.block.Block.quiescent_until`) until their
+            states, modes, timers, or flows change, and to skip simulating timesteps
+            when the whole model is quiescent (back-filling the history with repeated
+            rows). Only used in deterministic simulations. Default is False.
     """
     phases:            tuple = (('na', 0, 100),)
     times:             tuple = (0, 100)
@@ -187,6 +203,8 @@ class SimParam(Parameter, readonly=True):
     units_set = ('sec', 'min', 'hr', 'day', 'wk', 'month', 'year')
     end_condition:     str = ''
     use_local:         bool = True
+    static_order:      bool = False
+    event_driven:      bool = False
 
     def __init__(self, *args, **kwargs):
         if ('times' in kwargs) and not ('phases' in kwargs):
@@ -16,11 +16,10 @@ probability
 - :func:`get_pdf_for_dist`: Gets the corresponding probability mass/density (from scipy)
 for outcome x for probability distributions with name 'randname' in numpy.
 """
-from scipy import stats
 from recordclass import dataobject, asdict, astuple
 import numpy as np
 import math
-from .common import get_true_fields, get_true_field, get_dataobj_track
+from .common import get_true_fields, get_true_field, get_dataobj_track, changes
 import copy
 
 from fmdtools.analyze.result import History, init_hist_iter
@@ -74,6 +73,10 @@ class Rand(dataobject, mapping=True):
                            vals in rand_states if hasattr(self.s, state+"_update")}
         return rand_states
 
+    def has_changed(self, count):
+        """Check whether the random states have changed since the given count."""
+        return 's' in self.__fields__ and changes.changed_since(count, self.s)
+
     def return_mutables(self):
         if 's' in self.__fields__:
             return astuple(self.s)
@@ -144,6 +147,24 @@ class Rand(dataobject, mapping=True):
         self.rng.__setstate__(other_rand.rng.__getstate__())
         self.probs = copy.copy(other_rand.probs)
 
+    def get_snapshot(self):
+        """Returns the random states, seed, rng state, and probabilities, which can be
+        restored using load_snapshot."""
+        if 's' in self.__fields__:
+            s_snapshot = self.s.get_snapshot()
+        else:
+            s_snapshot = ()
+        return (s_snapshot, self.seed, self.rng.__getstate__(),
+                copy.copy(self.probs), self.probdens)
+
+    def load_snapshot(self, snapshot):
+        """Sets the Rand to the states in a snapshot from get_snapshot."""
+        s_snapshot, self.seed, rng_state, probs, self.probdens = snapshot
+        if 's' in self.__fields__:
+            self.s.load_snapshot(s_snapshot)
+        self.rng.__setstate__(rng_state)
+        self.probs = copy.copy(probs)
+
     def get_true_field(self, fieldname, *args, **kwargs):
         return get_true_field(self, fieldname, *args, **kwargs)
 
@@ -262,6 +283,9 @@ def get_scipy_pdf_helper(x, randname, args, pmf=False):
     prob: float/array of probability densities
 
     """
+    # scipy.stats is slow to import, so it is only imported when probabilities are
+    # calculated
+    from scipy import stats
     if randname == 'dirichlet':
         a = 1
     if pmf:
@@ -289,6 +313,7 @@ def get_pdf_for_dist(x, randname, args):
     -------
     prob: float/array of probability densities
     """
+    from scipy import stats
     if type(x) in [np.ndarray, list] and len(x) > 1 and len(args) > 0:
         args = args[:-1]
 
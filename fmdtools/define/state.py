@@ -7,7 +7,7 @@ attributes that change over time.
 """
 from recordclass import dataobject
 import numpy as np
-from .common import is_iter, get_dataobj_track
+from .common import is_iter, get_dataobj_track, changes, untrack_changes
 import copy
 import warnings
 from fmdtools.analyze.result import History
@@ -43,6 +43,12 @@ class State(dataobject, mapping=True):
     """
     default_track = 'all'
 
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        changes.mark_change(self, getattr(self, name), value)
+        dataobject.__setattr__(self, name, value)
+
     def set_atts(self, **kwargs):
         """Sets the given arguments to a given value. Mainly useful for
         reducing length/adding clarity to assignment statements in __init__ methods
@@ -136,6 +142,23 @@ class State(dataobject, mapping=True):
                     val = copy.copy(val)
                 setattr(self, set_state, val)
 
+    def get_snapshot(self):
+        """Returns a tuple of (copied) state values which can be used to return the
+        State to its current values using load_snapshot, e.g.,
+
+        >>> p = ExamplePoint(x=1.0, y=2.0)
+        >>> snap = p.get_snapshot()
+        >>> p.put(x=5.0, y=5.0)
+        >>> p.load_snapshot(snap)
+        >>> p
+        ExamplePoint(x=1.0, y=2.0)
+        """
+        return tuple(copy.copy(getattr(self, state)) for state in self.__fields__)
+
+    def load_snapshot(self, snapshot):
+        """Sets the State to the values in a snapshot from get_snapshot."""
+        self.assign(snapshot, *self.__fields__)
+
     def get(self, *attnames, **kwargs):
         """Returns the given attribute names (strings) as a numpy array. Mainly useful
         for reducing length of lines/adding clarity to assignment statements. e.g.,:
@@ -202,7 +225,12 @@ class State(dataobject, mapping=True):
                 current = getattr(self, name)
                 sign = np.sign(value[0])
                 newval = current + value[0]
-                if sign*newval <= sign*value[1]:
+                if isinstance(newval, np.ndarray):
+                    # array (e.g., LaneArray) values are limited elementwise
+                    within = sign*newval <= sign*value[1]
+                    setattr(self, name,
+                            np.where(within, newval, value[1]).view(type(newval)))
+                elif sign*newval <= sign*value[1]:
                     setattr(self, name, newval)
                 else:
                     setattr(self, name, value[1])
@@ -237,8 +265,12 @@ class State(dataobject, mapping=True):
         for name, value in kwargs.items():
             if name not in self.__fields__:
                 raise Exception(name+" not a property of "+str(self.__class__))
+            current = getattr(self, name)
             try:
-                setattr(self, name, min(value[1], max(value[0], getattr(self, name))))
+                if isinstance(current, np.ndarray):
+                    setattr(self, name, np.clip(current, value[0], value[1]))
+                else:
+                    setattr(self, name, min(value[1], max(value[0], current)))
             except ValueError as e:
                 raise Exception("Invalid state values for "+name +
                                 ": "+str(getattr(self, name))) from e
@@ -8,7 +8,7 @@ Description: A module for defining time-based properties for use in blocks. Has
 from decimal import Decimal
 from recordclass import dataobject
 from fmdtools.analyze.result import History, get_sub_include
-from .common import get_dataobj_track, get_obj_track
+from .common import get_dataobj_track, get_obj_track, changes, untrack_changes
 
 
 class Timer():
@@ -40,6 +40,12 @@ class Timer():
         self.tstep = -1.0
         self.mode = 'standby'
 
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        changes.mark_change(self, getattr(self, name, None), value)
+        object.__setattr__(self, name, value)
+
     def __repr__(self):
         return 'Timer ' + self.name + ': mode= ' + self.mode + ', time= ' + str(self.time)
 
@@ -117,6 +123,15 @@ class Timer():
         cop.dt = self.dt
         return cop
 
+    def get_snapshot(self):
+        """Returns the timer time, mode, dt, and tstep (see Time.get_snapshot)"""
+        return self.time, self.mode, self.dt, self.tstep
+
+    def load_snapshot(self, snapshot):
+        """Sets the timer to the time, mode, dt, and tstep in a snapshot from
+        get_snapshot"""
+        self.time, self.mode, self.dt, self.tstep = snapshot
+
     def create_hist(self, timerange, track):
         h = History()
         track = get_obj_track(self, track, all_possible=('time', 'mode'))
@@ -174,6 +189,17 @@ class Time(dataobject):
         else:
             return super().__getattribute__(item)
 
+    __del__ = untrack_changes
+
+    def __setattr__(self, name, value):
+        changes.mark_change(self, getattr(self, name), value)
+        dataobject.__setattr__(self, name, value)
+
+    def has_changed(self, count):
+        """Check whether the time or any timers have changed since the given count
+        (see :class:`fmdtools.define.common.ChangeTracker`)."""
+        return changes.changed_since(count, self, *self.timers.values())
+
     def return_mutables(self):
         return (*(t.time for t in self.timers.values()),
                 self.time,
@@ -226,6 +252,31 @@ class Time(dataobject):
         cop.dt = self.dt
         return cop
 
+    def get_snapshot(self):
+        """
+        Returns the current times and timers, which can be restored using load_snapshot.
+
+        Examples
+        --------
+        >>> class ExTime(Time):
+        ...     timernames = ('a',)
+        >>> t = ExTime()
+        >>> snap = t.get_snapshot()
+        >>> t.time = 2.0
+        >>> t.a.inc(1.0)
+        >>> t.load_snapshot(snap)
+        >>> t.time, t.a.time
+        (0.0, 0.0)
+        """
+        timers = {name: timer.get_snapshot() for name, timer in self.timers.items()}
+        return self.time, self.t_ind, self.t_loc, self.run_times, self.dt, timers
+
+    def load_snapshot(self, snapshot):
+        """Sets the times and timers to those in a snapshot from get_snapshot."""
+        self.time, self.t_ind, self.t_loc, self.run_times, self.dt, timers = snapshot
+        for name, timer_snapshot in timers.items():
+            self.timers[name].load_snapshot(timer_snapshot)
+
     def create_hist(self, timerange, track):
         """
         Creates a History corresponding to Time
@@ -2,4 +2,7 @@
 from fmdtools.sim import propagate
 from fmdtools.sim import search
 from fmdtools.sim import approach
-from fmdtools.sim import scenario
\ No newline at end of file
+from fmdtools.sim import scenario
+from fmdtools.sim import pool
+from fmdtools.sim import memo
+from fmdtools.sim import batch
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Description: A module for simulating sets of nominal scenarios (e.g., parameter sweeps)
+together in a single model, where the numeric states hold one value per scenario.
+
+Has classes:
+
+- :class:`ModelBatch`: Model which simulates a set of scenarios (lanes) with different
+  numeric parameters at once, along with the models/histories of each lane.
+
+And functions:
+
+- :func:`batch_key`: Gets the key of a nominal scenario for grouping scenarios into
+  batches.
+- :func:`get_lane`: Gets the value of a given lane in a (nested) snapshot/value.
+"""
+import copy
+import numpy as np
+from recordclass import asdict
+from fmdtools.define.common import LaneArray, LaneDivergence
+from fmdtools.analyze.result import History
+
+
+def is_lane_value(val):
+    """Checks whether the value val may be held in a lane (i.e., is int/float)."""
+    return (isinstance(val, (int, float, np.number, LaneArray))
+            and not isinstance(val, (bool, np.bool_)))
+
+
+def batch_key(scen):
+    """
+    Gets the key of the nominal scenario scen for grouping scenarios into batches.
+
+    Scenarios with the same key differ only in the values of numeric (int/float)
+    parameters (or in their rand args, which are not used in non-stochastic
+    simulation), and may thus be simulated together in a :class:`ModelBatch`.
+
+    Parameters
+    ----------
+    scen : NominalScenario
+        Scenario to get the key of.
+
+    Returns
+    -------
+    key : str
+        Key of the non-numeric parameters, simparams, and sequence of the scenario.
+
+    Examples
+    --------
+    >>> from fmdtools.sim.scenario import NominalScenario
+    >>> a = NominalScenario(p={'delay': 10, 'cost': ('repair',)})
+    >>> b = NominalScenario(p={'delay': 20, 'cost': ('repair',)}, r={'seed': 1})
+    >>> batch_key(a) == batch_key(b)
+    True
+    >>> batch_key(a) == batch_key(NominalScenario(p={'delay': 10, 'cost': ()}))
+    False
+    """
+    p = scen.p if isinstance(scen.p, dict) else asdict(scen.p)
+    other_p = sorted((k, v) for k, v in p.items() if not is_lane_value(v))
+    return repr((other_p, sorted(scen.sp.items()), scen.sequence))
+
+
+def get_lane(val, i):
+    """
+    Gets the value of lane i in val, which may be a LaneArray or a (nested)
+    dict/tuple/list of values (e.g., a model snapshot). Other values are copied.
+
+    Examples
+    --------
+    >>> get_lane({'a': (LaneArray.of([1.0, 2.0]), 'x'), 'b': [LaneArray.of([3, 4])]}, 1)
+    {'a': (2.0, 'x'), 'b': [4]}
+    """
+    if isinstance(val, LaneArray):
+        return val[i].item()
+    elif type(val) == dict:
+        return {k: get_lane(v, i) for k, v in val.items()}
+    elif type(val) == tuple:
+        return tuple(get_lane(v, i) for v in val)
+    elif type(val) == list:
+        return [get_lane(v, i) for v in val]
+    else:
+        return copy.deepcopy(val)
+
+
+class ModelBatch(object):
+    """
+    Model which simulates a set of nominal scenarios (lanes) with different numeric
+    parameters at once.
+
+    In the batch model, numeric (int/float) parameters which differ between the
+    scenarios and the numeric fields of the states of each flow and function are
+    LaneArrays, with one value per lane. Behaviors written with (numpy-compatible)
+    arithmetic then simulate every lane in one call, and the history of the batch
+    model holds (time x lane) arrays for these fields.
+
+    Since the lanes share a single model, they must take the same path through it,
+    i.e., have the same modes, timers, and conditions (which are otherwise evaluated
+    as scalars). If the lanes diverge (e.g., a fault occurs in some lanes but not
+    others), a :class:`fmdtools.define.common.LaneDivergence` is raised during the
+    simulation, in which case the scenarios should be simulated individually instead.
+    Since rand states are not used in non-stochastic simulation, the lanes may also have
+    different rand args (e.g., seeds), but the batch itself should not be simulated
+    with run_stochastic=True.
+
+    Attributes
+    ----------
+    mdl : Model
+        Batch model, which simulates the lanes.
+    lanes : list
+        Models of each lane (with the parameters of each scenario), which are used to
+        initialize the lane values of the batch model and to hold the state of each
+        lane (see load_lane) after the simulation.
+
+    Examples
+    --------
+    >>> from examples.pump.ex_pump import Pump
+    >>> from fmdtools.sim.scenario import NominalScenario
+    >>> scens = [NominalScenario(p={'delay': d}) for d in [5, 10, 20]]
+    >>> batch = ModelBatch(Pump(), scens)
+    >>> batch.mdl.p.delay
+    LaneArray([ 5, 10, 20])
+    >>> batch.mdl.fxns['move_water'].s.eff
+    LaneArray([1., 1., 1.])
+    >>> batch.mdl.propagate(0.0)
+    >>> lane = batch.load_lane(2)
+    >>> lane.p.delay
+    20
+    >>> lane.flows['ee_1'].s.current == batch.mdl.flows['ee_1'].s.current[2]
+    True
+    """
+
+    def __init__(self, mdl, scens):
+        """
+        Parameters
+        ----------
+        mdl : Model
+            Model to simulate the scenarios in.
+        scens : list
+            NominalScenarios to simulate (which should have the same batch_key).
+        """
+        self.lanes = [mdl.new_with_params(p=scen.p, sp=scen.sp, r=scen.r)
+                      for scen in scens]
+        self.mdl = mdl.new_with_params(p=self.stack_params(), sp=scens[0].sp,
+                                       r=scens[0].r)
+        self.stack_states()
+
+    def stack_params(self):
+        """Gets the parameters of the batch model, where numeric parameters which
+        differ between the lanes are LaneArrays."""
+        p = {}
+        for field in self.lanes[0].p.__fields__:
+            vals = [getattr(lane.p, field) for lane in self.lanes]
+            if all(np.array_equal(val, vals[0]) for val in vals[1:]):
+                p[field] = vals[0]
+            elif all(is_lane_value(val) for val in vals):
+                p[field] = LaneArray.of(vals)
+            else:
+                raise LaneDivergence("Parameter " + field + " differs between lanes " +
+                                     "but is not numeric: " + str(vals))
+        return p
+
+    def get_lane_objs(self, lane):
+        """Gets the flows/functions (with states) of the model lane which have lanes in
+        the batch model, with structure {'flows.flowname': obj, 'fxns.fxnname': obj}."""
+        objs = {'flows.' + flowname: flow for flowname, flow in lane.flows.items()}
+        objs.update({'fxns.' + fxnname: fxn for fxnname, fxn in lane.fxns.items()})
+        return {name: obj for name, obj in objs.items() if hasattr(obj, 's')}
+
+    def stack_states(self):
+        """Sets the numeric fields of the states of the batch model to LaneArrays of
+        the initial values of the fields in each lane."""
+        lane_objs = [self.get_lane_objs(lane) for lane in self.lanes]
+        for name, obj in self.get_lane_objs(self.mdl).items():
+            for field in obj.s.__fields__:
+                vals = [getattr(objs[name].s, field) for objs in lane_objs]
+                if all(is_lane_value(val) for val in vals):
+                    setattr(obj.s, field, LaneArray.of(vals))
+
+    def get_lane_hist(self, hist, i):
+        """
+        Gets the history of lane i from the (flat) history of the batch model.
+
+        Parameters
+        ----------
+        hist : History
+            History of the batch model, where the fields with lanes are (time x lane)
+            LaneArrays.
+        i : int
+            Index of the lane.
+
+        Returns
+        -------
+        lane_hist : History
+            History of the lane (with the same structure as the history of the model
+            simulated on its own).
+        """
+        lane_hist = History()
+        for k, v in hist.items():
+            if isinstance(v, LaneArray):
+                lane_hist[k] = np.array(v[:, i])
+            elif isinstance(v, np.ndarray):
+                lane_hist[k] = v.copy()
+            else:
+                lane_hist[k] = copy.deepcopy(v)
+        return lane_hist
+
+    def load_lane(self, i, hist=None, snapshot=None):
+        """
+        Sets the model of lane i to the current state of the lane in the batch model.
+
+        Parameters
+        ----------
+        i : int
+            Index of the lane.
+        hist : History, optional
+            History of the lane (from get_lane_hist) to give the model (e.g., for use
+            in find_classification). The default is None.
+        snapshot : dict, optional
+            Snapshot of the batch model (see Model.get_snapshot), if already taken.
+            The default is None, which takes a new snapshot.
+
+        Returns
+        -------
+        lane : Model
+            Model of the lane.
+        """
+        if snapshot is None:
+            snapshot = self.mdl.get_snapshot(with_hist=False)
+        lane = self.lanes[i]
+        # rand states are kept from the lane model (the lanes may have different seeds)
+        r_snaps = {None: lane.r.get_snapshot(),
+                   **{fxnname: fxn.r.get_snapshot()
+                      for fxnname, fxn in lane.fxns.items()}}
+        lane.load_snapshot(get_lane(snapshot, i))
+        lane.r.load_snapshot(r_snaps.pop(None))
+        for fxnname, r_snap in r_snaps.items():
+            lane.fxns[fxnname].r.load_snapshot(r_snap)
+        if hist is not None:
+            lane.h = hist
+        return lane
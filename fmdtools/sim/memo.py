@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Description: A module for re-using the simulations of equivalent scenarios.
+
+Has classes:
+
+- :class:`ScenarioMemo`: Memo of simulated scenarios, keyed by the state of the model
+  at the injection and the faults/disturbances injected.
+- :class:`StateLog`: Log of the states of a model over a simulated scenario, used to
+  check whether its simulation may be re-used for the same injection at other times.
+
+And functions:
+
+- :func:`get_state_signature`: Gets the state of a model, without the time of its
+  blocks.
+- :func:`get_until`: Gets the time until which the behaviors of a model do not depend
+  on time.
+- :func:`get_ind`: Gets the time-index of a time in the simulation of a model.
+- :func:`hash_obj`: Hashes an object by its (pickled) bytes.
+"""
+import hashlib
+import pickle
+import dill
+import numpy as np
+from .pool import ModelRef
+
+
+class ScenarioMemo(object):
+    """
+    Memo of simulated scenarios, which is used to re-use the simulation of a scenario
+    with the same pre-conditions as a scenario simulated previously (see the dedup
+    option in :data:`fmdtools.sim.propagate.mult_kwargs`).
+
+    Scenarios are keyed by a hash of the model at the injection (its class, parameters,
+    and state, without the time of its blocks, see :func:`get_state_signature`), the
+    faults/disturbances injected (at times relative to the start of the scenario),
+    and the simulation options. A scenario with the same key as a simulated scenario
+    (e.g., the same fault injected at another time in the same phase) re-uses its
+    simulation when:
+
+    - it starts at the same time (so that the scenarios are the same), or
+    - the behaviors of the model do not depend on time from the start of either
+      scenario until the end of the injections and the end of the (time-shifted)
+      simulation it uses, and the simulated scenario is in the same state at the end
+      of this window as at its time-shifted end (so that the scenarios are in the same
+      state from then on).
+
+    Time-dependent behaviors are given by the quiescence of the functions at the start
+    of the scenario (see :func:`get_until`), and the end condition of the model (if
+    used) is taken to depend on time. The history of the new scenario is then the
+    history of the simulated scenario, shifted in time over the window (besides the
+    time of the model and its blocks), and its results are classified from this
+    history and the final state of the simulated scenario (so that, e.g., scenarios
+    with different rates may share the same simulation). Indicators of the model in
+    the history are taken to depend on its state, as in quiescent functions.
+
+    As in staged='snapshot' execution, this assumes that the state of the model is
+    fully given by its snapshot (see :meth:`fmdtools.define.model.Model.get_snapshot`).
+
+    Attributes
+    ----------
+    entries : dict
+        Simulated scenarios, with structure {key: [entry, ...]}, where each entry is
+        a tuple (mdlhist, snapshot, time, ref_key, start_ind, until_ind, hashes), where
+        snapshot is the final state of the model, time is the last simulated time,
+        ref_key is the key of the model parameters (see ModelRef), start_ind is the
+        time-index of the start of the scenario, until_ind is the time-index until
+        which the model is time-invariant, and hashes are the state hashes over this
+        window from the StateLog of the scenario (and the final state hash).
+    skeletons : dict
+        Models (for each set of model parameters) to load final states in, for use in
+        classifying scenarios.
+    ref_keys : dict
+        Key of the model parameters of each start key.
+    hits : int
+        Number of scenarios which re-used a previous simulation.
+    misses : int
+        Number of scenarios which were simulated.
+
+    Examples
+    --------
+    >>> from examples.pump.ex_pump import Pump
+    >>> from fmdtools.sim.scenario import SingleFaultScenario
+    >>> mdl = Pump()
+    >>> memo = ScenarioMemo()
+    >>> start = memo.get_start(mdl, 5.0)
+    >>> seq = {5.0: {'faults': {'move_water': ['mech_break']}}}
+    >>> scen = SingleFaultScenario(sequence=seq, time=5.0, name='a', rate=1.0)
+    >>> key = memo.get_key(start, scen, track='all')
+    >>> key == memo.get_key(start, scen.copy_with(name='b', rate=0.1), track='all')
+    True
+    >>> key == memo.get_key(start, scen, track='default')
+    False
+
+    Injecting the same fault at another time from the same state gives the same key:
+
+    >>> seq_2 = {8.0: {'faults': {'move_water': ['mech_break']}}}
+    >>> scen_2 = SingleFaultScenario(sequence=seq_2, time=8.0, name='c', rate=1.0)
+    >>> key == memo.get_key(memo.get_start(mdl, 8.0), scen_2, track='all')
+    True
+    >>> memo.get(key, start, scen) is None
+    True
+    >>> memo.hits, memo.misses
+    (0, 1)
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.skeletons = {}
+        self.ref_keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_start(self, mdl, time, staged=True, use_end_condition=True):
+        """
+        Gets the start of scenarios simulated from a model at a given time (which may
+        be shared by multiple scenarios).
+
+        Parameters
+        ----------
+        mdl : Model
+            Model to simulate the scenario from (in its state before the injection).
+        time : float
+            Time the scenario is simulated from.
+        staged : bool, optional
+            Whether the scenario is simulated from the model at this time (staged) or
+            from the start of the simulation. If not staged, the scenario is not
+            time-invariant. The default is True.
+        use_end_condition : bool, optional
+            Whether the end condition of the model is used (see
+            :data:`fmdtools.sim.propagate.sim_kwargs`). The default is True.
+
+        Returns
+        -------
+        start : tuple
+            (start_key, state_hash, time, until, start_ind, until_ind), where start_key
+            is the hash of the class, parameters, and state of the model, state_hash is
+            the hash of the state, until is the time until which the model is
+            time-invariant (see get_until), and start_ind and until_ind are the
+            time-indices of time and until.
+        """
+        state_hash = hash_obj(get_state_signature(mdl))
+        ref_key = ModelRef(mdl).key
+        start_key = hash_obj((ref_key, state_hash))
+        self.ref_keys[start_key] = ref_key
+        if staged:
+            until = get_until(mdl, time, use_end_condition)
+        else:
+            until = time
+        return (start_key, state_hash, time, until, get_ind(mdl, time),
+                get_ind(mdl, until, up=True))
+
+    def get_key(self, start, scen, desired_result=None, **kwargs):
+        """
+        Gets the key of a scenario.
+
+        Parameters
+        ----------
+        start : tuple
+            Start of the scenario (from get_start).
+        scen : Scenario
+            Scenario to simulate.
+        desired_result : dict/str/list, optional
+            Desired result (unused, since results are re-computed for each scenario).
+        **kwargs : kwargs
+            :data:`fmdtools.sim.propagate.sim_kwargs` the scenario is simulated with.
+
+        Returns
+        -------
+        key : tuple
+            Start key and hash of the injected faults/disturbances (at times relative
+            to the start) and sim kwargs.
+        """
+        start_key, _, time = start[:3]
+        seq = [(round(t - time, 9), evs) for t, evs in sorted(scen.sequence.items())]
+        seq = repr((seq, sorted(kwargs.items())))
+        return start_key, hashlib.sha1(seq.encode()).hexdigest()
+
+    def get_state_log(self, start):
+        """Gets a :class:`StateLog` to log the states of a scenario from a start (from
+        get_start) in, or None if the scenario is not time-invariant."""
+        _, state_hash, _, _, start_ind, until_ind = start
+        if until_ind > start_ind:
+            return StateLog(until_ind, {start_ind - 1: state_hash})
+
+    def get(self, key, start, scen):
+        """
+        Gets an entry which may be re-used for a scenario (counting the hit/miss).
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the scenario (from get_key).
+        start : tuple
+            Start of the scenario (from get_start).
+        scen : Scenario
+            Scenario to simulate.
+
+        Returns
+        -------
+        match : tuple
+            (entry, start_ind, until_ind), where entry is the entry of the simulated
+            scenario and start_ind and until_ind give the window over which its history
+            is shifted. None if there is no simulated scenario to re-use.
+        """
+        _, _, time, until, start_ind, until_ind = start
+        for entry in self.entries.get(key, []):
+            e_start_ind, e_until_ind, hashes = entry[4:]
+            shift = start_ind - e_start_ind
+            if shift == 0:
+                self.hits += 1
+                return entry, start_ind, start_ind
+            # over the window, the scenario is the shifted simulated scenario, which
+            # it then matches if the simulated scenario was the same over the shift
+            end_ind = until_ind - 1
+            state_hash = hashes.get(end_ind - shift)
+            if (max(scen.sequence, default=time) < until
+                    and end_ind - shift < e_until_ind and state_hash is not None
+                    and state_hash == hashes.get(end_ind)):
+                self.hits += 1
+                return entry, start_ind, until_ind
+        self.misses += 1
+
+    def add(self, key, start, mdl, mdlhist, time, state_log=None):
+        """
+        Adds a simulated scenario to the memo.
+
+        Parameters
+        ----------
+        key : str
+            Key of the scenario (from get_key).
+        start : tuple
+            Start of the scenario (from get_start).
+        mdl : Model
+            Model after simulating the scenario.
+        mdlhist : History
+            History of the scenario.
+        time : float
+            Last simulated time.
+        state_log : StateLog, optional
+            Log of the states of the scenario (from get_state_log). The default is
+            None.
+        """
+        start_ind, until_ind = start[4:]
+        ref_key = self.ref_keys[key[0]]
+        if ref_key not in self.skeletons:
+            self.skeletons[ref_key] = mdl.copy()
+        hashes = {**state_log.hashes} if state_log else {}
+        hashes[get_ind(mdl, time)] = hash_obj(get_state_signature(mdl))
+        entry = (mdlhist, mdl.get_snapshot(with_hist=False), time, ref_key, start_ind,
+                 until_ind, hashes)
+        self.entries.setdefault(key, []).append(entry)
+
+    def load(self, match, mdl=None, nomhist={}):
+        """
+        Loads a simulated scenario.
+
+        Parameters
+        ----------
+        match : tuple
+            Match from get.
+        mdl : Model, optional
+            Model the scenario is simulated from, whose history gives the history of
+            the scenario before its start (if shifted). The default is None.
+        nomhist : History, optional
+            Nominal history, to compare the (shifted) history with if the history of
+            the simulated scenario was compared with the nominal history. The default
+            is {}.
+
+        Returns
+        -------
+        sim_mdl : Model
+            Model with the final state of the simulation.
+        mdlhist : History
+            Copy of the (shifted) history of the simulation.
+        time : float
+            Last simulated time.
+        """
+        entry, start_ind, until_ind = match
+        mdlhist, snapshot, time, ref_key, e_start_ind = entry[:5]
+        sim_mdl = self.skeletons[ref_key]
+        sim_mdl.load_snapshot(snapshot)
+        hist = mdlhist.copy()
+        comparison = mdlhist.get_comparison()
+        shift = start_ind - e_start_ind
+        if until_ind > start_ind:
+            prefix = mdl.h.flatten() if hasattr(mdl, 'h') else {}
+            e_hist = mdlhist.flatten()
+            for k, val in hist.flatten().items():
+                if k == 'time' or k == 't.time' or k.endswith('.t.time'):
+                    continue
+                end_ind = min(until_ind, len(val))
+                val[start_ind:end_ind] = np.asarray(e_hist[k][e_start_ind:
+                                                              end_ind-shift])
+                if k in prefix:
+                    val[:start_ind] = np.asarray(prefix[k][:start_ind])
+            if comparison is not None:
+                comparison = hist.set_comparison(nomhist, batch=comparison.batch)
+                comparison.update(start_ind)
+                comparison.update(len(hist['time']) - 1)
+        if comparison is not None:
+            hist.__dict__['_comparison'] = comparison
+        return sim_mdl, hist, time
+
+    @property
+    def hit_rate(self):
+        """Fraction of scenarios which re-used a previous simulation."""
+        return self.hits/max(self.hits + self.misses, 1)
+
+
+class StateLog(object):
+    """
+    Log of the states of a model over a simulated scenario (as hashes of their state
+    signatures), used to check when the scenario is in the same state at different
+    times (see :meth:`ScenarioMemo.get`).
+
+    Attributes
+    ----------
+    until : int
+        Time-index until which (exclusive) states are logged.
+    hashes : dict
+        Hashes of the state signature of the model after each time-index, with
+        structure {t_ind: hash}.
+    """
+
+    def __init__(self, until, hashes={}):
+        self.until = until
+        self.hashes = {**hashes}
+
+    def log(self, mdl, t_ind):
+        """Logs the state of the model mdl after time-index t_ind."""
+        if t_ind < self.until:
+            self.hashes[t_ind] = hash_obj(get_state_signature(mdl))
+
+    def log_repeated(self, t_ind):
+        """Logs the state after time-index t_ind as the same as the state after the
+        previous time-index (e.g., when it is skipped in event-driven simulation)."""
+        if t_ind < self.until and t_ind - 1 in self.hashes:
+            self.hashes[t_ind] = self.hashes[t_ind - 1]
+
+
+def get_state_signature(mdl):
+    """
+    Gets the state of a model (or block) without the time of its blocks, so that the
+    states of the model at different times may be compared.
+
+    Parameters
+    ----------
+    mdl : Model/Block
+        Model to get the state of.
+
+    Returns
+    -------
+    signature : list
+        Snapshots of the rand and flows of the model, along with the states, modes,
+        rand, and timers of its blocks (see
+        :meth:`fmdtools.define.block.Block.get_snapshot`).
+
+    Examples
+    --------
+    >>> from examples.pump.ex_pump import Pump
+    >>> mdl = Pump()
+    >>> sig = get_state_signature(mdl)
+    >>> mdl.propagate(1.0)
+    >>> mdl.propagate(2.0)
+    >>> sig_1 = get_state_signature(mdl)
+    >>> mdl.propagate(3.0)
+    >>> sig_1 == get_state_signature(mdl)
+    True
+    >>> mdl.fxns['move_water'].m.add_fault('mech_break')
+    >>> sig_1 == get_state_signature(mdl)
+    False
+    """
+    if hasattr(mdl, 'fxns'):
+        flows = {flowname: flow.get_snapshot() for flowname, flow in mdl.flows.items()}
+        signature = [mdl.r.get_snapshot(), flows, mdl._flowstates]
+        blocks = [*mdl.fxns.values()]
+    else:
+        signature, blocks = [], [mdl]
+    while blocks:
+        block = blocks.pop()
+        _, _, *t_snap = block.t.get_snapshot()
+        signature.append((block.s.get_snapshot(), block.m.get_snapshot(),
+                          block.r.get_snapshot(), t_snap))
+        if hasattr(block, 'ca'):
+            blocks.extend(block.ca.components.values())
+        if hasattr(block, 'aa'):
+            signature.append(block.aa.get_snapshot())
+    return signature
+
+
+def get_until(mdl, time, use_end_condition=True):
+    """
+    Gets the time until which the behaviors of a model do not depend on time, given
+    by the quiescence of its functions (see
+    :meth:`fmdtools.define.block.Block.quiescent_until`).
+
+    Parameters
+    ----------
+    mdl : Model/Block
+        Model to check.
+    time : float
+        Time to check from.
+    use_end_condition : bool, optional
+        Whether the end condition of the model is used, in which case the model
+        depends on time. The default is True.
+
+    Returns
+    -------
+    until : float
+        Time until which the model is time-invariant (at most the end of the
+        simulation, or time if it is not).
+
+    Examples
+    --------
+    >>> from examples.pump.ex_pump import Pump
+    >>> mdl = Pump()
+    >>> get_until(mdl, 0.0), get_until(mdl, 10.0), get_until(mdl, 51.0)
+    (5.0, 50.0, 56.0)
+    """
+    if use_end_condition and getattr(mdl.sp, 'end_condition', False):
+        return time
+    if hasattr(mdl, 'fxns'):
+        until = min([fxn.quiescent_until(time) for fxn in mdl.fxns.values()],
+                    default=np.inf)
+    else:
+        until = mdl.quiescent_until(time)
+    return min(until, mdl.sp.times[-1] + mdl.sp.dt)
+
+
+def get_ind(mdl, time, up=False):
+    """Gets the time-index of a time in the simulation of a model (rounded up to
+    the next index if up=True)."""
+    ind = round((time - mdl.sp.times[0]) / mdl.sp.dt, 9)
+    if up:
+        return int(np.ceil(ind))
+    return int(round(ind))
+
+
+def hash_obj(obj):
+    """Hashes an object by its (pickled) bytes."""
+    try:
+        data = pickle.dumps(obj)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        data = dill.dumps(obj)
+    return hashlib.sha1(data).hexdigest()
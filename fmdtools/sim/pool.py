@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Description: A module for running simulations in a persistent pool of workers which
+keep (pre-built) models between tasks.
+
+Has classes and functions:
+
+- :class:`ModelRef`: Reference to a model (by class, parameters, and state snapshot)
+  which is sent to workers in place of the model itself.
+- :class:`ModelPool`: Persistent process pool whose workers are initialized with a
+  model and cache built models between tasks.
+- :func:`init_worker`: Initializer for ModelPool workers which pre-builds models.
+- :func:`get_cached_model`: Gets a model with given parameters from the worker cache.
+"""
+import multiprocessing as mp
+from collections import OrderedDict
+
+max_cached_models = 16
+"""Maximum number of models (with different parameters) to cache in each worker."""
+
+_cached_models = OrderedDict()
+
+
+class ModelRef(object):
+    """
+    Reference to a model with given parameters, and, optionally, a snapshot of its
+    state (see :meth:`fmdtools.define.model.Model.get_snapshot`).
+
+    When sent to a worker (e.g. in :func:`fmdtools.sim.propagate.exec_scen_par`), the
+    model is retrieved using get_model, which re-uses a model with the same parameters
+    built by previous tasks in that worker (if any). This avoids both pickling the
+    model and constructing it in each task.
+
+    Examples
+    --------
+    >>> from examples.pump.ex_pump import Pump
+    >>> mdl = Pump()
+    >>> ref = ModelRef(mdl)
+    >>> mdl_1 = ref.get_model()
+    >>> mdl_1.fxns['move_water'].m.add_fault('mech_break')
+    >>> mdl_2 = ref.get_model()
+    >>> mdl_1 is mdl_2
+    True
+    >>> mdl_2.fxns['move_water'].m.faults
+    set()
+    """
+
+    __slots__ = ('mdl_class', 'p', 'sp', 'r', 'track', 'key', 'snapshot')
+
+    def __init__(self, mdl, snapshot=None, **kwargs):
+        """
+        Creates a reference to a model.
+
+        Parameters
+        ----------
+        mdl : Model
+            Model to reference.
+        snapshot : dict, optional
+            Snapshot of the model state (from Model.get_snapshot) to load in the model.
+            The default is None, which loads the initial state of the model.
+        **kwargs : kwargs
+            Changes to the parameters of the model (p, sp, r, track), as in
+            Model.new_with_params.
+        """
+        self.mdl_class = mdl.__class__
+        self.p, self.sp, self.r, self.track = mdl.new_params(**kwargs)
+        self.key = repr((self.mdl_class.__module__, self.mdl_class.__qualname__,
+                         self.p, self.sp, self.r, self.track))
+        self.snapshot = snapshot
+
+    def get_model(self):
+        """
+        Gets the referenced model (from the cache of models in the current process, if
+        present) and loads the snapshot (or the initial state) into it.
+
+        Returns
+        -------
+        mdl : Model
+            Model with the referenced parameters and state.
+        """
+        mdl, initial_snapshot = get_cached_model(self)
+        if self.snapshot is None:
+            mdl.load_snapshot(initial_snapshot)
+        else:
+            mdl.load_snapshot(self.snapshot)
+        return mdl
+
+
+def get_cached_model(ref):
+    """
+    Gets a model with the parameters of a given ModelRef from the cache of the current
+    process, building (and caching) it if it is not present.
+
+    Parameters
+    ----------
+    ref : ModelRef
+        Reference to the model.
+
+    Returns
+    -------
+    mdl : Model
+        Model with the parameters in ref.
+    initial_snapshot : dict
+        Snapshot of the model state when it was built.
+    """
+    if ref.key in _cached_models:
+        _cached_models.move_to_end(ref.key)
+    else:
+        mdl = ref.mdl_class(p=ref.p, sp=ref.sp, r=ref.r, track=ref.track)
+        _cached_models[ref.key] = (mdl, mdl.get_snapshot())
+        if len(_cached_models) > max_cached_models:
+            _cached_models.popitem(last=False)
+    return _cached_models[ref.key]
+
+
+def init_worker(refs):
+    """Initializes a ModelPool worker by building (and caching) the given models."""
+    for ref in refs:
+        get_cached_model(ref)
+
+
+class ModelPool(object):
+    """
+    Persistent process pool for running simulations of a model.
+
+    Each worker is initialized once with the model (see :func:`init_worker`), and
+    models are sent to the workers as :class:`ModelRef` objects (parameters and state
+    snapshots), so that they do not need to be pickled or re-built in each task.
+    Models with other parameters (e.g., in nominal_approach or optimization loops) are
+    built once per worker and cached (up to :data:`max_cached_models`).
+
+    Unlike other pools, a ModelPool is not closed at the end of approach,
+    nominal_approach, etc., so that it (and the models in the workers) can be re-used
+    between calls. It should thus be closed using close() or used as a context
+    manager, e.g. ::
+
+        with ModelPool(mdl, 4) as pool:
+            for app in apps:
+                res, hist = propagate.approach(mdl, app, pool=pool)
+
+    Note that, since models are restored using snapshots, attributes of the model
+    other than those in the snapshot (states, modes, rand, and time of functions and
+    flows) are not reset between tasks.
+    """
+
+    persistent = True
+
+    def __init__(self, mdl, processes=None, **kwargs):
+        """
+        Creates the pool.
+
+        Parameters
+        ----------
+        mdl : Model
+            Model to initialize workers with.
+        processes : int, optional
+            Number of worker processes. The default is None (os.cpu_count()).
+        **kwargs : kwargs
+            Parameter changes to the model (p, sp, r, track). Alternatively, a list of
+            these changes may be provided using the argument param_sets to pre-build
+            models with different parameters.
+        """
+        param_sets = kwargs.pop('param_sets', [kwargs])
+        refs = [ModelRef(mdl, **params) for params in param_sets]
+        self.pool = mp.Pool(processes, initializer=init_worker, initargs=(refs,))
+
+    def map(self, *args, **kwargs):
+        return self.pool.map(*args, **kwargs)
+
+    def imap(self, *args, **kwargs):
+        return self.pool.imap(*args, **kwargs)
+
+    def imap_unordered(self, *args, **kwargs):
+        return self.pool.imap_unordered(*args, **kwargs)
+
+    def close(self):
+        self.pool.close()
+
+    def join(self):
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.pool.close()
+        self.pool.join()
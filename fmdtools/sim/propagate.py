@@ -7,6 +7,8 @@ Main Methods:
 - :func:`nominal()`: Runs the model over time in the nominal scenario.
 - :func:`one_fault()`:  Runs one fault in the model at a specified time.
 - :func:`sequence()`: Runs arbitrary scenario of fault modes at specified times.
+- :func:`sequences()`: Runs a list of scenarios of fault modes/disturbances at specified
+  times.
 - :func:`single_faults()`: Creates and propagates a list of failure scenarios in a model
   over given model times.
 - :func:`approach`: Injects and propagates faults in the model defined by a given
@@ -28,14 +30,34 @@ Private Methods:
   given the modes set up in the fault model
 - :func:`prop_one_scen()`: Runs a fault scenario in the model over time
 - :func:`save_helper()`: Helper function for inline results saving.
+- :func:`indiv_save_args()`: Gets the arguments for saving an individual result.
+- :func:`split_pool_save_args()`: Splits individual saving between pool workers and
+  the parent process.
 - :func:`unpack _res_list`: Helper function for unpacking results
 - :func:`exec_nom_par`: Helper function for executing nominal scenarios in parallel
 - :func:`exec_nom_helper`: Helper function for executing nominal scenarios
+- :func:`make_batches`: Groups nominal scenarios into batches to simulate together
+- :func:`exec_batch_helper`: Helper function for executing a batch of nominal scenarios
+- :func:`is_lane_divergence`: Checks whether an exception was caused by lanes diverging
 - :func:`nom_helper`: Helper function for initial run of nominal scenario
+- :func:`get_end_snapshot`: Gets a snapshot of the nominal model at the end of a run
+- :func:`load_end_snapshot`: Restores a model to the nominal end snapshot
+- :func:`get_mode_signature`: Gets the modes and faults of the blocks of a model
 - :func:`scenlist_helper`: Helper function for `approach`
+- :func:`iter_scenarios`: Runs a list of scenarios, yielding results as they finish
+- :func:`iter_prefix_tree`: Runs a list of scenarios by shared prefix of injections
+- :func:`get_injection_key`: Gets a key of the faults/disturbances injected at a time
+- :func:`plan_prefix_tree`: Plans the simulation of scenarios with a shared prefix
+- :func:`iter_fork`: Runs scenarios with a shared prefix from a given model
+- :func:`iter_ended`: Gets results of scenarios which ended before diverging
 - :func:`exec_scen_par`:  Helper function for executing the scenario in parallel
+- :func:`exec_scen_par_named`: Helper function for executing the scenario in parallel
+  (returning the scenario name)
+- :func:`estimate_scen_costs`: Estimates the cost of scenarios for scheduling
 - :func:`exec_scen`: Executes a scenario and generates results and classifications given
   a model and nominal model history
+- :func:`exec_memo_scen`: Generates results and classifications of a scenario from the
+  simulation of an equivalent scenario in a memo
 - :func:`check_hist_memory`: Checks if the memory will be exhausted given the size of
   the mdlhist and number of scenarios
 - :func:`check_mdl_memory`: Raises exception if model size is too large.
@@ -43,6 +65,8 @@ Private Methods:
 - :func:`phases_from_hist`: Helper function for `nested_approach`
 - :func:`check_end_condition`: Helper function for `prop_one_scen` to end simulation
   earlier.
+- :func:`fill_skipped`: Helper function for `prop_one_scen` to fill in the times
+  skipped in event-driven simulation.
 - :func:`get_result`: Helper function for `prop_one_scen` to get result at specific
   timestep.
 - :func:`get_endclass_vars`: Helper function for `get_result`
@@ -53,14 +77,19 @@ Private Methods:
 
 import numpy as np
 import copy
+import bisect
 import tqdm
 import dill
 import os
 from fmdtools.define.common import get_var, t_key
 from .approach import SampleApproach
 from .scenario import Sequence, Scenario, SingleFaultScenario
+from .pool import ModelPool, ModelRef
+from .memo import ScenarioMemo
+from .batch import ModelBatch, batch_key
+from fmdtools.define.common import LaneDivergence
 from fmdtools.analyze.result import Result, History,  create_indiv_filename, file_check
-from fmdtools.analyze.graph import graph_factory
+from fmdtools.analyze.result import auto_filetype
 
 # DEFAULT ARGUMENTS
 sim_kwargs = {'desired_result': 'endclass',
@@ -68,7 +97,10 @@ sim_kwargs = {'desired_result': 'endclass',
               'track_times': 'all',
               'staged': False,
               'run_stochastic': False,
-              'use_end_condition': True}
+              'use_end_condition': True,
+              'columnar_hist': False,
+              'compare_nominal': False,
+              'reconverge_window': 0}
 """
 Simulation keyword arguments.
 
@@ -120,7 +152,45 @@ run_stochastic : bool
 staged : bool, optional
     Whether to inject the faults in a copy of the nominal model at the fault time
     (True) or instantiate a new model for the fault (False). Setting to True
-    roughly halves execution time. The default is False.
+    roughly halves execution time. May also be set to 'snapshot' to (in serial
+    execution) restore a single copied model from state snapshots (see
+    :meth:`fmdtools.define.model.Model.get_snapshot`) for each scenario instead of
+    copying the model for each scenario, which is faster but only restores
+    states/modes/rand/time and histories. The default is False.
+use_end_condition : bool
+    Whether to end the simulation when the model's end condition is met (if given).
+    The default is True.
+columnar_hist : bool
+    Whether to return the history as a
+    :class:`fmdtools.analyze.result.ColumnarHistory` (which stores fields in a
+    single array per dtype) so that the history is cheaper to copy, cut, and send
+    between processes. The default is False.
+compare_nominal : bool
+    Whether to compare the history of each fault scenario with the nominal history
+    as it is logged, keeping running counters of when/how often each field deviates
+    from nominal (see :class:`fmdtools.analyze.result.NominalComparison`), which
+    find_classification may access via mdlhists.faulty.get_comparison(). When True,
+    the nominal history passed to find_classification is a view (rather than a cut
+    copy) of the nominal history. The default is False.
+reconverge_window : int
+    Number of consecutive logged timesteps after the last fault/disturbance of a
+    scenario in which the history must match the nominal history for the simulation
+    to end early, with the rest of the history filled from the nominal history (which
+    saves simulating faults which the model recovers from). Since only tracked fields
+    are compared, this should be used with track='all' (so that matching the history
+    means matching the model states). Regardless of track, the modes and faults of
+    the model must also match those of the nominal model at the end of the simulation
+    (see :func:`get_mode_signature`), so that faults which are not tracked (or modes
+    which differ from the end of the nominal run) prevent the simulation from ending
+    early. Matching is checked each time the history is compared (see
+    compare_nominal), in batches of min(window, 16) timesteps, so the simulation may
+    run up to a batch longer than the window. Only
+    used when track_times='all', desired_result is not time-based (a dict), the end
+    condition of the model is not used (since the nominal run may not meet it at the
+    same time), and a snapshot of the nominal model at the end of the simulation is
+    given (nomsnapshot, see :func:`nom_helper`), which the model is restored to before
+    it is given to find_classification. The default is 0, which always simulates to
+    the end.
 """
 
 
@@ -182,7 +252,15 @@ def pack_run_kwargs(**kwargs):
 mult_kwargs = {'max_mem': 2e9,
                'showprogress': True,
                'pool': False,
-               'close_pool': True}
+               'close_pool': True,
+               'share_nomhist': False,
+               'stream': False,
+               'reducer': None,
+               'schedule': False,
+               'chunksize': 1,
+               'dedup': False,
+               'prefix_tree': False,
+               'batch': False}
 """
 Multi-scenario keyword arguments.
 
@@ -192,11 +270,70 @@ Parameters
         Process Pool Object from multiprocessing or pathos packages.
         e.g. parallelpool = mp.pool(n) for n cores (multiprocessing)
         or parallelpool = ProcessPool(nodes=n) for n cores (pathos)
+        May also be a persistent :class:`fmdtools.sim.pool.ModelPool`, which keeps
+        (pre-built) models in the workers between tasks and calls.
         If False, the set of scenarios is run serially. The default is False
     showprogress: bool, optional
         whether to show a progress bar during execution. default is true
     max_mem : int
         Max memory (warns the user when memory is above threshold)
+    share_nomhist : bool, optional
+        Whether to place the nominal history in shared memory (see
+        :meth:`fmdtools.analyze.result.History.as_shared`) when running scenarios in a
+        pool, so that it is sent to the workers by reference instead of pickled for
+        each scenario. The default is False.
+    stream : bool, optional
+        Whether to stream scenarios (in approach/single_faults), handling results as
+        each scenario finishes (using pool.imap_unordered in a pool) without keeping
+        scenario histories in memory. In this case, only the nominal history is
+        returned, the max_mem check on histories is skipped, and histories may be
+        written to disk using save_args with indiv=True and/or aggregated using
+        reducer. The default is False.
+    reducer : callable, optional
+        Function called with (scenname, result, mdlhist) as each scenario finishes
+        (in the main process), e.g., to aggregate statistics over histories
+        without keeping them in memory. The default is None.
+    schedule : str/bool, optional
+        How to schedule scenarios in a pool (in approach/single_faults). If
+        'longest_first', scenarios are sorted by estimated cost (see
+        :func:`estimate_scen_costs`) and dispatched (longest first) using
+        pool.imap_unordered, so that long-running scenarios do not end up at the end
+        of the run and progress is reported as scenarios finish. The default is
+        False, which dispatches scenarios in order using pool.map.
+    chunksize : int, optional
+        Number of scenarios to send to a worker at a time when scheduling/streaming
+        scenarios with pool.imap_unordered. The default is 1.
+    dedup : bool/ScenarioMemo, optional
+        Whether to re-use the simulation of scenarios which are equivalent (i.e., inject
+        the same faults/disturbances in the same model state, at the same time or at
+        times where the model is time-invariant) to a previously-simulated scenario
+        (see :class:`fmdtools.sim.memo.ScenarioMemo`), rather than simulating them
+        again. If True, a new memo is used for the call
+        (or, in nested_approach, the nested approaches); a ScenarioMemo may also be
+        given to re-use simulations between calls (e.g., when comparing approaches),
+        in which case its hits/misses/hit_rate attributes give how many scenarios
+        re-used a simulation (the returned results only hold scenarios). Only used in serial execution when track_times='all' and
+        desired_result is not time-based (a dict). The default is False.
+    prefix_tree : bool, optional
+        Whether to run scenarios (e.g., from :func:`sequences`) by their shared prefix
+        of injected faults/disturbances (see :func:`iter_prefix_tree`), simulating
+        each shared prefix once and forking the scenarios from copies of the model
+        where they diverge, so that runtime scales with the number of distinct
+        branches rather than the number of scenarios. As in staged execution, this
+        assumes that copies of the model (see :meth:`fmdtools.define.model.Model.copy`)
+        simulate the same as the original model. Only used in serial execution when
+        desired_result is not time-based (a dict), and not combined with dedup. The
+        default is False.
+    batch : bool/int, optional
+        Whether to simulate nominal scenarios (in nominal_approach) which only differ in
+        numeric parameters together in batches, where each batch is a single model with
+        one lane (value) per scenario in each numeric state (see
+        :class:`fmdtools.sim.batch.ModelBatch`). If an int, the maximum number of
+        scenarios in a batch. When the lanes of a batch diverge (e.g., take different
+        branches in a behavior or have different faults), its scenarios are simulated
+        individually instead. Only used in serial, non-stochastic execution when
+        track_times='all' and desired_result is not time-based (a dict). The default
+        is False.
 """
 
 
@@ -243,6 +380,46 @@ def nominal(mdl, **kwargs):
     return result, mdlhist
 
 
+def indiv_save_args(args, indiv_id):
+    """Gets the arguments to Result.save for saving an individual result (either to
+    its own file in a folder or, for npz files, appending it to the given file)."""
+    if auto_filetype(args['filename'], args.get('filetype', '')) == 'npz':
+        return {**args, 'append': True}
+    newfilename = create_indiv_filename(args['filename'], indiv_id, splitchar="/")
+    return {**args, 'filename': newfilename}
+
+
+def split_pool_save_args(save_args):
+    """
+    Splits save_args into the arguments for saving individual results in the workers
+    of a pool and in the parent process. Since individual npz results are appended to
+    a single file, they are saved by the parent as the results arrive (so workers do
+    not write to the same file concurrently).
+
+    Examples
+    --------
+    >>> worker_args, parent_args = split_pool_save_args(
+    ...     {'mdlhist': {'filename': 'hists.npz'},
+    ...      'endclass': {'filename': 'endclasses.csv'}, 'indiv': True})
+    >>> worker_args
+    {'indiv': True, 'endclass': {'filename': 'endclasses.csv'}}
+    >>> parent_args
+    {'indiv': True, 'mdlhist': {'filename': 'hists.npz'}}
+    """
+    if not save_args.get('indiv', False):
+        return save_args, {}
+    worker_args = {'indiv': True}
+    parent_args = {'indiv': True}
+    for arg, args in save_args.items():
+        if arg == 'indiv':
+            continue
+        elif auto_filetype(args['filename'], args.get('filetype', '')) == 'npz':
+            parent_args[arg] = args
+        else:
+            worker_args[arg] = args
+    return worker_args, parent_args
+
+
 def save_helper(save_args, endclass, mdlhist, indiv_id='', result_id=''):
     """
     Helper function for inline results saving.
@@ -258,7 +435,9 @@ def save_helper(save_args, endclass, mdlhist, indiv_id='', result_id=''):
 
         where mdlhistargs and endclassargs are dictionaries of arguments to Result.save
         (i.e., {'filename':'filename.pkl', 'filetype':'pickle', 'overwrite':True})
-        and individual_saving is a bool (True/False)
+        and individual_saving is a bool (True/False). When saving individually, results
+        are saved in a folder with one file per scenario, except for npz files, where
+        each scenario is appended to the given file.
     endclass : dict
         dict of end-state classifications (from simulation)
     mdlhist : dict
@@ -273,14 +452,10 @@ def save_helper(save_args, endclass, mdlhist, indiv_id='', result_id=''):
             raise Exception("Invalid key in save_args: "+save_arg)
     if save_args.get('indiv', False) and indiv_id:
         if 'endclass' in save_args:
-            newfilename = create_indiv_filename(save_args['endclass']['filename'],
-                                                indiv_id, splitchar="/")
-            endclass.save(**{**save_args['endclass'], 'filename': newfilename},
+            endclass.save(**indiv_save_args(save_args['endclass'], indiv_id),
                           result_id=result_id)
         if 'mdlhist' in save_args:
-            newfilename = create_indiv_filename(save_args['mdlhist']['filename'],
-                                                indiv_id, splitchar="/")
-            mdlhist.save(**{**save_args['mdlhist'], 'filename': newfilename},
+            mdlhist.save(**indiv_save_args(save_args['mdlhist'], indiv_id),
                          result_id=result_id)
     elif not save_args.get('indiv', False) and not indiv_id:
         if 'mdlhist' in save_args:
@@ -322,19 +497,44 @@ def nominal_approach(mdl, nomapp, **kwargs):
     """
     kwargs.update(pack_run_kwargs(**kwargs))
     check_overwrite(kwargs['save_args'])
-    kwargs['max_mem'], showprogress, pool, close_p = unpack_mult_kwargs(kwargs)
+    kwargs['max_mem'], showprogress, pool, close_p, *_, batch = \
+        unpack_mult_kwargs(kwargs)
     kwargs['num_scens'] = nomapp.num_scenarios
 
     n_results = Result.fromkeys(nomapp.scenarios)
     n_mdlhists = History.fromkeys(nomapp.scenarios)
+    batch = (batch and hasattr(mdl, 'fxns') and not kwargs.get('run_stochastic', False)
+             and kwargs.get('track_times', 'all') == 'all'
+             and type(kwargs.get('desired_result', 'endclass')) != dict)
     if pool:
         check_mdl_memory(mdl, nomapp.num_scenarios, max_mem=kwargs['max_mem'])
-        inputs = [(mdl, scen, name, kwargs) for name, scen in nomapp.scenarios.items()]
+        worker_save_args, parent_save_args = split_pool_save_args(kwargs['save_args'])
+        pool_kwargs = {**kwargs, 'save_args': worker_save_args}
+        if isinstance(pool, ModelPool):
+            inputs = [(ModelRef(mdl, p=scen.p, sp=scen.sp, r=scen.r), scen, name,
+                       pool_kwargs)
+                      for name, scen in nomapp.scenarios.items()]
+        else:
+            inputs = [(mdl, scen, name, pool_kwargs)
+                      for name, scen in nomapp.scenarios.items()]
         res_list = list(tqdm.tqdm(pool.map(exec_nom_par, inputs),
                                   total=len(inputs),
                                   disable=not (showprogress),
                                   desc="SCENARIOS COMPLETE"))
+        for name, (result, mdlhist) in zip(nomapp.scenarios, res_list):
+            save_helper(parent_save_args, result, mdlhist, name, name)
         n_results, n_mdlhists = unpack_res_list([*nomapp.scenarios.values()], res_list)
+    elif batch:
+        batches = make_batches(nomapp.scenarios, max_lanes=batch)
+        with tqdm.tqdm(total=nomapp.num_scenarios, disable=not (showprogress),
+                       desc="SCENARIOS COMPLETE") as pbar:
+            for names in batches:
+                scens = [nomapp.scenarios[name] for name in names]
+                res_list = exec_batch_helper(mdl, scens, names,
+                                             **{**kwargs, 'use_end_condition': False})
+                for name, (result, mdlhist) in zip(names, res_list):
+                    n_results[name], n_mdlhists[name] = result, mdlhist
+                pbar.update(len(names))
     else:
         for scenname, scen in tqdm.tqdm(nomapp.scenarios.items(),
                                         disable=not (showprogress),
@@ -361,13 +561,92 @@ def exec_nom_par(arg):
 
 def exec_nom_helper(mdl, scen, name, **kwargs):
     """Helper function for executing nominal scenarios"""
-    mdl = mdl.new_with_params(p=scen.p, sp=scen.sp, r=scen.r)
+    if isinstance(mdl, ModelRef):
+        mdl = mdl.get_model()
+    else:
+        mdl = mdl.new_with_params(p=scen.p, sp=scen.sp, r=scen.r)
     result, mdlhist, _, t_end = prop_one_scen(mdl, scen, **kwargs)
     check_hist_memory(mdlhist, kwargs['num_scens'], max_mem=kwargs['max_mem'])
     save_helper(kwargs['save_args'], result, mdlhist, name, name)
     return result, mdlhist
 
 
+def make_batches(scens, max_lanes=True):
+    """
+    Groups nominal scenarios into batches to simulate together (see
+    :class:`fmdtools.sim.batch.ModelBatch`), by :func:`fmdtools.sim.batch.batch_key`.
+
+    Parameters
+    ----------
+    scens : dict
+        Nominal scenarios, with structure {scenname: scen}.
+    max_lanes : bool/int, optional
+        Maximum number of scenarios in a batch (if an int). The default is True, which
+        puts all scenarios with the same key in a single batch.
+
+    Returns
+    -------
+    batches : list
+        Lists of the names of the scenarios in each batch.
+    """
+    groups = {}
+    for scenname, scen in scens.items():
+        groups.setdefault(batch_key(scen), []).append(scenname)
+    if max_lanes is True:
+        return [*groups.values()]
+    return [names[i:i + max_lanes] for names in groups.values()
+            for i in range(0, len(names), max_lanes)]
+
+
+def exec_batch_helper(mdl, scens, names, **kwargs):
+    """
+    Helper function for executing a batch of nominal scenarios in a single model (see
+    :class:`fmdtools.sim.batch.ModelBatch`). If the lanes of the batch diverge, the
+    scenarios are executed individually (using :func:`exec_nom_helper`) instead.
+
+    Returns
+    -------
+    res_list : list
+        List of (result, mdlhist) for each scenario.
+    """
+    if len(scens) == 1:
+        return [exec_nom_helper(mdl, scens[0], names[0], **kwargs)]
+    try:
+        batch = ModelBatch(mdl, scens)
+        _, hist, _, _ = prop_one_scen(batch.mdl, scens[0],
+                                      **{**kwargs, 'desired_result': {},
+                                         'columnar_hist': False})
+    except Exception as e:
+        if not is_lane_divergence(e):
+            raise
+        return [exec_nom_helper(mdl, scen, name, **kwargs)
+                for scen, name in zip(scens, names)]
+    snapshot = batch.mdl.get_snapshot(with_hist=False)
+    desired_result = kwargs.get('desired_result', 'endclass')
+    res_list = []
+    for i, (scen, name) in enumerate(zip(scens, names)):
+        mdlhist = batch.get_lane_hist(hist, i)
+        lane = batch.load_lane(i, mdlhist, snapshot=snapshot)
+        result = get_result(scen, lane, desired_result, mdlhist,
+                            time=mdlhist['time'][-1])
+        if kwargs.get('columnar_hist', False):
+            mdlhist = mdlhist.as_columnar()
+        check_hist_memory(mdlhist, kwargs['num_scens'], max_mem=kwargs['max_mem'])
+        save_helper(kwargs['save_args'], result, mdlhist, name, name)
+        res_list.append((result, mdlhist))
+    return res_list
+
+
+def is_lane_divergence(e):
+    """Checks whether the exception e was caused (directly or indirectly) by the lanes
+    of a batch diverging (see :class:`fmdtools.define.common.LaneDivergence`)."""
+    while e is not None:
+        if isinstance(e, LaneDivergence):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
 def one_fault(mdl, *fxnfault, time=0, **kwargs):
     """
     Runs one fault in the model at a specified time.
@@ -474,8 +753,8 @@ def sequence(mdl, seq={}, faultseq={}, disturbances={}, scen={}, rate=np.NaN, **
     n_outs = nom_helper(mdl,
                         [min(scen.sequence)],
                         **{**sim_kwarg, 'use_end_condition': False},
-                        **run_kwarg)
-    nomresult, nomhist, nomscen, mdls, t_end_nom = n_outs
+                        **run_kwarg, with_snapshot=True)
+    nomresult, nomhist, nomscen, mdls, t_end_nom, nomsnapshot = n_outs
 
     mdl = [*mdls.values()][0]
 
@@ -483,7 +762,8 @@ def sequence(mdl, seq={}, faultseq={}, disturbances={}, scen={}, rate=np.NaN, **
                                                 scen,
                                                 **sim_kwarg,
                                                 nomhist=nomhist,
-                                                nomresult=nomresult)
+                                                nomresult=nomresult,
+                                                nomsnapshot=nomsnapshot)
     nomhist.cut(t_end_nom)
     mdlhists = History(nominal=nomhist, faulty=faulthist)
     if kwargs.get('protect', False):
@@ -492,8 +772,80 @@ def sequence(mdl, seq={}, faultseq={}, disturbances={}, scen={}, rate=np.NaN, **
     return result.flatten(), mdlhists.flatten()
 
 
+def sequences(mdl, scenlist, **kwargs):
+    """
+    Runs a list of sequences of faults and disturbances in the model.
+
+    NOTE: When calling in a script/module using parallel=True, execute using the
+    protection statement ::
+
+        if __name__ == 'main':
+            results, mdlhists = sequences(mdl, scenlist)
+
+    Otherwise, the method will keep spawning parallel processes.
+    See multiprocessing documentation.
+
+    Parameters
+    ----------
+    mdl : Simulable
+        The model to inject faults in.
+    scenlist : list/dict
+        Scenarios to run. May be given as a list of Scenarios or as a dict of sequences
+        {scenname: seq}, where each seq has the form
+        {time:{`faults`:faults, `disturbances`:disturbances}} (see :func:`sequence`).
+        Sequences which share a prefix of injections may be run by this prefix using
+        the prefix_tree option (see :data:`mult_kwargs`).
+    **kwargs : kwargs
+        Additional keyword arguments, may include:
+
+        - :data:`sim_kwargs` : kwargs
+              Simulation options for :func:`prop_one_scen`
+        - :data:`run_kwargs` : kwargs
+              Run options for :func:`nom_helper` and others
+        - :data:`mult_kwargs` : kwargs
+              Multi-scenario options
+
+    Returns
+    -------
+    results : Result
+        A Result dictionary with results desired from each scenario corresponding to
+        desired_result over the set of scenarios.
+    mdlhists : History
+        A History dictionary with the tracked scenario (including the nominal)
+    """
+    if isinstance(scenlist, dict):
+        scenlist = [Scenario(sequence=seq, name=name, time=min(seq),
+                             times=tuple([*seq.keys()]))
+                    for name, seq in scenlist.items()]
+    kwargs.update(pack_run_kwargs(**kwargs))
+    n_outs = nom_helper(mdl,
+                        sorted({scen.time for scen in scenlist}),
+                        **{**kwargs, 'use_end_condition': False},
+                        with_snapshot=True)
+    nomresult, nomhist, nomscen, c_mdl, t_end_nom, nomsnapshot = n_outs
+
+    results, mdlhists = scenlist_helper(mdl,
+                                        scenlist,
+                                        c_mdl,
+                                        **kwargs,
+                                        nomhist=nomhist,
+                                        nomresult=nomresult,
+                                        nomsnapshot=nomsnapshot)
+    nomhist.cut(t_end_nom)
+    mdlhists['nominal'] = nomhist
+    results['nominal'] = nomresult
+    save_helper(kwargs.get('save_args', {}),
+                nomresult,
+                mdlhists['nominal'],
+                indiv_id=str(len(results)-1),
+                result_id='nominal')
+    save_helper(kwargs['save_args'], results, mdlhists)
+    close_pool(kwargs)
+    return results.flatten(), mdlhists.flatten()
+
+
 def nom_helper(mdl, ctimes, protect=True, save_args={}, mdl_kwargs={}, scen={},
-               **kwargs):
+               with_snapshot=False, **kwargs):
     """
     Helper function for initial run of nominal scenario.
 
@@ -503,6 +855,9 @@ def nom_helper(mdl, ctimes, protect=True, save_args={}, mdl_kwargs={}, scen={},
         Model of the system
     time : float/list
         Times to copy the nominal model from
+    with_snapshot : bool
+        Whether to also return a snapshot of the nominal model at the end of the
+        simulation (see :func:`get_end_snapshot`). The default is False.
     **kwargs : kwargs
         :data:`sim_kwargs` simulation options for :func:`prop_one_scen`
 
@@ -518,6 +873,9 @@ def nom_helper(mdl, ctimes, protect=True, save_args={}, mdl_kwargs={}, scen={},
         Models from copy time(s) ctimes
     t_end_nom : float
         Nominal simulation end time
+    nomsnapshot : tuple
+        Snapshot of the nominal model at the end of the simulation (if
+        with_snapshot=True and the reconverge_window option is used, otherwise None)
     """
     staged = kwargs.get('staged', False)
     check_overwrite(save_args)
@@ -554,9 +912,67 @@ def nom_helper(mdl, ctimes, protect=True, save_args={}, mdl_kwargs={}, scen={},
     if not staged:
         mdls = {0: mdl.new_with_params(**mdl_kwargs)}
 
+    if with_snapshot:
+        if kwargs.get('reconverge_window', 0):
+            nomsnapshot = get_end_snapshot(mdl)
+        else:
+            nomsnapshot = None
+        return result, nommdlhist, nomscen, mdls, t_end_nom, nomsnapshot
     return result, nommdlhist, nomscen, mdls, t_end_nom
 
 
+def get_end_snapshot(mdl):
+    """
+    Gets a snapshot of the (nominal) model at the end of a simulation (without its
+    history), which scenarios that reconverge with the nominal run (see the
+    reconverge_window option in :data:`sim_kwargs`) are restored to before getting
+    their results (see :func:`load_end_snapshot`).
+
+    Returns
+    -------
+    nomsnapshot : tuple
+        Snapshot of the model and the modes/faults of its blocks (see
+        :func:`get_mode_signature`), which scenarios must match to reconverge.
+    """
+    if hasattr(mdl, 'fxns'):
+        return mdl.get_snapshot(with_hist=False), get_mode_signature(mdl)
+    return mdl.get_snapshot(), get_mode_signature(mdl)
+
+
+def load_end_snapshot(mdl, nomsnapshot, mdlhist):
+    """Restores the model to the snapshot of the nominal model from
+    :func:`get_end_snapshot`, keeping the (filled-in) history mdlhist."""
+    snapshot, _ = nomsnapshot
+    if hasattr(mdl, 'fxns'):
+        mdl.load_snapshot({**snapshot, 'h': mdlhist})
+    else:
+        mdl.load_snapshot(snapshot)
+
+
+def get_mode_signature(mdl):
+    """
+    Gets the modes and faults of the blocks of a model (functions and their
+    components/actions, see :meth:`fmdtools.define.mode.Mode.get_snapshot`), which
+    are compared whether or not they are tracked in the history when checking if a
+    scenario has reconverged with the nominal run.
+
+    Returns
+    -------
+    signature : list
+        (mode, faults) of each block in the model.
+    """
+    blocks = [*mdl.fxns.values()] if hasattr(mdl, 'fxns') else [mdl]
+    signature = []
+    while blocks:
+        block = blocks.pop()
+        signature.append(block.m.get_snapshot())
+        if hasattr(block, 'ca'):
+            blocks.extend(block.ca.components.values())
+        if hasattr(block, 'aa'):
+            blocks.extend(block.aa.actions.values())
+    return signature
+
+
 def approach(mdl, app,  **kwargs):
     """
     Injects and propagates faults in the model defined by a given sample approach
@@ -597,8 +1013,9 @@ def approach(mdl, app,  **kwargs):
     kwargs.update(pack_run_kwargs(**kwargs))
     n_outs = nom_helper(mdl,
                         copy.copy(app.times),
-                        **{**kwargs, 'use_end_condition': False})
-    nomresult, nomhist, nomscen, c_mdl, t_end_nom = n_outs
+                        **{**kwargs, 'use_end_condition': False},
+                        with_snapshot=True)
+    nomresult, nomhist, nomscen, c_mdl, t_end_nom, nomsnapshot = n_outs
     scenlist = app.scenlist
 
     results, mdlhists = scenlist_helper(mdl,
@@ -606,7 +1023,8 @@ def approach(mdl, app,  **kwargs):
                                         c_mdl,
                                         **kwargs,
                                         nomhist=nomhist,
-                                        nomresult=nomresult)
+                                        nomresult=nomresult,
+                                        nomsnapshot=nomsnapshot)
 
     nomhist.cut(t_end_nom)
     mdlhists['nominal'] = nomhist
@@ -659,8 +1077,9 @@ def single_faults(mdl, **kwargs):
     kwargs.update(pack_run_kwargs(**kwargs))
     n_outs = nom_helper(mdl,
                         mdl.sp.times,
-                        **{**kwargs, 'use_end_condition': False})
-    nomresult, nomhist, nomscen, c_mdl, t_end_nom = n_outs
+                        **{**kwargs, 'use_end_condition': False},
+                        with_snapshot=True)
+    nomresult, nomhist, nomscen, c_mdl, t_end_nom, nomsnapshot = n_outs
 
     scenlist = list_init_faults(mdl)
     results, mdlhists = scenlist_helper(mdl,
@@ -668,7 +1087,8 @@ def single_faults(mdl, **kwargs):
                                         c_mdl,
                                         **kwargs,
                                         nomhist=nomhist,
-                                        nomresult=nomresult)
+                                        nomresult=nomresult,
+                                        nomsnapshot=nomsnapshot)
     nomhist.cut(t_end_nom)
     mdlhists['nominal'] = nomhist
     results['nominal'] = nomresult
@@ -683,39 +1103,360 @@ def single_faults(mdl, **kwargs):
 
 def scenlist_helper(mdl, scenlist, c_mdl, **kwargs):
     # nomhist, track, track_times, desired_result, run_stochastic, save_args
-    max_mem, showprogress, pool, close_p = unpack_mult_kwargs(kwargs)
-    staged = kwargs.get('staged', False)
+    max_mem, showprogress, pool, close_p, share_nomhist, stream, reducer, schedule, \
+        chunksize, dedup, prefix_tree, batch = unpack_mult_kwargs(kwargs)
     mem, mem_profile = kwargs['nomhist'].get_memory()
-    if mem * len(scenlist) > max_mem:
+    if not stream and mem * len(scenlist) > max_mem:
         raise Exception("Model history will be too large: "
-                        + str(mem) + " > " + str(max_mem))
+                        + str(mem) + " > " + str(max_mem)
+                        + ". To avoid, use stream=True to not keep histories in memory")
     results = Result()
     mdlhists = History()
     if pool:
         check_mdl_memory(mdl, len(scenlist), max_mem=max_mem)
-        if staged:
-            inputs = [(c_mdl[scen.time], scen, kwargs,  str(i))
+    if dedup is True:
+        memo = ScenarioMemo()
+    else:
+        memo = dedup or None
+    scen_iter = iter_scenarios(mdl, scenlist, c_mdl, pool=pool,
+                               share_nomhist=share_nomhist, ordered=not stream,
+                               schedule=schedule, chunksize=chunksize, memo=memo,
+                               prefix_tree=prefix_tree, **kwargs)
+    for name, result, mdlhist in tqdm.tqdm(scen_iter,
+                                           total=len(scenlist),
+                                           disable=not (showprogress),
+                                           desc="SCENARIOS COMPLETE"):
+        results[name] = result
+        if reducer:
+            reducer(name, result, mdlhist)
+        if not stream:
+            mdlhists[name] = mdlhist
+    # scenarios may finish out of order when streamed/scheduled
+    results.data = {scen.name: results.data[scen.name] for scen in scenlist}
+    if not stream:
+        mdlhists.data = {scen.name: mdlhists.data[scen.name] for scen in scenlist}
+    return results, mdlhists
+
+
+def iter_scenarios(mdl, scenlist, c_mdl, pool=False, share_nomhist=False, ordered=True,
+                   schedule=False, chunksize=1, memo=None, prefix_tree=False,
+                   **kwargs):
+    """
+    Runs a list of scenarios, yielding the result and history of each scenario as it
+    finishes (so that all histories do not need to be held in memory at once).
+
+    Parameters
+    ----------
+    mdl : Simulable
+        The model to inject faults in.
+    scenlist : list
+        List of scenarios to run.
+    c_mdl : dict
+        Models (copied at given times) from :func:`nom_helper` to run scenarios from.
+    pool : process pool, optional
+        Process pool to run the scenarios in (see :data:`mult_kwargs`). The default is
+        False, which runs the scenarios serially.
+    share_nomhist : bool, optional
+        Whether to place the nominal history in shared memory for the pool (see
+        :data:`mult_kwargs`). The default is False.
+    ordered : bool, optional
+        Whether to yield scenarios in the order of scenlist. If False, scenarios are
+        yielded as they complete (using pool.imap_unordered). The default is True.
+    schedule : str/bool, optional
+        Scheduling of scenarios in the pool (see :data:`mult_kwargs`). If given,
+        scenarios are yielded as they complete. The default is False.
+    chunksize : int, optional
+        Chunksize for pool.imap_unordered (see :data:`mult_kwargs`). The default is 1.
+    memo : ScenarioMemo, optional
+        Memo of simulated scenarios to re-use simulations from (in serial execution,
+        see :data:`mult_kwargs`). The default is None.
+    prefix_tree : bool, optional
+        Whether to run the scenarios by shared prefix of injections (in serial
+        execution, see :func:`iter_prefix_tree`). The default is False.
+    **kwargs : kwargs
+        :data:`sim_kwargs` and :data:`run_kwargs` for :func:`exec_scen`, along with
+        the nominal history (nomhist) and result (nomresult).
+
+    Yields
+    ------
+    name : str
+        Name of the scenario
+    result : Result
+        Result of the scenario corresponding to desired_result
+    mdlhist : History
+        History of the scenario
+    """
+    staged = kwargs.get('staged', False)
+    if pool:
+        worker_save_args, parent_save_args = split_pool_save_args(
+            kwargs.get('save_args', {}))
+        pool_kwargs = {**kwargs, 'save_args': worker_save_args}
+        if share_nomhist:
+            pool_kwargs['nomhist'] = kwargs['nomhist'].as_shared()
+        if isinstance(pool, ModelPool):
+            # send models as references to the models built in the workers
+            if staged:
+                refs = {t: ModelRef(c_mdl[t], snapshot=c_mdl[t].get_snapshot())
+                        for t in {scen.time for scen in scenlist}}
+                inputs = [(refs[scen.time], scen, pool_kwargs, str(i))
+                          for i, scen in enumerate(scenlist)]
+            else:
+                ref = ModelRef(c_mdl[0])
+                inputs = [(ref, scen, pool_kwargs, str(i))
+                          for i, scen in enumerate(scenlist)]
+        elif staged:
+            inputs = [(c_mdl[scen.time], scen, pool_kwargs,  str(i))
                       for i, scen in enumerate(scenlist)]
         else:
-            inputs = [(c_mdl[0], scen,  kwargs, str(i))
+            inputs = [(c_mdl[0], scen,  pool_kwargs, str(i))
                       for i, scen in enumerate(scenlist)]
-        res_list = list(tqdm.tqdm(pool.map(exec_scen_par, inputs),
-                                  total=len(inputs),
-                                  disable=not (showprogress),
-                                  desc="SCENARIOS COMPLETE"))
-        results, mdlhists = unpack_res_list(scenlist, res_list)
+        if schedule == 'longest_first':
+            costs = estimate_scen_costs(scenlist, kwargs['nomhist'], sp=mdl.sp,
+                                        staged=staged,
+                                        use_end_condition=kwargs.get(
+                                            'use_end_condition', True))
+            inputs = [inputs[i] for i in np.argsort(-costs, kind='stable')]
+        elif schedule:
+            raise Exception("Invalid schedule: " + str(schedule))
+        try:
+            if ordered and not schedule:
+                res_list = pool.map(exec_scen_par, inputs)
+                for i, scen in enumerate(scenlist):
+                    result, mdlhist, t_end = res_list[i]
+                    save_helper(parent_save_args, result, mdlhist, indiv_id=str(i),
+                                result_id=str(scen.name))
+                    yield scen.name, result, mdlhist
+            else:
+                if hasattr(pool, 'imap_unordered'):
+                    res_iter = pool.imap_unordered(exec_scen_par_named, inputs,
+                                                   chunksize=chunksize)
+                else:
+                    # pathos pools provide uimap instead of imap_unordered
+                    res_iter = pool.uimap(exec_scen_par_named, inputs)
+                for name, result, mdlhist in res_iter:
+                    save_helper(parent_save_args, result, mdlhist, indiv_id=str(name),
+                                result_id=str(name))
+                    yield name, result, mdlhist
+        finally:
+            if share_nomhist:
+                pool_kwargs['nomhist'].release()
+    elif prefix_tree and type(pack_sim_kwargs(**kwargs)['desired_result']) != dict:
+        yield from iter_prefix_tree(scenlist, c_mdl, **kwargs)
     else:
-        for i, scen in enumerate(tqdm.tqdm(scenlist,
-                                           disable=not (showprogress),
-                                           desc="SCENARIOS COMPLETE")):
-            name = scen.name
-            if staged:
+        if staged == 'snapshot':
+            snapshots = {}
+            skeleton = copy_staged(c_mdl[scenlist[0].time]) if scenlist else None
+        sim_kwarg = pack_sim_kwargs(**kwargs)
+        if (memo is not None and sim_kwarg['track_times'] == 'all'
+                and type(sim_kwarg['desired_result']) != dict):
+            starts = {}
+        else:
+            memo = None
+        state_log = None
+        for i, scen in enumerate(scenlist):
+            if memo:
+                start_time = scen.time if staged else 0
+                if start_time not in starts:
+                    starts[start_time] = memo.get_start(
+                        c_mdl[start_time], start_time, staged=bool(staged),
+                        use_end_condition=sim_kwarg['use_end_condition'])
+                start = starts[start_time]
+                key = memo.get_key(start, scen, **sim_kwarg)
+                match = memo.get(key, start, scen)
+                if match:
+                    result, mdlhist = exec_memo_scen(memo, match, scen,
+                                                     mdl=c_mdl[start_time],
+                                                     indiv_id=str(i), **kwargs)
+                    yield scen.name, result, mdlhist
+                    continue
+                state_log = memo.get_state_log(start)
+            if staged == 'snapshot':
+                if scen.time not in snapshots:
+                    snapshots[scen.time] = c_mdl[scen.time].get_snapshot()
+                skeleton.load_snapshot(snapshots[scen.time])
+                mdl_i = skeleton
+            elif staged:
                 mdl_i = copy_staged(c_mdl[scen.time])
             else:
                 mdl_i = c_mdl[0].new_with_params()
-            ec, mh, t_end = exec_scen(mdl_i, scen, indiv_id=str(i), **kwargs)
-            results[name], mdlhists[name] = ec, mh
-    return results, mdlhists
+            result, mdlhist, t_end = exec_scen(mdl_i, scen, indiv_id=str(i),
+                                               state_log=state_log, **kwargs)
+            if memo:
+                memo.add(key, start, mdl_i, mdlhist, mdlhist['time'][-1],
+                         state_log=state_log)
+            yield scen.name, result, mdlhist
+
+
+def iter_prefix_tree(scenlist, c_mdl, **kwargs):
+    """
+    Runs a list of scenarios (serially) by their shared prefix of injections, yielding
+    the result and history of each scenario as it finishes.
+
+    Scenarios which inject the same faults/disturbances at the same times up to a
+    point are simulated together up to the time where they diverge: one scenario (the
+    carrier) is simulated with copies of the model taken at the times the other
+    scenarios diverge from it (see the ctimes argument of :func:`prop_one_scen`), and
+    the other scenarios are then simulated (recursively, in the same way) from these
+    copies, as in staged execution. Each shared prefix is thus simulated once.
+
+    Parameters
+    ----------
+    scenlist : list
+        List of scenarios to run.
+    c_mdl : dict
+        Models (copied at given times) from :func:`nom_helper` to run scenarios from.
+    **kwargs : kwargs
+        :data:`sim_kwargs` and :data:`run_kwargs` for :func:`prop_one_scen`, along with
+        the nominal history (nomhist) and result (nomresult) and save_args.
+
+    Yields
+    ------
+    name : str
+        Name of the scenario
+    result : Result
+        Result of the scenario corresponding to desired_result
+    mdlhist : History
+        History of the scenario
+    """
+    staged = kwargs.get('staged', False)
+    roots = {}
+    for i, scen in enumerate(scenlist):
+        injections = [get_injection_key(t, inj)
+                      for t, inj in sorted(scen['sequence'].items())]
+        start_time = scen.time if staged else 0
+        root = (start_time, injections[0] if injections else i)
+        roots.setdefault(root, []).append((str(i), scen, injections))
+    for (start_time, _), scens in roots.items():
+        if staged:
+            mdl = copy_staged(c_mdl[start_time])
+        else:
+            mdl = c_mdl[0].new_with_params()
+        yield from iter_fork(scens, 1, mdl, **kwargs)
+
+
+def get_injection_key(time, injection):
+    """Gets a (hashable) key of the faults/disturbances injected at a given time."""
+    return (time,
+            repr(sorted(injection.get('faults', {}).items())),
+            repr(sorted(injection.get('disturbances', {}).items())))
+
+
+def plan_prefix_tree(scens, k):
+    """
+    Plans the simulation of a set of scenarios with the same first k injections.
+
+    Parameters
+    ----------
+    scens : list
+        Scenarios, given as tuples (indiv_id, scen, injections), where injections is a
+        list of the injection keys (see :func:`get_injection_key`) of the scenario.
+    k : int
+        Number of (first) injections shared by the scenarios.
+
+    Returns
+    -------
+    carrier : tuple
+        Scenario to simulate (with copies of the model taken at the fork times).
+    forks : list
+        Sets of scenarios to simulate from the copies, with structure
+        [(time, scens, k)], where k is the number of injections they share.
+
+    Examples
+    --------
+    >>> scens = [('0', 'a', [(1, 'x'), (5, 'y')]), ('1', 'b', [(1, 'x'), (3, 'z')]),
+    ...          ('2', 'c', [(1, 'x'), (5, 'y'), (8, 'w')])]
+    >>> carrier, forks = plan_prefix_tree(scens, 1)
+    >>> carrier[1]
+    'a'
+    >>> [(t, [s[1] for s in fork_scens], k) for t, fork_scens, k in forks]
+    [(8, ['c'], 3), (3, ['b'], 2)]
+    """
+    exact = [s for s in scens if len(s[2]) <= k]
+    groups = {}
+    for s in scens:
+        if len(s[2]) > k:
+            groups.setdefault(s[2][k], []).append(s)
+    if exact:
+        carrier = exact[0]
+        # duplicate scenarios are forked from the time of their last injection
+        forks = [(carrier[2][k-1][0], exact[1:], k)] if exact[1:] else []
+    else:
+        # the group which diverges last carries the copies for the others
+        latest = max(groups, key=lambda key: key[0])
+        carrier, forks = plan_prefix_tree(groups.pop(latest), k + 1)
+    forks = forks + [(key[0], group, k + 1) for key, group in groups.items()]
+    return carrier, forks
+
+
+def iter_fork(scens, k, mdl, save_args={}, start_time=None, **kwargs):
+    """
+    Runs a set of scenarios with the same first k injections from a given model (see
+    :func:`iter_prefix_tree`).
+
+    Parameters
+    ----------
+    scens : list
+        Scenarios, given as tuples (indiv_id, scen, injections) (see
+        :func:`plan_prefix_tree`).
+    k : int
+        Number of (first) injections shared by the scenarios.
+    mdl : Simulable
+        Model to simulate the scenarios from (in the state before the k-th injection).
+    save_args : dict
+        Save dictionary to use in save_helper defining when/how to save the dictionary
+    start_time : float, optional
+        Time to start the simulation from. The default is None, which starts the
+        simulation at the time of the scenario (or from the beginning, if not staged).
+    **kwargs : kwargs
+        :data:`sim_kwargs` for :func:`prop_one_scen`, along with the nominal history
+        (nomhist) and result (nomresult).
+
+    Yields
+    ------
+    name : str
+        Name of the scenario
+    result : Result
+        Result of the scenario corresponding to desired_result
+    mdlhist : History
+        History of the scenario
+    """
+    carrier, forks = plan_prefix_tree(scens, k)
+    ctimes = sorted({t for t, _, _ in forks if t <= mdl.sp.times[-1]})
+    indiv_id, scen, _ = carrier
+    result, mdlhist, c_mdl, _ = prop_one_scen(mdl, scen, ctimes=ctimes,
+                                              start_time=start_time, **kwargs)
+    save_helper(save_args, result, mdlhist, indiv_id=indiv_id, result_id=str(scen.name))
+    yield scen.name, result, mdlhist
+    uses = {t: sum(fork_t == t for fork_t, _, _ in forks) for t in ctimes}
+    for t, fork_scens, fork_k in forks:
+        if c_mdl.get(t) is None:
+            # the carrier ended (by the end condition or the end of the simulation)
+            # before the scenarios diverge, so they end the same way
+            yield from iter_ended(fork_scens, mdl, mdlhist, save_args=save_args,
+                                  **kwargs)
+            continue
+        uses[t] -= 1
+        if uses[t]:
+            fork_mdl = copy_staged(c_mdl[t])
+        else:
+            fork_mdl = c_mdl.pop(t)
+        yield from iter_fork(fork_scens, fork_k, fork_mdl, save_args=save_args,
+                             start_time=t, **{**kwargs, 'staged': True})
+
+
+def iter_ended(scens, mdl, mdlhist, save_args={}, nomhist={}, nomresult={}, **kwargs):
+    """Yields the results of scenarios which ended before diverging from a simulated
+    scenario (with final model mdl and history mdlhist), see :func:`iter_fork`."""
+    desired_result = pack_sim_kwargs(**kwargs)['desired_result']
+    comparison = mdlhist.get_comparison()
+    for indiv_id, scen, _ in scens:
+        hist = mdlhist.copy()
+        if comparison is not None:
+            hist.__dict__['_comparison'] = comparison
+        result = get_result(scen, mdl, desired_result, hist, nomhist, nomresult,
+                            time=hist['time'][-1])
+        save_helper(save_args, result, hist, indiv_id=indiv_id, result_id=str(scen.name))
+        yield scen.name, result, hist
 
 
 def copy_staged(mdl):
@@ -742,8 +1483,9 @@ def copy_staged(mdl):
 
 
 def close_pool(kwargs):
-    """Closes pool to avoid memory problems"""
-    if kwargs.get('pool', False) and kwargs.get('close_pool', True):
+    """Closes pool to avoid memory problems (unless it is persistent, e.g., a ModelPool)"""
+    pool = kwargs.get('pool', False)
+    if pool and kwargs.get('close_pool', True) and not getattr(pool, 'persistent', False):
         kwargs['pool'].close()
         kwargs['pool'].join()
 
@@ -751,13 +1493,91 @@ def close_pool(kwargs):
 def exec_scen_par(args):
     """Helper function for executing the scenario in parallel"""
     mdl_in = args[0]
-    if args[2].get('staged', False):
+    if isinstance(mdl_in, ModelRef):
+        mdl_out = mdl_in.get_model()
+    elif args[2].get('staged', False):
         mdl_out = copy_staged(mdl_in)
     else:
         mdl_out = mdl_in.new_with_params()
     return exec_scen(mdl_out, args[1], **args[2], indiv_id=args[3])
 
 
+def estimate_scen_costs(scenlist, nomhist, sp=None, staged=False,
+                        use_end_condition=True):
+    """
+    Estimates the relative cost of simulating each scenario in a list, for use in
+    scheduling the scenarios in a pool.
+
+    The cost is estimated as the number of timesteps simulated in the scenario, from
+    its start (the scenario time if staged, otherwise the start of the simulation) to
+    its end. Non-staged scenarios are all simulated from the start, so they have the
+    same estimated cost. If the end condition is used and the nominal run met it
+    (ending before the end of the simulation), scenarios are estimated to end when
+    the nominal run did, since this is the only information available on when the
+    end condition will be met before the scenarios are run.
+
+    Parameters
+    ----------
+    scenlist : list
+        List of scenarios.
+    nomhist : History
+        History of the nominal run.
+    sp : SimParam, optional
+        Simulation parameters of the model (giving the end time and end condition).
+        The default is None, which estimates the simulation times from nomhist.
+    staged : bool/str, optional
+        Whether the scenarios are staged (see :data:`sim_kwargs`). The default is
+        False.
+    use_end_condition : bool, optional
+        Whether the end condition is used (see :data:`sim_kwargs`). The default is
+        True.
+
+    Returns
+    -------
+    costs : np.array
+        Estimated cost of each scenario in scenlist.
+
+    Examples
+    --------
+    >>> nomhist = History(time=np.array([0.0, 1.0, 2.0, 3.0]))
+    >>> scenlist = [SingleFaultScenario(time=1.0), SingleFaultScenario(time=3.0)]
+    >>> estimate_scen_costs(scenlist, nomhist, staged=True)
+    array([3, 1])
+    >>> estimate_scen_costs(scenlist, nomhist, staged=False)
+    array([4, 4])
+
+    If the end condition isn't used, scenarios run to the end of the simulation,
+    even if the nominal run ended early:
+
+    >>> from fmdtools.define.parameter import SimParam
+    >>> sp = SimParam(times=(0, 4), end_condition='indicate_done')
+    >>> estimate_scen_costs(scenlist, nomhist, sp, staged=True)
+    array([3, 1])
+    >>> estimate_scen_costs(scenlist, nomhist, sp, staged=True,
+    ...                     use_end_condition=False)
+    array([4, 2])
+    """
+    nom_times = np.sort(nomhist['time'])
+    if sp is None:
+        times = nom_times
+    else:
+        times = np.arange(sp.times[0], sp.times[-1] + sp.dt / 2, sp.dt)
+        if use_end_condition and sp.end_condition and len(nom_times):
+            times = times[times <= nom_times[-1] + sp.dt / 2]
+    if staged:
+        scen_times = np.array([getattr(scen, 'time', 0.0) for scen in scenlist])
+        return len(times) - np.searchsorted(times, scen_times, side='left')
+    else:
+        return np.full(len(scenlist), len(times))
+
+
+def exec_scen_par_named(args):
+    """Helper function for executing the scenario in parallel (returning the scenario
+    name, for use when results are returned out of order)"""
+    result, mdlhist, t_end = exec_scen_par(args)
+    return args[1].name, result, mdlhist
+
+
 def exec_scen(mdl, scen, save_args={}, indiv_id='', **kwargs):
     """
     Executes a scenario and generates results and classifications given a model and
@@ -783,6 +1603,51 @@ def exec_scen(mdl, scen, save_args={}, indiv_id='', **kwargs):
     return result, mdlhist, t_end
 
 
+def exec_memo_scen(memo, match, scen, mdl=None, save_args={}, indiv_id='', nomhist={},
+                   nomresult={}, **kwargs):
+    """
+    Generates results and classifications of a scenario using the simulation of an
+    equivalent scenario from a memo (rather than simulating it).
+
+    Parameters
+    ----------
+    memo : ScenarioMemo
+        Memo of simulated scenarios.
+    match : tuple
+        Match of the equivalent scenario in the memo (see
+        :meth:`fmdtools.sim.memo.ScenarioMemo.get`).
+    scen : scenario
+        scenario used to define time and faults where the fault is to be injected
+    mdl : Simulable, optional
+        Model the scenario is simulated from (see
+        :meth:`fmdtools.sim.memo.ScenarioMemo.load`). The default is None.
+    save_args : dict
+        Save dictionary to use in save_helper defining when/how to save the dictionary
+    indiv_id : str
+        ID str to insert into the file name (if saving individually)
+    nomhist : History
+        history of results in the nominal model run
+    nomresult : Result
+        Nominal result to compare with.
+    **kwargs : kwargs
+        :data:`sim_kwargs` for the scenario.
+
+    Returns
+    -------
+    result : Result
+        Result of the scenario corresponding to desired_result
+    mdlhist : History
+        History of the scenario (copied from the equivalent scenario, shifted to the
+        time of the scenario)
+    """
+    sim_mdl, mdlhist, time = memo.load(match, mdl=mdl, nomhist=nomhist)
+    desired_result = pack_sim_kwargs(**kwargs)['desired_result']
+    result = get_result(scen, sim_mdl, desired_result, mdlhist, nomhist, nomresult,
+                        time=time)
+    save_helper(save_args, result, mdlhist, indiv_id=indiv_id, result_id=str(scen.name))
+    return result, mdlhist
+
+
 def check_hist_memory(mdlhist, nscens, max_mem=2e9):
     """Checks if the memory will be exhausted given the size of the mdlhist and number
     of scenarios"""
@@ -817,7 +1682,8 @@ def check_overwrite(save_args):
             filename = args['filename']
             if args.get('filename', False):
                 file_check(filename, args.get('overwrite', False))
-            if save_args.get('indiv', False):
+            filetype = auto_filetype(filename, args.get('filetype', ''))
+            if save_args.get('indiv', False) and filetype != 'npz':
                 last_split_index = filename.rfind(".")
                 foldername = filename[:last_split_index]
                 if not os.path.exists(foldername):
@@ -879,7 +1745,10 @@ def nested_approach(mdl, nomapp, get_phases=False, **kwargs):
     save_args = kwargs.get('save_args', {})
     check_overwrite(save_args)
     save_app = save_args.pop("apps", False)
-    max_mem, showprogress, pool, close_p = unpack_mult_kwargs(kwargs)
+    max_mem, showprogress, pool, close_p, share_nomhist, stream, reducer, schedule, \
+        chunksize, dedup, prefix_tree, batch = unpack_mult_kwargs(kwargs)
+    if dedup is True:
+        dedup = ScenarioMemo()
     sim_kwarg = pack_sim_kwargs(**kwargs)
     run_kwargs_nest = pack_run_kwargs(**kwargs)
     app_args = {k: v for k, v in kwargs.items()
@@ -903,15 +1772,23 @@ def nested_approach(mdl, nomapp, get_phases=False, **kwargs):
             app_args.update({'phases': phases_from_hist(get_phases, t_end, nomhist)})
         app = SampleApproach(mdl, **app_args)
         apps[scenname] = app
-        check_hist_memory(nomhist,
-                          len(app.scenlist)*nomapp.num_scenarios,
-                          max_mem=max_mem)
+        if not stream:
+            check_hist_memory(nomhist,
+                              len(app.scenlist)*nomapp.num_scenarios,
+                              max_mem=max_mem)
 
         nest_results[scenname], nest_mdlhists[scenname] = approach(mdl,
                                                                    app,
                                                                    pool=pool,
                                                                    close_pool=False,
                                                                    showprogress=False,
+                                                                   share_nomhist=share_nomhist,
+                                                                   stream=stream,
+                                                                   reducer=reducer,
+                                                                   schedule=schedule,
+                                                                   chunksize=chunksize,
+                                                                   dedup=dedup,
+                                                                   prefix_tree=prefix_tree,
                                                                    **{**sim_kwarg,
                                                                       'p': scen.p,
                                                                       'r': scen.r})
@@ -1064,7 +1941,7 @@ def check_end_condition(mdl, use_end_condition, t):
 
 
 def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
-                  **kwargs):
+                  start_time=None, nomsnapshot=None, state_log=None, **kwargs):
     """
     Runs a fault scenario in the model over time
 
@@ -1088,6 +1965,19 @@ def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
         Nominal result dictionary (to compare with current if desired)
     cut_hist : bool
         Whether to cut the model history to a given size. The default is True
+    start_time : float, optional
+        Time to start the (staged) simulation from, if not the time of the scenario
+        (e.g., when the model is a copy from another scenario, which the scenario
+        diverges from at this time). The default is None.
+    nomsnapshot : tuple, optional
+        Snapshot of the nominal model at the end of the simulation (see
+        :func:`get_end_snapshot`), which the model is restored to if the scenario
+        reconverges with the nominal run (see reconverge_window in
+        :data:`sim_kwargs`). The default is None.
+    state_log : StateLog, optional
+        Log to record the states of the model in at each time (see
+        :class:`fmdtools.sim.memo.StateLog`), for re-using the simulation of the
+        scenario at other times. The default is None.
     **kwargs : kwargs
         simulation options, see :data:`sim_kwargs`
     Returns
@@ -1101,20 +1991,59 @@ def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
     t_end: float
         Last sim time
     """
-    desired_result, track, track_times, staged, run_stochastic, use_end_condition = unpack_sim_kwargs(**kwargs)
+    desired_result, track, track_times, staged, run_stochastic, use_end_condition, columnar_hist, compare_nominal, reconverge_window = unpack_sim_kwargs(**kwargs)
     # if staged, we want it to start a new run from the starting time of the scenario,
     # using a copy of the input model (which is the nominal run) at this time
+    forked = start_time is not None
+    if not forked:
+        start_time = scen.time
     mdlhist, histrange, timerange, shift = init_histrange(mdl,
-                                                          scen.time,
+                                                          start_time,
                                                           staged,
                                                           track,
                                                           track_times)
+    if (compare_nominal or reconverge_window) and nomhist:
+        comparison = mdlhist.set_comparison(nomhist,
+                                            batch=min(16, reconverge_window or 16))
+        if forked and shift:
+            # the history before a fork may differ from nominal, so it is compared too
+            comparison.update(0)
+            comparison.update(shift - 1)
+    reconverge = (bool(reconverge_window and nomhist) and comparison.complete
+                  and not ctimes and track_times == 'all'
+                  and type(desired_result) != dict and nomsnapshot is not None
+                  and not (use_end_condition and mdl.sp.end_condition))
+    reconverged = False
+    ended = False
+    event_ind = -1
+    last_event = max(scen['sequence'], default=timerange[0])
+    # in event-driven simulation, times when the model is quiescent are skipped (until
+    # the next injection, copy, or result) and filled in the history afterward
+    event_driven = (getattr(mdl.sp, 'event_driven', False) and hasattr(mdl, 'fxns')
+                    and not run_stochastic and track_times == 'all' and not reconverge
+                    and not (type(desired_result) == dict and 'all' in desired_result))
+    if event_driven:
+        res_times = desired_result if type(desired_result) == dict else ()
+        events = sorted([*{*scen['sequence'], *ctimes,
+                           *[t for t in res_times if type(t) != str]}])
+    skip_ind = 0
+    skip_until = -np.inf
     # run model through the time range defined in the object
     c_mdl = dict.fromkeys(ctimes)
     result = Result()
     for t_ind, t in enumerate(timerange):
         # inject fault when it occurs, track defined flow states and graph
         try:
+            if t < skip_until:
+                if state_log:
+                    state_log.log_repeated(t_ind + shift)
+                if check_end_condition(mdl, use_end_condition, t):
+                    ended = True
+                    break
+                continue
+            elif event_driven and skip_ind < t_ind:
+                fill_skipped(mdl, mdlhist, timerange, skip_ind, t_ind - 1, shift)
+            skip_ind = t_ind + 1
             if t in ctimes: 
                 c_mdl[t] = mdl.copy()
                 if 'time' in mdl.h:
@@ -1129,6 +2058,8 @@ def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
                 mdl.propagate(t, fxnfaults, disturbances, run_stochastic=run_stochastic)
             except Exception as e:
                 raise Exception("Error in scenario " + str(scen)) from e
+            if state_log:
+                state_log.log(mdl, t_ind + shift)
 
             if track_times:
                 if track_times == 'all':
@@ -1158,14 +2089,40 @@ def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
                                            nomhist,
                                            nom_res,
                                            time=t)
+            if reconverge:
+                if t in scen['sequence']:
+                    event_ind = t_ind_rec
+                elif (t > last_event
+                      and comparison.num_matching(event_ind) >= reconverge_window
+                      and get_mode_signature(mdl) == nomsnapshot[1]):
+                    reconverged = True
+                    break
             if check_end_condition(mdl, use_end_condition, t):
+                ended = True
                 break
-        except:
-            print("Error at t=" + str(t) + ' in scenario ' + str(scen))
+            if event_driven:
+                next_ind = bisect.bisect_right(events, t)
+                next_event = events[next_ind] if next_ind < len(events) else np.inf
+                skip_until = min(mdl.quiescent_until(t), next_event)
+        except BaseException as e:
+            # (lanes diverging in batches are handled by simulating them individually)
+            if not is_lane_divergence(e):
+                print("Error at t=" + str(t) + ' in scenario ' + str(scen))
             raise
             break
+    if event_driven and skip_ind <= t_ind:
+        fill_skipped(mdl, mdlhist, timerange, skip_ind, t_ind, shift)
+    if reconverged:
+        t_ind = comparison.fill_nominal() - 1 - shift
+        t = mdlhist['time'][t_ind + shift]
+        # the rest of the run is nominal, so the model ends in the nominal end state
+        load_end_snapshot(mdl, nomsnapshot, mdlhist)
     if cut_hist:
         mdlhist.cut(t_ind + shift)
+    if columnar_hist:
+        mdlhist = mdlhist.as_columnar()
+        if (compare_nominal or reconverge_window) and nomhist:
+            mdlhist.__dict__['_comparison'] = comparison
     if type(desired_result) == dict and 'end' in desired_result:
         result['end'] = get_result(scen,
                                    mdl,
@@ -1182,12 +2139,40 @@ def prop_one_scen(mdl, scen, ctimes=[], nomhist={}, nomresult={}, cut_hist=True,
                                  nomresult,
                                  time=t))
     # if len(result)==1: result = [*result.values()][0]
-    if None in c_mdl.values():
+    # (copy times may not be reached if the end condition ended the simulation)
+    if None in c_mdl.values() and not ended:
         raise Exception("Approach times" + str(ctimes)
                         + " go beyond simulation time " + str(t))
     return result, mdlhist, c_mdl, t_ind + shift
 
 
+def fill_skipped(mdl, mdlhist, timerange, start_ind, end_ind, shift):
+    """
+    Fills in times skipped in event-driven simulation (where the model was quiescent,
+    see :meth:`fmdtools.define.model.Model.quiescent_until`) by repeating the last
+    simulated row of the history and setting the time of the functions.
+
+    Parameters
+    ----------
+    mdl : Model
+        Model being simulated.
+    mdlhist : History
+        History of the model.
+    timerange : array
+        Times being simulated.
+    start_ind : int
+        Index of the first skipped time in timerange.
+    end_ind : int
+        Index of the last skipped time in timerange.
+    shift : int
+        Shift of the history index from the timerange index (see init_histrange).
+    """
+    times = timerange[start_ind:end_ind+1]
+    mdlhist.log_repeated(mdl, start_ind + shift, end_ind + 1 + shift, times)
+    for fxn in mdl.fxns.values():
+        fxn.t.time = times[-1]
+
+
 def get_result(scen, mdl, desired_result, mdlhist={}, nomhist={}, nomresult={},
                time=0.0):
     desired_result = copy.deepcopy(desired_result)
@@ -1201,8 +2186,11 @@ def get_result(scen, mdl, desired_result, mdlhist={}, nomhist={}, nomresult={},
     if not nomhist:
         nomhist = mdlhist
     elif len(nomhist['time']) != len(mdlhist['time']):
-        nomhist = nomhist.cut(start_ind=len(nomhist['time']) - len(mdlhist['time']),
-                              newcopy=True)
+        start_ind = len(nomhist['time']) - len(mdlhist['time'])
+        if isinstance(mdlhist, History) and mdlhist.get_comparison() is not None:
+            nomhist = nomhist.cut_view(start_ind=start_ind)
+        else:
+            nomhist = nomhist.cut(start_ind=start_ind, newcopy=True)
     if 'endclass' in desired_result:
         mdlhists = History()
         mdlhists['faulty'] = mdlhist
@@ -1238,6 +2226,8 @@ def get_result(scen, mdl, desired_result, mdlhist={}, nomhist={}, nomresult={},
         if Gclass:
             rgraph = Gclass(obj, time=time, **kwargs)
         else:
+            # imported here so that propagate can be imported without matplotlib
+            from fmdtools.analyze.graph import graph_factory
             rgraph = graph_factory(obj, time=time, **kwargs)
 
         if nomresult and g in nomresult:
@@ -8,12 +8,11 @@ Classes:
 """
 import copy
 import fmdtools.sim.propagate as prop
-import fmdtools.analyze.plot as plot
 from fmdtools.sim.approach import SampleApproach
 from fmdtools.analyze.result import History
 from .scenario import Scenario
+from .pool import ModelPool, ModelRef
 import networkx as nx
-import matplotlib.pyplot as plt
 import numpy as np
 import warnings
 import time
@@ -425,6 +424,9 @@ class ProblemInterface:
             else:       
                 inputs = [(self._check_new_mdl(simname, var_time, mdl, x, obj_time), scen,  kwargs, str(i)) 
                           for i, scen in enumerate(scenlist)]
+            if isinstance(pool, ModelPool):
+                inputs = [(ModelRef(inp[0], snapshot=inp[0].get_snapshot()), *inp[1:])
+                          for inp in inputs]
             res_list = list(pool.imap(prop.exec_scen_par, inputs))
             results, mh = prop.unpack_res_list(scenlist, res_list)
         else:
@@ -680,6 +682,7 @@ class ProblemInterface:
         if self.simulations[simname][0]=='multi':      f_times = {get_text_time(t)  for seq in self.simulations[simname][1][0] for t in seq['sequence'].keys()}
         elif self.simulations[simname][0]=='single':   f_times = {get_text_time(t) for t in self.simulations[simname][2]['sequence'].keys()}
         
+        import fmdtools.analyze.plot as plot
         hist = History(self._sims[simname]['mdlhists']).flatten()
         fig, axs = plot.hist(hist, *vals, time_slice=f_times, **kwargs)
         
@@ -799,6 +802,7 @@ class ProblemInterface:
             self.clear(simname, clearvars=False)
     def show_architecture(self):
         #TODO: leverage Graph to draw this
+        import matplotlib.pyplot as plt
         fig = plt.figure()
         pos=nx.planar_layout(self.sim_graph)
         nx.draw(self.sim_graph, with_labels=True, pos=pos)
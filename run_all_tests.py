@@ -15,7 +15,13 @@ if __name__=="__main__":
     # requires pytest, nbmake, pytest-html
     
     # for testing modules with doctests
-    doctest_modules = ["fmdtools/define/state.py",
+    doctest_modules = ["fmdtools/define/common.py",
+                       "fmdtools/define/state.py",
+                       "fmdtools/define/time.py",
+                       "fmdtools/sim/pool.py",
+                       "fmdtools/sim/memo.py",
+                       "fmdtools/sim/batch.py",
+                       "fmdtools/analyze/result.py",
                        "fmdtools/define/parameter.py",
                        "fmdtools/define/geom.py",
                        "fmdtools/define/coords.py",
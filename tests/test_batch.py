@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for simulating parameter sweeps in batches, where the scenarios of a
+batch are simulated together in a single model with one lane per scenario.
+
+Compares nominal approaches run with the batch option with the same approaches
+simulated one scenario at a time.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump, PumpParam
+from examples.tank.tank_model import Tank
+from examples.tank.tank_optimization_model import Tank as CoolantTank
+from fmdtools.define.common import LaneArray, LaneDivergence, mutables_differ
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import NominalApproach
+from fmdtools.sim.batch import ModelBatch
+from fmdtools.sim.scenario import NominalScenario
+
+
+def pump_params(delay=10):
+    """Makes pump parameters with the given delay."""
+    return PumpParam(delay=delay)
+
+
+def tank_params(capacity=20.0, turnup=1.0):
+    """Makes coolant tank parameters with the given capacity and turnup."""
+    return {'capacity': capacity, 'turnup': turnup}
+
+
+def human_tank_params(reacttime=2, store_tstep=1.0):
+    """Makes (human) tank parameters with the given reaction time and timestep."""
+    return {'reacttime': reacttime, 'store_tstep': store_tstep}
+
+
+def make_app(paramfunc, **ranges):
+    """Makes a nominal approach over the given parameter ranges."""
+    app = NominalApproach()
+    app.add_param_ranges(paramfunc, 'sweep', **ranges)
+    return app
+
+
+def bench_batch(mdl, app):
+    """Returns the time (s) to run the nominal approach one scenario at a time and
+    with the batch option."""
+    t0 = time.perf_counter()
+    propagate.nominal_approach(mdl, app, showprogress=False)
+    t_scen = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    propagate.nominal_approach(mdl, app, showprogress=False, batch=True)
+    t_batch = time.perf_counter() - t0
+    return t_scen, t_batch
+
+
+class BatchTests(unittest.TestCase):
+    def check_same(self, mdl, app, batch=True, **kwargs):
+        res, hist = propagate.nominal_approach(mdl, app, showprogress=False, **kwargs)
+        res_b, hist_b = propagate.nominal_approach(mdl, app, showprogress=False,
+                                                   batch=batch, **kwargs)
+        self.assertEqual([*res_b.keys()], [*res.keys()])
+        for k, v in res.items():
+            np.testing.assert_array_equal(res_b[k], v)
+        self.assertEqual([*hist_b.keys()], [*hist.keys()])
+        for k, v in hist.items():
+            np.testing.assert_array_equal(hist_b[k], v)
+            self.assertEqual(hist_b[k].dtype, v.dtype)
+            self.assertNotIsInstance(hist_b[k], LaneArray)
+
+    def test_pump(self):
+        app = make_app(pump_params, delay=(1, 40, 3))
+        self.check_same(Pump(), app, track='all')
+
+    def test_coolant_tank(self):
+        app = make_app(tank_params, capacity=(12.0, 30.0, 2.0), turnup=(0.5, 1.5, 0.5))
+        self.check_same(CoolantTank(), app, track='all')
+
+    def test_human_tank(self):
+        app = make_app(human_tank_params, reacttime=(1, 4, 1),
+                       store_tstep=(0.5, 1.5, 0.5))
+        self.check_same(Tank(), app, track='all')
+
+    def test_divergence(self):
+        # delay=0 takes a different branch in MoveWat.condfaults, so the batch diverges
+        app = make_app(pump_params, delay=(0, 3, 1))
+        self.check_same(Pump(), app, track='all')
+        scens = [*app.scenarios.values()]
+        batch = ModelBatch(Pump(), scens)
+        with self.assertRaises(Exception) as cm:
+            propagate.prop_one_scen(batch.mdl, scens[0], desired_result={})
+        self.assertTrue(propagate.is_lane_divergence(cm.exception))
+
+    def test_max_lanes(self):
+        app = make_app(pump_params, delay=(1, 10, 1))
+        self.assertEqual([len(b) for b in propagate.make_batches(app.scenarios, 4)],
+                         [4, 4, 1])
+        self.check_same(Pump(), app, track='all', batch=4)
+
+    def test_lane_array(self):
+        a = LaneArray.of([1.0, 2.0])
+        b = a
+        b += 1.0
+        np.testing.assert_array_equal(a, [1.0, 2.0])
+        self.assertIsInstance(b, LaneArray)
+        self.assertEqual(float(LaneArray.of([3.0, 3.0])), 3.0)
+        with self.assertRaises(LaneDivergence):
+            float(a)
+        with self.assertRaises(LaneDivergence):
+            if a > 1.0:
+                pass
+        self.assertFalse(mutables_differ((a, 'x'), (LaneArray.of([1.0, 2.0]), 'x')))
+        self.assertTrue(mutables_differ((a, 'x'), (b, 'x')))
+
+    def test_model_batch(self):
+        scens = [NominalScenario(p={'capacity': c}) for c in [16.0, 20.0]]
+        batch = ModelBatch(CoolantTank(), scens)
+        np.testing.assert_array_equal(batch.mdl.fxns['store_coolant'].s.level,
+                                      [8.0, 10.0])
+        self.assertEqual(batch.mdl.p.turnup, 1.0)
+        batch.mdl.propagate(0.0)
+        lane = batch.load_lane(0)
+        self.assertEqual(lane.fxns['store_coolant'].s.level, 8.0)
+        self.assertEqual(lane.p.capacity, 16.0)
+
+
+if __name__ == '__main__':
+    sweeps = {'pump delay': (Pump(), make_app(pump_params, delay=(1, 100, 1))),
+              'coolant tank capacity/turnup': (CoolantTank(),
+                                               make_app(tank_params,
+                                                        capacity=(12.0, 30.0, 0.25),
+                                                        turnup=(0.5, 1.5, 0.25)))}
+    for name, (mdl, app) in sweeps.items():
+        t_scen, t_batch = bench_batch(mdl, app)
+        print(name + " sweep (" + str(app.num_scenarios) + " scenarios): per-scenario: "
+              + str(round(t_scen, 3)) + "s, batch: " + str(round(t_batch, 3)) +
+              "s, speedup: " + str(round(t_scen/t_batch, 2)) + "x")
+    unittest.main()
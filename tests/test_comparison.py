@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for comparing faulty and nominal histories as they are logged.
+
+Compares the fault/degradation summaries computed by a NominalComparison (which is
+updated during the simulation, using the compare_nominal option) with the previous
+approach, which compares the full faulty history with a cut copy of the nominal history
+after the simulation.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+from fmdtools.analyze.result import History, NominalComparison
+
+
+def summary_by_hist(mdlhist, nomhist, *attrs):
+    """Gets the fault/degradation summary of a history by comparing it with a (cut)
+    copy of the nominal history."""
+    if len(nomhist['time']) != len(mdlhist['time']):
+        nomhist = nomhist.cut(len(mdlhist['time'])-1, newcopy=True)
+    return History(faulty=mdlhist, nominal=nomhist).get_fault_degradation_summary(*attrs)
+
+
+def run_scens(mdl, app, compare_nominal=False):
+    """Runs the scenarios of an approach (individually), returning the nominal history
+    and the faulty histories."""
+    _, nomhist = propagate.nominal(mdl, track='all', showprogress=False)
+    hists = {}
+    for scen in app.scenlist:
+        _, hists[scen.name], _, _ = propagate.prop_one_scen(mdl.new_with_params(), scen,
+                                                            nomhist=nomhist,
+                                                            track='all',
+                                                            compare_nominal=compare_nominal)
+    return nomhist, hists
+
+
+def bench_summary(mdl, numpts=3):
+    """Returns the time (s) to run the scenarios of an approach and get the
+    fault/degradation summary of each by comparing the histories after each run and
+    using the compare_nominal option."""
+    attrs = [*mdl.fxns, *mdl.flows]
+    app = SampleApproach(mdl, defaultsamp={'samp': 'evenspacing', 'numpts': numpts})
+    t0 = time.perf_counter()
+    nomhist, hists = run_scens(mdl, app)
+    for hist in hists.values():
+        summary_by_hist(hist, nomhist, *attrs)
+    t_hist = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    nomhist, hists = run_scens(mdl, app, compare_nominal=True)
+    for hist in hists.values():
+        hist.get_comparison().get_fault_degradation_summary(*attrs)
+    t_comp = time.perf_counter() - t0
+    return t_hist, t_comp
+
+
+class NominalComparisonTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                         'numpts': 2})
+
+    def check_summaries(self, mdl, app):
+        attrs = [*mdl.fxns, *mdl.flows]
+        nomhist, hists = run_scens(mdl, app, compare_nominal=True)
+        for scen, hist in hists.items():
+            summary = hist.get_comparison().get_fault_degradation_summary(*attrs)
+            ref = summary_by_hist(hist, nomhist, *attrs)
+            self.assertEqual(summary.faulty, ref.faulty)
+            self.assertEqual(summary.degraded, ref.degraded)
+
+    def test_summary(self):
+        self.check_summaries(self.mdl, self.app)
+
+    def test_rover_summary(self):
+        mdl = Rover()
+        app = SampleApproach(mdl, faults=[('plan_path', 'no_con'), ('drive', 'hmode_3')],
+                             defaultsamp={'samp': 'evenspacing', 'numpts': 2})
+        self.check_summaries(mdl, app)
+
+    def test_first_deg(self):
+        nomhist, hists = run_scens(self.mdl, self.app, compare_nominal=True)
+        for hist in hists.values():
+            comp = hist.get_comparison()
+            flathist = hist.flatten()
+            flatnom = nomhist.flatten()
+            for k, first_deg in comp.first_deg.items():
+                deg = flathist[k] != flatnom[k][:len(flathist[k])]
+                self.assertEqual(comp.num_deg[k], np.count_nonzero(deg))
+                if np.any(deg):
+                    self.assertEqual(first_deg, flathist['time'][np.argmax(deg)])
+                else:
+                    self.assertIsNone(first_deg)
+            for k, first_fault in comp.first_fault.items():
+                self.assertEqual(comp.num_faulty[k], np.count_nonzero(flathist[k]))
+
+    def test_batch(self):
+        nomhist = History({'a': np.zeros(40), 'time': np.arange(40.0)})
+        hist = History({'a': np.zeros(40), 'time': np.arange(40.0)})
+        comps = [NominalComparison(hist, nomhist, batch=batch) for batch in [1, 16, 100]]
+        for t_ind in range(5, 40):
+            if t_ind in (7, 20, 21, 39):
+                hist['a'][t_ind] = 1.0
+            for comp in comps:
+                comp.update(t_ind)
+        self.assertEqual(comps[0].compared_ind, 40)
+        self.assertEqual(comps[2].compared_ind, 5)
+        for comp in comps:
+            self.assertEqual(comp.num_deg['a'], 4)
+            self.assertEqual(comp.first_deg['a'], 7.0)
+            self.assertEqual(comp.num_deg['time'], 0)
+
+    def test_same_results(self):
+        for mdl in [self.mdl, Rover()]:
+            app = SampleApproach(mdl, defaultsamp={'samp': 'evenspacing', 'numpts': 2})
+            for staged in [False, True]:
+                res, hist = propagate.approach(mdl, app, staged=staged,
+                                               showprogress=False)
+                res_comp, hist_comp = propagate.approach(mdl, app, staged=staged,
+                                                         compare_nominal=True,
+                                                         showprogress=False)
+                self.assertEqual(res, res_comp)
+                for k, v in hist.items():
+                    np.testing.assert_array_equal(v, hist_comp[k])
+
+    def test_cut_view(self):
+        _, nomhist = propagate.nominal(self.mdl, track='all', showprogress=False)
+        view = nomhist.cut_view(start_ind=10)
+        cut = nomhist.cut(start_ind=10, newcopy=True)
+        for k, v in cut.flatten().items():
+            np.testing.assert_array_equal(view.flatten()[k], v)
+        self.assertTrue(np.shares_memory(view['time'], nomhist['time']))
+
+
+if __name__ == '__main__':
+    for mdl in [Pump(), Rover()]:
+        t_hist, t_comp = bench_summary(mdl)
+        print(mdl.__class__.__name__ + " run + summaries: compare after run: " +
+              str(round(t_hist, 3)) + "s, compare during run: " + str(round(t_comp, 3)) +
+              "s, speedup: " + str(round(t_hist/t_comp, 2)) + "x")
+    unittest.main()
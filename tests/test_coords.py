@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for the spatial indexes of Coords, which are used to find the closest
+points in collections/properties of the grid, and for the versions of Coords states,
+which are used to detect changes to the grid in static propagation.
+
+Compares Coords.find_closest and find_all with brute-force searches over every point of
+the grid, for features, collections, and states changed during use, and
+Coords.return_mutables with the grids of the states as tuples.
+"""
+import copy
+import pickle
+import time
+import unittest
+import numpy as np
+from fmdtools.define.common import changes
+from fmdtools.define.coords import Coords, CoordsParam, ExampleCoords, StateArray
+from fmdtools.define.environment import Environment
+from fmdtools.define.geom import ExGeomArch
+
+
+class GridParam(CoordsParam):
+    """Grid with a random feature (and collection) and a state."""
+
+    x_size = 60
+    y_size = 60
+    feature_f: tuple = (bool, False)
+    feature_v: tuple = (float, 0.0)
+    state_s: tuple = (float, 0.0)
+    collect_fs: tuple = ("f", True)
+
+
+class Grid(Coords):
+    _init_p = GridParam
+
+    def init_properties(self, *args, **kwargs):
+        self.set_rand_pts("f", True, 150)
+        self.set_prop_dist("v", "uniform", low=0.0, high=10.0)
+
+
+def brute_find_all(coords, prop, value=True, comparator=np.equal):
+    """Finds all points satisfying the condition by checking each point."""
+    arr = getattr(coords, prop)
+    return np.array([coords.grid[i, j] for i in range(arr.shape[0])
+                     for j in range(arr.shape[1]) if comparator(arr[i, j], value)])
+
+
+def brute_find_closest(coords, x, y, pts, include_pt=True):
+    """Finds the closest point by computing the distance to every point."""
+    p_rounded = coords.to_gridpoint(x, y)
+    if p_rounded.tolist() in pts.tolist():
+        return p_rounded
+    if not include_pt:
+        pts = np.array([p for p in pts if all(p != p_rounded)])
+    dists = np.sqrt(np.sum((np.array([x, y])-pts)**2, 1))
+    return pts[np.argmin(dists)]
+
+
+def bench_find_closest(size=200, num_pts=2000, queries=500):
+    """Returns the time (s) to find the closest point in a collection by brute force
+    and using the spatial index."""
+    class BenchParam(GridParam):
+        x_size = size
+        y_size = size
+
+    class BenchGrid(Coords):
+        _init_p = BenchParam
+
+        def init_properties(self, *args, **kwargs):
+            self.set_rand_pts("f", True, num_pts)
+    coords = BenchGrid()
+    qs = np.random.default_rng(0).uniform(0, (size-1)*coords.p.blocksize, (queries, 2))
+    t0 = time.perf_counter()
+    for x, y in qs:
+        brute_find_closest(coords, x, y, coords.fs, include_pt=False)
+    t_brute = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for x, y in qs:
+        coords.find_closest(x, y, "fs", include_pt=False)
+    t_index = time.perf_counter() - t0
+    return t_brute, t_index
+
+
+def bench_return_mutables(size=200, calls=100):
+    """Returns the time (s) to check the Coords for changes by comparing the grids of
+    the states as tuples and by comparing the versions of the states."""
+    class BenchParam(GridParam):
+        x_size = size
+        y_size = size
+
+    class BenchGrid(Coords):
+        _init_p = BenchParam
+    coords = BenchGrid()
+    t0 = time.perf_counter()
+    old = tuple(tuple(map(tuple, getattr(coords, s))) for s in coords.states)
+    for i in range(calls):
+        old == tuple(tuple(map(tuple, getattr(coords, s))) for s in coords.states)
+    t_grid = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    old = coords.return_mutables()
+    for i in range(calls):
+        old == coords.return_mutables()
+    t_version = time.perf_counter() - t0
+    return t_grid, t_version
+
+
+class CoordsIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.coords = Grid(r={'seed': 1})
+        self.rng = np.random.default_rng(2)
+        self.max_xy = (self.coords.p.x_size - 1)*self.coords.p.blocksize
+
+    def check_closest(self, prop, pts, num=200, **kwargs):
+        for i in range(num):
+            x, y = self.rng.uniform(0, self.max_xy - 10.0, 2)
+            if i % 4 == 0:
+                # grid-aligned points have many equidistant points
+                x, y = np.round([x, y], -1) + 5.0*(i % 8 == 0)
+            for include_pt in [True, False]:
+                np.testing.assert_array_equal(
+                    self.coords.find_closest(x, y, prop, include_pt=include_pt,
+                                             **kwargs),
+                    brute_find_closest(self.coords, x, y, pts, include_pt=include_pt))
+
+    def test_find_all(self):
+        np.testing.assert_array_equal(self.coords.find_all("f"),
+                                      brute_find_all(self.coords, "f"))
+        np.testing.assert_array_equal(self.coords.find_all("v", 5.0, np.greater),
+                                      brute_find_all(self.coords, "v", 5.0, np.greater))
+        self.assertEqual(self.coords.find_all("s", 1.0).shape, (0, 2))
+
+    def test_collection(self):
+        np.testing.assert_array_equal(self.coords.fs, brute_find_all(self.coords, "f"))
+        self.check_closest("fs", self.coords.fs)
+        self.check_closest("pts", self.coords.pts, num=20)
+
+    def test_feature(self):
+        pts = brute_find_all(self.coords, "v", 9.0, np.greater)
+        self.check_closest("v", pts, value=9.0, comparator=np.greater)
+
+    def test_large(self):
+        # large collections are searched with the KD-tree
+        self.coords.set_range("s", 1.0, 0, 400, 0, 400)
+        self.coords.set_range("s", 0.0, 100, 300, 100, 300)
+        pts = brute_find_all(self.coords, "s", 1.0)
+        self.assertGreater(len(pts), self.coords.get_index("s", 1.0).brute_force_size)
+        self.check_closest("s", pts, value=1.0)
+
+    def test_state_updates(self):
+        # index is cached before the state is set
+        self.assertEqual(len(self.coords.get_index("s", 1.0).pts), 0)
+        self.coords.set(100.0, 100.0, "s", 1.0)
+        self.coords.set_pts([(300.0, 200.0), (550.0, 500.0)], "s", 1.0)
+        self.coords.set_range("s", 1.0, 400, 450, 0, 50)
+        self.check_closest("s", brute_find_all(self.coords, "s", 1.0), value=1.0)
+        snap = self.coords.get_snapshot()
+        self.coords.set(100.0, 100.0, "s", 0.0)
+        self.coords.set_range("s", 0.0, 400, 450, 0, 50)
+        np.testing.assert_array_equal(self.coords.find_closest(0.0, 0.0, "s", value=1.0),
+                                      [300.0, 200.0])
+        self.coords.load_snapshot(snap)
+        np.testing.assert_array_equal(self.coords.find_closest(0.0, 0.0, "s", value=1.0),
+                                      [100.0, 100.0])
+        cop = self.coords.copy()
+        self.coords.set_prop_dist("s", "uniform", low=0.0, high=1.0)
+        np.testing.assert_array_equal(cop.find_closest(0.0, 0.0, "s", value=1.0),
+                                      [100.0, 100.0])
+        self.check_closest("s", brute_find_all(self.coords, "s", 0.5, np.greater),
+                           value=0.5, comparator=np.greater)
+
+
+class CoordsVersionTests(unittest.TestCase):
+    def setUp(self):
+        self.coords = Grid(r={'seed': 1})
+
+    def check_changed(self, change, changed=True):
+        old = self.coords.return_mutables()
+        count = changes.count
+        change()
+        self.assertEqual(self.coords.return_mutables() != old, changed)
+        self.assertEqual(self.coords.has_changed(count), changed)
+
+    def test_set_methods(self):
+        c = self.coords
+        self.check_changed(lambda: c.set(10.0, 10.0, "s", 1.0))
+        self.check_changed(lambda: c.set(10.0, 10.0, "s", 1.0), changed=False)
+        self.check_changed(lambda: c.set_range("s", 2.0, 0, 50, 0, 50))
+        self.check_changed(lambda: c.set_pts([(100.0, 100.0), (200.0, 0.0)], "s", 3.0))
+        self.check_changed(lambda: c.set_rand_pts("s", 4.0, 10))
+        self.check_changed(lambda: c.set_prop_dist("s", "uniform", low=0.0, high=1.0))
+        snap = c.get_snapshot()
+        self.check_changed(lambda: c.load_snapshot(snap), changed=False)
+
+    def test_direct_writes(self):
+        c = self.coords
+
+        def set_view():
+            c.s[2:4][1, 3] = 5.0
+
+        def add():
+            c.s += 1.0
+
+        def add_at():
+            np.add.at(c.s, ([0, 1], [0, 0]), 1.0)
+
+        def set_attr():
+            c.s = np.zeros(c.s.shape)
+        self.check_changed(set_view)
+        self.assertEqual(c.find_closest(300.0, 300.0, "s", value=5.0).tolist(),
+                         [30.0, 30.0])
+        self.check_changed(add)
+        self.assertEqual(c.find_closest(300.0, 300.0, "s", value=6.0).tolist(),
+                         [30.0, 30.0])
+        self.check_changed(add_at)
+        self.check_changed(set_attr)
+        self.check_changed(set_attr, changed=False)
+        self.assertIsInstance(c.s, StateArray)
+        self.assertIs(type(c.s + 1.0), np.ndarray)
+        self.assertIs(type(c.return_states()['s']), np.ndarray)
+        self.assertIs(type(c.get_snapshot()[0]['s']), np.ndarray)
+
+    def test_indexed_copies(self):
+        c = self.coords
+
+        def set_fancy():
+            cop = c.s[[0, 1]]
+            cop[0, 0] = 5.0
+            cop += 1.0
+
+        def set_masked():
+            cop = c.s[c.s == 0.0]
+            cop[0] = 5.0
+
+        def set_strided_view():
+            c.s[::2, 1::2][0, 0] = 5.0
+        self.check_changed(set_fancy, changed=False)
+        self.check_changed(set_masked, changed=False)
+        self.assertEqual(c.s[0, 0], 0.0)
+        self.assertIsNone(c.s[[0, 1]]._owner)
+        self.check_changed(set_strided_view)
+        self.assertEqual(c.s[0, 1], 5.0)
+
+    def test_copies(self):
+        self.coords.set(10.0, 10.0, "s", 1.0)
+        for cop in [self.coords.copy(), copy.deepcopy(self.coords),
+                    pickle.loads(pickle.dumps(self.coords))]:
+            old = cop.return_mutables()
+            self.assertEqual(cop.s[1, 1], 1.0)
+            cop.set(20.0, 20.0, "s", 1.0)
+            self.assertNotEqual(cop.return_mutables(), old)
+            self.assertEqual(cop.find_closest(30.0, 30.0, "s", value=1.0).tolist(),
+                             [20.0, 20.0])
+            self.assertEqual(self.coords.s[2, 2], 0.0)
+            self.assertEqual(self.coords.find_closest(30.0, 30.0, "s", value=1.0).tolist(),
+                             [10.0, 10.0])
+
+    def test_environment(self):
+        class ExampleEnvironment(Environment):
+            _init_c = ExampleCoords
+            _init_ga = ExGeomArch
+        env = ExampleEnvironment('env')
+        count = changes.count
+        self.assertFalse(env.has_changed(count))
+        env.c.h[0, 0] = 1.0
+        self.assertTrue(env.has_changed(count))
+        count = changes.count
+        env.c.h[0, 0] = 1.0
+        self.assertFalse(env.has_changed(count))
+        env.ga.geoms['ex_point'].s.occupied = True
+        self.assertTrue(env.has_changed(count))
+
+
+if __name__ == '__main__':
+    for size in [20, 100, 500]:
+        t_grid, t_version = bench_return_mutables(size=size)
+        print(str(size) + "x" + str(size) + " grid return_mutables (100 checks): grids:"
+              + " " + str(round(t_grid, 3)) + "s, versions: " + str(round(t_version, 5))
+              + "s, speedup: " + str(round(t_grid/t_version, 2)) + "x")
+    for size, num_pts in [(10, 20), (60, 200), (200, 2000), (500, 10000)]:
+        t_brute, t_index = bench_find_closest(size=size, num_pts=num_pts)
+        print(str(size) + "x" + str(size) + " grid find_closest (" + str(num_pts) +
+              " points): brute force: " + str(round(t_brute, 3)) + "s, spatial index: "
+              + str(round(t_index, 3)) + "s, speedup: " +
+              str(round(t_brute/t_index, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for re-using the simulations of equivalent scenarios.
+
+Compares approaches run with the dedup option, which re-uses the simulation of
+scenarios with the same pre-conditions (model state and injected faults) as scenarios
+simulated previously (e.g., when comparing sample approaches of the same model), with
+the same approaches simulated without it.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump, PumpParam
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach, NominalApproach
+from fmdtools.sim.memo import ScenarioMemo
+
+
+def make_apps(mdl):
+    """Makes sample approaches to compare (which share some scenarios)."""
+    return [SampleApproach(mdl, defaultsamp={'samp': 'fullint'}),
+            SampleApproach(mdl),
+            SampleApproach(mdl, defaultsamp={'samp': 'evenspacing', 'numpts': 5})]
+
+
+def pump_params(delay=10, label=0):
+    """Makes pump parameters (where label does not change the parameters)."""
+    return PumpParam(delay=delay)
+
+
+def bench_dedup(staged=True):
+    """Returns the time (s) to run the approaches from make_apps without and with a
+    shared ScenarioMemo, along with the memo's hit rate."""
+    mdl = Pump()
+    apps = make_apps(mdl)
+    t0 = time.perf_counter()
+    for app in apps:
+        propagate.approach(mdl, app, staged=staged, showprogress=False)
+    t_sim = time.perf_counter() - t0
+    memo = ScenarioMemo()
+    t0 = time.perf_counter()
+    for app in apps:
+        propagate.approach(mdl, app, staged=staged, showprogress=False, dedup=memo)
+    t_memo = time.perf_counter() - t0
+    return t_sim, t_memo, memo.hit_rate
+
+
+class DedupTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+
+    def check_same_results(self, res, ref):
+        for k, v in ref.items():
+            np.testing.assert_array_equal(res[k], v)
+
+    def check_same_hists(self, hist, ref):
+        self.assertEqual([*hist.keys()], [*ref.keys()])
+        for k, v in ref.items():
+            np.testing.assert_array_equal(hist[k], v)
+
+    def test_approaches(self):
+        apps = make_apps(self.mdl)[1:]
+        for staged in [False, True, 'snapshot']:
+            memo = ScenarioMemo()
+            for app in apps:
+                res, hist = propagate.approach(self.mdl, app, staged=staged,
+                                               track='all', showprogress=False)
+                num_scens = memo.hits + memo.misses
+                res_memo, hist_memo = propagate.approach(self.mdl, app, staged=staged,
+                                                         track='all', dedup=memo,
+                                                         showprogress=False)
+                self.check_same_results(res_memo, res)
+                self.check_same_hists(hist_memo, hist)
+                self.assertEqual(memo.hits + memo.misses - num_scens,
+                                 len(app.scenlist))
+            # all scenarios of the default approach are in the evenspacing approach
+            num_entries = sum([len(entries) for entries in memo.entries.values()])
+            if staged:
+                # faults at other times in the same phase re-use shifted simulations
+                self.assertGreater(memo.hits, len(apps[0].scenlist))
+                self.assertLess(num_entries, len(apps[1].scenlist))
+            else:
+                self.assertEqual(memo.hits, len(apps[0].scenlist))
+                self.assertEqual(num_entries, len(apps[1].scenlist))
+
+    def test_rates(self):
+        app = SampleApproach(self.mdl)
+        memo = ScenarioMemo()
+        propagate.approach(self.mdl, app, showprogress=False, dedup=memo)
+        app_2 = SampleApproach(self.mdl, faults=[('move_water', 'mech_break')],
+                               phases={'on': [10, 20]})
+        hits = memo.hits
+        res, _ = propagate.approach(self.mdl, app_2, showprogress=False)
+        res_memo, _ = propagate.approach(self.mdl, app_2, showprogress=False, dedup=memo)
+        self.assertEqual(memo.hits, hits)
+        self.check_same_results(res_memo, res)
+        # hits/misses are given by the memo, so the results only hold scenarios
+        fmea = res_memo.create_simple_fmea()
+        self.assertTrue(fmea.equals(res.create_simple_fmea()))
+
+    def test_nested(self):
+        app = NominalApproach()
+        app.add_param_ranges(pump_params, 'delays', set_args={'delay': [10, 10, 20]})
+        kwargs = dict(faults=[('move_water', 'mech_break'), ('import_ee', 'no_v')],
+                      showprogress=False, staged=True)
+        res, hist, _ = propagate.nested_approach(self.mdl, app, **kwargs)
+        memo = ScenarioMemo()
+        res_memo, hist_memo, _ = propagate.nested_approach(self.mdl, app, dedup=memo,
+                                                           **kwargs)
+        # only the scenarios of the second (same) parameter re-use simulations
+        self.assertEqual(memo.misses, 2*memo.hits)
+        self.check_same_results(res_memo, res)
+        self.check_same_hists(hist_memo, hist)
+
+    def test_unused(self):
+        app = SampleApproach(self.mdl)
+        memo = ScenarioMemo()
+        propagate.approach(self.mdl, app, desired_result={10: 'endclass'},
+                           showprogress=False, dedup=memo)
+        self.assertEqual(memo.misses, 0)
+        self.assertEqual(memo.hit_rate, 0.0)
+
+    def test_key(self):
+        memo = ScenarioMemo()
+        _, _, _, c_mdl, _ = propagate.nom_helper(self.mdl, [2.0, 10.0, 20.0],
+                                                 staged=True, track='all')
+        start_10 = memo.get_start(c_mdl[10.0], 10.0)
+        start_20 = memo.get_start(c_mdl[20.0], 20.0)
+        # the model is in the same state (besides time) over the on phase
+        self.assertEqual(start_10[0], start_20[0])
+        self.assertEqual(start_10[3], 50.0)
+        self.assertNotEqual(start_10[0], memo.get_start(c_mdl[2.0], 2.0)[0])
+        mdl = self.mdl.new_with_params(p={'delay': 20})
+        _, _, _, c_mdl_2, _ = propagate.nom_helper(mdl, [10.0], staged=True,
+                                                   track='all')
+        self.assertNotEqual(start_10[0], memo.get_start(c_mdl_2[10.0], 10.0)[0])
+
+    def test_shifted(self):
+        app = SampleApproach(self.mdl, faults=[('move_water', 'mech_break'),
+                                               ('export_water', 'block')],
+                             defaultsamp={'samp': 'fullint'})
+        memo = ScenarioMemo()
+        kwargs = dict(staged=True, track='all', showprogress=False)
+        res, hist = propagate.approach(self.mdl, app, **kwargs)
+        res_memo, hist_memo = propagate.approach(self.mdl, app, dedup=memo, **kwargs)
+        self.check_same_results(res_memo, res)
+        self.check_same_hists(hist_memo, hist)
+        # faults at different times in the same phase share simulations
+        self.assertGreater(memo.hits, memo.misses)
+
+
+if __name__ == '__main__':
+    for staged in [False, True]:
+        t_sim, t_memo, hit_rate = bench_dedup(staged=staged)
+        print("compared pump approaches (staged=" + str(staged) + "): simulated: " +
+              str(round(t_sim, 3)) + "s, dedup: " + str(round(t_memo, 3)) +
+              "s (hit rate: " + str(round(hit_rate, 2)) + "), speedup: " +
+              str(round(t_sim/t_memo, 2)) + "x")
+    unittest.main()
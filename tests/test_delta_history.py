@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for recording the histories of Coords states as deltas, where only
+the points of the grid which change at each timestep are stored.
+
+Compares models simulated with Coords with delta_hist=True with the same models
+simulated with the full grid recorded at each timestep.
+"""
+import os
+import pickle
+import tempfile
+import time
+import unittest
+import matplotlib
+import numpy as np
+from fmdtools.analyze.graph import ModelGraph
+from fmdtools.analyze.result import DeltaArray, History
+from fmdtools.analyze.show import coord
+from fmdtools.define.block import FxnBlock, Mode
+from fmdtools.define.coords import Coords, CoordsParam
+from fmdtools.define.environment import Environment
+from fmdtools.define.model import Model
+from fmdtools.define.state import State
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+matplotlib.use("Agg")
+
+
+class FloorGridParam(CoordsParam):
+    """Floor with dirt and the points visited by the sweeper."""
+
+    x_size = 30
+    y_size = 30
+    state_dirt: tuple = (float, 1.0)
+    state_visited: tuple = (bool, False)
+
+
+class FloorGrid(Coords):
+    _init_p = FloorGridParam
+
+
+class DeltaFloorGridParam(FloorGridParam):
+    delta_hist = True
+
+
+class DeltaFloorGrid(Coords):
+    _init_p = DeltaFloorGridParam
+
+
+class Floor(Environment):
+    _init_c = FloorGrid
+
+
+class DeltaFloor(Environment):
+    _init_c = DeltaFloorGrid
+
+
+class SweeperState(State):
+    x: float = 0.0
+    y: float = 0.0
+
+
+class SweeperMode(Mode):
+    failrate = 1e-5
+    faultparams = {'stuck': (0.5, 1000), 'leak': (0.5, 2000)}
+
+
+class Sweeper(FxnBlock):
+    """Sweeps the floor row by row, leaving dirt behind when leaking."""
+
+    __slots__ = ('floor',)
+    _init_s = SweeperState
+    _init_m = SweeperMode
+    _init_floor = Floor
+    flownames = {'floor': 'floor'}
+
+    def dynamic_behavior(self, time):
+        if not self.m.has_fault('stuck'):
+            size = self.floor.c.p.x_size
+            step = int(time) % (size*size)
+            self.s.x = (step % size)*self.floor.c.p.blocksize
+            self.s.y = (step // size)*self.floor.c.p.blocksize
+        self.floor.c.set(self.s.x, self.s.y, 'visited', True)
+        if self.m.has_fault('leak'):
+            self.floor.c.set(self.s.x, self.s.y, 'dirt', 2.0)
+        else:
+            self.floor.c.set(self.s.x, self.s.y, 'dirt', 0.0)
+
+
+class DeltaSweeper(Sweeper):
+    __slots__ = ()
+    _init_floor = DeltaFloor
+
+
+class Sweep(Model):
+    """Sweeper on a floor with the full grid recorded at each timestep."""
+
+    __slots__ = ()
+    default_sp = dict(phases=(('sweep', 0, 80),), times=(0, 80), units='min')
+    default_track = 'all'
+    floorclass = Floor
+    sweeperclass = Sweeper
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.add_flow('floor', self.floorclass)
+        self.add_fxn('sweeper', self.sweeperclass, 'floor')
+        self.build()
+
+
+class DeltaSweep(Sweep):
+    """Sweeper on a floor with the grid recorded as deltas."""
+
+    __slots__ = ()
+    floorclass = DeltaFloor
+    sweeperclass = DeltaSweeper
+
+
+def bench_delta_hist(size=100, end=200):
+    """Returns the time (s) and memory (bytes) of the history for nominal simulations
+    of the sweep with the full grid and with the grid recorded as deltas."""
+    def make(fl, sw):
+        class BenchParam(FloorGridParam):
+            x_size = size
+            y_size = size
+            delta_hist = fl is DeltaFloor
+
+        class BenchGrid(Coords):
+            _init_p = BenchParam
+
+        class BenchFloor(fl):
+            _init_c = BenchGrid
+
+        class BenchSweeper(sw):
+            __slots__ = ()
+            _init_floor = BenchFloor
+
+        class BenchSweep(Sweep):
+            __slots__ = ()
+            default_sp = dict(phases=(('sweep', 0, end),), times=(0, end))
+            floorclass = BenchFloor
+            sweeperclass = BenchSweeper
+        return BenchSweep()
+    res = []
+    for mdl in [make(Floor, Sweeper), make(DeltaFloor, DeltaSweeper)]:
+        t0 = time.perf_counter()
+        _, hist = propagate.nominal(mdl, showprogress=False)
+        res.extend([time.perf_counter() - t0, hist.get_memory()[0]])
+    return res
+
+
+class DeltaHistoryTests(unittest.TestCase):
+    def check_same(self, hist, hist_d):
+        self.assertEqual([*hist_d.keys()], [*hist.keys()])
+        for k, v in hist.items():
+            np.testing.assert_array_equal(np.asarray(hist_d[k]), v)
+            self.assertEqual(hist_d[k].dtype, v.dtype)
+
+    def test_nominal(self):
+        res, hist = propagate.nominal(Sweep(), showprogress=False)
+        res_d, hist_d = propagate.nominal(DeltaSweep(), showprogress=False)
+        self.assertEqual(res_d, res)
+        self.check_same(hist, hist_d)
+        self.assertIsInstance(hist_d.flows.floor.c.dirt, DeltaArray)
+        self.assertNotIsInstance(hist.flows.floor.c.dirt, DeltaArray)
+        self.assertLess(hist_d.get_memory()[0]*10, hist.get_memory()[0])
+
+    def test_one_fault(self):
+        for fault in ['stuck', 'leak']:
+            res, hist = propagate.one_fault(Sweep(), 'sweeper', fault, time=20,
+                                            showprogress=False)
+            res_d, hist_d = propagate.one_fault(DeltaSweep(), 'sweeper', fault, time=20,
+                                                showprogress=False)
+            self.assertEqual(res_d, res)
+            self.check_same(hist.flatten(), hist_d.flatten())
+            self.assertIsInstance(hist_d.faulty.flows.floor.c.dirt, DeltaArray)
+
+    def test_approach(self):
+        for staged in [True, False]:
+            res, hist = propagate.approach(Sweep(), SampleApproach(Sweep()),
+                                           showprogress=False, staged=staged)
+            res_d, hist_d = propagate.approach(DeltaSweep(), SampleApproach(Sweep()),
+                                               showprogress=False, staged=staged)
+            self.assertEqual(res_d, res)
+            self.check_same(hist.flatten(), hist_d.flatten())
+
+    def test_history_methods(self):
+        _, hist = propagate.one_fault(DeltaSweep(), 'sweeper', 'leak', time=20,
+                                      showprogress=False)
+        dirt = hist.faulty.flows.floor.c.dirt
+        full = np.asarray(dirt)
+        self.assertLess(dirt.nbytes*10, full.nbytes)
+        cop = hist.copy()
+        cop.faulty.flows.floor.c.dirt[30] = 5.0
+        np.testing.assert_array_equal(dirt, full)
+        cut = hist.cut(40, 10, newcopy=True)
+        np.testing.assert_array_equal(cut.faulty.flows.floor.c.dirt, full[10:41])
+        unpickled = pickle.loads(pickle.dumps(hist))
+        np.testing.assert_array_equal(unpickled.faulty.flows.floor.c.dirt, full)
+        deg = hist.get_degraded_hist('floor', withtotal=False, withtime=False)
+        # (1 where the floor is the same as in the nominal history)
+        self.assertTrue(deg['floor'][19])
+        self.assertFalse(deg['floor'][21])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            hist.save(os.path.join(tmpdir, "hist.npz"))
+            loaded = History.load(os.path.join(tmpdir, "hist.npz"))
+            np.testing.assert_array_equal(loaded['faulty.flows.floor.c.dirt'], full)
+
+    def test_delta_array(self):
+        arr = DeltaArray(np.zeros((3, 3)), 5)
+        arr[1] = np.ones((3, 3))
+        arr[3] = 2.0
+        # setting a frame does not change the frames after it
+        arr[2] = 3.0
+        np.testing.assert_array_equal(arr[3], np.full((3, 3), 2.0))
+        # frames after the last frame set repeat it
+        np.testing.assert_array_equal(arr[4], np.full((3, 3), 2.0))
+        arr[1:3] = 4.0
+        full = np.asarray(arr)
+        self.assertEqual(full.shape, (5, 3, 3))
+        np.testing.assert_array_equal(full[:, 0, 0], [0.0, 4.0, 4.0, 2.0, 2.0])
+        np.testing.assert_array_equal(arr[1:4], full[1:4])
+        np.testing.assert_array_equal(arr[2, 1], full[2, 1])
+        np.testing.assert_array_equal(arr[[0, 3]], full[[0, 3]])
+        cop = arr.copy()
+        cop[0] = np.nan
+        np.testing.assert_array_equal(arr, full)
+        self.assertTrue(np.isnan(cop[0]).all())
+        self.assertTrue(np.all(arr == full))
+
+    def test_plots(self):
+        _, hist = propagate.one_fault(DeltaSweep(), 'sweeper', 'stuck', time=20,
+                                      showprogress=False)
+        _, hist_f = propagate.one_fault(Sweep(), 'sweeper', 'stuck', time=20,
+                                        showprogress=False)
+        mg = ModelGraph(DeltaSweep())
+        mg.draw_from(30, hist)
+        ani = mg.animate_from(hist, times=[10, 30])
+        ani.to_jshtml()
+        mdl = DeltaSweep()
+        fig, ax = coord(mdl.flows['floor'].c, 'dirt',
+                        hist=hist.faulty.flows.floor.c, t_ind=30)
+        fig_f, ax_f = coord(mdl.flows['floor'].c, 'dirt',
+                            hist=hist_f.faulty.flows.floor.c, t_ind=30)
+        np.testing.assert_array_equal(ax.collections[0].get_array(),
+                                      ax_f.collections[0].get_array())
+
+
+if __name__ == '__main__':
+    for size in [50, 200, 500]:
+        t_full, mem_full, t_delta, mem_delta = bench_delta_hist(size=size)
+        print(str(size) + "x" + str(size) + " grid nominal history (200 steps): full: "
+              + str(round(t_full, 3)) + "s, " + str(round(mem_full/1e6, 2)) +
+              "MB, deltas: " + str(round(t_delta, 3)) + "s, " +
+              str(round(mem_delta/1e6, 2)) + "MB, memory reduction: " +
+              str(round(mem_full/mem_delta, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for calculating statistics of endclasses using the EndclassTable.
+
+Compares Result.expected/average/percent/rate/total using the table with the previous
+implementations, which build lists of values from Result.get_values.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach, NominalApproach
+from fmdtools.analyze import tabulate
+from fmdtools.analyze.result import Result, EndclassTable
+
+
+def expected_by_list(res, metric, prob_key='rate'):
+    ecs = np.array([e for e in res.get_values(metric).values() if not np.isnan(e)])
+    weights = np.array([e for e in res.get_values(prob_key).values()
+                        if not np.isnan(e)])
+    return sum(ecs*weights)
+
+
+def average_by_list(res, metric, empty_as='nan'):
+    ecs = [e for e in res.get_values(metric).values() if not np.isnan(e)]
+    if len(ecs) > 0 or empty_as == 'nan':
+        return np.mean(ecs)
+    else:
+        return empty_as
+
+
+def percent_by_list(res, metric):
+    return sum([int(bool(e)) for e in res.get_values(metric).values()
+                if not np.isnan(e)])/(len(res.get_values(metric))+1e-16)
+
+
+def rate_by_list(res, metric, prob_key='rate'):
+    ecs = np.array([bool(e) for e in res.get_values(metric).values()
+                    if not np.isnan(e)])
+    weights = np.array([e for e in res.get_values(prob_key).values()
+                        if not np.isnan(e)])
+    return sum(ecs*weights)
+
+
+def total_by_list(res, metric):
+    return sum([e for e in res.get_values(metric).values()])
+
+
+def make_endclasses(num_scens=10000, seed=0):
+    """Makes a (flat) endclass result with num_scens scenarios."""
+    rng = np.random.default_rng(seed)
+    res = Result()
+    for i in range(num_scens):
+        res['scen_'+str(i)+'.endclass.rate'] = rng.random()
+        res['scen_'+str(i)+'.endclass.cost'] = float(rng.integers(0, 3))
+        res['scen_'+str(i)+'.endclass.expected cost'] = rng.random()
+    return res
+
+
+def bench_stats(num_scens=10000):
+    """Returns the time (s) to calculate expected/average/percent/rate/total of a
+    metric using lists of values and the EndclassTable (including the time to
+    build the table)."""
+    res = make_endclasses(num_scens)
+    stats_by_list = [expected_by_list, average_by_list, percent_by_list,
+                     rate_by_list, total_by_list]
+    t0 = time.perf_counter()
+    for stat in stats_by_list:
+        stat(res, '.cost')
+    t_list = time.perf_counter() - t0
+    res = make_endclasses(num_scens)
+    t0 = time.perf_counter()
+    for stat in [res.expected, res.average, res.percent, res.rate, res.total]:
+        stat('.cost')
+    t_table = time.perf_counter() - t0
+    return t_list, t_table
+
+
+class EndclassTableTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl)
+        self.res, _ = propagate.approach(self.mdl, self.app, showprogress=False)
+
+    def test_stats(self):
+        res = make_endclasses(50)
+        res['scen_3.endclass.cost'] = np.nan
+        res['scen_4.endclass.rate'] = np.nan
+        res['scen_5.endclass.other'] = 1.0
+        for metric in ['.cost', 'endclass.cost', 'expected cost', '.other', '.none']:
+            self.assertAlmostEqual(res.average(metric, empty_as=0.0),
+                                   average_by_list(res, metric, empty_as=0.0))
+            self.assertAlmostEqual(res.percent(metric), percent_by_list(res, metric))
+        for metric in ['expected cost', '.other']:
+            self.assertAlmostEqual(res.total(metric), total_by_list(res, metric))
+        res['scen_3.endclass.cost'] = 1.0
+        res['scen_4.endclass.rate'] = 0.5
+        for metric in ['.cost', 'expected cost']:
+            self.assertAlmostEqual(res.expected(metric), expected_by_list(res, metric))
+            self.assertAlmostEqual(res.rate(metric), rate_by_list(res, metric))
+
+    def test_suffix_stats(self):
+        for metric in ['cost', '.cost', 'expected cost']:
+            self.assertAlmostEqual(self.res.average(metric),
+                                   average_by_list(self.res, metric))
+            self.assertAlmostEqual(self.res.total(metric),
+                                   total_by_list(self.res, metric))
+        self.assertAlmostEqual(self.res.expected('.cost'),
+                               expected_by_list(self.res, '.cost'))
+
+    def test_table(self):
+        table = self.res.get_endclass_table()
+        self.assertIs(table, self.res.get_endclass_table())
+        self.assertEqual(len(table.rows), len(self.app.scenlist)+1)
+        self.assertEqual([*table.columns], ['rate', 'cost', 'expected cost'])
+        scen = self.app.scenlist[0].name
+        self.assertEqual(table.get(scen+'.endclass', 'cost'),
+                         self.res[scen+'.endclass.cost'])
+        self.assertEqual(table.get_scen_value(scen, 'cost'),
+                         self.res[scen+'.endclass.cost'])
+        np.testing.assert_array_equal(table.select('.rate', rows=[0, 1]),
+                                      [*self.res.get_values('.rate').values()][:2])
+
+    def test_invalidation(self):
+        res = Result({'a.cost': 1.0, 'b.cost': 3.0})
+        self.assertEqual(res.average('cost'), 2.0)
+        res['b.cost'] = 5.0
+        self.assertEqual(res.average('cost'), 3.0)
+        res['c.cost'] = 6.0
+        self.assertEqual(res.average('cost'), 4.0)
+        del res['c.cost']
+        self.assertEqual(res.total('cost'), 6.0)
+
+    def test_nested(self):
+        res = Result.fromdict({'a': {'cost': 1.0, 'rate': 0.5},
+                               'b': {'cost': 3.0, 'rate': 0.5}})
+        self.assertFalse(res.is_flat())
+        self.assertEqual(res.average('cost'), 2.0)
+        self.assertEqual(res.expected('cost'), 2.0)
+
+    def test_non_numeric(self):
+        table = EndclassTable(Result({'a.classification': 'fail', 'a.cost': 1,
+                                      'b.classification': 'ok', 'b.cost': True}))
+        self.assertEqual(table.columns['classification'].dtype, object)
+        self.assertEqual(table.columns['cost'].dtype, float)
+        self.assertEqual(table.get('b', 'classification'), 'ok')
+
+    def test_fmea(self):
+        fmea = tabulate.fmea(self.res, self.app, group_by='none')
+        id_weights = self.app.get_id_weights()
+        for scen in self.app.scenlist:
+            ec = self.res.get(scen.name)
+            self.assertAlmostEqual(fmea.loc[scen.name, 'rate'],
+                                   ec['endclass.rate']*id_weights[scen.name])
+            self.assertAlmostEqual(fmea.loc[scen.name, 'expected cost'],
+                                   ec['endclass.rate']*ec['endclass.cost'] *
+                                   id_weights[scen.name])
+        fmea_group = tabulate.fmea(self.res, self.app, group_by='fxnfault')
+        self.assertAlmostEqual(sum(fmea['expected cost']),
+                               sum(fmea_group['expected cost']))
+
+    def test_nominal_stats(self):
+        app = NominalApproach()
+        app.add_seed_replicates('replicates', 4)
+        res, _ = propagate.nominal_approach(self.mdl, app, run_stochastic=True,
+                                            showprogress=False)
+        table = tabulate.nominal_stats(app, res, inputparams='none')
+        self.assertEqual([*table.columns], [*app.scenarios])
+        self.assertEqual([*table.index], ['rate', 'cost', 'expected cost'])
+        for scen in app.scenarios:
+            self.assertEqual(table.loc['cost', scen], res[scen+'.endclass.cost'])
+
+    def test_nested_stats(self):
+        app = NominalApproach()
+        app.add_seed_replicates('replicates', 3)
+        res = Result()
+        for i, scen in enumerate(app.scenarios):
+            for fault in ['nominal', 'f1', 'f2']:
+                res[scen+'.'+fault+'.endclass.cost'] = float(i)
+                res[scen+'.'+fault+'.endclass.rate'] = 0.1
+        table = tabulate.nested_stats(app, res, average_metrics=['cost'],
+                                      expected_metrics=['cost'], inputparams=[])
+        self.assertEqual([*table.columns], [*res.keys()])
+        for k in res:
+            i = [*app.scenarios].index(k.split('.')[0])
+            self.assertAlmostEqual(table.loc['ave_cost', k], float(i))
+            self.assertAlmostEqual(table.loc['exp_cost', k], 0.3*i)
+
+
+if __name__ == '__main__':
+    t_list, t_table = bench_stats()
+    print("expected/average/percent/rate/total (10000 scenarios): lists: " +
+          str(round(t_list, 3)) + "s, table: " + str(round(t_table, 3)) +
+          "s, speedup: " + str(round(t_list/t_table, 2)) + "x")
+    unittest.main()
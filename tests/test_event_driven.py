@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for event-driven simulation, which skips the dynamic behaviors of
+quiescent functions and the timesteps where the whole model is quiescent.
+
+Compares approaches run with the event_driven SimParam option with the same approaches
+simulated at every timestep.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.tank.tank_model import Tank
+from examples.tank.tank_optimization_model import Tank as CoolantTank
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+
+
+class LateCoolantTank(CoolantTank):
+    """Coolant tank (simulated over a longer time) with a time-dependent indicator."""
+    __slots__ = ()
+    default_sp = dict(phases=(('na', 0, 0), ('operation', 1, 100)),
+                      times=(0, 5, 10, 15, 100), units='min')
+
+    def indicate_late(self, time):
+        return time > 60
+
+
+def make_mdl(mdlclass, **sp):
+    """Makes a model with the given (non-default) SimParam fields."""
+    return mdlclass(sp={**mdlclass.default_sp, **sp})
+
+
+def run_app(mdlclass, numpts=2, event_driven=False, **kwargs):
+    """Runs an evenspacing approach of the model, returning the results and history."""
+    mdl = make_mdl(mdlclass, event_driven=event_driven)
+    app = SampleApproach(mdl, defaultsamp={'samp': 'evenspacing', 'numpts': numpts})
+    return propagate.approach(mdl, app, showprogress=False, **kwargs)
+
+
+def bench_event_driven(mdlclass, numpts=3, staged=False):
+    """Returns the time (s) to run an approach of the model simulated at every timestep
+    and with the event_driven option."""
+    t0 = time.perf_counter()
+    run_app(mdlclass, numpts=numpts, staged=staged)
+    t_step = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    run_app(mdlclass, numpts=numpts, staged=staged, event_driven=True)
+    t_event = time.perf_counter() - t0
+    return t_step, t_event
+
+
+class EventDrivenTests(unittest.TestCase):
+    def check_same(self, res, hist, ref_res, ref_hist):
+        self.assertEqual(res, ref_res)
+        self.assertEqual([*hist.keys()], [*ref_hist.keys()])
+        for k, v in ref_hist.items():
+            np.testing.assert_array_equal(hist[k], v)
+
+    def test_same_results(self):
+        for mdlclass in [Pump, Tank, LateCoolantTank, Rover]:
+            for staged in [False, True]:
+                res, hist = run_app(mdlclass, staged=staged, track='all')
+                res_ev, hist_ev = run_app(mdlclass, staged=staged, track='all',
+                                          event_driven=True)
+                self.check_same(res_ev, hist_ev, res, hist)
+
+    def test_comparison(self):
+        res, hist = run_app(LateCoolantTank, staged=True, track='all')
+        res_ev, hist_ev = run_app(LateCoolantTank, staged=True, track='all',
+                                  event_driven=True, compare_nominal=True)
+        self.check_same(res_ev, hist_ev, res, hist)
+
+    def test_end_condition(self):
+        hists = {}
+        for event_driven in [False, True]:
+            mdl = make_mdl(LateCoolantTank, end_condition='indicate_late',
+                           event_driven=event_driven)
+            _, hists[event_driven] = propagate.nominal(mdl, track='all',
+                                                       showprogress=False)
+        self.assertEqual(hists[True]['time'][-1], 61.0)
+        self.assertTrue(hists[True]['i.late'][-1])
+        for k, v in hists[False].items():
+            np.testing.assert_array_equal(hists[True][k], v)
+
+    def test_desired_result(self):
+        desired_result = {30.0: 'fxns.store_coolant.s.level', 'end': 'endclass'}
+        seq = {20.0: {'disturbances': {'fxns.store_coolant.s.level': 8.0}}}
+        results = {}
+        for event_driven in [False, True]:
+            mdl = make_mdl(LateCoolantTank, event_driven=event_driven)
+            results[event_driven], _ = propagate.sequence(mdl, seq=seq, rate=1.0,
+                                                          desired_result=desired_result,
+                                                          showprogress=False)
+        self.assertEqual(results[True], results[False])
+
+    def test_asleep(self):
+        mdl = make_mdl(LateCoolantTank, event_driven=True)
+        for t in range(3):
+            mdl.propagate(float(t))
+        self.assertEqual(mdl.asleep_until('store_coolant'), np.inf)
+        mdl.fxns['store_coolant'].s.level = 8.0
+        self.assertEqual(mdl.asleep_until('store_coolant'), -np.inf)
+        self.assertEqual(mdl.quiescent_until(100.0), 100.0)
+
+    def test_quiescent_until(self):
+        rover = Rover()
+        self.assertEqual(rover.fxns['operator'].quiescent_until(0.0), 1.0)
+        self.assertEqual(rover.fxns['operator'].quiescent_until(5.0), 200.0)
+        self.assertEqual(rover.fxns['drive'].quiescent_until(5.0), np.inf)
+        self.assertEqual(Tank().fxns['human'].quiescent_until(5.0), 5.0)
+        self.assertEqual(Pump().fxns['import_signal'].quiescent_until(5.0), 50.0)
+
+
+if __name__ == '__main__':
+    for mdlclass in [Tank, LateCoolantTank, Rover]:
+        for staged in [False, True]:
+            t_step, t_event = bench_event_driven(mdlclass, staged=staged)
+            print(mdlclass.__module__.split('.')[-1] + "." + mdlclass.__name__ +
+                  " approach (staged=" + str(staged) + "): every timestep: " +
+                  str(round(t_step, 3)) + "s, event-driven: " + str(round(t_event, 3)) +
+                  "s, speedup: " + str(round(t_step/t_event, 2)) + "x")
+    unittest.main()
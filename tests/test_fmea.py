@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for making fmeas over groups of scenarios.
+
+Compares tabulate.fmea, which maps the scenario groups to integer group codes and
+calculates each metric over all groups at once, with the previous implementation, which
+calculates each metric separately for each group of scenarios.
+"""
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from examples.pump.ex_pump import Pump
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+from fmdtools.analyze import tabulate
+from fmdtools.analyze.result import Result, EndclassTable, group_sum
+
+
+def fmea_by_group(endclasses, app, metrics=[], weight_metrics=[], avg_metrics=[],
+                  perc_metrics=[], mult_metrics={}, group_by='none', mdl={},
+                  empty_as=0.0):
+    """Makes an (unsorted) fmea by calculating each metric for each group."""
+    group_dict = {}
+    if group_by in ['fxnclassfault', 'fxnclass']:
+        group_dict = {cl: mdl.fxns_of_class(cl) for cl in mdl.fxnclasses()}
+    grouped_scens = app.get_scenid_groups(group_by, group_dict)
+    id_weights = app.get_id_weights()
+    id_weights['nominal'] = 1.0
+    allmetrics = metrics+weight_metrics+avg_metrics+perc_metrics+[*mult_metrics.keys()]
+    fmeadict = {g: dict.fromkeys(allmetrics) for g in grouped_scens}
+    for group, ids in grouped_scens.items():
+        ecs = [endclasses.get(scenid+'.endclass') for scenid in ids]
+        weights = np.array([id_weights[scenid] for scenid in ids])
+        group_res = Result({scenid: endclasses.get(scenid) for scenid in ids})
+        for metric in metrics:
+            fmeadict[group][metric] = np.sum([ec[metric] for ec in ecs])
+        for metric in weight_metrics:
+            fmeadict[group][metric] = np.sum(np.array([ec[metric] for ec in ecs]) *
+                                             weights)
+        for metric in perc_metrics:
+            fmeadict[group][metric] = group_res.percent(metric)
+        for metric in avg_metrics:
+            fmeadict[group][metric] = group_res.average(metric, empty_as=empty_as)
+        for metric, to_mult in mult_metrics.items():
+            prods = np.prod([[ec[m] for ec in ecs] for m in to_mult], axis=0)
+            if set(to_mult).intersection(weight_metrics):
+                fmeadict[group][metric] = np.sum(prods*weights)
+            else:
+                fmeadict[group][metric] = np.sum(prods)
+    return pd.DataFrame(fmeadict).transpose()
+
+
+def make_endclasses(app, seed=0):
+    """Makes a (flat) endclass result for the scenarios of an approach."""
+    rng = np.random.default_rng(seed)
+    res = Result()
+    for scenid in ['nominal'] + [scen.name for scen in app.scenlist]:
+        res[scenid+'.endclass.rate'] = rng.random()*1e-5
+        res[scenid+'.endclass.cost'] = float(rng.integers(0, 3))*1000.0
+        res[scenid+'.endclass.expected cost'] = rng.random()
+    return res
+
+
+def bench_fmea(group_by='none', numpts=300):
+    """Returns the time (s) to make an fmea of synthetic endclasses of a pump approach
+    with three-fault joint scenarios using the previous (per-group) implementation and
+    tabulate.fmea, along with the number of scenarios."""
+    mdl = Pump()
+    app = SampleApproach(mdl, jointfaults={'faults': 3},
+                         defaultsamp={'samp': 'evenspacing', 'numpts': numpts})
+    res = make_endclasses(app)
+    t0 = time.perf_counter()
+    fmea_by_group(res, app, weight_metrics=['rate'], avg_metrics=['cost'],
+                  mult_metrics={"expected cost": ['rate', 'cost']}, group_by=group_by)
+    t_group = time.perf_counter() - t0
+    res = make_endclasses(app)
+    t0 = time.perf_counter()
+    tabulate.fmea(res, app, group_by=group_by)
+    t_codes = time.perf_counter() - t0
+    return t_group, t_codes, len(app.scenlist)
+
+
+class FmeaTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl)
+        self.res, _ = propagate.approach(self.mdl, self.app, showprogress=False)
+
+    def check_same_fmea(self, fmea, ref):
+        self.assertEqual([*fmea.columns], [*ref.columns])
+        self.assertEqual({*fmea.index}, {*ref.index})
+        ref = ref.loc[fmea.index]
+        for col in fmea.columns:
+            np.testing.assert_allclose(fmea[col].values.astype(float),
+                                       ref[col].values.astype(float), rtol=1e-12)
+
+    def test_default(self):
+        for group_by in ['none', 'phase', 'fxnfault', 'mode', 'functions', 'times',
+                         'fxnclassfault', 'fxnclass']:
+            fmea = tabulate.fmea(self.res, self.app, group_by=group_by, mdl=self.mdl)
+            ref = fmea_by_group(self.res, self.app, weight_metrics=['rate'],
+                                avg_metrics=['cost'],
+                                mult_metrics={"expected cost": ['rate', 'cost']},
+                                group_by=group_by, mdl=self.mdl)
+            self.check_same_fmea(fmea, ref)
+            self.assertTrue(all(fmea['rate'].values[:-1] >= fmea['rate'].values[1:]))
+
+    def test_metrics(self):
+        kwargs = dict(metrics=['cost'], weight_metrics=['rate'], perc_metrics=['cost'],
+                      avg_metrics=['expected cost'],
+                      mult_metrics={'x': ['rate', 'cost'], 'y': ['cost', 'cost']})
+        for group_by in ['none', 'phase', 'fxnfault', 'times']:
+            fmea = tabulate.fmea(self.res, self.app, group_by=group_by, **kwargs)
+            ref = fmea_by_group(self.res, self.app, group_by=group_by, **kwargs)
+            self.check_same_fmea(fmea, ref)
+
+    def test_index(self):
+        fmea = tabulate.fmea(self.res, self.app, group_by='phase')
+        self.assertIsInstance(fmea.index, pd.MultiIndex)
+        fmea = tabulate.fmea(self.res, self.app, group_by='fxnclassfault', mdl=self.mdl)
+        self.assertIn('nominal', fmea.index)
+
+    def test_group_sum(self):
+        rng = np.random.default_rng(0)
+        for num_vals in [0, 5, 100]:
+            codes = rng.integers(0, 4, num_vals)
+            vals = rng.random(num_vals)
+            sums = group_sum(vals, codes, 5)
+            for i in range(5):
+                self.assertEqual(sums[i], sum(vals[codes == i].tolist()))
+
+    def test_sum_order(self):
+        app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                    'numpts': 5})
+        res, _ = propagate.approach(self.mdl, app, showprogress=False)
+        fmea = tabulate.fmea(res, app, group_by='functions')
+        id_weights = app.get_id_weights()
+        scenids = [k[:-len('.endclass.rate')] for k in res
+                   if k.endswith('.endclass.rate')]
+        for fxn, ids in app.get_scenid_groups('functions').items():
+            # metrics are summed sequentially in the order of the results
+            rates = [res[scenid+'.endclass.rate']*id_weights[scenid]
+                     for scenid in scenids if scenid in ids]
+            self.assertEqual(fmea['rate'][fxn], sum(rates))
+
+    def test_group_stats(self):
+        res = Result({'a.endclass.cost': 1.0, 'a.endclass.x': 0.0,
+                      'b.endclass.cost': 3.0, 'b.other.cost': np.nan,
+                      'c.endclass.x': 1.0})
+        table = EndclassTable(res)
+        codes = [0, 0, 1, 2]
+        np.testing.assert_array_equal(table.group_average('cost', codes, 3),
+                                      [2.0, np.nan, np.nan])
+        np.testing.assert_array_equal(table.group_average('cost', codes, 3,
+                                                          empty_as=0.0),
+                                      [2.0, 0.0, 0.0])
+        self.assertEqual([*table.group_average('cost', codes, 3, empty_as='NA')],
+                         [2.0, 'NA', 'NA'])
+        np.testing.assert_allclose(table.group_percent('x', codes, 3), [0.0, 0.0, 1.0])
+        np.testing.assert_allclose(table.group_percent('cost', [0, 0, 1], 2,
+                                                       rows=[0, 1, 2]), [1.0, 0.0])
+
+
+if __name__ == '__main__':
+    for group_by in ['none', 'phase']:
+        t_group, t_codes, num_scens = bench_fmea(group_by)
+        print("fmea (group_by=" + group_by + ", " + str(num_scens) + " scenarios): " +
+              "per-group: " + str(round(t_group, 3)) + "s, group codes: " +
+              str(round(t_codes, 3)) + "s, speedup: " +
+              str(round(t_group/t_codes, 2)) + "x")
+    unittest.main()
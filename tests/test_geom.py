@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for checking points against geoms, which uses prepared shapes/buffers
+(in Geom.at) and the spatial index of the architecture (in GeomArch.all_at_many).
+
+Compares Geom.at, GeomArch.all_at and GeomArch.all_at_many with checking whether
+each (unprepared) shape/buffer covers each point, for the rover environment and an
+architecture of many city blocks.
+"""
+import copy
+import pickle
+import time
+import unittest
+import numpy as np
+from shapely import Point, from_wkb, is_prepared
+from examples.rover.rover_model import GroundGeomArch
+from fmdtools.define.geom import GeomArch, GeomPoly, PolyParam, ExGeomArch
+
+
+class BlockParam(PolyParam):
+    """Square city block with a sidewalk and street around it."""
+
+    shell: tuple = ((0.0, 0.0), (8.0, 0.0), (8.0, 8.0), (0.0, 8.0))
+    buffer_sidewalk: float = 0.5
+    buffer_street: float = 1.0
+
+
+class Block(GeomPoly):
+    _init_p = BlockParam
+
+
+class CityGeomArch(GeomArch):
+    """Grid of num x num city blocks."""
+
+    def init_geoms(self, num=10, **kwargs):
+        for i in range(num):
+            for j in range(num):
+                shell = tuple((x + 10.0*i, y + 10.0*j) for x, y in BlockParam().shell)
+                self.add_geom("block_" + str(i) + "_" + str(j), Block,
+                              p={'shell': shell})
+
+
+def covers_all_at(arch, pt):
+    """Finds all geoms/buffers at the point by checking whether each shape/buffer
+    covers it."""
+    all_at = {}
+    for geomname, geom in arch.geoms.items():
+        at_geom = [bname for bname in ['shape', *geom.buffers]
+                   if getattr(geom, bname).covers(Point(*pt))]
+        if at_geom:
+            all_at[geomname] = at_geom
+    return all_at
+
+
+def rover_points(num=1000, seed=0):
+    """Points scattered around the line (and start/end) of the rover environment."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(-2.0, 32.0, num), rng.normal(0.0, 1.0, num)])
+
+
+def bench_all_at(arch, points):
+    """Returns the time (s) to find all geoms at the points by checking whether each
+    shape/buffer covers each point, with GeomArch.all_at, and with
+    GeomArch.all_at_many."""
+    # (unprepared) copies of the shapes/buffers
+    bufs = [(from_wkb(getattr(geom, bname).wkb), bname)
+            for geom in arch.geoms.values() for bname in ['shape', *geom.buffers]]
+    t0 = time.perf_counter()
+    for pt in points:
+        [bname for buf, bname in bufs if buf.covers(Point(*pt))]
+    t_covers = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for pt in points:
+        arch.all_at(*pt)
+    t_all_at = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    arch.all_at_many(points)
+    t_many = time.perf_counter() - t0
+    return t_covers, t_all_at, t_many
+
+
+class GeomAtTests(unittest.TestCase):
+    def check_all_at(self, arch, points):
+        all_at_many = arch.all_at_many(points)
+        self.assertEqual(len(all_at_many), len(points))
+        for pt, at_many in zip(points, all_at_many):
+            self.assertEqual(arch.all_at(*pt), covers_all_at(arch, pt))
+            self.assertEqual(at_many, arch.all_at(*pt))
+
+    def test_rover(self):
+        arch = GroundGeomArch()
+        points = rover_points(300)
+        self.check_all_at(arch, points)
+        line = arch.geoms['line']
+        for pt in points[:50]:
+            for bname in ['shape', *line.buffers]:
+                self.assertEqual(line.at(pt, bname),
+                                 getattr(line, bname).covers(Point(*pt)))
+
+    def test_city(self):
+        arch = CityGeomArch()
+        rng = np.random.default_rng(1)
+        points = rng.uniform(-2.0, 102.0, (300, 2))
+        # points on the edges of the blocks/buffers are covered
+        points = np.vstack([points, [[0.0, 0.0], [8.0, 4.0], [-0.5, 4.0], [9.0, 9.0]]])
+        self.check_all_at(arch, points)
+
+    def test_example(self):
+        arch = ExGeomArch()
+        self.check_all_at(arch, [(1.0, 1.0), (0.0, 0.0), (0.4, 0.3), (5.0, 5.0)])
+        self.check_all_at(arch, [(1.0, 1.0, 2.0), (0.0, 0.0, 0.0)])
+        self.assertEqual(arch.all_at_many([]), [])
+
+    def test_copies(self):
+        arch = GroundGeomArch()
+        arch.all_at_many([(0.0, 0.0)])
+        points = rover_points(50)
+        for cop in [arch.copy(), copy.deepcopy(arch), pickle.loads(pickle.dumps(arch))]:
+            self.check_all_at(cop, points)
+            self.assertTrue(is_prepared(cop.geoms['line'].on))
+
+
+if __name__ == '__main__':
+    archs = {'rover environment': (GroundGeomArch(), rover_points(1000)),
+             'city blocks (10x10)': (CityGeomArch(),
+                                     np.random.default_rng(1).uniform(-2.0, 102.0,
+                                                                      (1000, 2)))}
+    for name, (arch, points) in archs.items():
+        t_covers, t_all_at, t_many = bench_all_at(arch, points)
+        print(name + " (" + str(len(points)) + " points): covers: " +
+              str(round(t_covers, 3)) + "s, all_at: " + str(round(t_all_at, 3)) +
+              "s, all_at_many: " + str(round(t_many, 4)) + "s, speedup: " +
+              str(round(t_covers/t_all_at, 2)) + "x (all_at), " +
+              str(round(t_covers/t_many, 2)) + "x (all_at_many)")
+    unittest.main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for History logging, the columnar History backend, and shared
+nominal histories.
+
+Compares History.log (which compiles an accessor for each key) with the previous
+approach of re-parsing each key with get_var at every timestep, and the size of
+task pickles sent to a pool with and without a shared nominal history.
+"""
+import time
+import pickle
+import unittest
+import multiprocessing as mp
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.analyze import result
+from fmdtools.define.common import get_var
+from fmdtools.sim import propagate
+from fmdtools.sim.pool import ModelPool
+
+
+def log_by_parsing(hist, obj, t_ind, time=None):
+    """Reference (uncompiled) logging, where each key is parsed at each timestep."""
+    for att, h in hist.items():
+        split_att = att.split('.')
+        if att == 'time' and time is not None:
+            val = time
+        elif 'i' in split_att[:-1]:
+            i_ind = split_att.index('i')
+            methname = '.'.join(split_att[:i_ind] + ['indicate_'+split_att[-1]])
+            val = get_var(obj, methname)(time)
+        elif 'faults' in split_att[:-1]:
+            faultind = split_att.index('faults')
+            val = split_att[faultind+1] in get_var(obj, split_att[:faultind]).faults
+        else:
+            val = get_var(obj, att)
+        h[t_ind] = val
+
+
+def bench_log(mdl, num_logs=200, track='all'):
+    """Returns the time (s) to log num_logs timesteps with each approach."""
+    hist = mdl.create_hist(range(num_logs), track)
+    t0 = time.perf_counter()
+    for t in range(num_logs):
+        log_by_parsing(hist, mdl, t, time=float(t))
+    t_parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for t in range(num_logs):
+        hist.log(mdl, t, time=float(t))
+    t_compiled = time.perf_counter() - t0
+    return t_parse, t_compiled
+
+
+class HistoryLogTests(unittest.TestCase):
+    def check_same_log(self, mdl, track='all', num_logs=5):
+        hist = mdl.create_hist(range(num_logs), track)
+        ref_hist = hist.copy()
+        for t in range(num_logs):
+            mdl.propagate(t)
+            hist.log(mdl, t, time=float(t))
+            log_by_parsing(ref_hist, mdl, t, time=float(t))
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, ref_hist[k])
+
+    def test_pump_log(self):
+        self.check_same_log(Pump())
+
+    def test_rover_log(self):
+        self.check_same_log(Rover())
+
+    def test_log_fault(self):
+        mdl = Pump()
+        hist = mdl.create_hist(range(3), 'all')
+        mdl.fxns['move_water'].m.add_fault('mech_break')
+        hist.log(mdl, 2, time=2.0)
+        self.assertTrue(hist['fxns.move_water.m.faults.mech_break'][2])
+        self.assertFalse(hist['fxns.move_water.m.faults.short'][2])
+
+    def test_log_error(self):
+        mdl = Pump()
+        hist = mdl.create_hist(range(3), 'all')
+        hist['fxns.move_water.s.not_a_state'] = np.zeros(3)
+        with self.assertRaises(Exception):
+            hist.log(mdl, 0)
+
+
+class ColumnarHistoryTests(unittest.TestCase):
+    def setUp(self):
+        _, self.hist = propagate.nominal(Rover(), track='all')
+        _, self.chist = propagate.nominal(Rover(), track='all', columnar_hist=True)
+
+    def check_same_hist(self, hist, chist):
+        self.assertEqual([*hist.keys()], [*chist.keys()])
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, chist[k])
+
+    def test_same_as_hist(self):
+        self.assertEqual(self.chist.__class__.__name__, "ColumnarHistory")
+        self.check_same_hist(self.hist, self.chist)
+        self.assertEqual(self.hist.get_slice(10), self.chist.get_slice(10))
+        self.assertEqual(self.hist.get_memory(), self.chist.get_memory())
+
+    def test_copy(self):
+        chist = self.chist.copy()
+        self.check_same_hist(self.hist, chist)
+        chist['flows.pos_signal.s.x'][0] = 100.0
+        self.assertNotEqual(self.chist['flows.pos_signal.s.x'][0], 100.0)
+
+    def test_cut(self):
+        self.check_same_hist(self.hist.cut(20, newcopy=True),
+                             self.chist.cut(20, newcopy=True))
+        self.check_same_hist(self.hist.cut(20, 5), self.chist.cut(20, 5))
+
+    def test_pickle(self):
+        chist = pickle.loads(pickle.dumps(self.chist))
+        self.assertEqual(chist.__class__.__name__, "ColumnarHistory")
+        self.check_same_hist(self.hist, chist)
+
+    def test_setitem(self):
+        self.chist['flows.pos_signal.s.x'] = np.zeros(len(self.chist['time']))
+        chist = self.chist.copy()
+        np.testing.assert_array_equal(chist['flows.pos_signal.s.x'], 0.0)
+
+
+def bench_task_size(mdl):
+    """Returns the size (bytes) of the nominal history sent with each pool task when
+    pickled directly and as a SharedHistory."""
+    _, hist = propagate.nominal(mdl, track='all')
+    shared_hist = hist.as_shared()
+    try:
+        size_pickled = len(pickle.dumps(hist))
+        size_shared = len(pickle.dumps(shared_hist))
+    finally:
+        shared_hist.release()
+    return size_pickled, size_shared
+
+
+def num_attached(*args):
+    """Returns the number of shared memory blocks attached in the (worker) process."""
+    return len(result._attached_shms)
+
+
+class SharedHistoryTests(unittest.TestCase):
+    def setUp(self):
+        _, self.hist = propagate.nominal(Rover(), track='all')
+        self.shist = self.hist.as_shared()
+
+    def tearDown(self):
+        self.shist.release()
+
+    def test_attach(self):
+        shist = pickle.loads(pickle.dumps(self.shist))
+        self.assertEqual(shist.__class__.__name__, "SharedHistory")
+        self.assertEqual([*self.hist.keys()], [*shist.keys()])
+        for k, v in self.hist.items():
+            np.testing.assert_array_equal(v, shist[k])
+        with self.assertRaises(ValueError):
+            shist['flows.pos_signal.s.x'][0] = 100.0
+
+    def test_pickle_size(self):
+        self.assertLess(len(pickle.dumps(self.shist)), len(pickle.dumps(self.hist)))
+
+    def test_cut(self):
+        shist = self.shist.cut(10, newcopy=True)
+        np.testing.assert_array_equal(shist['time'], self.hist['time'][:11])
+        shist = pickle.loads(pickle.dumps(self.shist.flatten().cut(10)))
+        np.testing.assert_array_equal(shist['time'], self.hist['time'][:11])
+
+    def test_pool_share_nomhist(self):
+        res, hist = propagate.single_faults(Pump(), staged=True, showprogress=False)
+        with mp.Pool(2) as pool:
+            shared_res, shared_hist = propagate.single_faults(Pump(), staged=True,
+                                                              pool=pool,
+                                                              share_nomhist=True,
+                                                              showprogress=False)
+        self.assertEqual(res, shared_res)
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, shared_hist[k])
+
+    def test_persistent_pool_attachments(self):
+        res, hist = propagate.single_faults(Pump(), staged=True, showprogress=False)
+        with ModelPool(Pump(), 2) as pool:
+            for i in range(3):
+                shared_res, _ = propagate.single_faults(Pump(), staged=True, pool=pool,
+                                                        share_nomhist=True,
+                                                        showprogress=False)
+                self.assertEqual(res, shared_res)
+                # attachments are closed in the workers when their tasks finish
+                self.assertEqual(pool.map(num_attached, range(4), chunksize=1),
+                                 [0, 0, 0, 0])
+
+    def test_release_attached(self):
+        shist = pickle.loads(pickle.dumps(self.shist))
+        shist2 = pickle.loads(pickle.dumps(self.shist))
+        self.assertEqual(len(result._attached_shms), len(self.shist._shms))
+        shist.release()
+        np.testing.assert_array_equal(shist2['time'], self.hist['time'])
+        del shist2
+        self.assertEqual(len(result._attached_shms), 0)
+
+
+if __name__ == '__main__':
+    for mdl in [Pump(), Rover()]:
+        t_parse, t_compiled = bench_log(mdl, num_logs=2000)
+        print(mdl.__class__.__name__ + ": parsed: " + str(round(t_parse, 4)) +
+              "s, compiled: " + str(round(t_compiled, 4)) + "s, speedup: " +
+              str(round(t_parse/t_compiled, 2)) + "x")
+    for mdl in [Pump(), Rover()]:
+        size_pickled, size_shared = bench_task_size(mdl)
+        print(mdl.__class__.__name__ + ": pickled nomhist: " + str(size_pickled) +
+              " bytes/task, shared nomhist: " + str(size_shared) + " bytes/task")
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for importing fmdtools, where the modules of fmdtools.analyze (and
+the matplotlib/pandas dependencies they import) are only imported when first used.
+
+Compares the time to import fmdtools.define and fmdtools.sim (e.g., in a worker
+process which only simulates models) with the time to also import the modules of
+fmdtools.analyze (which were previously always imported), each in a new process.
+"""
+import subprocess
+import sys
+import time
+import unittest
+
+heavy_modules = ['matplotlib', 'pandas', 'scipy.stats']
+
+
+def run_python(code):
+    """Runs the code in a new python process, returning what it prints."""
+    return subprocess.run([sys.executable, "-c", code], capture_output=True,
+                          text=True, check=True).stdout
+
+
+def loaded_modules(code, modules=heavy_modules):
+    """Gets the modules (of the given modules) imported after running the code."""
+    check = ("\nimport sys\nprint(*[m for m in " + str(modules) +
+             " if m in sys.modules])")
+    return run_python(code + check).split()
+
+
+def bench_import(reps=5):
+    """Returns the time (s) to import fmdtools.define/sim and to also import the
+    modules of fmdtools.analyze (minus the time to start python)."""
+    times = []
+    for code in ["pass",
+                 "import fmdtools.define, fmdtools.sim",
+                 "import fmdtools.define, fmdtools.sim\n" +
+                 "from fmdtools.analyze import graph, plot, show, tabulate"]:
+        t0 = time.perf_counter()
+        for i in range(reps):
+            run_python(code)
+        times.append((time.perf_counter() - t0)/reps)
+    return times[1] - times[0], times[2] - times[0]
+
+
+class ImportTests(unittest.TestCase):
+    def test_define_sim(self):
+        self.assertEqual(loaded_modules("import fmdtools.define, fmdtools.sim"), [])
+        self.assertEqual(loaded_modules("import fmdtools"), [])
+
+    def test_simulate(self):
+        code = ("from examples.pump.ex_pump import Pump\n" +
+                "from fmdtools.sim import propagate\n" +
+                "propagate.single_faults(Pump(), showprogress=False)")
+        self.assertEqual(loaded_modules(code), [])
+
+    def test_analyze(self):
+        self.assertEqual(loaded_modules("import fmdtools.analyze.result"), [])
+        code = "import fmdtools.analyze as an\nan.plot"
+        self.assertEqual(loaded_modules(code, ['matplotlib', 'pandas']),
+                         ['matplotlib', 'pandas'])
+        code = "import fmdtools\nprint(fmdtools.analyze.graph.Graph.__name__)"
+        self.assertEqual(run_python(code).split(), ['Graph'])
+        with self.assertRaises(AttributeError):
+            import fmdtools.analyze as an
+            an.not_a_module
+
+
+if __name__ == '__main__':
+    t_sim, t_all = bench_import()
+    print("import fmdtools.define/sim: " + str(round(t_sim, 3)) +
+          "s, with fmdtools.analyze modules: " + str(round(t_all, 3)) +
+          "s, speedup: " + str(round(t_all/t_sim, 2)) + "x")
+    unittest.main()
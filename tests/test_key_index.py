@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for finding Result/History keys using the KeyIndex.
+
+Compares get_values/get_scens/get_comp_groups using the index with the previous
+implementations, which scan every key of the result for each query.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from fmdtools.sim import propagate
+from fmdtools.analyze.result import Result, History, KeyIndex
+
+
+def get_values_by_scan(res, *values):
+    """Gets values by scanning each key (i.e., without the KeyIndex)."""
+    flatres = res.flatten()
+    return [k for k in flatres.keys() for v in values if k.endswith(v)]
+
+
+def get_scens_by_scan(res, *scens):
+    """Gets scenarios by scanning each key (i.e., without the KeyIndex)."""
+    return [k for k in res.keys()
+            for s in scens if k.startswith(s+".") or '.'+s+'.' in k]
+
+
+def get_comp_groups_by_scan(res, *values, **groups):
+    """Gets comparison groups by scanning each key (i.e., without the KeyIndex)."""
+    values = values + ('time', )
+    group_keys = {}
+    for group, scens in groups.items():
+        if type(scens) == str:
+            scens = [scens]
+        group_keys[group] = [k for k in res.keys() for scen in scens for v in values
+                             if k.startswith(scen) and k.endswith(v) and '.t.' not in k]
+    return group_keys
+
+
+def make_endclasses(num_scens=10000, metrics=('rate', 'cost', 'expected_cost', 'prob')):
+    """Makes a (flat) endclass result with num_scens scenarios."""
+    res = Result()
+    for i in range(num_scens):
+        for metric in metrics:
+            res['scen_'+str(i)+'.endclass.'+metric] = float(i)
+    return res
+
+
+def bench_get_values(num_scens=10000, num_queries=20):
+    """Returns the time (s) to run num_queries get_values calls by scanning keys and
+    using the KeyIndex (including the time to build the index)."""
+    res = make_endclasses(num_scens)
+    metrics = ['rate', 'cost', 'expected_cost', 'prob']
+    t0 = time.perf_counter()
+    for i in range(num_queries):
+        get_values_by_scan(res, metrics[i % 4])
+    t_scan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(num_queries):
+        res.get_values(metrics[i % 4])
+    t_index = time.perf_counter() - t0
+    return t_scan, t_index
+
+
+def bench_get_scens(num_scens=2000, num_queries=200):
+    """Returns the time (s) to get num_queries scenarios by scanning keys and using the
+    KeyIndex."""
+    res = make_endclasses(num_scens)
+    t0 = time.perf_counter()
+    for i in range(num_queries):
+        get_scens_by_scan(res, 'scen_'+str(i))
+    t_scan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(num_queries):
+        res.get_scens('scen_'+str(i))
+    t_index = time.perf_counter() - t0
+    return t_scan, t_index
+
+
+class KeyIndexTests(unittest.TestCase):
+    def setUp(self):
+        mdl = Pump()
+        self.res, self.hist = propagate.single_faults(mdl, track='all',
+                                                      showprogress=False)
+
+    def test_get_values(self):
+        for values in [('s.eff',), ('eff',), ('.rate', 'cost'), ('m.mode', 'time'),
+                       ('fxns.move_water.s.eff',), ('nominal.time',), ('x',)]:
+            for res in [self.res, self.hist, self.hist.nest(1)]:
+                self.assertEqual([*res.get_values(*values).keys()],
+                                 get_values_by_scan(res, *values))
+
+    def test_get_scens(self):
+        scens = [*self.hist.nest(1).keys()]
+        for scen in [scens[0], scens[-1], 'move_water', 'fxns', 'nominal', 'x']:
+            self.assertEqual([*self.hist.get_scens(scen).keys()],
+                             get_scens_by_scan(self.hist, scen))
+        self.assertEqual([*self.res.get_scens(*scens[:3]).keys()],
+                         get_scens_by_scan(self.res, *scens[:3]))
+
+    def test_get_comp_groups(self):
+        scens = [*self.hist.nest(1).keys()]
+        groups = {'nominal': 'nominal', 'faulty': scens[1:],
+                  'prefix': ['import_ee', 'move_water'], 'dotted': [scens[2]+'.fxns']}
+        group_hist = self.hist.get_comp_groups('s.eff', 'flows.ee_1.s.rate', **groups)
+        group_keys = get_comp_groups_by_scan(self.hist, 's.eff', 'flows.ee_1.s.rate',
+                                             **groups)
+        for group, keys in group_keys.items():
+            self.assertEqual([*group_hist[group].keys()], keys)
+
+    def test_nest(self):
+        nest = self.hist.nest(1)
+        self.assertEqual({*nest.keys()}, {k.split('.')[0] for k in self.hist})
+        for scen, scenhist in nest.items():
+            for k, v in scenhist.items():
+                np.testing.assert_array_equal(v, self.hist[scen+'.'+k])
+
+    def test_all_with(self):
+        self.assertEqual([*self.hist.nominal.keys()],
+                         [k[8:] for k in self.hist if k.startswith('nominal.')])
+        np.testing.assert_array_equal(self.hist.nominal.fxns.move_water.s.eff,
+                                      self.hist['nominal.fxns.move_water.s.eff'])
+
+    def test_invalidation(self):
+        res = Result({'a.x': 1.0, 'b.x': 2.0})
+        self.assertEqual([*res.get_values('x')], ['a.x', 'b.x'])
+        index = res.get_key_index()
+        self.assertIs(index, res.get_key_index())
+        res['c.x'] = 3.0
+        self.assertEqual([*res.get_values('x')], ['a.x', 'b.x', 'c.x'])
+        del res['a.x']
+        res['a.y'] = 4.0
+        self.assertEqual([*res.get_values('x')], ['b.x', 'c.x'])
+        self.assertEqual([*res.get_values('y')], ['a.y'])
+        res.d = 5.0
+        self.assertEqual([*res.get_scens('d')], [])
+        self.assertEqual(res.all_with('d'), 5.0)
+        res.data = {'e.x': 6.0}
+        self.assertEqual([*res.get_values('x')], ['e.x'])
+        self.assertTrue(res.is_flat())
+        res['e.x'] = Result({'z': 1.0})
+        self.assertFalse(res.is_flat())
+        self.assertEqual([*res.get_values('z')], ['e.x.z'])
+
+    def test_index(self):
+        index = KeyIndex({'a.b.c': 1, 'a.c': 2, 'b': 3, 0: 4})
+        self.assertEqual(index.with_suffix('c'), ['a.b.c', 'a.c'])
+        self.assertEqual(index.with_suffix('b.c'), ['a.b.c'])
+        self.assertEqual(index.with_prefix('a'), ['a.b.c', 'a.c'])
+        self.assertEqual(index.with_prefix('b'), ['b'])
+        self.assertEqual(index.with_inner('b'), ['a.b.c'])
+        self.assertEqual([*index.first_keys()], ['a', 'b'])
+
+
+if __name__ == '__main__':
+    t_scan, t_index = bench_get_values()
+    print("get_values (10000 scenarios, 20 queries): scan: " + str(round(t_scan, 3)) +
+          "s, index: " + str(round(t_index, 3)) + "s, speedup: " +
+          str(round(t_scan/t_index, 2)) + "x")
+    t_scan, t_index = bench_get_scens()
+    print("get_scens (2000 scenarios, 200 queries): scan: " + str(round(t_scan, 3)) +
+          "s, index: " + str(round(t_index, 3)) + "s, speedup: " +
+          str(round(t_scan/t_index, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for running simulations in a persistent ModelPool.
+
+Compares running successive approaches in a multiprocessing pool (which pickles and
+re-builds models for each scenario) with a ModelPool (which keeps pre-built models in
+the workers between tasks and calls).
+"""
+import time
+import unittest
+import multiprocessing as mp
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach, NominalApproach
+from fmdtools.sim.pool import ModelPool
+
+
+def bench_pool(mdl, num_calls=5, processes=2, **kwargs):
+    """Returns the time (s) to run single_faults num_calls times in a multiprocessing
+    pool and a ModelPool."""
+    with mp.Pool(processes) as pool:
+        t0 = time.perf_counter()
+        for i in range(num_calls):
+            propagate.single_faults(mdl, pool=pool, close_pool=False,
+                                    showprogress=False, **kwargs)
+        t_pool = time.perf_counter() - t0
+    with ModelPool(mdl, processes) as pool:
+        t0 = time.perf_counter()
+        for i in range(num_calls):
+            propagate.single_faults(mdl, pool=pool, showprogress=False, **kwargs)
+        t_mdlpool = time.perf_counter() - t0
+    return t_pool, t_mdlpool
+
+
+class ModelPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                         'numpts': 2})
+
+    def check_same_results(self, res, hist, pool_res, pool_hist):
+        self.assertEqual(res, pool_res)
+        self.assertEqual([*hist.keys()], [*pool_hist.keys()])
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, pool_hist[k])
+
+    def test_approach(self):
+        with ModelPool(self.mdl, 2) as pool:
+            for staged in [False, True]:
+                res, hist = propagate.approach(self.mdl, self.app, staged=staged,
+                                               track='all', showprogress=False)
+                for i in range(2):
+                    pool_res, pool_hist = propagate.approach(self.mdl, self.app,
+                                                             staged=staged,
+                                                             track='all', pool=pool,
+                                                             showprogress=False)
+                    self.check_same_results(res, hist, pool_res, pool_hist)
+
+    def test_nominal_approach(self):
+        nomapp = NominalApproach()
+        nomapp.add_seed_replicates('replicates', 4)
+        res, hist = propagate.nominal_approach(self.mdl, nomapp, run_stochastic=True,
+                                               showprogress=False)
+        with ModelPool(self.mdl, 2) as pool:
+            pool_res, pool_hist = propagate.nominal_approach(self.mdl, nomapp,
+                                                             run_stochastic=True,
+                                                             pool=pool,
+                                                             showprogress=False)
+        self.check_same_results(res, hist, pool_res, pool_hist)
+
+    def test_rover(self):
+        mdl = Rover()
+        res, hist = propagate.single_faults(mdl, staged=True, showprogress=False)
+        with ModelPool(mdl, 2) as pool:
+            pool_res, pool_hist = propagate.single_faults(mdl, staged=True, pool=pool,
+                                                          showprogress=False)
+        self.check_same_results(res, hist, pool_res, pool_hist)
+
+
+if __name__ == '__main__':
+    for mdl in [Pump(), Rover()]:
+        for staged in [False, True]:
+            t_pool, t_mdlpool = bench_pool(mdl, staged=staged)
+            print(mdl.__class__.__name__ + " (staged=" + str(staged) + "): pool: " +
+                  str(round(t_pool, 3)) + "s, ModelPool: " + str(round(t_mdlpool, 3)) +
+                  "s, speedup: " + str(round(t_pool/t_mdlpool, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for running sequences of faults by their shared prefix of injections.
+
+Compares sequences run with the prefix_tree option, which simulates each shared prefix
+of injections once and forks the scenarios from copies of the model where they
+diverge, with the same sequences each simulated from the start (or staged copy).
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from fmdtools.sim import propagate
+from fmdtools.sim.propagate import plan_prefix_tree
+
+
+def make_seqs(times, first_faults=[('export_water', 'block'), ('import_ee', 'inf_v')],
+              second_fault=('move_water', 'mech_break')):
+    """Makes sequences of a second fault injected at the given times after each of the
+    given first faults (at t=10), along with the first faults on their own."""
+    seqs = {}
+    for fxn, fault in first_faults:
+        first = {10: {'faults': {fxn: [fault]}}}
+        seqs[fxn+'_'+fault] = first
+        for t in times:
+            seqs[fxn+'_'+fault+'_'+str(t)] = {**first,
+                                              t: {'faults': {second_fault[0]:
+                                                             [second_fault[1]]}}}
+    return seqs
+
+
+def bench_prefix_tree(times=range(12, 55)):
+    """Returns the time (s) to run sequences of the pump with and without the
+    prefix_tree option."""
+    mdl = Pump()
+    seqs = make_seqs(times)
+    t0 = time.perf_counter()
+    propagate.sequences(mdl, seqs, staged=True, showprogress=False)
+    t_seq = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    propagate.sequences(mdl, seqs, staged=True, showprogress=False, prefix_tree=True)
+    t_tree = time.perf_counter() - t0
+    return t_seq, t_tree, len(seqs)
+
+
+class PrefixTreeTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+
+    def check_same(self, res, hist, ref_res, ref_hist):
+        self.assertEqual([*res.keys()], [*ref_res.keys()])
+        for k, v in ref_res.items():
+            np.testing.assert_array_equal(res[k], v)
+        self.assertEqual([*hist.keys()], [*ref_hist.keys()])
+        for k, v in ref_hist.items():
+            np.testing.assert_array_equal(hist[k], v)
+
+    def test_same_results(self):
+        seqs = make_seqs([15, 30, 45, 60])
+        seqs['dist'] = {5: {'disturbances': {'flows.wat_1.s.level': 0.5}},
+                        20: {'faults': {'import_ee': ['no_v']}}}
+        seqs['dup'] = seqs['export_water_block_30']
+        seqs['third'] = {**seqs['export_water_block_30'],
+                         40: {'faults': {'import_ee': ['no_v']}}}
+        for staged in [False, True]:
+            res, hist = propagate.sequences(self.mdl, seqs, staged=staged, track='all',
+                                            showprogress=False)
+            res_tree, hist_tree = propagate.sequences(self.mdl, seqs, staged=staged,
+                                                      track='all', prefix_tree=True,
+                                                      showprogress=False)
+            self.check_same(res_tree, hist_tree, res, hist)
+
+    def test_end_condition(self):
+        mdl = Pump(sp={'end_condition': 'indicate_on'})
+        seqs = make_seqs([15, 30])
+        for staged in [False, True]:
+            res, hist = propagate.sequences(mdl, seqs, staged=staged, track='all',
+                                            showprogress=False)
+            res_tree, hist_tree = propagate.sequences(mdl, seqs, staged=staged,
+                                                      track='all', prefix_tree=True,
+                                                      showprogress=False)
+            self.check_same(res_tree, hist_tree, res, hist)
+
+    def test_comparison(self):
+        seqs = make_seqs([15, 30])
+        scens = [propagate.Scenario(sequence=seq, name=name, time=min(seq))
+                 for name, seq in seqs.items()]
+        kwargs = dict(staged=True, track='all', compare_nominal=True)
+        nomresult, nomhist, _, c_mdl, _ = propagate.nom_helper(self.mdl, [10],
+                                                               use_end_condition=False,
+                                                               **kwargs)
+        comps = {}
+        for prefix_tree in [False, True]:
+            scen_iter = propagate.iter_scenarios(self.mdl, scens, c_mdl,
+                                                 nomhist=nomhist, nomresult=nomresult,
+                                                 prefix_tree=prefix_tree, **kwargs)
+            comps[prefix_tree] = {name: hist.get_comparison()
+                                  for name, _, hist in scen_iter}
+        for name, comp in comps[False].items():
+            self.assertEqual(comps[True][name].num_deg, comp.num_deg)
+            self.assertEqual(comps[True][name].first_deg, comp.first_deg)
+            self.assertEqual(comps[True][name].num_faulty, comp.num_faulty)
+
+    def test_plan(self):
+        scens = [('0', 'a', [(1, 'x'), (5, 'y')]), ('1', 'b', [(1, 'x'), (3, 'z')]),
+                 ('2', 'c', [(1, 'x'), (5, 'y'), (8, 'w')]),
+                 ('3', 'd', [(1, 'x'), (5, 'y')])]
+        carrier, forks = plan_prefix_tree(scens, 1)
+        self.assertEqual(carrier[1], 'a')
+        self.assertEqual([(t, [s[1] for s in fork_scens], k)
+                          for t, fork_scens, k in forks],
+                         [(5, ['d'], 2), (8, ['c'], 3), (3, ['b'], 2)])
+
+
+if __name__ == '__main__':
+    t_seq, t_tree, num_seqs = bench_prefix_tree()
+    print("pump fault sequences (" + str(num_seqs) + " scenarios): simulated from start: "
+          + str(round(t_seq, 3)) + "s, prefix tree: " + str(round(t_tree, 3)) +
+          "s, speedup: " + str(round(t_seq/t_tree, 2)) + "x")
+    unittest.main()
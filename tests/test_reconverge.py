@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for ending simulations early when the faulty history returns to
+nominal.
+
+Compares scenarios run with the reconverge_window option, which stops simulating once
+the history has matched the nominal history for a given number of timesteps (filling
+the rest from nominal), with the same scenarios simulated to the end.
+"""
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+from fmdtools.sim.scenario import Sequence, Scenario
+from fmdtools.analyze.result import History, NominalComparison
+
+
+def disturbance_scens(times, var='flows.wat_1.s.level', val=0.5):
+    """Makes scenarios with a (transient) disturbance at each of the given times."""
+    return [Scenario(sequence=Sequence(disturbances={t: {var: val}}), rate=1.0,
+                     name='dist_'+str(t), time=t) for t in times]
+
+
+def run_scens(mdl, scens, **kwargs):
+    """Runs the scenarios individually, returning the nominal history, the results and
+    histories of each scenario, and the last simulated time of each scenario."""
+    _, nomhist, _, _, _, nomsnapshot = propagate.nom_helper(mdl, [], track='all',
+                                                            with_snapshot=True,
+                                                            **kwargs)
+    results, hists, end_times = {}, {}, {}
+    for scen in scens:
+        scen_mdl = mdl.new_with_params()
+        with mock.patch.object(type(mdl), 'propagate', autospec=True,
+                               side_effect=type(mdl).propagate) as prop:
+            results[scen.name], hists[scen.name], _, _ = propagate.prop_one_scen(
+                scen_mdl, scen, nomhist=nomhist, nomsnapshot=nomsnapshot,
+                track='all', **kwargs)
+        end_times[scen.name] = prop.call_args[0][1]
+    return nomhist, results, hists, end_times
+
+
+def run_staged(mdl, scens, **kwargs):
+    """Runs the scenarios (staged) from copies of the nominal model at their times,
+    returning the results and histories and the time (s) to run the scenarios."""
+    kwargs = {**propagate.pack_run_kwargs(**kwargs), **kwargs}
+    times = sorted({t for scen in scens for t in scen.sequence})
+    nomresult, nomhist, _, c_mdl, _ = propagate.nom_helper(mdl, times, staged=True,
+                                                           track='all',
+                                                           use_end_condition=False)
+    t0 = time.perf_counter()
+    results, hists = propagate.scenlist_helper(mdl, scens, c_mdl, staged=True,
+                                               track='all', nomhist=nomhist,
+                                               nomresult=nomresult,
+                                               showprogress=False, **kwargs)
+    return results, hists, time.perf_counter() - t0
+
+
+def bench_reconverge(window=5):
+    """Returns the time (s) to run (staged) transient disturbance scenarios of the pump
+    to the end of the simulation and with the reconverge_window option."""
+    mdl = Pump()
+    scens = disturbance_scens(range(5, 50, 2))
+    _, _, t_full = run_staged(mdl, scens)
+    _, _, t_reconverge = run_staged(mdl, scens, reconverge_window=window)
+    return t_full, t_reconverge
+
+
+class ReconvergeTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+
+    def check_same_results(self, results, ref):
+        for scen, result in results.items():
+            for k, v in ref[scen].flatten().items():
+                np.testing.assert_array_equal(result.flatten()[k], v)
+
+    def check_same_hists(self, hists, ref):
+        for scen, hist in hists.items():
+            self.assertEqual([*hist.keys()], [*ref[scen].keys()])
+            for k, v in ref[scen].items():
+                np.testing.assert_array_equal(hist[k], v)
+
+    def test_disturbances(self):
+        for var, val in [('flows.wat_1.s.level', 0.5), ('flows.ee_1.s.current', 0.0)]:
+            scens = disturbance_scens([5, 20, 50], var=var, val=val)
+            _, results, hists, end_times = run_scens(self.mdl, scens,
+                                                     reconverge_window=5)
+            _, ref_results, ref_hists, ref_end_times = run_scens(self.mdl, scens)
+            self.check_same_results(results, ref_results)
+            self.check_same_hists(hists, ref_hists)
+            self.assertLess(end_times['dist_5'], ref_end_times['dist_5'])
+            self.assertLess(end_times['dist_20'], ref_end_times['dist_20'])
+
+    def test_staged(self):
+        scens = disturbance_scens([5, 20, 50])
+        results, hists, _ = run_staged(self.mdl, scens, reconverge_window=5)
+        ref_results, ref_hists, _ = run_staged(self.mdl, scens)
+        self.check_same_results(results, ref_results)
+        self.check_same_hists(hists, ref_hists)
+
+    def test_window(self):
+        scens = disturbance_scens([10])
+        _, _, hists, end_times = run_scens(self.mdl, scens, reconverge_window=50)
+        _, _, ref_hists, ref_end_times = run_scens(self.mdl, scens)
+        self.check_same_hists(hists, ref_hists)
+        self.assertEqual(end_times, ref_end_times)
+        for window in [1, 20]:
+            _, _, _, end_times = run_scens(self.mdl, scens, reconverge_window=window)
+            self.assertGreaterEqual(end_times['dist_10'], 10 + window)
+            self.assertLessEqual(end_times['dist_10'], 10 + window + min(window, 16))
+
+    def test_end_state(self):
+        # rover recovers from the disturbance, but keeps driving after it reconverges
+        mdl = Rover()
+        scens = disturbance_scens([5], var='flows.motor_control.s.rpower', val=0.0)
+        _, results, hists, end_times = run_scens(mdl, scens, reconverge_window=5,
+                                                 use_end_condition=False)
+        _, ref_results, ref_hists, ref_end_times = run_scens(mdl, scens,
+                                                             use_end_condition=False)
+        self.check_same_results(results, ref_results)
+        self.check_same_hists(hists, ref_hists)
+        self.assertLess(end_times['dist_5'], ref_end_times['dist_5'])
+        self.assertEqual(results['dist_5'].endclass.classification,
+                         'incomplete mission')
+        np.testing.assert_allclose(results['dist_5'].endclass.endpt, [27.47, 0.90],
+                                   atol=0.01)
+        # (the end condition may be met at a different time than in the nominal run)
+        disturbances = {5: {'flows.motor_control.s.rpower': 0.0}}
+        for use_end_condition in [True, False]:
+            res, hist = propagate.sequence(mdl, disturbances=disturbances, track='all',
+                                           reconverge_window=5, showprogress=False,
+                                           use_end_condition=use_end_condition)
+            ref_res, ref_hist = propagate.sequence(mdl, disturbances=disturbances,
+                                                   track='all', showprogress=False,
+                                                   use_end_condition=use_end_condition)
+            self.check_same_results({'dist_5': res}, {'dist_5': ref_res})
+            self.check_same_hists({'dist_5': hist}, {'dist_5': ref_hist})
+
+    def test_untracked_faults(self):
+        # faults/modes are not tracked by default, but still prevent reconvergence
+        res = propagate.single_faults(self.mdl, staged=True, showprogress=False)[0]
+        res_rec = propagate.single_faults(self.mdl, staged=True, reconverge_window=3,
+                                          showprogress=False)[0]
+        self.assertEqual(res, res_rec)
+        self.assertAlmostEqual(res_rec['import_ee_no_v_t0.endclass.cost'], 20125)
+
+    def test_persistent_faults(self):
+        app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                    'numpts': 2})
+        for staged in [False, True]:
+            res, hist = propagate.approach(self.mdl, app, staged=staged, track='all',
+                                           showprogress=False)
+            res_rec, hist_rec = propagate.approach(self.mdl, app, staged=staged,
+                                                   track='all', reconverge_window=3,
+                                                   showprogress=False)
+            self.assertEqual(res, res_rec)
+            for k, v in hist.items():
+                np.testing.assert_array_equal(v, hist_rec[k])
+
+    def test_fill_nominal(self):
+        nomhist = History({'a': np.arange(10.0), 'time': np.arange(10.0)})
+        hist = History({'a': np.zeros(10), 'time': np.arange(10.0)})
+        comp = NominalComparison(hist, nomhist, batch=1)
+        hist['a'][:4] = [0.0, 5.0, 5.0, 3.0]
+        for t_ind in range(4):
+            comp.update(t_ind)
+        self.assertEqual(comp.last_diff_ind, 2)
+        self.assertEqual(comp.num_matching(), 1)
+        self.assertEqual(comp.num_matching(after_ind=3), 0)
+        self.assertEqual(comp.fill_nominal(), 10)
+        np.testing.assert_array_equal(hist['a'][3:], nomhist['a'][3:])
+        self.assertEqual(comp.num_deg['a'], 2)
+        self.assertEqual(comp.num_matching(), 7)
+
+    def test_incomplete(self):
+        nomhist = History({'time': np.arange(10.0)})
+        hist = History({'a': np.zeros(10), 'time': np.arange(10.0)})
+        comp = NominalComparison(hist, nomhist)
+        self.assertFalse(comp.complete)
+        self.assertEqual(comp.missing, ['a'])
+        with self.assertRaises(Exception):
+            comp.fill_nominal()
+
+
+if __name__ == '__main__':
+    t_full, t_reconverge = bench_reconverge()
+    print("transient disturbance scenarios: simulated to end: " + str(round(t_full, 3)) +
+          "s, reconverge_window=5: " + str(round(t_reconverge, 3)) + "s, speedup: " +
+          str(round(t_full/t_reconverge, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for scheduling scenarios in a pool (schedule='longest_first').
+
+Compares the time to run a staged approach sampling faults at many times on the
+multirotor model in a pool using pool.map (in scenario order) with longest-first
+scheduling via imap_unordered.
+"""
+import time
+import unittest
+import multiprocessing as mp
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.multirotor.drone_mdl_dynamic import Drone
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+
+
+def bench_schedule(mdl_class, numpts=10, processes=16, chunksize=1, reps=3):
+    """Returns the time (s) to run an approach sampling each fault at numpts times
+    per phase in a pool with the default and longest-first scheduling."""
+    app = SampleApproach(mdl_class(), defaultsamp={'samp': 'evenspacing',
+                                                   'numpts': numpts})
+    t_map = []
+    t_sched = []
+    with mp.Pool(processes) as pool:
+        for i in range(reps):
+            t0 = time.perf_counter()
+            propagate.approach(mdl_class(), app, staged=True, pool=pool,
+                               close_pool=False, showprogress=False)
+            t_map.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            propagate.approach(mdl_class(), app, staged=True, pool=pool,
+                               close_pool=False, showprogress=False,
+                               schedule='longest_first', chunksize=chunksize)
+            t_sched.append(time.perf_counter() - t0)
+    return min(t_map), min(t_sched)
+
+
+class ScheduleTests(unittest.TestCase):
+    def test_costs(self):
+        mdl = Pump()
+        _, nomhist = propagate.nominal(mdl)
+        scenlist = propagate.list_init_faults(mdl)
+        scenlist = [scenlist[0].copy_with(time=t) for t in [0.0, 50.0, 20.0]]
+        costs = propagate.estimate_scen_costs(scenlist, nomhist, sp=mdl.sp,
+                                              staged=True)
+        self.assertEqual([*np.argsort(-costs)], [0, 2, 1])
+        # non-staged scenarios are all simulated from the start of the simulation
+        costs = propagate.estimate_scen_costs(scenlist, nomhist, sp=mdl.sp,
+                                              staged=False)
+        self.assertEqual(len(set(costs)), 1)
+        self.assertEqual(costs[0], len(nomhist['time']))
+
+    def test_same_schedule(self):
+        res, hist = propagate.single_faults(Drone(), staged=True, showprogress=False)
+        with mp.Pool(2) as pool:
+            sched_res, sched_hist = propagate.single_faults(Drone(), staged=True,
+                                                            pool=pool,
+                                                            schedule='longest_first',
+                                                            chunksize=4,
+                                                            showprogress=False)
+        self.assertEqual([*res.keys()], [*sched_res.keys()])
+        self.assertEqual([*hist.keys()], [*sched_hist.keys()])
+        for k, v in res.items():
+            np.testing.assert_array_equal(v, sched_res[k])
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, sched_hist[k])
+
+    def test_invalid_schedule(self):
+        with mp.Pool(1) as pool:
+            with self.assertRaises(Exception):
+                propagate.single_faults(Pump(), pool=pool, schedule='shortest_first',
+                                        showprogress=False)
+
+
+if __name__ == '__main__':
+    t_map, t_sched = bench_schedule(Drone)
+    print("Drone approach, 10 pts/phase (16 workers): map: " + str(round(t_map, 3)) +
+          "s, longest_first: " + str(round(t_sched, 3)) + "s, speedup: " +
+          str(round(t_map/t_sched, 2)) + "x")
+    unittest.main()
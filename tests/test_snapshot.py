@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for model snapshots and snapshot-based staged execution.
+
+Compares restoring a model skeleton using Model.get_snapshot/load_snapshot
+(staged='snapshot') with copying the model for each scenario (staged=True).
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from examples.tank.tank_model import Tank
+from examples.multirotor.drone_mdl_dynamic import Drone
+from fmdtools.sim import propagate
+
+
+def init_staged(mdl, num_times=20):
+    """Creates the history of the model and propagates it for num_times timesteps."""
+    hist = mdl.create_hist(range(num_times), 'all')
+    for t in range(num_times):
+        mdl.propagate(t)
+        hist.log(mdl, t, time=float(t))
+    return mdl
+
+
+def bench_copy(mdl, reps=50):
+    """Returns the copies/s of the model using Model.copy and Model.load_snapshot."""
+    init_staged(mdl)
+    t0 = time.perf_counter()
+    for i in range(reps):
+        propagate.copy_staged(mdl)
+    t_copy = time.perf_counter() - t0
+    skeleton = propagate.copy_staged(mdl)
+    snap = mdl.get_snapshot()
+    t0 = time.perf_counter()
+    for i in range(reps):
+        skeleton.load_snapshot(snap)
+    t_snap = time.perf_counter() - t0
+    return reps/t_copy, reps/t_snap
+
+
+class SnapshotTests(unittest.TestCase):
+    def test_load_snapshot(self):
+        mdl = init_staged(Pump())
+        snap = mdl.get_snapshot()
+        mdl.fxns['move_water'].m.add_fault('mech_break')
+        mdl.fxns['move_water'].s.eff = 0.0
+        mdl.flows['wat_1'].s.flowrate = 10.0
+        mdl.load_snapshot(snap)
+        self.assertFalse(mdl.fxns['move_water'].m.faults)
+        self.assertEqual(mdl.fxns['move_water'].s.eff, 1.0)
+        self.assertEqual(mdl.flows['wat_1'].s.flowrate, snap['flows']['wat_1'][0])
+
+    def test_timer_snapshot(self):
+        mdl = init_staged(Pump())
+        snap = mdl.get_snapshot()
+        timer = mdl.fxns['move_water'].t.pressure_limit
+        timer.set_timer(5.0, tstep=-2.0)
+        timer.inc()
+        mdl.load_snapshot(snap)
+        # tstep set in one scenario does not carry into the next
+        self.assertEqual(timer.tstep, -1.0)
+        self.assertEqual(timer.time, 0.0)
+        timer.set_timer(5.0)
+        timer.inc()
+        self.assertEqual(timer.time, 4.0)
+
+    def test_independent_hist(self):
+        mdl = init_staged(Rover())
+        snap = mdl.get_snapshot()
+        mdl.load_snapshot(snap)
+        hist = mdl.h
+        mdl.load_snapshot(snap)
+        hist['flows.pos_signal.s.x'][0] = 100.0
+        self.assertNotEqual(mdl.h['flows.pos_signal.s.x'][0], 100.0)
+        self.assertIs(mdl.flows['pos_signal'].h['s.x'], mdl.h['flows.pos_signal.s.x'])
+
+    def check_same_staged(self, mdl_class):
+        res, hist = propagate.single_faults(mdl_class(), staged=True, track='all',
+                                            showprogress=False)
+        snap_res, snap_hist = propagate.single_faults(mdl_class(), staged='snapshot',
+                                                      track='all', showprogress=False)
+        self.assertEqual([*res.keys()], [*snap_res.keys()])
+        for k, v in res.items():
+            np.testing.assert_array_equal(v, snap_res[k])
+        snap_hist = snap_hist.flatten()
+        for k, v in hist.flatten().items():
+            np.testing.assert_array_equal(v, snap_hist[k])
+
+    def test_pump_staged(self):
+        self.check_same_staged(Pump)
+
+    def test_rover_staged(self):
+        self.check_same_staged(Rover)
+
+    def test_tank_staged(self):
+        self.check_same_staged(Tank)
+
+    def test_drone_staged(self):
+        self.check_same_staged(Drone)
+
+
+if __name__ == '__main__':
+    for mdl in [Rover(), Drone()]:
+        copy_rate, snap_rate = bench_copy(mdl)
+        print(mdl.__class__.__name__ + ": copy: " + str(round(copy_rate, 1)) +
+              "/s, snapshot: " + str(round(snap_rate, 1)) + "/s, speedup: " +
+              str(round(snap_rate/copy_rate, 2)) + "x")
+    unittest.main()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for calculating statistics over scenarios using StackedHistory.
+
+Compares Result.get_expected and tabulate.result_summary_fmea, which stack each field
+into a single (scenario x time) array, with the previous implementations, which nest
+the history by scenario and compare/average each scenario separately.
+"""
+import time
+import unittest
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+from fmdtools.analyze import tabulate
+from fmdtools.analyze.result import History, Result, StackedHistory, is_numeric
+
+
+def get_expected_by_scen(res, weights=[], with_nominal=False,
+                         difference_from_nominal=False):
+    """Takes the expectation of a result by averaging the nested scenarios."""
+    mh = res.nest(levels=1)
+    nomhist = {k: v for k, v in mh.nominal.items() if is_numeric(v)}
+    newhists = {k: hist for k, hist in mh.items()
+                if not ('nominal' in k and not (with_nominal))}
+    if not weights:
+        weights = [1 for k in newhists]
+    expres = res.__class__()
+    for k in nomhist.keys():
+        if difference_from_nominal:
+            expres[k] = np.average([nomhist[k]-hist[k] for hist in newhists.values()],
+                                   axis=0, weights=weights)
+        else:
+            expres[k] = np.average([hist[k] for hist in newhists.values()],
+                                   axis=0, weights=weights)
+    return expres
+
+
+def summaries_by_scen(mdlhist, *attrs):
+    """Gets the fault/degradation summary of each scenario by comparing the nested
+    scenario histories with the nominal history (cut to the same length)."""
+    summaries = {}
+    mdlhist = mdlhist.nest(levels=1)
+    for scen, hist in mdlhist.items():
+        nomhist = mdlhist.nominal.cut(len(hist.time)-1, newcopy=True)
+        hist_comp = History(faulty=hist, nominal=nomhist)
+        summaries[scen] = hist_comp.get_fault_degradation_summary(*attrs)
+    return summaries
+
+
+def make_hists(hist, num_copies):
+    """Makes a history with num_copies copies of each faulty scenario."""
+    nest = hist.nest(levels=1)
+    bighist = History()
+    for k, v in nest.nominal.items():
+        bighist['nominal.'+k] = v
+    for i in range(num_copies):
+        for scen, scenhist in nest.items():
+            if scen != 'nominal':
+                for k, v in scenhist.items():
+                    bighist[scen+'_'+str(i)+'.'+k] = v
+    return bighist
+
+
+def bench_stacked(num_copies=20):
+    """Returns the time (s) to calculate the expected history and the
+    fault/degradation summaries of the pump over many scenarios by scenario and
+    using StackedHistory (including the time to stack the history)."""
+    mdl = Pump()
+    attrs = [*mdl.fxns, *mdl.flows]
+    app = SampleApproach(mdl)
+    _, hist = propagate.approach(mdl, app, track='all', showprogress=False)
+    hist = make_hists(hist, num_copies)
+    t0 = time.perf_counter()
+    get_expected_by_scen(hist)
+    summaries_by_scen(hist, *attrs)
+    t_scen = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    hist.get_expected()
+    hist.as_stacked().get_fault_degradation_summary(*attrs)
+    t_stacked = time.perf_counter() - t0
+    return t_scen, t_stacked, len(hist.nest(levels=1))
+
+
+class StackedHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                         'numpts': 2})
+        self.res, self.hist = propagate.approach(self.mdl, self.app, track='all',
+                                                 showprogress=False)
+
+    def check_same_hist(self, hist, ref):
+        self.assertEqual([*hist.keys()], [*ref.keys()])
+        for k, v in ref.items():
+            np.testing.assert_array_equal(hist[k], v)
+
+    def test_stack(self):
+        stacked = self.hist.as_stacked()
+        self.assertIsInstance(stacked, StackedHistory)
+        scens = [*self.hist.nest(levels=1).keys()]
+        self.assertEqual(stacked.scens, scens)
+        for k, v in stacked.items():
+            self.assertEqual(len(v), len(scens))
+            self.assertNotIsInstance(v, np.ma.MaskedArray)
+        self.check_same_hist(stacked.unstack(), self.hist.flatten())
+        scen = scens[1]
+        self.check_same_hist(stacked.get_scen(scen), self.hist.nest(levels=1)[scen])
+
+    def test_stack_ragged(self):
+        hist = History({'nominal.a': np.array([1.0, 2.0, 3.0]), 'nominal.b': 1.0,
+                        'f1.a': np.array([1.0]), 'f2.a': np.array([2.0, 2.0]),
+                        'f2.b': 3.0})
+        stacked = hist.as_stacked()
+        np.testing.assert_array_equal(np.ma.getmaskarray(stacked['a']),
+                                      [[0, 0, 0], [0, 1, 1], [0, 0, 1]])
+        np.testing.assert_array_equal(stacked.present['b'], [True, False, True])
+        self.check_same_hist(stacked.unstack(), hist)
+        expected = hist.get_expected()
+        np.testing.assert_array_equal(expected['a'], [1.5, 2.0])
+        self.assertEqual(expected['b'], 3.0)
+        expected = hist.get_expected(with_nominal=True, difference_from_nominal=True)
+        np.testing.assert_allclose(expected['a'], [-1/3, 0.0, 0.0])
+        self.assertEqual(expected['b'], -1.0)
+
+    def test_get_expected(self):
+        weights = [scen.rate for scen in self.app.scenlist]
+        for res in [self.hist, self.res]:
+            for diff in [False, True]:
+                self.check_same_hist(res.get_expected(difference_from_nominal=diff),
+                                     get_expected_by_scen(res,
+                                                          difference_from_nominal=diff))
+                self.check_same_hist(res.get_expected(app=self.app,
+                                                      difference_from_nominal=diff),
+                                     get_expected_by_scen(res, weights=weights,
+                                                          difference_from_nominal=diff))
+        self.check_same_hist(self.hist.get_expected(with_nominal=True),
+                             get_expected_by_scen(self.hist, with_nominal=True))
+
+    def test_fault_degradation_summary(self):
+        attrs = [*self.mdl.fxns, *self.mdl.flows]
+        summaries = self.hist.as_stacked().get_fault_degradation_summary(*attrs)
+        for scen, summary in summaries_by_scen(self.hist, *attrs).items():
+            self.assertEqual(summaries[scen].faulty, summary.faulty)
+            self.assertEqual(summaries[scen].degraded, summary.degraded)
+        table = tabulate.result_summary_fmea(self.res, self.hist, *attrs)
+        for scen, summary in summaries.items():
+            self.assertEqual(table.loc[scen, 'degraded'], str(summary.degraded))
+
+    def test_rover_summary(self):
+        mdl = Rover()
+        app = SampleApproach(mdl, faults=[('plan_path', 'no_con')],
+                             defaultsamp={'samp': 'evenspacing', 'numpts': 2})
+        _, hist = propagate.approach(mdl, app, track='all', showprogress=False)
+        attrs = [*mdl.fxns, *mdl.flows]
+        summaries = hist.as_stacked().get_fault_degradation_summary(*attrs)
+        for scen, summary in summaries_by_scen(hist, *attrs).items():
+            self.assertEqual(summaries[scen].faulty, summary.faulty)
+            self.assertEqual(summaries[scen].degraded, summary.degraded)
+
+    def test_degraded_hist(self):
+        stacked = self.hist.as_stacked()
+        deghist = stacked.get_degraded_hist(*self.mdl.fxns, *self.mdl.flows)
+        faulty_hist = stacked.get_faulty_hist(*self.mdl.fxns)
+        nest = self.hist.nest(levels=1)
+        for i, scen in enumerate(stacked.scens):
+            hist_comp = History(faulty=nest[scen], nominal=nest.nominal)
+            self.check_same_hist(Result({k: v[i] for k, v in deghist.items()}),
+                                 hist_comp.get_degraded_hist(*self.mdl.fxns,
+                                                             *self.mdl.flows))
+            self.check_same_hist(Result({k: v[i] for k, v in faulty_hist.items()}),
+                                 hist_comp.get_faulty_hist(*self.mdl.fxns))
+        deghist = stacked.get_degraded_hist('flows', nomhist=nest.nominal)
+        for i, scen in enumerate(stacked.scens):
+            hist_comp = History(faulty=nest[scen], nominal=nest.nominal)
+            np.testing.assert_array_equal(deghist['flows'][i],
+                                          hist_comp.get_degraded_hist('flows')['flows'])
+
+    def test_get_metrics(self):
+        stacked = self.hist.as_stacked()
+        metrics = stacked.get_metrics('s.eff', 'flows.ee_1.s.current')
+        nest = self.hist.nest(levels=1)
+        for i, scen in enumerate(stacked.scens):
+            ref = nest[scen].get_metrics('s.eff', 'flows.ee_1.s.current')
+            for k, v in ref.items():
+                self.assertAlmostEqual(metrics[k][i], v)
+        np.testing.assert_array_equal(stacked.get_metric('s.eff', axis=0)[1],
+                                      nest[stacked.scens[1]].get_metric('s.eff', axis=0))
+
+
+if __name__ == '__main__':
+    t_scen, t_stacked, num_scens = bench_stacked()
+    print("get_expected + fault/degradation summaries (" + str(num_scens) +
+          " scenarios): by scenario: " + str(round(t_scen, 3)) + "s, stacked: " +
+          str(round(t_stacked, 3)) + "s, speedup: " + str(round(t_scen/t_stacked, 2)) +
+          "x")
+    unittest.main()
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for change-tracking in static propagation.
+
+Compares Model.prop_static (which uses ChangeTracker stamps to skip constructing
+return_mutables for unchanged blocks/flows) with the previous approach of comparing
+return_mutables before and after every function call, as well as ordered static
+propagation (SimParam.static_order).
+"""
+import gc
+import time
+import unittest
+import numpy as np
+from recordclass import asdict
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from examples.multiflow_demo.multiflow_demo import TestModel as MultiflowModel
+from examples.multirotor.drone_mdl_dynamic import Drone
+from fmdtools.define.common import ChangeTracker, changes
+from fmdtools.define.block import FxnBlock
+from fmdtools.define.model import Model
+from fmdtools.define.time import Time
+from fmdtools.sim import propagate
+
+
+def prop_static_by_comparison(mdl, time, run_stochastic=False):
+    """Reference (untracked) static propagation, where return_mutables is constructed
+    and compared for each function/flow at each call."""
+    activefxns = mdl.staticfxns.copy()
+    nextfxns = set()
+    if not mdl._flowstates:
+        mdl._flowstates = dict.fromkeys(mdl.staticflows)
+        for flowname in mdl.staticflows:
+            mdl._flowstates[flowname] = mdl.flows[flowname].return_mutables()
+    n = 0
+    while activefxns:
+        flows_to_check = {*mdl.staticflows}
+        for fxnname in list(activefxns).copy():
+            oldmutables = mdl.fxns[fxnname].return_mutables()
+            mdl.fxns[fxnname]('static', time=time, run_stochastic=run_stochastic)
+            if oldmutables != mdl.fxns[fxnname].return_mutables():
+                nextfxns.update([fxnname])
+            for flowname in mdl.fxns[fxnname].flows:
+                if flowname in flows_to_check:
+                    if mdl._flowstates[flowname] != mdl.flows[flowname].return_mutables():
+                        nextfxns.update(set([n for n in mdl.graph.neighbors(flowname)
+                                             if n in mdl.staticfxns]))
+                        flows_to_check.remove(flowname)
+        for flowname in flows_to_check:
+            if mdl._flowstates[flowname] != mdl.flows[flowname].return_mutables():
+                nextfxns.update(set([n for n in mdl.graph.neighbors(flowname)
+                                     if n in mdl.staticfxns]))
+        for flowname in mdl.staticflows:
+            mdl._flowstates[flowname] = mdl.flows[flowname].return_mutables()
+        activefxns = nextfxns.copy()
+        nextfxns.clear()
+        n += 1
+        if n > 1000:
+            raise Exception("Undesired looping between functions in static propagation")
+
+
+class ByComparison(object):
+    """Context manager for running models with prop_static_by_comparison."""
+
+    def __enter__(self):
+        self.prop_static = Model.prop_static
+        Model.prop_static = prop_static_by_comparison
+
+    def __exit__(self, *args):
+        Model.prop_static = self.prop_static
+
+
+class CallLog(object):
+    """Context manager for logging the function calls made in a simulation."""
+
+    def __enter__(self):
+        self.calls = []
+        self.call = FxnBlock.__call__
+
+        def logged_call(fxn, proptype, faults=[], time=0, run_stochastic=False):
+            self.calls.append((time, proptype, fxn.name))
+            return self.call(fxn, proptype, faults=faults, time=time,
+                             run_stochastic=run_stochastic)
+        FxnBlock.__call__ = logged_call
+        return self.calls
+
+    def __exit__(self, *args):
+        FxnBlock.__call__ = self.call
+
+
+def bench_prop_static(mdl_class, reps=5):
+    """Returns the time (s) to simulate the nominal scenario with each approach."""
+    t_compare = []
+    t_tracked = []
+    for i in range(reps):
+        mdl = mdl_class()
+        with ByComparison():
+            t0 = time.perf_counter()
+            propagate.nominal(mdl, desired_result={}, track='all')
+            t_compare.append(time.perf_counter() - t0)
+        mdl = mdl_class()
+        t0 = time.perf_counter()
+        propagate.nominal(mdl, desired_result={}, track='all')
+        t_tracked.append(time.perf_counter() - t0)
+    return min(t_compare), min(t_tracked)
+
+
+class ChangeTrackerTests(unittest.TestCase):
+    def test_state_changes(self):
+        mdl = Pump()
+        s = mdl.flows['wat_1'].s
+        count = changes.count
+        s.put(flowrate=s.flowrate)
+        self.assertFalse(mdl.flows['wat_1'].has_changed(count))
+        s.inc(flowrate=1.0)
+        self.assertTrue(mdl.flows['wat_1'].has_changed(count))
+        self.assertFalse(mdl.flows['wat_1'].has_changed(changes.count))
+
+    def test_mode_changes(self):
+        fxn = Pump().fxns['move_water']
+        count = changes.count
+        fxn.m.remove_any_faults()
+        self.assertFalse(fxn.has_changed(count))
+        fxn.m.add_fault('mech_break')
+        self.assertTrue(fxn.has_changed(count))
+        count = changes.count
+        fxn.m.add_fault('mech_break')
+        self.assertFalse(fxn.has_changed(count))
+        fxn.m.remove_fault('mech_break', opermode='nominal')
+        self.assertTrue(fxn.has_changed(count))
+
+    def test_timer_changes(self):
+        class TimerTime(Time):
+            timernames = ('a',)
+        t = TimerTime()
+        count = changes.count
+        t.time = 0.0
+        self.assertFalse(t.has_changed(count))
+        t.a.inc(1.0)
+        self.assertTrue(t.has_changed(count))
+
+    def test_array_changes(self):
+        tracker = ChangeTracker()
+        a = []
+        tracker.mark_change(a, np.array([1.0, 2.0]), np.array([1.0, 2.0]))
+        self.assertTrue(tracker.changed_since(0, a))
+
+    def test_stamps_freed(self):
+        # stamps are removed when the (copied) models of each scenario are deleted
+        propagate.single_faults(Pump(), showprogress=False)
+        gc.collect()
+        num_stamps = len(changes.stamps)
+        for i in range(3):
+            propagate.single_faults(Pump(), showprogress=False)
+            propagate.nominal(Rover(), showprogress=False)
+        gc.collect()
+        self.assertLessEqual(len(changes.stamps), num_stamps)
+        mdl = Pump()
+        mdl.flows['wat_1'].s.inc(flowrate=1.0)
+        self.assertIn(id(mdl.flows['wat_1'].s), changes.stamps)
+        s_id = id(mdl.flows['wat_1'].s)
+        del mdl
+        gc.collect()
+        self.assertNotIn(s_id, changes.stamps)
+
+
+class StaticPropTests(unittest.TestCase):
+    def check_same_prop(self, mdl_class):
+        with CallLog() as ref_calls:
+            with ByComparison():
+                _, ref_hist = propagate.nominal(mdl_class(), desired_result={},
+                                                track='all')
+        with CallLog() as calls:
+            _, hist = propagate.nominal(mdl_class(), desired_result={}, track='all')
+        self.assertEqual(ref_calls, calls)
+        for k, v in hist.flatten().items():
+            np.testing.assert_array_equal(v, ref_hist.flatten()[k])
+
+    def test_pump_prop(self):
+        self.check_same_prop(Pump)
+
+    def test_rover_prop(self):
+        self.check_same_prop(Rover)
+
+    def test_multiflow_prop(self):
+        self.check_same_prop(MultiflowModel)
+
+    def test_drone_prop(self):
+        self.check_same_prop(Drone)
+
+    def test_faulty_prop(self):
+        mdl = Pump()
+        with CallLog() as ref_calls:
+            with ByComparison():
+                ref_res, _ = propagate.one_fault(mdl.copy(), 'move_water', 'short',
+                                                 time=10, track='all')
+        with CallLog() as calls:
+            res, _ = propagate.one_fault(mdl.copy(), 'move_water', 'short', time=10,
+                                         track='all')
+        self.assertEqual(ref_calls, calls)
+        self.assertEqual(ref_res, res)
+
+    def check_same_ordered_prop(self, mdl_class):
+        mdl = mdl_class()
+        _, hist = propagate.nominal(mdl, desired_result={}, track='all')
+        ordered_mdl = mdl_class(sp={**asdict(mdl.sp), 'static_order': True})
+        self.assertTrue(ordered_mdl.sp.static_order)
+        _, ordered_hist = propagate.nominal(ordered_mdl, desired_result={}, track='all')
+        for k, v in hist.flatten().items():
+            np.testing.assert_array_equal(v, ordered_hist.flatten()[k])
+
+    def test_ordered_prop(self):
+        for mdl_class in [Pump, Rover, MultiflowModel, Drone]:
+            self.check_same_ordered_prop(mdl_class)
+
+    def test_static_index(self):
+        mdl = Drone()
+        for flowname in mdl.staticflows:
+            neighbors = {*mdl.graph.neighbors(flowname)}.intersection(mdl.staticfxns)
+            self.assertEqual(mdl._flowfxns[flowname], neighbors)
+        self.assertEqual({*mdl.staticorder}, {*mdl.staticfxns})
+        cop = mdl.copy()
+        self.assertEqual(cop._flowfxns, mdl._flowfxns)
+        self.assertEqual(cop.staticorder, mdl.staticorder)
+
+
+if __name__ == '__main__':
+    for mdl_class in [Pump, Rover, Drone]:
+        t_compare, t_tracked = bench_prop_static(mdl_class)
+        print(mdl_class.__module__ + ": compared: " + str(round(t_compare, 4)) +
+              "s, tracked: " + str(round(t_tracked, 4)) + "s, speedup: " +
+              str(round(t_compare/t_tracked, 2)) + "x")
+    unittest.main()
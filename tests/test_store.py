@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Tests/benchmarks for saving and (lazily) loading results in columnar npz files.
+
+Compares the time to load a single field of a saved history from a pickle file (which
+loads the entire history) with an npz file (which only reads the given field).
+"""
+import os
+import time
+import tempfile
+import unittest
+import multiprocessing as mp
+import numpy as np
+from examples.pump.ex_pump import Pump
+from examples.rover.rover_model import Rover
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+from fmdtools.analyze.result import History, Result
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def bench_load_field(mdl, key, reps=5, track='all'):
+    """Returns the time (s) to load a single field of the history of single_faults from
+    pickle and npz files (as well as the file sizes in kB)."""
+    _, hist = propagate.single_faults(mdl, track=track, showprogress=False)
+    times = {}
+    sizes = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for ext in ['pkl', 'npz']:
+            filename = folder + '/hist.' + ext
+            hist.save(filename)
+            sizes[ext] = os.path.getsize(filename)/1000
+            t0 = time.perf_counter()
+            for i in range(reps):
+                loaded = History.load(filename)
+                loaded[key]
+                if ext == 'npz':
+                    loaded.data.close()
+            times[ext] = (time.perf_counter() - t0)/reps
+    return times, sizes
+
+
+class NpzStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                         'numpts': 2})
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def check_same_loaded(self, result, loaded):
+        flat = result.flatten()
+        self.assertEqual([*flat.keys()], [*loaded.keys()])
+        for k, v in flat.items():
+            np.testing.assert_array_equal(v, loaded[k])
+        loaded.data.close()
+
+    def test_save_load(self):
+        mfile = self.folder.name + '/hists.npz'
+        ecfile = self.folder.name + '/endclasses.npz'
+        res, hist = propagate.approach(self.mdl, self.app, track='all',
+                                       showprogress=False,
+                                       save_args={'mdlhist': {'filename': mfile},
+                                                  'endclass': {'filename': ecfile}})
+        self.check_same_loaded(hist, History.load(mfile))
+        self.check_same_loaded(res, Result.load(ecfile))
+
+    def test_save_load_indiv(self):
+        mfile = self.folder.name + '/hists.npz'
+        ecfile = self.folder.name + '/endclasses.npz'
+        res, hist = propagate.approach(self.mdl, self.app, track='all',
+                                       showprogress=False,
+                                       save_args={'mdlhist': {'filename': mfile},
+                                                  'endclass': {'filename': ecfile},
+                                                  'indiv': True})
+        self.assertFalse(os.path.exists(self.folder.name + '/hists'))
+        loaded_hist = History.load(mfile)
+        self.assertEqual({*hist.flatten().keys()}, {*loaded_hist.keys()})
+        for k, v in hist.flatten().items():
+            np.testing.assert_array_equal(v, loaded_hist[k])
+        loaded_hist.data.close()
+        loaded_res = Result.load(ecfile)
+        self.assertEqual(res.flatten(), loaded_res)
+        loaded_res.data.close()
+
+    def test_save_load_indiv_pool(self):
+        res, hist = propagate.single_faults(self.mdl, track='all', showprogress=False)
+        for stream in [False, True]:
+            mfile = self.folder.name + '/hists_' + str(stream) + '.npz'
+            ecfile = self.folder.name + '/endclasses_' + str(stream) + '.npz'
+            with mp.Pool(4) as pool:
+                propagate.single_faults(self.mdl, track='all', showprogress=False,
+                                        pool=pool, stream=stream,
+                                        save_args={'mdlhist': {'filename': mfile},
+                                                   'endclass': {'filename': ecfile},
+                                                   'indiv': True})
+            # all scenarios are saved (workers do not append to the file concurrently)
+            loaded_hist = History.load(mfile)
+            self.assertEqual(len(loaded_hist), len(hist.flatten()))
+            for k, v in hist.flatten().items():
+                np.testing.assert_array_equal(v, loaded_hist[k])
+            loaded_hist.data.close()
+            loaded_res = Result.load(ecfile)
+            self.assertEqual(res.flatten(), loaded_res)
+            loaded_res.data.close()
+
+    def test_load_folder(self):
+        _, hist = propagate.approach(self.mdl, self.app, showprogress=False)
+        for scen, scenhist in hist.nest(1).items():
+            scenhist.save(self.folder.name + '/' + scen + '.npz', result_id=scen)
+        loaded = History.load_folder(self.folder.name, 'npz')
+        self.assertEqual({*hist.keys()}, {*loaded.keys()})
+        for k, v in hist.items():
+            np.testing.assert_array_equal(v, loaded[k])
+        loaded.data.close()
+
+    @unittest.skipUnless(resource, "requires the resource module")
+    def test_load_folder_many(self):
+        hist = History({'a': np.arange(3.0), 'b': np.array([True, False, True])})
+        for i in range(400):
+            hist.save(self.folder.name + '/scen_' + str(i) + '.npz',
+                      result_id='scen_' + str(i))
+        # load more files than may be open at once
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, hard), hard))
+        try:
+            with History.load_folder(self.folder.name, 'npz').data as loaded:
+                self.assertEqual(len(loaded), 800)
+                for i in range(400):
+                    np.testing.assert_array_equal(loaded['scen_'+str(i)+'.a'], hist.a)
+                self.assertEqual(len(loaded.npzs), 1)
+            self.assertEqual(len(loaded.npzs), 0)
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    def test_lazy_load(self):
+        filename = self.folder.name + '/hist.npz'
+        _, hist = propagate.approach(self.mdl, self.app, track='all',
+                                     showprogress=False)
+        hist.save(filename)
+        loaded = History.load(filename)
+        self.assertEqual(len(loaded.data.loaded), 0)
+        key = 'nominal.fxns.move_water.s.eff'
+        np.testing.assert_array_equal(loaded[key], hist[key])
+        self.assertEqual([*loaded.data.loaded], [key])
+        np.testing.assert_array_equal(loaded.nominal.fxns.move_water.s.eff, hist[key])
+        loaded.data.close()
+
+    def test_append(self):
+        filename = self.folder.name + '/hist.npz'
+        hist = History({'a': np.array([1.0, 2.0]), 'b': np.array(['x', 'y'])})
+        hist.save(filename, result_id='scen_1')
+        hist.save(filename, result_id='scen_2', append=True)
+        with self.assertRaises(Exception):
+            hist.save(filename, result_id='scen_2', append=True)
+        with self.assertRaises(Exception):
+            hist.save(filename)
+        with self.assertRaises(Exception):
+            hist.save(self.folder.name + '/hist.pkl', append=True)
+        loaded = History.load(filename)
+        self.assertEqual([*loaded.keys()], ['scen_1.a', 'scen_1.b',
+                                            'scen_2.a', 'scen_2.b'])
+        np.testing.assert_array_equal(loaded['scen_2.b'], hist['b'])
+        loaded.data.close()
+
+
+if __name__ == '__main__':
+    for mdl, key in [(Pump(), 'nominal.fxns.move_water.s.eff'),
+                     (Rover(), 'nominal.flows.pos.s.x')]:
+        times, sizes = bench_load_field(mdl, key)
+        print(mdl.__class__.__name__ + " load field: pickle: " +
+              str(round(times['pkl'], 4)) + "s (" + str(round(sizes['pkl'])) +
+              " kB), npz: " + str(round(times['npz'], 4)) + "s (" +
+              str(round(sizes['npz'])) + " kB), speedup: " +
+              str(round(times['pkl']/times['npz'], 2)) + "x")
+    unittest.main()
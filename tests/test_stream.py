@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for streaming scenario results in approach/single_faults (stream=True), where
+scenario histories are passed to a reducer instead of being kept in memory.
+"""
+import unittest
+import multiprocessing as mp
+import numpy as np
+from examples.pump.ex_pump import Pump
+from fmdtools.sim import propagate
+from fmdtools.sim.approach import SampleApproach
+
+
+class HistReducer(object):
+    """Example reducer which finds the max of a given history key over scenarios."""
+
+    def __init__(self, key):
+        self.key = key
+        self.names = []
+        self.maxes = {}
+
+    def __call__(self, name, result, mdlhist):
+        self.names.append(name)
+        self.maxes[name] = np.max(mdlhist[self.key])
+
+
+class StreamTests(unittest.TestCase):
+    def setUp(self):
+        self.mdl = Pump()
+        self.app = SampleApproach(self.mdl, defaultsamp={'samp': 'evenspacing',
+                                                         'numpts': 2})
+        self.res, self.hist = propagate.approach(self.mdl, self.app, track='all',
+                                                 showprogress=False)
+
+    def check_same_stream(self, **kwargs):
+        key = 'fxns.move_water.s.eff'
+        reducer = HistReducer(key)
+        res, hist = propagate.approach(self.mdl, self.app, stream=True, track='all',
+                                       reducer=reducer, showprogress=False, **kwargs)
+        self.assertEqual(res, self.res)
+        self.assertEqual([*res.keys()], [*self.res.keys()])
+        self.assertFalse([k for k in hist if not k.startswith('nominal')])
+        self.assertEqual({*reducer.names}, {scen.name for scen in self.app.scenlist})
+        for name, val in reducer.maxes.items():
+            self.assertEqual(val, np.max(self.hist[name+'.'+key]))
+
+    def test_stream(self):
+        self.check_same_stream()
+
+    def test_stream_staged(self):
+        self.check_same_stream(staged=True)
+
+    def test_stream_pool(self):
+        with mp.Pool(2) as pool:
+            self.check_same_stream(pool=pool, close_pool=False, share_nomhist=True)
+
+    def test_stream_max_mem(self):
+        with self.assertRaises(Exception):
+            propagate.approach(self.mdl, self.app, max_mem=10, showprogress=False)
+        res, _ = propagate.approach(self.mdl, self.app, max_mem=10, stream=True,
+                                    showprogress=False)
+        self.assertEqual(res, self.res)
+
+    def test_iter_scenarios(self):
+        scen_iter = propagate.iter_scenarios(self.mdl, self.app.scenlist,
+                                             {0: self.mdl.new_with_params()},
+                                             nomhist=self.hist.nominal,
+                                             nomresult=self.res.nominal)
+        name, result, mdlhist = next(scen_iter)
+        self.assertEqual(name, self.app.scenlist[0].name)
+        np.testing.assert_array_equal(mdlhist.time, self.hist.get(name).time)
+
+
+if __name__ == '__main__':
+    unittest.main()